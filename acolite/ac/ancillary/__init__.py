@@ -1,5 +1,7 @@
 from .download import *
 from .get import *
+from .read_grid import *
+from .interp_grid import *
 from .interp_met import *
 from .interp_ozone import *
 from .list_files import *
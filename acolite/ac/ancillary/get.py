@@ -8,8 +8,10 @@
 ##                2018-07-18 (QV) changed acolite import name
 ##                2018-11-19 (QV) added verbosity option
 ##                2021-03-01 (QV) simplified for acg, renamed from ancillary_get
+##                2026-10-18 (AD) added cache keyword, lon and lat can be arrays
+##                2026-10-18 (AD) npz cache off by default
 
-def get(date, lon, lat, local_dir=None, quiet=True, kind='linear', verbosity=0):
+def get(date, lon, lat, local_dir=None, quiet=True, kind='linear', cache=False, verbosity=0):
     import acolite as ac
     import dateutil.parser, datetime
     import os
@@ -48,7 +50,7 @@ def get(date, lon, lat, local_dir=None, quiet=True, kind='linear', verbosity=0):
     else:
         if os.path.exists(ozone_file):
             if verbosity > 1: print('Reading ozone from {}'.format(ozone_file))
-            anc_ozone = ac.ac.ancillary.interp_ozone(ozone_file, lon, lat, kind=kind)
+            anc_ozone = ac.ac.ancillary.interp_ozone(ozone_file, lon, lat, kind=kind, cache=cache)
             for k in anc_ozone.keys(): anc[k] = anc_ozone[k]
 
     ## get ncep MET files
@@ -60,7 +62,7 @@ def get(date, lon, lat, local_dir=None, quiet=True, kind='linear', verbosity=0):
         if verbosity > 0: print('No NCEP files found for {}'.format(date))
     else:
         if verbosity > 1: print('Reading {} ncep met files'.format(len(ncep_files)))
-        anc_met = ac.ac.ancillary.interp_met(ncep_files,  lon, lat, ftime, kind=kind)
+        anc_met = ac.ac.ancillary.interp_met(ncep_files,  lon, lat, ftime, kind=kind, cache=cache)
         for k in anc_met.keys(): anc[k] = anc_met[k]
 
     return(anc)
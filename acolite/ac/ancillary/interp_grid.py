@@ -0,0 +1,27 @@
+## def interp_grid
+## interpolates a regular lat/lon grid as returned by read_grid to the given lon, lat
+## lon and lat can be scalars or arrays of any shape, all points are evaluated in a single call
+## kind is the RegularGridInterpolator method: 'nearest', 'linear', 'cubic', 'quintic'
+## linear interpolation uses ac.shared.grid_interp, which wraps around the antimeridian and keeps the edge values at the poles
+## points outside of the grid are extrapolated for the other methods
+## weights from ac.shared.grid_weights for the grid lons and lats can be given to reuse them for several datasets
+##
+## written by AD
+## 2026-10-18
+## modifications: 2026-10-18 (AD) linear interpolation with shared grid weights
+
+def interp_grid(grid, dataset, lon, lat, kind='linear', weights=None):
+    import numpy as np
+    from scipy import interpolate
+    import acolite as ac
+
+    if kind == 'linear':
+        if weights is None: weights = ac.shared.grid_weights(grid['lons'], grid['lats'], lon, lat)
+        return(ac.shared.grid_interp(grid['data'][dataset], weights))
+
+    lon, lat = np.broadcast_arrays(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    rgi = interpolate.RegularGridInterpolator((grid['lats'], grid['lons']), grid['data'][dataset],
+                                              method=kind, bounds_error=False, fill_value=None)
+    ret = rgi(np.stack((lat.ravel(), lon.ravel()), axis=-1)).reshape(lon.shape)
+    if ret.ndim == 0: ret = ret.item()
+    return(ret)
@@ -9,63 +9,39 @@
 ##                2018-03-05 (QV) fixed end of year rollover
 ##                2018-03-12 (QV) added file closing to enable file deletion for Windows
 ##                2021-03-01 (QV) simplified for acg renamed from ancillary_interp_met
+##                2026-10-18 (AD) use cached grids from read_grid and interp_grid, lon and lat can be arrays
+##                2026-10-18 (AD) grid weights computed once for the files on the same grid
+##                2026-10-18 (AD) npz cache off by default
 
-def interp_met(files, lon, lat, time, datasets=['z_wind','m_wind','press','rel_hum','p_water'], kind='linear'):
-
-    import os, sys, bz2
-    from pyhdf.SD import SD, SDC
+def interp_met(files, lon, lat, time, datasets=['z_wind','m_wind','press','rel_hum','p_water'], kind='linear', cache=False):
     import numpy as np
     from scipy import interpolate
+    import acolite as ac
 
     interp_data = {ds:[] for ds in datasets}
     ftimes = []
     jdates = []
+    weights, weights_grid = None, None
     for file in files:
-        zipped = False
-        # uncompress bz2 files
-        if file[-4:len(file)] == '.bz2':
-            try:
-                zipped=True
-                file = file.strip('.bz2')
-                file_zipped = file + '.bz2'
-                with bz2.open(file_zipped, 'rb') as f: data = f.read()
-                with open(file,'wb') as f: f.write(data)
-            except:
-                print("Error extracting file {}, probably incomplete download".format(file_zipped))
-
-        f = SD(file, SDC.READ)
-        datasets_dic = f.datasets()
-        meta = f.attributes()
+        grid = ac.ac.ancillary.read_grid(file, datasets, cache=cache)
+        if len(grid) == 0: continue
+        meta = grid['meta']
 
         ftime = meta['Start Millisec'] / 3600000.
         ftimes.append(ftime)
         jdates.append(meta['Start Day'])
 
-        ## make lons and lats for this file
-        lons = np.linspace(meta["Westernmost Longitude"], meta["Easternmost Longitude"],
-                        num = meta['Number of Columns'])
-        lats = np.linspace(meta["Northernmost Latitude"], meta["Southernmost Latitude"],
-                        num = meta['Number of Rows'])
-
+        ## do interpolation in space
+        if kind == 'linear':
+            grid_key = (len(grid['lons']), grid['lons'][0], grid['lons'][-1], len(grid['lats']), grid['lats'][0], grid['lats'][-1])
+            if grid_key != weights_grid:
+                weights = ac.shared.grid_weights(grid['lons'], grid['lats'], lon, lat)
+                weights_grid = grid_key
         for dataset in datasets:
-            sds_obj = f.select(dataset)
-            data = sds_obj.get()
-            ## do interpolation in space
-            if kind == 'nearest':
-                xi,xret = min(enumerate(lons), key=lambda x: abs(x[1]-float(lon)))
-                yi,yret = min(enumerate(lats), key=lambda x: abs(x[1]-float(lat)))
-                interp_data[dataset].append(data[yi,xi])
-            else:
-                interp = interpolate.interp2d(lons, lats, data, kind=kind)
-                idata = interp(lon, lat)
-                interp_data[dataset].append(idata[0])
+            interp_data[dataset].append(ac.ac.ancillary.interp_grid(grid, dataset, lon, lat, kind=kind, weights=weights))
             ## add QC?
 
-        f.end()
-        f = None
-
-        ### delete unzipped file
-        if (zipped): os.remove(file)
+    if len(ftimes) == 0: return({})
 
     ## add check for year for files[-1]?
     if (ftimes[-1] == 0.) & \
@@ -76,8 +52,9 @@ def interp_met(files, lon, lat, time, datasets=['z_wind','m_wind','press','rel_h
 
     if (time >= ftimes[0]) & (time <= ftimes[-1]):
         for dataset in datasets:
-            tinp = interpolate.interp1d(ftimes,interp_data[dataset])
-            ti = tinp(time).flatten()[0]
+            tinp = interpolate.interp1d(ftimes, np.asarray(interp_data[dataset]), axis=0)
+            ti = tinp(time)
+            if ti.ndim == 0: ti = ti.item()
             anc_data[dataset] = {"interp":ti, "series":interp_data[dataset]}
 
     return(anc_data)
@@ -7,34 +7,18 @@
 ##                2017-10-24 (QV) added option to use nearest neighbour (kind from scipy= ‘linear’, ‘cubic’, ‘quintic’)
 ##                2018-03-12 (QV) added file closing
 ##                2021-03-01 (QV) simplified for acg renamed from ancillary_interp_ozone
+##                2026-10-18 (AD) use cached grids from read_grid and interp_grid, lon and lat can be arrays
+##                2026-10-18 (AD) npz cache off by default
 
-def interp_ozone(file, lon, lat, dataset='ozone', kind='linear'):
-    from pyhdf.SD import SD, SDC
-    import numpy as np
-    from scipy import interpolate
+def interp_ozone(file, lon, lat, dataset='ozone', kind='linear', cache=False):
+    import acolite as ac
 
-    f = SD(file, SDC.READ)
-    datasets_dic = f.datasets()
-    meta = f.attributes()
-    sds_obj = f.select(dataset)
-    data = sds_obj.get()
-    f.end()
-    f = None
-
-    ## make lons and lats for this file
-    lons = np.linspace(meta["Westernmost Longitude"], meta["Easternmost Longitude"],
-                        num = meta['Number of Columns'])
-    lats = np.linspace(meta["Northernmost Latitude"], meta["Southernmost Latitude"],
-                        num = meta['Number of Rows'])
+    grid = ac.ac.ancillary.read_grid(file, [dataset], cache=cache)
+    if len(grid) == 0: return({})
 
     ## do interpolation in space
-    if kind == 'nearest':
-        xi,xret = min(enumerate(lons), key=lambda x: abs(x[1]-float(lon)))
-        yi,yret = min(enumerate(lats), key=lambda x: abs(x[1]-float(lat)))
-        uoz = data[yi,xi]/1000.
-    else:
-        interp = interpolate.interp2d(lons, lats, data, kind=kind)
-        uoz = (interp(lon, lat))[0]
+    uoz = ac.ac.ancillary.interp_grid(grid, dataset, lon, lat, kind=kind)
+    if kind == 'nearest': uoz = uoz/1000.
 
     anc_ozone = {'ozone':{'interp':uoz}}
     return(anc_ozone)
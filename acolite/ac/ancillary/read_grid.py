@@ -0,0 +1,108 @@
+## def read_grid
+## reads gridded datasets and lon/lat axes from an ancillary HDF4 file (NCEP MET, ozone)
+## bz2 files are decompressed to a temporary file that is removed after reading
+##
+## parsed grids are kept in an in memory LRU cache (read_grid_cache_size files)
+## and optionally in an npz file next to the ancillary file (cache=True, requires a writable ancillary directory)
+## the npz file is only used if it was written for the current size and modification time of the file
+##
+## returns a dict with meta, lons, lats (ascending) and data (rows flipped to ascending lats)
+##
+## written by AD
+## 2026-10-18
+## modifications: 2026-10-18 (AD) npz cache off by default
+
+from collections import OrderedDict
+
+## in memory cache of parsed grids, keyed by file, modification time and datasets
+read_grid_cache = OrderedDict()
+read_grid_cache_size = 16
+
+## metadata to keep from the HDF4 files
+read_grid_meta = ['Start Millisec', 'Start Day',
+                  'Westernmost Longitude', 'Easternmost Longitude', 'Number of Columns',
+                  'Northernmost Latitude', 'Southernmost Latitude', 'Number of Rows']
+
+def read_grid(file, datasets, cache=False, verbosity=0):
+    import os, bz2, tempfile, shutil
+    import numpy as np
+
+    if type(datasets) is not list: datasets = [datasets]
+    st = os.stat(file)
+    key = (os.path.abspath(file), st.st_size, st.st_mtime, tuple(datasets))
+
+    ## in memory
+    if key in read_grid_cache:
+        read_grid_cache.move_to_end(key)
+        return(read_grid_cache[key])
+
+    ## on disk
+    npz_file = '{}.npz'.format(file[0:-4] if file.endswith('.bz2') else file)
+    grid = None
+    if cache & os.path.exists(npz_file):
+        try:
+            with np.load(npz_file) as z:
+                if (int(z['source_size']) == st.st_size) & (float(z['source_mtime']) == st.st_mtime) & \
+                   (all(['data_{}'.format(ds) in z for ds in datasets])):
+                    grid = {'meta': {k: z['meta_{}'.format(k)].item() for k in read_grid_meta if 'meta_{}'.format(k) in z},
+                            'lons': z['lons'], 'lats': z['lats'],
+                            'data': {ds: z['data_{}'.format(ds)] for ds in datasets}}
+                    if verbosity > 1: print('Read ancillary grid from {}'.format(npz_file))
+        except BaseException as e:
+            if verbosity > 0: print('Could not read {}: {}'.format(npz_file, e))
+            grid = None
+
+    ## parse the HDF4 file
+    if grid is None:
+        from pyhdf.SD import SD, SDC
+
+        tmp_dir = None
+        hdf_file = file
+        if file.endswith('.bz2'):
+            tmp_dir = tempfile.mkdtemp()
+            hdf_file = '{}/{}'.format(tmp_dir, os.path.basename(file)[0:-4])
+            try:
+                with bz2.open(file, 'rb') as fi, open(hdf_file, 'wb') as fo: shutil.copyfileobj(fi, fo)
+            except:
+                print("Error extracting file {}, probably incomplete download".format(file))
+                shutil.rmtree(tmp_dir)
+                return()
+
+        try:
+            f = SD(hdf_file, SDC.READ)
+            attributes = f.attributes()
+            meta = {k: attributes[k] for k in read_grid_meta if k in attributes}
+            data = {ds: f.select(ds).get() for ds in datasets}
+            f.end()
+            f = None
+        finally:
+            if tmp_dir is not None: shutil.rmtree(tmp_dir)
+
+        ## make lons and lats for this file
+        lons = np.linspace(meta["Westernmost Longitude"], meta["Easternmost Longitude"],
+                           num = meta['Number of Columns'])
+        lats = np.linspace(meta["Northernmost Latitude"], meta["Southernmost Latitude"],
+                           num = meta['Number of Rows'])
+
+        ## flip to ascending latitudes
+        if lats[0] > lats[-1]:
+            lats = lats[::-1]
+            data = {ds: data[ds][::-1, :] for ds in data}
+        grid = {'meta': meta, 'lons': lons, 'lats': lats, 'data': {ds: np.ascontiguousarray(data[ds]) for ds in data}}
+
+        ## write npz cache
+        if cache:
+            try:
+                tmp_file = '{}.tmp{}.npz'.format(npz_file[0:-4], os.getpid())
+                np.savez(tmp_file, source_size=st.st_size, source_mtime=st.st_mtime,
+                         lons=lons, lats=lats,
+                         **{'meta_{}'.format(k): meta[k] for k in meta},
+                         **{'data_{}'.format(ds): grid['data'][ds] for ds in datasets})
+                os.replace(tmp_file, npz_file)
+                if verbosity > 1: print('Wrote ancillary grid to {}'.format(npz_file))
+            except BaseException as e:
+                if verbosity > 0: print('Could not write {}: {}'.format(npz_file, e))
+
+    read_grid_cache[key] = grid
+    while len(read_grid_cache) > read_grid_cache_size: read_grid_cache.popitem(last=False)
+    return(grid)
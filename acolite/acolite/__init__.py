@@ -1,6 +1,7 @@
 from .acolite_l1r import *
 from .acolite_l2r import *
 from .acolite_l2w import *
+from .l2w_required import *
 
 from .acolite_run import *
 from .acolite_map import *
@@ -14,6 +15,7 @@ from .parameter_scaling import *
 
 from . import settings
 from . import logging
+from . import profiling
 
 import os
 path=os.path.dirname(os.path.abspath(__file__))
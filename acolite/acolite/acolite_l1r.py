@@ -4,6 +4,7 @@
 ## 2021-03-10
 ## modifications: 2021-12-08 (QV) added nc_projection
 ##                2021-12-31 (QV) new handling of settings
+##                2026-10-18 (AD) added profiling stages
 
 def acolite_l1r(bundle, setu, input_type=None):
     import acolite as ac
@@ -26,7 +27,9 @@ def acolite_l1r(bundle, setu, input_type=None):
             for b in bundle: print(len(b), b)
 
     ## identify bundle
+    ac.acolite.profiling.start('identify_bundle')
     input_types = [ac.acolite.identify_bundle(b) for b in bundle]
+    ac.acolite.profiling.stop('identify_bundle')
     input_type = input_types[0]
     if not all([i == input_type for i in input_types]):
         print('Warning: Multiple input types given: {}'.format(input_types))
@@ -44,6 +47,8 @@ def acolite_l1r(bundle, setu, input_type=None):
                 print('Provided in the settings:', setu['limit'])
                 return()
 
+    ac.acolite.profiling.start('l1r_convert', input_type=input_type)
+
     ################
     ## ACOLITE
     if input_type == 'ACOLITE':
@@ -153,4 +158,5 @@ def acolite_l1r(bundle, setu, input_type=None):
     ## end AMAZONIA
     ################
 
+    ac.acolite.profiling.stop('l1r_convert')
     return(l1r_files, setu)
@@ -5,6 +5,17 @@
 ## modifications: 2021-03-11 (QV) forked from acolite_gem
 ##                2021-12-08 (QV) added nc_projection
 ##                2022-01-01 (QV) added segmented dsf option
+##                2026-10-18 (AD) keep input and output NetCDF open during processing
+##                2026-10-18 (AD) added l2r_block_size to compute surface reflectance in blocks of rows
+##                2026-10-18 (AD) added luts_cache setting
+##                2026-10-18 (AD) added ancillary_cache setting
+##                2026-10-18 (AD) interpolate tiled parameters in a single tiles_interp call
+##                2026-10-18 (AD) evaluate atmospheric parameters from band stacked LUTs
+##                2026-10-18 (AD) glint reference computed before the surface reflectance loop, glint removed before writing rhos
+##                2026-10-18 (AD) added profiling stages
+##                2026-10-18 (AD) use virtual geolocation for ancillary and dem data
+##                2026-10-18 (AD) hyperspectral convolution of all bands with the sparse rsr_matrix
+##                2026-10-18 (AD) added luts_hyper_sensor to use sensor LUTs generated for hyperspectral RSR
 
 def acolite_l2r(gem,
                 output = None,
@@ -27,8 +38,11 @@ def acolite_l2r(gem,
     time_start = datetime.datetime.now()
 
     ## read gem file if NetCDF
+    gem_close = False
     if type(gem) is str:
         gem = ac.gem.gem(gem)
+        gem.open()
+        gem_close = True
         nc_projection = gem.nc_projection
     gemf = gem.file
 
@@ -56,6 +70,7 @@ def acolite_l2r(gem,
         band_data = None
         if (nbf/npx) >= float(setu['blackfill_max']):
             if verbosity>0: print('Skipping scene as crop is {:.0f}% blackfill'.format(100*nbf/npx))
+            if gem_close: gem.close()
             return()
 
     if verbosity > 0: print('Running acolite for {}'.format(gemf))
@@ -87,8 +102,18 @@ def acolite_l2r(gem,
         rsrd = rsrd[gem.gatts['sensor']]
     else:
         print('Could not find {} RSR'.format(gem.gatts['sensor']))
+        if gem_close: gem.close()
         return()
 
+    ## sensor LUT for hyperspectral sensors, generated for the scene RSR and named by its hash
+    ## hyperspectral scenes then use the same band LUTs as multispectral sensors
+    lut_sensor, lut_rsr = gem.gatts['sensor'], None
+    if hyper & setu['luts_hyper_sensor']:
+        lut_rsr = {b: rsrd['rsr'][b] for b in rsrd['rsr_bands']}
+        lut_sensor = '{}_{}'.format(gem.gatts['sensor'], ac.shared.rsr_hash(lut_rsr))
+        if verbosity > 1: print('Using sensor LUT {} for {} bands'.format(lut_sensor, len(lut_rsr)))
+        hyper = False
+
     ## set defaults
     gem.gatts['uoz'] = setu['uoz_default']
     gem.gatts['uwv'] = setu['uwv_default']
@@ -96,14 +121,23 @@ def acolite_l2r(gem,
     gem.gatts['pressure'] = setu['pressure']
 
     ## read ancillary data
-    if (setu['ancillary_data']) & ((('lat' in gem.datasets) & ('lon' in gem.datasets)) | (('lat' in gem.gatts) & ('lon' in gem.gatts))):
+    geolocation = ('lat' in gem.datasets + gem.datasets_virtual) & ('lon' in gem.datasets + gem.datasets_virtual)
+    if (setu['ancillary_data']) & ((geolocation) | (('lat' in gem.gatts) & ('lon' in gem.gatts))):
         if ('lat' in gem.datasets) & ('lon' in gem.datasets):
             clon = np.nanmedian(gem.data('lon'))
             clat = np.nanmedian(gem.data('lat'))
+        elif geolocation:
+            ## scene centre from subsampled virtual geolocation
+            lon, lat = ac.shared.nc_geolocation(gem.file, stride=10)
+            clon = np.nanmedian(lon)
+            clat = np.nanmedian(lat)
+            lon, lat = None, None
         else:
             clon = gem.gatts['lon']
             clat = gem.gatts['lat']
-        anc = ac.ac.ancillary.get(gem.gatts['isodate'], clon, clat)
+        ac.acolite.profiling.start('ancillary')
+        anc = ac.ac.ancillary.get(gem.gatts['isodate'], clon, clat, cache=setu['ancillary_cache'], verbosity=verbosity)
+        ac.acolite.profiling.stop('ancillary')
 
         ## overwrite the defaults
         if ('ozone' in anc): gem.gatts['uoz'] = anc['ozone']['interp']/1000. ## convert from MET data
@@ -121,8 +155,9 @@ def acolite_l2r(gem,
 
     ## dem pressure
     if setu['dem_pressure']:
+        ac.acolite.profiling.start('dem')
         if verbosity > 1: print('Extracting SRTM DEM data')
-        if ('lat' in gem.datasets) & ('lon' in gem.datasets):
+        if geolocation:
             dem = ac.dem.dem_lonlat(gem.data('lon'), gem.data('lat'), source = setu['dem_source'])
         else:
             dem = ac.dem.dem_lonlat(gem.gatts['lon'], gem.gatts['lon'], source = setu['dem_source'])
@@ -139,6 +174,7 @@ def acolite_l2r(gem,
             gem.data_mem['dem_pressure'] = dem_pressure
         dem = None
         dem_pressure = None
+        ac.acolite.profiling.stop('dem')
 
     ## set wind to wind range
     if gem.gatts['wind'] is None: gem.gatts['wind'] = setu['wind_default']
@@ -273,7 +309,7 @@ def acolite_l2r(gem,
                 if len(np.atleast_1d(gem.data(ds)))>1: ## if not fixed geometry
                     gem.data_mem['{}_segmented'.format(ds)] = [np.nanmean(gem.data(ds)[segment_data[segment]['sub']]) for segment in segment_data]
                 else:
-                    gem.data_mem['{}_segmented'.format(ds)] = [1.0 * gem.data(ds) for segment in segment_data]
+                    gem.data_mem['{}_segmented'.format(ds)] = [float(np.nanmean(gem.data(ds))) for segment in segment_data]
     ## end segmenting
 
     if (not setu['resolved_geometry']) & (setu['dsf_aot_estimate'] != 'tiled'): use_revlut = False
@@ -317,7 +353,9 @@ def acolite_l2r(gem,
         gemo = ac.gem.gem(ofile, new=True,
                           netcdf_compression=setu['netcdf_compression'],
                           netcdf_compression_level=setu['netcdf_compression_level'],
-                          netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+                          netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'],
+                          netcdf_chunking=setu['netcdf_chunking'],
+                          keep_open=True)
 
         gemo.nc_projection = nc_projection
         gemo.bands = gem.bands
@@ -364,19 +402,29 @@ def acolite_l2r(gem,
                     gem.data_mem[k] = None
 
     t0 = time.time()
+    ac.acolite.profiling.start('lut_load')
     print('Loading LUTs')
     ## load reverse lut romix -> aot
-    if use_revlut: revl = ac.aerlut.reverse_lut(gem.gatts['sensor'], par=par, base_luts=setu['luts'])
+    if use_revlut: revl = ac.aerlut.reverse_lut(lut_sensor, par=par, base_luts=setu['luts'], rsr=lut_rsr)
     ## load aot -> atmospheric parameters lut
-    lutdw = ac.aerlut.import_luts(add_rsky=True, sensor=None if hyper else gem.gatts['sensor'],
+    lutdw = ac.aerlut.import_luts(add_rsky=True, sensor=None if hyper else lut_sensor, rsr=lut_rsr,
                                   base_luts=setu['luts'], pressures = setu['luts_pressures'],
-                                  reduce_dimensions=setu['luts_reduce_dimensions'])
+                                  reduce_dimensions=setu['luts_reduce_dimensions'], cache=setu['luts_cache'])
     luts = list(lutdw.keys())
+    ## stack sensor LUTs for the parameters used in the surface reflectance step
+    if (ac_opt == 'dsf') & (not hyper):
+        lut_stacks = {lut: ac.aerlut.lut_stack(lutdw[lut], [par, 'astot', 'dutott', 'ttot']) for lut in luts}
+    ## sparse RSR matrix to convolute hyperspectral LUT results to all bands at once
+    if hyper:
+        rsrm = ac.shared.rsr_matrix(lutdw[luts[0]]['meta']['wave'], rsrd['rsr'],
+                                    bands=[b for b in gem.bands if b in rsrd['rsr']], bounds_error=False)
+    ac.acolite.profiling.stop('lut_load')
     print('Loading LUTs took {:.1f} s'.format(time.time()-t0))
 
     ## #####################
     ## dark spectrum fitting
     if (ac_opt == 'dsf'):
+        ac.acolite.profiling.start('dsf_aot', dsf_aot_estimate=setu['dsf_aot_estimate'])
         ## user supplied aot
         if (setu['dsf_fixed_aot'] is not None):
             aot_lut = None
@@ -478,9 +526,9 @@ def acolite_l2r(gem,
                 elif setu['dsf_aot_estimate'] == 'segmented':
                     gk = '_segmented'
                     if setu['dsf_spectrum_option'] == 'darkest':
-                        band_data = np.array([np.nanpercentile(band_data[segment_data[segment]['sub']], 0)[0] for segment in segment_data])
+                        band_data = np.array([np.nanpercentile(band_data[segment_data[segment]['sub']], 0) for segment in segment_data])
                     if setu['dsf_spectrum_option'] == 'percentile':
-                        band_data = np.array([np.nanpercentile(band_data[segment_data[segment]['sub']], setu['dsf_percentile'])[0] for segment in segment_data])
+                        band_data = np.array([np.nanpercentile(band_data[segment_data[segment]['sub']], setu['dsf_percentile']) for segment in segment_data])
                     if setu['dsf_spectrum_option'] == 'intercept':
                         band_data = np.array([ac.shared.intercept(band_data[segment_data[segment]['sub']], setu['dsf_intercept_pixels'])  for segment in segment_data])
                     band_data.shape+=(1,1) ## make 2 dimensions
@@ -553,11 +601,11 @@ def acolite_l2r(gem,
                                                              gem.data_mem['sza'+gk],
                                                              gem.data_mem['wind'+gk], aot))
                                     rhot_aot.append(tmp.flatten())
-                                rhot_aot = np.asarray(rhot_aot)
+                                ## resample modeled results to all bands
+                                rhot_aot = ac.shared.rsr_convolute_matrix(np.asarray(rhot_aot), rsrm, axis=1)
 
-                            ## resample modeled results to current band
-                            tmp = ac.shared.rsr_convolute_nd(rhot_aot, lutdw[lut]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=1)
-                            tmp = tmp.flatten()
+                            ## modeled results for current band
+                            tmp = rhot_aot[:, rsrm['index'][b]].flatten()
 
                             ## interpolate rho path to observation
                             aot_band[lut][band_sub] = np.interp(band_data[band_sub], tmp,
@@ -717,7 +765,7 @@ def acolite_l2r(gem,
                                         for gki in range(len(aot_sub[0])):
                                             rhop_f[aot_sub[0][gki], aot_sub[1][gki], ai] = lutdw[lut]['rgi'][b]((xi[0][aot_sub[0][gki]], lutdw[lut]['ipd'][par],
                                                             xi[1][aot_sub[0][gki]], xi[2][aot_sub[0][gki]],
-                                                            xi[3][aot_sub[0][gki]], xi[4][aot_sub[0][gki]], aot_stack[lut]['min'][aot_sub][gki]))
+                                                            xi[3][aot_sub[0][gki]], xi[4][aot_sub[0][gki]], aot_stack[lut]['min'][aot_sub][gki])).item()
 
                                     else:
                                         rhop_f[aot_sub[0], aot_sub[1], ai] = lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd'][par],
@@ -751,6 +799,7 @@ def acolite_l2r(gem,
 
             rhod_f = None
             rhod_p = None
+        ac.acolite.profiling.stop('dsf_aot')
     ### end dark_spectrum_fitting
 
     ## exponential
@@ -954,9 +1003,6 @@ def acolite_l2r(gem,
         gemo.write('aot_550', aot_out)
         aot_out = None
 
-    ## store ttot for glint correction
-    ttot_all = {}
-
     ## allow use of per pixel geometry for fixed dsf
     if (per_pixel_geometry) & (setu['dsf_aot_estimate'] == 'fixed') & (setu['resolved_geometry']):
         use_revlut = True
@@ -970,241 +1016,309 @@ def acolite_l2r(gem,
 
     print('use_revlut', use_revlut)
 
-    hyper_res = None
-    ## compute surface reflectances
-    for bi, b in enumerate(gem.bands):
-        if ('rhot_ds' not in gem.bands[b]) or ('tt_gas' not in gem.bands[b]): continue
-        if gem.bands[b]['rhot_ds'] not in gem.datasets: continue ## skip if we don't have rhot for a band that is in the RSR file
-
-        dsi = gem.bands[b]['rhot_ds']
-        dso = gem.bands[b]['rhos_ds']
-        cur_data, cur_att = gem.data(dsi, attributes=True)
-
-        ## store rhot in output file
-        if copy_rhot:
-            gemo.write(dsi, cur_data, ds_att = cur_att)
-
-        if gem.bands[b]['tt_gas'] < setu['min_tgas_rho']: continue
-        if gem.bands[b]['rhot_ds'] not in gem.datasets: continue
-
-        t0 = time.time()
-        if verbosity > 1: print('Computing surface reflectance', b, gem.bands[b]['wave_name'], '{:.3f}'.format(gem.bands[b]['tt_gas']))
-
-        ds_att = gem.bands[b]
-        ds_att['wavelength']=ds_att['wave_nm']
-
-        ## dark spectrum fitting
-        if (ac_opt == 'dsf'):
-            gem.data_mem[dso] = np.zeros(cur_data.shape, dtype=np.float32)+np.nan
-            if setu['slicing']: valid_mask = np.isfinite(cur_data)
-
-            ## shape of atmospheric datasets
-            atm_shape = aot_sel.shape
-            ## if path reflectance is resolved, but resolved geometry available
+    ## blocks of rows for computing surface reflectance
+    ## sub is [xoff, yoff, xcount, ycount] as used by gem.data, None for the full scene
+    blocks = [None]
+    if setu['l2r_block_size'] is not None:
+        nrows, ncols = gem.gatts['data_dimensions']
+        block_size = max(1, setu['l2r_block_size'])
+        if block_size < nrows:
+            blocks = [[0, r0, ncols, min(block_size, nrows-r0)] for r0 in range(0, nrows, block_size)]
+            if verbosity > 1: print('Computing surface reflectance in {} blocks of {} rows'.format(len(blocks), block_size))
+            ## match chunking of output datasets to the blocks
+            if output_file: gemo.chunksizes = (block_size, ncols)
+
+            ## find segment indices per block
+            if (ac_opt == 'dsf') & (setu['dsf_aot_estimate'] == 'segmented'):
+                for segment in segment_data:
+                    seg_sub = segment_data[segment]['sub']
+                    segment_data[segment]['block_sub'] = {}
+                    for bsub in blocks:
+                        bs = np.where((seg_sub[0] >= bsub[1]) & (seg_sub[0] < bsub[1]+bsub[3]))
+                        segment_data[segment]['block_sub'][bsub[1]] = (seg_sub[0][bs]-bsub[1], seg_sub[1][bs])
+
+    ## subset full scene dataset to block
+    def block_data(data, bsub):
+        if (bsub is None) or (np.ndim(data) != 2): return(data)
+        if tuple(data.shape) != tuple(gem.gatts['data_dimensions']): return(data)
+        return(data[bsub[1]:bsub[1]+bsub[3], bsub[0]:bsub[0]+bsub[2]])
+
+    ## segment indices in the block
+    def segment_sub(segment, bsub):
+        if bsub is None: return(segment_data[segment]['sub'])
+        return(segment_data[segment]['block_sub'][bsub[1]])
+
+    ## write block to output file
+    def block_write(ds, data, bsub, ds_att = None):
+        if bsub is None:
+            gemo.write(ds, data, ds_att = ds_att)
+        else:
+            gemo.write(ds, data, ds_att = ds_att, offset = [bsub[0], bsub[1]],
+                       global_dims = gem.gatts['data_dimensions'])
+
+    ## geometry for band b in block
+    def block_geometry(b, bsub):
+        ## use band specific geometry if available
+        gk_raa = '{}'.format(gk)
+        gk_vza = '{}'.format(gk)
+        if 'raa_{}'.format(gem.bands[b]['wave_name']) in gem.datasets:
+            gk_raa = '_{}'.format(gem.bands[b]['wave_name'])+gk_raa
+        if 'vza_{}'.format(gem.bands[b]['wave_name']) in gem.datasets:
+            gk_vza = '_{}'.format(gem.bands[b]['wave_name'])+gk_vza
+        xi = [gem.data_mem['pressure'+gk],
+              gem.data_mem['raa'+gk_raa],
+              gem.data_mem['vza'+gk_vza],
+              gem.data_mem['sza'+gk],
+              gem.data_mem['wind'+gk]]
+        ## only resolved geometry is subset
+        if gk == '': xi = [block_data(x, bsub) for x in xi]
+        return(xi)
+
+    ## evaluate the stacked LUT for all parameters in band b
+    ## all bands are evaluated at once and kept when the coordinates are the same for all bands
+    ## and the results are small (e.g. fixed, tiled and segmented aot)
+    atm_stack, atm_stack_size, atm_stack_max = {}, 0, 2**24
+    band_geometry = any([('raa_{}'.format(gem.bands[b]['wave_name']) in gem.datasets) or \
+                         ('vza_{}'.format(gem.bands[b]['wave_name']) in gem.datasets) for b in gem.bands])
+    def lut_stack_eval(li, lut, b, bsub, xi, ai, all_bands = True):
+        nonlocal atm_stack_size
+        key = (li, None if bsub is None else bsub[1])
+        bi = lut_stacks[lut]['bands'].index(b)
+        if key in atm_stack: return(atm_stack[key][..., bi])
+        coords = (xi[0], xi[1], xi[2], xi[3], xi[4], ai)
+        size = np.broadcast(*[np.asarray(x) for x in coords]).size * len(lut_stacks[lut]['pars']) * len(lut_stacks[lut]['bands'])
+        if (all_bands) & (not band_geometry) & (atm_stack_size + size <= atm_stack_max):
+            atm_stack[key] = lut_stacks[lut]['rgi'](coords)
+            atm_stack_size += size
+            return(atm_stack[key][..., bi])
+        return(lut_stacks[lut]['rgi_band'][b](coords))
+
+    ## compute DSF atmospheric parameters for band b in block
+    def dsf_parameters(b, cur_data, bsub, pars = ['romix', 'astot', 'dutott']):
+        nonlocal hyper_res
+        if setu['slicing']: valid_mask = np.isfinite(cur_data)
+
+        ## aot and model for this block
+        aot_sel_b, aot_lut_b = aot_sel, aot_lut
+        if setu['dsf_aot_estimate'] == 'resolved':
+            aot_sel_b, aot_lut_b = block_data(aot_sel, bsub), block_data(aot_lut, bsub)
+
+        ## shape of atmospheric datasets
+        atm_shape = aot_sel_b.shape
+        ## if path reflectance is resolved, but resolved geometry available
+        if (use_revlut) & (setu['dsf_aot_estimate'] == 'fixed'):
+            atm_shape = cur_data.shape
+
+        geom = block_geometry(b, bsub)
+        atm = {prm: np.zeros(atm_shape, dtype=np.float32)+np.nan for prm in pars}
+        for li, lut in enumerate(luts):
+            ls = np.where(aot_lut_b == li)
+            if len(ls[0]) == 0: continue
+            ai = aot_sel_b[ls]
+
+            ## resolved geometry with fixed path reflectance
             if (use_revlut) & (setu['dsf_aot_estimate'] == 'fixed'):
-                atm_shape = cur_data.shape
-                gk = ''
+                ls = np.where(cur_data)
 
-            ## use band specific geometry if available
-            gk_raa = '{}'.format(gk)
-            gk_vza = '{}'.format(gk)
-            if 'raa_{}'.format(gem.bands[b]['wave_name']) in gem.datasets:
-                gk_raa = '_{}'.format(gem.bands[b]['wave_name'])+gk_raa
-            if 'vza_{}'.format(gem.bands[b]['wave_name']) in gem.datasets:
-                gk_vza = '_{}'.format(gem.bands[b]['wave_name'])+gk_vza
+            if (use_revlut):
+                xi = [x[ls] for x in geom]
+            else:
+                xi = [x for x in geom]
+                # subset to number of estimates made for this LUT
+                if len(xi[0]) > 1:
+                    xi = [[x[l] for l in ls[0]] for x in xi]
+
+            if hyper:
+                ## compute hyper results and resample later
+                ## hyperpectral sensors should be fixed DSF at the moment
+                ## resampled to all bands at once
+                if hyper_res is None:
+                    hyper_res = {}
+                    for prm in [par, 'astot', 'dutott', 'ttot']:
+                        hyper_res[prm] = ac.shared.rsr_convolute_matrix(lutdw[lut]['rgi']((xi[0], lutdw[lut]['ipd'][prm],
+                                         lutdw[lut]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], ai)).flatten(), rsrm, axis=0)
+                ## path reflectance, transmittances and spherical albedo for current band
+                for prm in pars:
+                    atm[prm][ls] = hyper_res[par if prm == 'romix' else prm][rsrm['index'][b]]
+            else:
+                ## path reflectance, transmittances and spherical albedo in one call
+                ## coordinates depend on the band data for resolved geometry with fixed path reflectance
+                res = lut_stack_eval(li, lut, b, bsub, xi, ai, all_bands = not ((use_revlut) & (setu['dsf_aot_estimate'] == 'fixed')))
+                for prm in pars:
+                    atm[prm][ls] = res[..., lut_stacks[lut]['pars'].index(par if prm == 'romix' else prm)]
+                res = None
+
+        ## interpolate tiled processing to block
+        if setu['dsf_aot_estimate'] == 'tiled':
+            if (verbosity > 1) & ((bsub is None) or (bsub[1] == 0)): print('Interpolating tiles')
+            ynew_b = ynew if bsub is None else ynew[bsub[1]:bsub[1]+bsub[3]]
+            atm_ = ac.shared.tiles_interp({prm: atm[prm] for prm in pars}, xnew, ynew_b, target_mask=(valid_mask if setu['slicing'] else None), \
+                                          target_mask_full=True, smooth=True, kern_size=3, method='linear')
+            for prm in pars: atm[prm] = atm_[prm]
+
+        ## create block parameters for segmented processing
+        if setu['dsf_aot_estimate'] == 'segmented':
+            for prm in pars:
+                atm_ = atm[prm] * 1.0
+                atm[prm] = np.zeros(cur_data.shape) + np.nan
+                for sidx, segment in enumerate(segment_data):
+                    atm[prm][segment_sub(segment, bsub)] = atm_[sidx]
+        return(atm)
 
-            romix = np.zeros(atm_shape, dtype=np.float32)+np.nan
-            astot = np.zeros(atm_shape, dtype=np.float32)+np.nan
-            dutott = np.zeros(atm_shape, dtype=np.float32)+np.nan
-            if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                ttot_all[b] = np.zeros(atm_shape, dtype=np.float32)+np.nan
+    ## default glint correction uses ttot
+    glint_default = (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default')
+    if (ac_opt == 'dsf') & (use_revlut) & (setu['dsf_aot_estimate'] == 'fixed'): gk = ''
 
-            for li, lut in enumerate(luts):
-                ls = np.where(aot_lut == li)
-                if len(ls[0]) == 0: continue
-                ai = aot_sel[ls]
-
-                ## resolved geometry with fixed path reflectance
-                if (use_revlut) & (setu['dsf_aot_estimate'] == 'fixed'):
-                    ls = np.where(cur_data)
-
-                if (use_revlut):
-                    xi = [gem.data_mem['pressure'+gk][ls],
-                          gem.data_mem['raa'+gk_raa][ls],
-                          gem.data_mem['vza'+gk_vza][ls],
-                          gem.data_mem['sza'+gk][ls],
-                          gem.data_mem['wind'+gk][ls]]
-                else:
-                    xi = [gem.data_mem['pressure'+gk],
-                          gem.data_mem['raa'+gk_raa],
-                          gem.data_mem['vza'+gk_vza],
-                          gem.data_mem['sza'+gk],
-                          gem.data_mem['wind'+gk]]
-                    # subset to number of estimates made for this LUT
-                    if len(xi[0]) > 1:
-                        xi = [[x[l] for l in ls[0]] for x in xi]
+    hyper_res = None
 
-                if hyper:
-                    ## compute hyper results and resample later
-                    ## hyperpectral sensors should be fixed DSF at the moment
-                    if hyper_res is None:
-                        hyper_res = {}
-                        for prm in [par, 'astot', 'dutott', 'ttot']:
-                            hyper_res[prm] = lutdw[lut]['rgi']((xi[0], lutdw[lut]['ipd'][prm],
-                                             lutdw[lut]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], ai)).flatten()
-                    ## resample to current band
-                    ### path reflectance
-                    romix[ls] = ac.shared.rsr_convolute_nd(hyper_res[par], lutdw[lut]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                    ## transmittance and spherical albedo
-                    astot[ls] = ac.shared.rsr_convolute_nd(hyper_res['astot'], lutdw[lut]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                    dutott[ls] = ac.shared.rsr_convolute_nd(hyper_res['dutott'], lutdw[lut]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                    ## total transmittance
-                    if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                        ttot_all[b][ls] = ac.shared.rsr_convolute_nd(hyper_res['ttot'], lutdw[lut]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                else:
-                    ## path reflectance
-                    romix[ls] = lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd'][par], xi[1], xi[2], xi[3], xi[4], ai))
-                    ## transmittance and spherical albedo
-                    astot[ls] = lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd']['astot'], xi[1], xi[2], xi[3], xi[4], ai))
-                    dutott[ls] = lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd']['dutott'], xi[1], xi[2], xi[3], xi[4], ai))
-                    ## total transmittance
-                    if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                        ttot_all[b][ls] = lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd']['ttot'], xi[1], xi[2], xi[3], xi[4], ai))
-
-            ## interpolate tiled processing to full scene
-            if setu['dsf_aot_estimate'] == 'tiled':
-                if verbosity > 1: print('Interpolating tiles')
-                romix = ac.shared.tiles_interp(romix, xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                target_mask_full=True, smooth=True, kern_size=3, method='linear')
-                astot = ac.shared.tiles_interp(astot, xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                target_mask_full=True, smooth=True, kern_size=3, method='linear')
-                dutott = ac.shared.tiles_interp(dutott, xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                target_mask_full=True, smooth=True, kern_size=3, method='linear')
-                if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                    ttot_all[b] = ac.shared.tiles_interp(ttot_all[b], xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                    target_mask_full=True, smooth=True, kern_size=3, method='linear')
-
-            ## create full scene parameters for segmented processing
-            if setu['dsf_aot_estimate'] == 'segmented':
-                romix_ = romix * 1.0
-                astot_ = astot * 1.0
-                dutott_ = dutott * 1.0
-                romix = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                astot = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                dutott = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                for sidx, segment in enumerate(segment_data):
-                    romix[segment_data[segment]['sub']] = romix_[sidx]
-                    astot[segment_data[segment]['sub']] = astot_[sidx]
-                    dutott[segment_data[segment]['sub']] = dutott_[sidx]
-                if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                    ttot_all_ = ttot_all[b] * 1.0
-                    ttot_all[b] = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                    for sidx, segment in enumerate(segment_data):
-                        ttot_all[b][segment_data[segment]['sub']] = ttot_all_[sidx]
-
-            ## write ac parameters
-            if setu['dsf_write_tiled_parameters']:
-                if len(np.atleast_1d(romix)>1):
-                    if romix.shape == cur_data.shape:
-                        gemo.write('romix_{}'.format(gem.bands[b]['wave_name']), romix)
-                if len(np.atleast_1d(astot)>1):
-                    if astot.shape == cur_data.shape:
-                        gemo.write('astot_{}'.format(gem.bands[b]['wave_name']), astot)
-                if len(np.atleast_1d(dutott)>1):
-                    if dutott.shape == cur_data.shape:
-                        gemo.write('dutott_{}'.format(gem.bands[b]['wave_name']), dutott)
-                if (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
-                    if len(np.atleast_1d(ttot_all[b])>1):
-                        if ttot_all[b].shape == cur_data.shape:
-                            gemo.write('ttot_{}'.format(gem.bands[b]['wave_name']), ttot_all[b])
-
-            ## do atmospheric correction
-            rhot_noatm = (cur_data/ gem.bands[b]['tt_gas']) - romix
-            romix = None
-            cur_data = (rhot_noatm) / (dutott + astot*rhot_noatm)
-            astot=None
-            dutott=None
+    ## bands for which surface reflectance is computed
+    rhos_bands = [b for b in gem.bands if ('rhot_ds' in gem.bands[b]) and ('tt_gas' in gem.bands[b]) and \
+                  (gem.bands[b]['rhot_ds'] in gem.datasets) and (gem.bands[b]['tt_gas'] >= setu['min_tgas_rho'])]
+
+    ## geometry for glint correction in block
+    def glint_geometry(bsub):
+        ## compute scattering angle
+        dtor = np.pi / 180.
+        sza = block_data(gem.data_mem['sza'], bsub) * dtor
+        vza = block_data(gem.data_mem['vza'], bsub) * dtor
+        raa = block_data(gem.data_mem['raa'], bsub) * dtor
+
+        ## flatten 1 element arrays
+        if sza.shape == (1,1): sza = sza.flatten()
+        if vza.shape == (1,1): vza = vza.flatten()
+        if raa.shape == (1,1): raa = raa.flatten()
+
+        muv = np.cos(vza)
+        mus = np.cos(sza)
+        cos2omega = mus*muv + np.sin(sza)*np.sin(vza)*np.cos(raa)
+        omega = np.arccos(np.sqrt(cos2omega))
+        omega = np.arccos(cos2omega)/2
+        return(muv, mus, omega)
+
+    ## glint correction factors for band b relative to the reference bands
+    def glint_factors(b, ttot, muv, mus, omega, gs):
+        sub_gc = gs['sub_gc']
+        ## two way direct transmittance
+        T_cur  = np.exp(-1.*(ttot/muv)) * np.exp(-1.*(ttot/mus))
+        ## subset if 2d
+        T_cur_sub = T_cur[sub_gc] if len(np.atleast_2d(T_cur)) > 1 else T_cur[0] * 1.0
+        ## fresnel reflectance for this band and the reference bands
+        Rf_cur = ac.ac.sky_refl(omega, n_w=refri_sen[b])
+        gcf = {}
+        for k, rb in [('SWIR1', gc_swir1_b), ('SWIR2', gc_swir2_b), ('USER', gc_user_b)]:
+            if rb is None: continue
+            Rf_ref = ac.ac.sky_refl(omega, n_w=refri_sen[rb])
+            if len(np.atleast_2d(Rf_cur))>1: ## if resolved angles
+                gcf[k] = (T_cur_sub/gs['T_{}'.format(k)]) * (Rf_cur[sub_gc]/Rf_ref[sub_gc])
+            else:
+                gcf[k] = (T_cur_sub/gs['T_{}'.format(k)]) * (Rf_cur/Rf_ref)
+        return(gcf)
+
+    ## compute glint reference for block from the reference bands surface reflectance
+    def glint_reference(bsub):
+        muv, mus, omega = glint_geometry(bsub)
+
+        ## surface reflectance of reference bands, as float32 as written to the output
+        ref_rhos, ref_ttot = {}, {}
+        for b in [gc_mask_b, gc_swir1_b, gc_swir2_b, gc_user_b]:
+            if (b is None) or (b in ref_rhos): continue
+            cur_data = gem.data(gem.bands[b]['rhot_ds'], sub=bsub)
+            atm = dsf_parameters(b, cur_data, bsub, pars = ['romix', 'astot', 'dutott', 'ttot'])
+            rhot_noatm = (cur_data/ gem.bands[b]['tt_gas']) - atm['romix']
+            ref_rhos[b] = ((rhot_noatm) / (atm['dutott'] + atm['astot']*rhot_noatm)).astype(np.float32)
+            ref_ttot[b] = atm['ttot']
+            atm = None
             rhot_noatm = None
-        ## exponential
-        elif (ac_opt == 'exp'):
-            ## get Rayleigh correction
-            rorayl_cur = lutdw[exp_lut]['rgi'][b]((xi[0], lutdw[exp_lut]['ipd'][par], xi[1], xi[2], xi[3], xi[4], 0.001))
-            dutotr_cur = lutdw[exp_lut]['rgi'][b]((xi[0], lutdw[exp_lut]['ipd']['dutott'], xi[1], xi[2], xi[3], xi[4], 0.001))
-
-            ## get epsilon in current band
-            delta = (long_wv-gem.bands[b]['wave_nm'])/(long_wv-short_wv)
-            eps_cur = np.power(epsilon, delta)
-            rhoam_cur = rhoam * eps_cur
-
-            ## add results to band
-            if exp_fixed_epsilon: ds_att['epsilon'] = eps_cur
-            if exp_fixed_rhoam: ds_att['rhoam'] = rhoam_cur
-
-            cur_data = (cur_data - rorayl_cur - rhoam_cur) / (dutotr_cur)
-            cur_data[mask] = np.nan
-        ## end exponential
-
-        ## write rhorc
-        if (setu['output_rhorc']):
-            ## read TOA
-            cur_rhorc, cur_att = gem.data(dsi, attributes=True)
-
-            ## compute Rayleigh parameters for DSF
-            if (ac_opt == 'dsf'):
-                ## no subset
-                xi = [gem.data_mem['pressure'+gk],
-                      gem.data_mem['raa'+gk_raa],
-                      gem.data_mem['vza'+gk_vza],
-                      gem.data_mem['sza'+gk],
-                      gem.data_mem['wind'+gk]]
-
-                ## get Rayleigh parameters
-                if hyper:
-                    rorayl_hyper = lutdw[luts[0]]['rgi']((xi[0], lutdw[luts[0]]['ipd'][par],
-                                        lutdw[luts[0]]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], 0.001)).flatten()
-                    dutotr_hyper = lutdw[luts[0]]['rgi']((xi[0], lutdw[luts[0]]['ipd']['dutott'],
-                                        lutdw[luts[0]]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], 0.001)).flatten()
-                    rorayl_cur = ac.shared.rsr_convolute_nd(rorayl_hyper, lutdw[luts[0]]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                    dutotr_cur = ac.shared.rsr_convolute_nd(dutotr_hyper, lutdw[luts[0]]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
-                else:
-                    rorayl_cur = lutdw[luts[0]]['rgi'][b]((xi[0], lutdw[luts[0]]['ipd'][par], xi[1], xi[2], xi[3], xi[4], 0.001))
-                    dutotr_cur = lutdw[luts[0]]['rgi'][b]((xi[0], lutdw[luts[0]]['ipd']['dutott'], xi[1], xi[2], xi[3], xi[4], 0.001))
 
-            ## create full scene parameters for segmented processing
-            if setu['dsf_aot_estimate'] == 'segmented':
-                rorayl_ = rorayl_cur * 1.0
-                dutotr_ = dutotr_cur * 1.0
-                rorayl_cur = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                dutotr_cur = np.zeros(gem.gatts['data_dimensions']) + np.nan
-                for sidx, segment in enumerate(segment_data):
-                    rorayl_cur[segment_data[segment]['sub']] = rorayl_[sidx]
-                    dutotr_cur[segment_data[segment]['sub']] = dutotr_[sidx]
-
-            ## create full scene parameters for tiled processing
-            if (setu['dsf_aot_estimate'] == 'tiled') & (use_revlut):
-                if verbosity > 1: print('Interpolating tiles for rhorc')
-                rorayl_cur = ac.shared.tiles_interp(rorayl_cur, xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                            target_mask_full=True, smooth=True, kern_size=3, method='linear')
-                dutotr_cur = ac.shared.tiles_interp(dutotr_cur, xnew, ynew, target_mask=(valid_mask if setu['slicing'] else None), \
-                            target_mask_full=True, smooth=True, kern_size=3, method='linear')
-
-            cur_rhorc = (cur_rhorc - rorayl_cur) / (dutotr_cur)
-            gemo.write(dso.replace('rhos_', 'rhorc_'), cur_rhorc, ds_att = ds_att)
-            cur_rhorc = None
-            rorayl_cur = None
-            dtotr_cur = None
-            utotr_cur = None
-
-        ## write rhos
-        gemo.write(dso, cur_data, ds_att = ds_att)
-        cur_data = None
-        if verbosity > 1: print('{}/B{} took {:.1f}s ({})'.format(gem.gatts['sensor'], b, time.time()-t0, 'RevLUT' if use_revlut else 'StdLUT'))
+        ## sub_gc has the idx for non masked data with rhos_ref below the masking threshold
+        gs = {}
+        gs['sub_gc'] = np.where(np.isfinite(ref_rhos[gc_mask_b]) & \
+                                (ref_rhos[gc_mask_b]<=setu['glint_mask_rhos_threshold']))
+        sub_gc = gs['sub_gc']
+
+        ## get reference bands transmittance
+        for k, rb in [('SWIR1', gc_swir1_b), ('SWIR2', gc_swir2_b), ('USER', gc_user_b)]:
+            if rb is None: continue
+            T_cur  = np.exp(-1.*(ref_ttot[rb]/muv)) * np.exp(-1.*(ref_ttot[rb]/mus))
+            gs['T_{}'.format(k)] = T_cur[sub_gc] if len(np.atleast_2d(T_cur)) > 1 else T_cur[0] * 1.0
+            T_cur = None
+
+        ## choose glint correction band (based on first band results)
+        b0 = rhos_bands[0]
+        if b0 in ref_ttot:
+            ttot = ref_ttot[b0]
+        else:
+            ttot = dsf_parameters(b0, gem.data(gem.bands[b0]['rhot_ds'], sub=bsub), bsub, pars=['ttot'])['ttot']
+        gcf = glint_factors(b0, ttot, muv, mus, omega, gs)
+        if gc_user is None:
+            swir1_rhos = ref_rhos[gc_swir1_b][sub_gc]
+            swir2_rhos = ref_rhos[gc_swir2_b][sub_gc]
+            ## set negatives to 0
+            swir1_rhos[swir1_rhos<0] = 0
+            swir2_rhos[swir2_rhos<0] = 0
+            ## estimate glint correction in the blue band
+            g1_blue = gcf['SWIR1'] * swir1_rhos
+            g2_blue = gcf['SWIR2'] * swir2_rhos
+            ## use SWIR1 or SWIR2 based glint correction
+            use_swir1 = np.where(g1_blue<g2_blue)
+            g1_blue, g2_blue = None, None
+            rhog_ref = swir2_rhos
+            rhog_ref[use_swir1] = swir1_rhos[use_swir1]
+            swir1_rhos, swir2_rhos = None, None
+            use_swir1 = None
+            gs['use_swir1'] = use_swir1
+        else:
+            rhog_ref = ref_rhos[gc_user_b][sub_gc]
+            ## set negatives to 0
+            rhog_ref[rhog_ref<0] = 0
+        gs['rhog_ref'] = rhog_ref
+
+        ## write reference glint
+        if setu['glint_write_rhog_ref']:
+            tmp = np.zeros(gem.gatts['data_dimensions'] if bsub is None else (bsub[3], bsub[2]), dtype=np.float32) + np.nan
+            tmp[sub_gc] = rhog_ref
+            block_write('rhog_ref', tmp, bsub)
+            tmp = None
+        return(gs)
+
+    ## remove glint from the surface reflectance of band b in block
+    def glint_remove(b, cur_data, ttot, bsub):
+        gs = glint_blocks[None if bsub is None else bsub[1]]
+        if (bsub is None) or (bsub[1] == 0):
+            print('Performing glint correction for band {} ({} nm)'.format(b, gem.bands[b]['wave_name']))
+
+        ## get gc factors for this band
+        muv, mus, omega = glint_geometry(bsub)
+        gcf = glint_factors(b, ttot, muv, mus, omega, gs)
+
+        ## calculate glint in this band
+        if gc_user is None:
+            cur_rhog = gcf['SWIR2'] * gs['rhog_ref']
+            try:
+                cur_rhog[gs['use_swir1']] = gcf['SWIR1'][gs['use_swir1']] * gs['rhog_ref'][gs['use_swir1']]
+            except:
+                cur_rhog[gs['use_swir1']] = gcf['SWIR1'] * gs['rhog_ref'][gs['use_swir1']]
+        else:
+            cur_rhog = gcf['USER'] * gs['rhog_ref']
 
-    ## update outputfile dataset info
-    gemo.datasets_read()
+        ## remove glint from rhos, as float32 as written to the output
+        cur_data = cur_data.astype(np.float32)
+        cur_data[gs['sub_gc']]-=cur_rhog
+
+        ## write band glint
+        if setu['glint_write_rhog_all']:
+            tmp = np.zeros(cur_data.shape, dtype=np.float32) + np.nan
+            tmp[gs['sub_gc']] = cur_rhog
+            block_write('rhog_{}'.format(gem.bands[b]['wave_name']), tmp, bsub, ds_att={'wavelength':gem.bands[b]['wavelength']})
+            tmp = None
+        cur_rhog = None
+        return(cur_data)
 
     ## glint correction
-    if (ac_opt == 'dsf') & (setu['dsf_residual_glint_correction']) & (setu['dsf_residual_glint_correction_method']=='default'):
+    ## the glint reference is computed per block before the surface reflectance loop
+    ## so glint can be removed from each band before it is written
+    glint_blocks = None
+    if (ac_opt == 'dsf') & (glint_default):
         ## find bands for glint correction
         gc_swir1, gc_swir2 = None, None
         gc_swir1_b, gc_swir2_b = None, None
@@ -1212,34 +1326,34 @@ def acolite_l2r(gem,
         gc_user, gc_mask = None, None
         gc_user_b, gc_mask_b = None, None
         userd, maskd = 1000, 1000
-        for b in gemo.bands:
+        for b in gem.bands:
             ## swir1
-            sd = np.abs(gemo.bands[b]['wave_nm'] - 1600)
+            sd = np.abs(gem.bands[b]['wave_nm'] - 1600)
             if sd < 100:
                 if sd < swir1d:
-                    gc_swir1 = gemo.bands[b]['rhos_ds']
+                    gc_swir1 = gem.bands[b]['rhos_ds']
                     swir1d = sd
                     gc_swir1_b = b
             ## swir2
-            sd = np.abs(gemo.bands[b]['wave_nm'] - 2200)
+            sd = np.abs(gem.bands[b]['wave_nm'] - 2200)
             if sd < 100:
                 if sd < swir2d:
-                    gc_swir2 = gemo.bands[b]['rhos_ds']
+                    gc_swir2 = gem.bands[b]['rhos_ds']
                     swir2d = sd
                     gc_swir2_b = b
             ## mask band
-            sd = np.abs(gemo.bands[b]['wave_nm'] - setu['glint_mask_rhos_wave'])
+            sd = np.abs(gem.bands[b]['wave_nm'] - setu['glint_mask_rhos_wave'])
             if sd < 100:
                 if sd < maskd:
-                    gc_mask = gemo.bands[b]['rhos_ds']
+                    gc_mask = gem.bands[b]['rhos_ds']
                     maskd = sd
                     gc_mask_b = b
             ## user band
             if setu['glint_force_band'] is not None:
-                sd = np.abs(gemo.bands[b]['wave_nm'] - setu['glint_force_band'])
+                sd = np.abs(gem.bands[b]['wave_nm'] - setu['glint_force_band'])
                 if sd < 100:
                     if sd < userd:
-                        gc_user = gemo.bands[b]['rhos_ds']
+                        gc_user = gem.bands[b]['rhos_ds']
                         userd = sd
                         gc_user_b = b
 
@@ -1251,151 +1365,163 @@ def acolite_l2r(gem,
         ## start glint correction
         if ((gc_swir1 is not None) and (gc_swir2 is not None)) or (gc_user is not None):
             t0 = time.time()
+            ac.acolite.profiling.start('glint')
             print('Starting glint correction')
 
-            ## compute scattering angle
-            dtor = np.pi / 180.
-            sza = gem.data_mem['sza'] * dtor
-            vza = gem.data_mem['vza'] * dtor
-            raa = gem.data_mem['raa'] * dtor
-
-            ## flatten 1 element arrays
-            if sza.shape == (1,1): sza = sza.flatten()
-            if vza.shape == (1,1): vza = vza.flatten()
-            if raa.shape == (1,1): raa = raa.flatten()
-
-            muv = np.cos(vza)
-            mus = np.cos(sza)
-            cos2omega = mus*muv + np.sin(sza)*np.sin(vza)*np.cos(raa)
-            omega = np.arccos(np.sqrt(cos2omega))
-            omega = np.arccos(cos2omega)/2
-
             ## read and resample refractive index
             refri = ac.ac.refri()
             refri_sen = ac.shared.rsr_convolute_dict(refri['wave']/1000, refri['n'], rsrd['rsr'])
 
-            ## compute fresnel reflectance for each n
-            Rf_sen = {b: ac.ac.sky_refl(omega, n_w=refri_sen[b]) for b in refri_sen}
-
             ## compute where to apply the glint correction
-            ## sub_gc has the idx for non masked data with rhos_ref below the masking threshold
-            gc_mask_data = gemo.data(gc_mask)
-
-            if gc_mask_data == (): ## can be an empty tuple for night time images (should not be processed, but this avoids a crash)
+            if (gc_mask_b not in rhos_bands): ## e.g. for night time images (should not be processed, but this avoids a crash)
                 print('No glint mask could be determined.')
+            elif any([(rb is not None) and (rb not in rhos_bands) for rb in [gc_swir1_b, gc_swir2_b, gc_user_b]]):
+                print('No surface reflectance for the glint reference bands.')
             else:
-                sub_gc = np.where(np.isfinite(gc_mask_data) & \
-                                  (gc_mask_data<=setu['glint_mask_rhos_threshold']))
-                gc_mask_data = None
+                glint_blocks = {}
+                for bsub in blocks:
+                    glint_blocks[None if bsub is None else bsub[1]] = glint_reference(bsub)
+                if verbosity > 1: print('Computing glint reference took {:.1f}s'.format(time.time()-t0))
+            ac.acolite.profiling.stop('glint')
+    ## compute surface reflectances
+    for bi, b in enumerate(gem.bands):
+        if ('rhot_ds' not in gem.bands[b]) or ('tt_gas' not in gem.bands[b]): continue
+        if gem.bands[b]['rhot_ds'] not in gem.datasets: continue ## skip if we don't have rhot for a band that is in the RSR file
+
+        dsi = gem.bands[b]['rhot_ds']
+        dso = gem.bands[b]['rhos_ds']
 
-                ## get reference bands transmittance
-                for ib, b in enumerate(gemo.bands):
-                    rhos_ds = gemo.bands[b]['rhos_ds']
-                    if rhos_ds not in [gc_swir1, gc_swir2, gc_user]: continue
-                    if rhos_ds not in gemo.datasets: continue
+        ## skip surface reflectance for bands with low gas transmittance
+        compute_rhos = gem.bands[b]['tt_gas'] >= setu['min_tgas_rho']
 
-                    ## two way direct transmittance
-                    T_cur  = np.exp(-1.*(ttot_all[b]/muv)) * np.exp(-1.*(ttot_all[b]/mus))
+        t0 = time.time()
+        ac.acolite.profiling.start('rhos_band', band=b)
+        for bsub in blocks:
+            cur_data, cur_att = gem.data(dsi, attributes=True, sub=bsub)
 
-                    ## subset if 2d
-                    T_cur_sub = T_cur[sub_gc] if len(np.atleast_2d(T_cur)) > 1 else T_cur[0] * 1.0
+            ## store rhot in output file
+            if copy_rhot:
+                block_write(dsi, cur_data, bsub, ds_att = cur_att)
 
-                    if rhos_ds == gc_user:
-                        T_USER = T_cur_sub * 1.0
-                    else:
-                        if rhos_ds == gc_swir1: T_SWIR1 = T_cur_sub * 1.0
-                        if rhos_ds == gc_swir2: T_SWIR2 = T_cur_sub * 1.0
-                    T_cur = None
-
-                ## swir band choice is made for first band
-                gc_choice = False
-                ## glint correction per band
-                for ib, b in enumerate(gemo.bands):
-                    rhos_ds = gemo.bands[b]['rhos_ds']
-                    if rhos_ds not in gemo.datasets: continue
-                    if b not in ttot_all: continue
-                    print('Performing glint correction for band {} ({} nm)'.format(b, gemo.bands[b]['wave_name']))
-
-                    ## two way direct transmittance
-                    T_cur  = np.exp(-1.*(ttot_all[b]/muv)) * np.exp(-1.*(ttot_all[b]/mus))
-
-                    ## subset if 2d
-                    T_cur_sub = T_cur[sub_gc] if len(np.atleast_2d(T_cur)) > 1 else T_cur[0] * 1.0
-
-                    ## get gc factors for this band
-                    if gc_user is None:
-                        if len(np.atleast_2d(Rf_sen[b]))>1: ## if resolved angles
-                            gc_SWIR1 = (T_cur_sub/T_SWIR1) * (Rf_sen[b][sub_gc]/Rf_sen[gc_swir1_b][sub_gc])
-                            gc_SWIR2 = (T_cur_sub/T_SWIR2) * (Rf_sen[b][sub_gc]/Rf_sen[gc_swir2_b][sub_gc])
-                        else:
-                            gc_SWIR1 = (T_cur_sub/T_SWIR1) * (Rf_sen[b]/Rf_sen[gc_swir1_b])
-                            gc_SWIR2 = (T_cur_sub/T_SWIR2) * (Rf_sen[b]/Rf_sen[gc_swir2_b])
-                    else:
-                        if len(np.atleast_2d(Rf_sen[b]))>1: ## if resolved angles
-                            gc_USER = (T_cur_sub/T_USER) * (Rf_sen[b][sub_gc]/Rf_sen[gc_user_b][sub_gc])
-                        else:
-                            gc_USER = (T_cur_sub/T_USER) * (Rf_sen[b]/Rf_sen[gc_user_b])
-
-                    ## choose glint correction band (based on first band results)
-                    if gc_choice is False:
-                        gc_choice = True
-                        if gc_user is None:
-                            swir1_rhos = gemo.data(gc_swir1)[sub_gc]
-                            swir2_rhos = gemo.data(gc_swir2)[sub_gc]
-                            ## set negatives to 0
-                            swir1_rhos[swir1_rhos<0] = 0
-                            swir2_rhos[swir2_rhos<0] = 0
-                            ## estimate glint correction in the blue band
-                            g1_blue = gc_SWIR1 * swir1_rhos
-                            g2_blue = gc_SWIR2 * swir2_rhos
-                            ## use SWIR1 or SWIR2 based glint correction
-                            use_swir1 = np.where(g1_blue<g2_blue)
-                            g1_blue, g2_blue = None, None
-                            rhog_ref = swir2_rhos
-                            rhog_ref[use_swir1] = swir1_rhos[use_swir1]
-                            swir1_rhos, swir2_rhos = None, None
-                            use_swir1 = None
-                        else:
-                            rhog_ref = gemo.data(gc_user)[sub_gc]
-                            ## set negatives to 0
-                            rhog_ref[rhog_ref<0] = 0
-                        ## write reference glint
-                        if setu['glint_write_rhog_ref']:
-                            tmp = np.zeros(gemo.gatts['data_dimensions'], dtype=np.float32) + np.nan
-                            tmp[sub_gc] = rhog_ref
-                            gemo.write('rhog_ref', tmp)
-                            tmp = None
-                    ## end select glint correction band
-
-                    ## calculate glint in this band
-                    if gc_user is None:
-                        cur_rhog = gc_SWIR2 * rhog_ref
-                        try:
-                            cur_rhog[use_swir1] = gc_SWIR1[use_swir1] * rhog_ref[use_swir1]
-                        except:
-                            cur_rhog[use_swir1] = gc_SWIR1 * rhog_ref[use_swir1]
+            if not compute_rhos: continue
+
+            if (verbosity > 1) & ((bsub is None) or (bsub[1] == 0)):
+                print('Computing surface reflectance', b, gem.bands[b]['wave_name'], '{:.3f}'.format(gem.bands[b]['tt_gas']))
+
+            ds_att = gem.bands[b]
+            ds_att['wavelength']=ds_att['wave_nm']
+
+            ## dark spectrum fitting
+            if (ac_opt == 'dsf'):
+                if setu['slicing']: valid_mask = np.isfinite(cur_data)
+
+                pars = ['romix', 'astot', 'dutott']
+                if glint_default: pars.append('ttot')
+                atm = dsf_parameters(b, cur_data, bsub, pars = pars)
+
+                ## keep ttot for glint correction
+                if glint_blocks is not None: ttot = atm['ttot']
+
+                ## write ac parameters
+                if setu['dsf_write_tiled_parameters']:
+                    for prm in pars:
+                        if len(np.atleast_1d(atm[prm])>1):
+                            if atm[prm].shape == cur_data.shape:
+                                block_write('{}_{}'.format(prm, gem.bands[b]['wave_name']), atm[prm], bsub)
+
+                ## do atmospheric correction
+                rhot_noatm = (cur_data/ gem.bands[b]['tt_gas']) - atm['romix']
+                cur_data = (rhot_noatm) / (atm['dutott'] + atm['astot']*rhot_noatm)
+                atm = None
+                rhot_noatm = None
+            ## exponential
+            elif (ac_opt == 'exp'):
+                ## get Rayleigh correction
+                rorayl_cur = lutdw[exp_lut]['rgi'][b]((xi[0], lutdw[exp_lut]['ipd'][par], xi[1], xi[2], xi[3], xi[4], 0.001))
+                dutotr_cur = lutdw[exp_lut]['rgi'][b]((xi[0], lutdw[exp_lut]['ipd']['dutott'], xi[1], xi[2], xi[3], xi[4], 0.001))
+
+                ## get epsilon in current band
+                delta = (long_wv-gem.bands[b]['wave_nm'])/(long_wv-short_wv)
+                eps_cur = np.power(block_data(epsilon, bsub), delta)
+                rhoam_cur = block_data(rhoam, bsub) * eps_cur
+
+                ## add results to band
+                if exp_fixed_epsilon: ds_att['epsilon'] = eps_cur
+                if exp_fixed_rhoam: ds_att['rhoam'] = rhoam_cur
+
+                cur_data = (cur_data - rorayl_cur - rhoam_cur) / (dutotr_cur)
+                cur_data[block_data(mask, bsub)] = np.nan
+            ## end exponential
+
+            ## write rhorc
+            if (setu['output_rhorc']):
+                ## read TOA
+                cur_rhorc, cur_att = gem.data(dsi, attributes=True, sub=bsub)
+
+                ## compute Rayleigh parameters for DSF
+                if (ac_opt == 'dsf'):
+                    ## no subset
+                    xi = block_geometry(b, bsub)
+
+                    ## get Rayleigh parameters
+                    if hyper:
+                        rorayl_hyper = lutdw[luts[0]]['rgi']((xi[0], lutdw[luts[0]]['ipd'][par],
+                                            lutdw[luts[0]]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], 0.001)).flatten()
+                        dutotr_hyper = lutdw[luts[0]]['rgi']((xi[0], lutdw[luts[0]]['ipd']['dutott'],
+                                            lutdw[luts[0]]['meta']['wave'], xi[1], xi[2], xi[3], xi[4], 0.001)).flatten()
+                        rorayl_cur = ac.shared.rsr_convolute_nd(rorayl_hyper, lutdw[luts[0]]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
+                        dutotr_cur = ac.shared.rsr_convolute_nd(dutotr_hyper, lutdw[luts[0]]['meta']['wave'], rsrd['rsr'][b]['response'], rsrd['rsr'][b]['wave'], axis=0)
                     else:
-                        cur_rhog = gc_USER * rhog_ref
-
-                    ## remove glint from rhos
-                    cur_data = gemo.data(rhos_ds)
-                    cur_data[sub_gc]-=cur_rhog
-                    gemo.write(rhos_ds, cur_data, ds_att = gem.bands[b])
-
-                    ## write band glint
-                    if setu['glint_write_rhog_all']:
-                        tmp = np.zeros(gemo.gatts['data_dimensions'], dtype=np.float32) + np.nan
-                        tmp[sub_gc] = cur_rhog
-                        gemo.write('rhog_{}'.format(gemo.bands[b]['wave_name']), tmp, ds_att={'wavelength':gemo.bands[b]['wavelength']})
-                        tmp = None
-                    cur_rhog = None
-                Rf_sen = None
-                rhog_ref = None
-    ## end glint correction
+                        res = lut_stacks[luts[0]]['rgi_band'][b]((xi[0], xi[1], xi[2], xi[3], xi[4], 0.001))
+                        rorayl_cur = res[..., lut_stacks[luts[0]]['pars'].index(par)]
+                        dutotr_cur = res[..., lut_stacks[luts[0]]['pars'].index('dutott')]
+                        res = None
+
+                ## create block parameters for segmented processing
+                if setu['dsf_aot_estimate'] == 'segmented':
+                    rorayl_ = rorayl_cur * 1.0
+                    dutotr_ = dutotr_cur * 1.0
+                    rorayl_cur = np.zeros(cur_rhorc.shape) + np.nan
+                    dutotr_cur = np.zeros(cur_rhorc.shape) + np.nan
+                    for sidx, segment in enumerate(segment_data):
+                        rorayl_cur[segment_sub(segment, bsub)] = rorayl_[sidx]
+                        dutotr_cur[segment_sub(segment, bsub)] = dutotr_[sidx]
+
+                ## create block parameters for tiled processing
+                if (setu['dsf_aot_estimate'] == 'tiled') & (use_revlut):
+                    if (verbosity > 1) & ((bsub is None) or (bsub[1] == 0)): print('Interpolating tiles for rhorc')
+                    ynew_b = ynew if bsub is None else ynew[bsub[1]:bsub[1]+bsub[3]]
+                    rhorc_ = ac.shared.tiles_interp({'rorayl': rorayl_cur, 'dutotr': dutotr_cur}, xnew, ynew_b, target_mask=(valid_mask if setu['slicing'] else None), \
+                                target_mask_full=True, smooth=True, kern_size=3, method='linear')
+                    rorayl_cur = rhorc_['rorayl']
+                    dutotr_cur = rhorc_['dutotr']
+                    rhorc_ = None
+
+                cur_rhorc = (cur_rhorc - rorayl_cur) / (dutotr_cur)
+                block_write(dso.replace('rhos_', 'rhorc_'), cur_rhorc, bsub, ds_att = ds_att)
+                cur_rhorc = None
+                rorayl_cur = None
+                dutotr_cur = None
+
+            ## remove glint before writing rhos
+            if (ac_opt == 'dsf') & (glint_blocks is not None):
+                cur_data = glint_remove(b, cur_data, ttot, bsub)
+                ttot = None
+
+            ## write rhos
+            block_write(dso, cur_data, bsub, ds_att = ds_att)
+            cur_data = None
+        ac.acolite.profiling.stop('rhos_band')
+        if (compute_rhos) & (verbosity > 1): print('{}/B{} took {:.1f}s ({})'.format(gem.gatts['sensor'], b, time.time()-t0, 'RevLUT' if use_revlut else 'StdLUT'))
+
+    ## update outputfile dataset info
+    gemo.datasets_read()
+
 
     ## alternative glint correction
     if (ac_opt == 'dsf') & (setu['dsf_residual_glint_correction']) & (setu['dsf_aot_estimate'] in ['fixed', 'segmented']) &\
        (setu['dsf_residual_glint_correction_method']=='alternative'):
+        ac.acolite.profiling.start('glint', method='alternative')
 
         ## reference aot and wind speed
         if setu['dsf_aot_estimate'] == 'fixed':
@@ -1519,6 +1645,7 @@ def acolite_l2r(gem,
                     gemo.write('rhog_{}'.format(gemo.bands[b]['wave_name']), tmp, ds_att={'wavelength':gemo.bands[b]['wavelength']})
                     tmp = None
                 cur_rhog = None
+        ac.acolite.profiling.stop('glint')
     ## end alternative glint correction
 
     ## compute oli orange band
@@ -1546,11 +1673,12 @@ def acolite_l2r(gem,
         gemo.bands['O'] = ob
 
         ## compute orange band
-        ob_data = gemo.data(gemo.bands[panb]['rhos_ds'])*float(ob_cfg['pf'])
-        ob_data += gemo.data(gemo.bands[greenb]['rhos_ds'])*float(ob_cfg['gf'])
-        ob_data += gemo.data(gemo.bands[redb]['rhos_ds'])*float(ob_cfg['rf'])
-        gemo.write(ob['rhos_ds'], ob_data, ds_att = ob)
-        ob_data = None
+        for bsub in blocks:
+            ob_data = gemo.data(gemo.bands[panb]['rhos_ds'], sub=bsub)*float(ob_cfg['pf'])
+            ob_data += gemo.data(gemo.bands[greenb]['rhos_ds'], sub=bsub)*float(ob_cfg['gf'])
+            ob_data += gemo.data(gemo.bands[redb]['rhos_ds'], sub=bsub)*float(ob_cfg['rf'])
+            block_write(ob['rhos_ds'], ob_data, bsub, ds_att = ob)
+            ob_data = None
         ob = None
     ## end orange band
 
@@ -1558,7 +1686,10 @@ def acolite_l2r(gem,
     aot_lut, aot_sel = None, None
 
     ## update attributes with latest version
-    if output_file: gemo.update_attributes()
+    if output_file:
+        gemo.update_attributes()
+        gemo.close()
+    if gem_close: gem.close()
 
     if verbosity>0: print('Wrote {}'.format(ofile))
 
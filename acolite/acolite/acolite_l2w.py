@@ -3,6 +3,10 @@
 ## written by Quinten Vanhellemont, RBINS
 ## 2021-03-09
 ## modifications: 2021-12-08 (QV) added nc_projection
+##                2026-10-18 (AD) keep input and output NetCDF open during processing
+##                2026-10-18 (AD) read L2R datasets lazily, keeping them in memory only while remaining parameters require them
+##                2026-10-18 (AD) added l2w_block_size to compute all parameters per block of rows, with bands read once per block
+##                2026-10-18 (AD) added profiling stages
 
 def acolite_l2w(gem,
                 settings = None,
@@ -24,7 +28,7 @@ def acolite_l2w(gem,
     ## read gem file if NetCDF
     if type(gem) is str:
         gemf = '{}'.format(gem)
-        gem = ac.gem.read(gem, sub=sub, load_data=load_data)
+        gem = ac.gem.read(gem, sub=sub, load_data=load_data, lazy=True)
         if 'nc_projection' in gem:
             nc_projection = gem['nc_projection']
         else:
@@ -45,6 +49,10 @@ def acolite_l2w(gem,
     ## combine default and user defined settings
     setu = ac.acolite.settings.parse(gem['gatts']['sensor'], settings=settings)
 
+    ## open input file for datasets not loaded in gem
+    gemi = ac.gem.gem(gemf)
+    gemi.open()
+
     ## get rhot and rhos wavelengths
     rhot_ds = [ds for ds in gem['datasets'] if 'rhot_' in ds]
     rhot_waves = [int(ds.split('_')[-1]) for ds in rhot_ds]
@@ -57,6 +65,7 @@ def acolite_l2w(gem,
     if gem['gatts']['acolite_file_type'] != 'L2R':
         print('Only L2W processing of ACOLITE L2R files supported.')
         print('{} is a "{}" file'.format(gemf, gem['gatts']['acolite_file_type']))
+        gemi.close()
         return(None)
 
     ## read rsr
@@ -97,6 +106,13 @@ def acolite_l2w(gem,
                 if wn == 'nan': continue
                 setu['l2w_parameters'].append(k.replace('_*', '_{}').format(wn))
 
+    ## declare datasets required by each parameter
+    ## in block processing the parameter datasets are read per block
+    lazy = (type(gem['data']) is ac.gem.lazy) & (setu['l2w_block_size'] is None)
+    if lazy:
+        l2w_required = {cur_par: ac.acolite.l2w_required(cur_par, rhos_waves, rhot_waves, gem['gatts']['sensor']) for cur_par in setu['l2w_parameters']}
+        for cur_par in setu['l2w_parameters']: gem['data'].require(l2w_required[cur_par])
+
     ## compute flag value to mask for water products
     flag_value = 0
     if setu['l2w_mask']:
@@ -112,7 +128,7 @@ def acolite_l2w(gem,
     if cur_par in gem['data']:
         cur_data = 1.0 * gem['data'][cur_par]
     else:
-        cur_data = ac.shared.nc_data(gemf, cur_par, sub=sub).data
+        cur_data = gemi.data(cur_par, sub=sub)
     if setu['l2w_mask_smooth']:
         cur_data = ac.shared.fillnan(cur_data)
         cur_data = scipy.ndimage.gaussian_filter(cur_data, setu['l2w_mask_smooth_sigma'], mode='reflect')
@@ -127,7 +143,7 @@ def acolite_l2w(gem,
         if cur_par in gem['data']:
             cur_data = 1.0 * gem['data'][cur_par]
         else:
-            cur_data = ac.shared.nc_data(gemf, cur_par, sub=sub).data
+            cur_data = gemi.data(cur_par, sub=sub)
         if setu['l2w_mask_smooth']:
             cur_data = ac.shared.fillnan(cur_data)
             cur_data = scipy.ndimage.gaussian_filter(cur_data, setu['l2w_mask_smooth_sigma'], mode='reflect')
@@ -143,7 +159,7 @@ def acolite_l2w(gem,
         if cur_par in gem['data']:
             cur_data = 1.0 * gem['data'][cur_par]
         else:
-            cur_data = ac.shared.nc_data(gemf, cur_par, sub=sub).data
+            cur_data = gemi.data(cur_par, sub=sub)
         if ci == 0:
             outmask = np.isnan(cur_data)
         else:
@@ -166,13 +182,36 @@ def acolite_l2w(gem,
         if cur_par in gem['data']:
             cur_data = 1.0 * gem['data'][cur_par]
         else:
-            cur_data = ac.shared.nc_data(gemf, cur_par, sub=sub).data
+            cur_data = gemi.data(cur_par, sub=sub)
         #if setu['l2w_mask_smooth']: cur_data = scipy.ndimage.gaussian_filter(cur_data, setu['l2w_mask_smooth_sigma'])
         if neg_mask is None: neg_mask = np.zeros(cur_data.shape).astype(bool)
         neg_mask = (neg_mask) | (cur_data < 0)
     l2_flags = (l2_flags) | (neg_mask.astype(np.int32)*(2**setu['flag_exponent_negative']))
     neg_mask = None
 
+    ## set up output file
+    gemo = ac.gem.gem(ofile, new=new,
+                      netcdf_compression=setu['netcdf_compression'],
+                      netcdf_compression_level=setu['netcdf_compression_level'],
+                      netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'],
+                      netcdf_chunking=setu['netcdf_chunking'],
+                      keep_open=True)
+    gemo.gatts = gem['gatts']
+    gemo.nc_projection = nc_projection
+    if new: gemo.datasets = []
+
+    ## blocks of rows for computing parameters
+    ## sub is [xoff, yoff, xcount, ycount] in the L2W dimensions, None for the full scene
+    blocks = [None]
+    if setu['l2w_block_size'] is not None:
+        nrows, ncols = l2_flags.shape
+        block_size = max(1, setu['l2w_block_size'])
+        if block_size < nrows:
+            blocks = [[0, r0, ncols, min(block_size, nrows-r0)] for r0 in range(0, nrows, block_size)]
+            if verbosity > 1: print('Computing L2W parameters in {} blocks of {} rows'.format(len(blocks), block_size))
+            ## match chunking of output datasets to the blocks
+            gemo.chunksizes = (block_size, ncols)
+
     ## list datasets to copy over from L2R
     for cur_par in gem['data']:
         if cur_par in copy_datasets: continue
@@ -198,6 +237,10 @@ def acolite_l2w(gem,
         elif (('bt*' in setu['l2w_parameters']) & ('bt' == cur_par.lower()[0:2])):
             copy_datasets.append(cur_par)
 
+    ## keep datasets copied to several outputs until the last copy
+    copy_tags = [cur_par.replace('Rrs_','rhos_').replace('rhow_','rhos_') for cur_par in copy_datasets]
+    if lazy: gem['data'].require(copy_tags)
+
     ## copy datasets
     for ci, cur_par in enumerate(copy_datasets):
         factor = 1.0
@@ -225,1239 +268,1231 @@ def acolite_l2w(gem,
             cur_data = factor * gem['data'][cur_tag]
             cur_att = gem['atts'][cur_tag]
         else:
-            if cur_tag not in ac.shared.nc_datasets(gemf): continue
-            cur_d, cur_att = ac.shared.nc_data(gemf, cur_tag, sub=sub, attributes=True)
-            cur_data = factor * cur_d.data
-            cur_data[cur_d.mask] = np.nan
+            if cur_tag not in gemi.datasets: continue
+            cur_d, cur_att = gemi.data(cur_tag, sub=sub, attributes=True)
+            cur_data = factor * cur_d
             cur_d = None
         ## apply mask to Rrs and rhow
         if (mask) & (setu['l2w_mask_water_parameters']): cur_data[(l2_flags & flag_value)!=0] = np.nan
         if verbosity > 1: print('Writing {}'.format(cur_par))
         ## add attributes
         for k in att_add: cur_att[k] = att_add[k]
-        ac.output.nc_write(ofile, cur_par, cur_data, dataset_attributes=cur_att,
-                           attributes=gem['gatts'], new=new, nc_projection=nc_projection,
-                           netcdf_compression=setu['netcdf_compression'],
-                           netcdf_compression_level=setu['netcdf_compression_level'],
-                           netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+        gemo.write(cur_par, cur_data, ds_att=cur_att)
         cur_data = None
-        new = False
+        if lazy: gem['data'].release([cur_tag])
 
     ## write l2 flags
-    ac.output.nc_write(ofile, 'l2_flags', l2_flags, attributes=gem['gatts'], new=new,
-                        nc_projection=nc_projection,
-                        netcdf_compression=setu['netcdf_compression'],
-                        netcdf_compression_level=setu['netcdf_compression_level'])
+    gemo.write('l2_flags', l2_flags)
     if return_gem: gem['data']['l2_flags'] = l2_flags
-    new = False
-
-    qaa_computed, p3qaa_computed = False, False
-    ## parameter loop
-    ## compute other parameters
-    for cur_par in setu['l2w_parameters']:
-        if cur_par.lower() in ['rhot_*', 'rhos_*', 'rrs_*', 'rhow_*', 'rhorc_*', '', ' ']: continue ## we have copied these above
-        if cur_par.lower() in [ds.lower() for ds in ac.shared.nc_datasets(ofile)]: continue ## parameter already in output dataset (would not work if we are appending subsets to the ncdf)
-        if cur_par.lower()[0:2] == 'bt': continue
-
-        ## split on underscores
-        sp = cur_par.split('_')
-
-        ## default mask and empty dicts for current parameter
-        mask = False
-        par_data = {}
-        par_atts = {}
-
-        #############################
-        ## Nechad turbidity/spm
-        if 'nechad' in cur_par:
-            mask = True ## water parameter so apply mask
+    gemo.datasets_read()
+
+    ## read dataset for the current block, bands are read once per block and shared between parameters
+    def l2w_data(cur_ds):
+        if bsub is None:
+            if cur_ds in gem['data']: return(1.0 * gem['data'][cur_ds])
+            return(gemi.data(cur_ds, sub=sub))
+        if cur_ds not in block_data:
+            if (not lazy) & (type(gem['data']) is dict) & (cur_ds in gem['data']):
+                block_data[cur_ds] = gem['data'][cur_ds][bsub[1]:bsub[1]+bsub[3], bsub[0]:bsub[0]+bsub[2]]
+            else:
+                ## block in the input file dimensions
+                fsub = [bsub[0], bsub[1], bsub[2], bsub[3]]
+                if sub is not None: fsub = [sub[0]+bsub[0], sub[1]+bsub[1], bsub[2], bsub[3]]
+                block_data[cur_ds] = gemi.data(cur_ds, sub=fsub)
+        return(1.0 * block_data[cur_ds])
+
+    ## existing output datasets
+    gemo_datasets = [ds.lower() for ds in gemo.datasets]
+
+    ## block loop
+    for bsub in blocks:
+        block_data = {}
+        if bsub is None:
+            l2w_flags = l2_flags
+        else:
+            l2w_flags = l2_flags[bsub[1]:bsub[1]+bsub[3], bsub[0]:bsub[0]+bsub[2]]
+        ## mask for water parameters
+        l2w_mask = (l2w_flags & flag_value)!=0
+        block_datasets = [ds for ds in gemo_datasets]
+
+        qaa_computed, p3qaa_computed = False, False
+        ## parameter loop
+        ## compute other parameters
+        for pi, cur_par in enumerate(setu['l2w_parameters']):
+            ## evict datasets no longer required by the remaining parameters
+            if (lazy) & (pi > 0): gem['data'].release(l2w_required[setu['l2w_parameters'][pi-1]])
+
+            if cur_par.lower() in ['rhot_*', 'rhos_*', 'rrs_*', 'rhow_*', 'rhorc_*', '', ' ']: continue ## we have copied these above
+            if cur_par.lower() in block_datasets: continue ## parameter already in output dataset (would not work if we are appending subsets to the ncdf)
+            if cur_par.lower()[0:2] == 'bt': continue
+
+            ## close the stage of a previous parameter that was skipped
+            ac.acolite.profiling.stop('l2w_parameter')
+            ac.acolite.profiling.start('l2w_parameter', parameter=cur_par, row=0 if bsub is None else bsub[1])
+
+            ## split on underscores
+            sp = cur_par.split('_')
 
-            nechad_parameter = 'centre'
-            if '2016' in cur_par: nechad_parameter = '2016'
-            elif 'ave' in cur_par: nechad_parameter = 'resampled'
+            ## default mask and empty dicts for current parameter
+            mask = False
+            par_data = {}
+            par_atts = {}
+
+            #############################
+            ## Nechad turbidity/spm
+            if 'nechad' in cur_par:
+                mask = True ## water parameter so apply mask
+
+                nechad_parameter = 'centre'
+                if '2016' in cur_par: nechad_parameter = '2016'
+                elif 'ave' in cur_par: nechad_parameter = 'resampled'
+
+                ## turbidity
+                if cur_par[0] == 't':
+                    nechad_par = 'TUR'
+                    par_attributes = {'algorithm':'Nechad et al. 2009', 'title':'Nechad Turbidity'}
+                    par_attributes['reference']='Nechad et al. 2009'
+                    par_attributes['algorithm']='2009 calibration'
+                    cal_year = 2009
+                elif cur_par[0] == 's':
+                    nechad_par = 'SPM'
+                    par_attributes = {'algorithm':'Nechad et al. 2010', 'title':'Nechad SPM'}
+                    par_attributes['reference']='Nechad et al. 2010'
+                    par_attributes['algorithm']='2010 calibration'
+                    cal_year = 2010
+                else:
+                    continue
 
-            ## turbidity
-            if cur_par[0] == 't':
+                ## find out which band to use
+                nechad_band = None
+                nechad_wave = 665
+                sp = cur_par.split('_')
+                if 'ave' not in cur_par:
+                    if len(sp) > 2: nechad_wave = sp[2]
+                else:
+                    if len(sp) > 2: nechad_wave = sp[2]
+                    if len(sp) > 3: nechad_wave = sp[3]
+
+                ## find out wavelength for turbidity product
+                if type(nechad_wave) == str:
+                    if nechad_wave.lower() == 'red': nechad_wave=665
+                    elif nechad_wave.lower() == 'nir': nechad_wave=865
+                    elif nechad_wave.lower() == 'green': nechad_wave=560
+                    else:
+                        try: ## if wavelength is specified
+                            nechad_wave = int(nechad_wave)
+                        except:
+                            continue
+
+                ci, cw = ac.shared.closest_idx(rhos_waves, int(nechad_wave))
+                for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
+                    if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(cw)): nechad_band = b
+
+                A_Nechad, C_Nechad = None, None
+
+                ## band center
+                if nechad_parameter == 'centre':
+                    par_name = '{}_Nechad{}_{}'.format(nechad_par, cal_year, cw)
+                    nechad_dict = ac.parameters.nechad.coef_hyper(nechad_par)
+                    didx,algwave = ac.shared.closest_idx(nechad_dict['wave'], cw)
+                    A_Nechad = nechad_dict['A'][didx]
+                    C_Nechad = nechad_dict['C'][didx]
+
+                ## resampled to band
+                if nechad_parameter == 'resampled':
+                    par_name = '{}_Nechad{}Ave_{}'.format(nechad_par, cal_year, cw)
+                    nechad_dict = ac.parameters.nechad.coef_hyper(nechad_par)
+                    ## resample parameters to band
+                    cdct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, nechad_dict['C'], rsrd[gem['gatts']['sensor']]['rsr'])
+                    adct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, 1/nechad_dict['A'], rsrd[gem['gatts']['sensor']]['rsr'])
+                    adct = {k:1/adct[k] for k in adct}
+                    A_Nechad = adct[nechad_band]
+                    C_Nechad = cdct[nechad_band]
+
+                ## resampled to band by Nechad 2016
+                if nechad_parameter == '2016':
+                    par_name = '{}_Nechad2016_{}'.format(nechad_par, cw)
+                    par_attributes['algorithm']='2016 calibration'
+                    nechad_dict = ac.parameters.nechad.coef_2016()
+                    for k in nechad_dict:
+                        if k['sensor'] != gem['gatts']['sensor'].split('_')[-1]: continue
+                        if k['band'] != 'B{}'.format(nechad_band): continue
+                        if k['par'] != nechad_par: continue
+                        A_Nechad = k['A']
+                        C_Nechad = k['C']
+
+                ## if we have A and C we can continue
+                if (A_Nechad is not None) & (C_Nechad is not None):
+                    cur_ds = 'rhos_{}'.format(cw)
+                    cur_data = l2w_data(cur_ds)
+                    ## compute parameter
+                    cur_mask = np.where(cur_data >= (setu['nechad_max_rhow_C_factor'] * C_Nechad))
+                    cur_data = (A_Nechad * cur_data) / (1.-(cur_data/C_Nechad))
+                    cur_data[cur_mask] = np.nan
+                    par_data[par_name] = cur_data
+                    par_atts[par_name] = par_attributes
+                    par_atts[par_name]['ds_name'] = par_name
+                    par_atts[par_name]['A_{}'.format(nechad_par)] = A_Nechad
+                    par_atts[par_name]['C_{}'.format(nechad_par)] = C_Nechad
+            ## end nechad turbidity/spm
+            #############################
+
+            #############################
+            ## start Dogliotti 2015 turbidity
+            if 'dogliotti2015' in cur_par:
+                mask = True ## water parameter so apply mask
+
+                par_attributes = {'algorithm':'Dogliotti et al. 2015', 'title':'Dogliotti Turbidity'}
+                par_attributes['reference']='Dogliotti et al. 2015'
+                par_attributes['algorithm']=''
+
+                ## get config
+                par_name = 'TUR_Dogliotti2015'
+                dcfg = 'defaults'
+                dogliotti_par = 'blended'
+                if len(sp) > 2:
+                    if sp[2] not in ['red', 'nir']:
+                        dcfg = sp[2]
+                    else:
+                        dogliotti_par = sp[2]
+                    par_name+='_{}'.format(dogliotti_par)
+                par_attributes['ds_name'] = par_name
+                cfg = ac.parameters.dogliotti.coef(config=dcfg)
+
+                ## identify bands
+                ri, rw = ac.shared.closest_idx(rhos_waves, int(cfg['algo_wave_red']))
+                ni, nw = ac.shared.closest_idx(rhos_waves, int(cfg['algo_wave_nir']))
+                for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
+                    if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(rw)): red_band = b
+                    if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(nw)): nir_band = b
+
+                ## store settings in atts
+                for k in cfg: par_attributes[k] = cfg[k]
+                par_attributes['wave_red'] = rw
+                par_attributes['wave_nir'] = nw
+
+                ## read red data
+                cur_ds = 'rhos_{}'.format(rw)
+                red = l2w_data(cur_ds)
+                tur = (par_attributes['A_T_red'] * red) / (1.-red/par_attributes['C_T_red'])
+
+                ## read nir data
+                cur_ds = 'rhos_{}'.format(nw)
+                nir = l2w_data(cur_ds)
+                nir_tur = (par_attributes['A_T_nir'] * nir) / (1.-nir/par_attributes['C_T_nir'])
+
+                if dogliotti_par == 'blended':
+                    ## replace most turbid with nir band
+                    dsub = np.where(red >= par_attributes['upper_lim'])
+                    if len(dsub[0]) > 0: tur[dsub] = nir_tur[dsub]
+                    ## blend in between
+                    dsub = np.where((red < par_attributes['upper_lim']) & (red >= par_attributes['lower_lim']))
+                    if len(dsub[0]) > 0:
+                        w=(red[dsub]  - par_attributes['lower_lim']) / (par_attributes['upper_lim']-par_attributes['lower_lim'])
+                        tur[dsub] = ((1.-w) * tur[dsub]) + (w*nir_tur[dsub])
+                    par_data[par_name] = tur
+                    par_atts[par_name] = par_attributes
+                elif dogliotti_par == 'red':
+                    par_data[par_name] = tur
+                    par_atts[par_name] = par_attributes
+                elif dogliotti_par == 'nir':
+                    par_data[par_name] = nir_tur
+                    par_atts[par_name] = par_attributes
+                red = None
+                nir = None
+            ## end Dogliotti turbidity
+            #############################
+
+            #############################
+            ## Dogliotti generic turbidity
+            if 'dogliotti2022' in cur_par:
+                mask = True ## water parameter so apply mask
                 nechad_par = 'TUR'
-                par_attributes = {'algorithm':'Nechad et al. 2009', 'title':'Nechad Turbidity'}
+                par_attributes = {'algorithm':'Dogliotti et al. in prep', 'title':'Dogliotti Turbidity'}
                 par_attributes['reference']='Nechad et al. 2009'
-                par_attributes['algorithm']='2009 calibration'
-                cal_year = 2009
-            elif cur_par[0] == 's':
-                nechad_par = 'SPM'
-                par_attributes = {'algorithm':'Nechad et al. 2010', 'title':'Nechad SPM'}
-                par_attributes['reference']='Nechad et al. 2010'
-                par_attributes['algorithm']='2010 calibration'
-                cal_year = 2010
-            else:
-                continue
-
-            ## find out which band to use
-            nechad_band = None
-            nechad_wave = 665
-            sp = cur_par.split('_')
-            if 'ave' not in cur_par:
-                if len(sp) > 2: nechad_wave = sp[2]
-            else:
+                par_attributes['algorithm']='turbidity recalibration 2022'
+                nechad_parameter = 'center'
+                if not hyper: nechad_parameter = 'resampled'
+
+                ## find out which band to use
+                nechad_band = None
+                nechad_wave = 665
+                sp = cur_par.split('_')
                 if len(sp) > 2: nechad_wave = sp[2]
                 if len(sp) > 3: nechad_wave = sp[3]
 
-            ## find out wavelength for turbidity product
-            if type(nechad_wave) == str:
-                if nechad_wave.lower() == 'red': nechad_wave=665
-                elif nechad_wave.lower() == 'nir': nechad_wave=865
-                elif nechad_wave.lower() == 'green': nechad_wave=560
-                else:
-                    try: ## if wavelength is specified
-                        nechad_wave = int(nechad_wave)
-                    except:
-                        continue
-
-            ci, cw = ac.shared.closest_idx(rhos_waves, int(nechad_wave))
-            for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
-                if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(cw)): nechad_band = b
-
-            A_Nechad, C_Nechad = None, None
-
-            ## band center
-            if nechad_parameter == 'centre':
-                par_name = '{}_Nechad{}_{}'.format(nechad_par, cal_year, cw)
-                nechad_dict = ac.parameters.nechad.coef_hyper(nechad_par)
-                didx,algwave = ac.shared.closest_idx(nechad_dict['wave'], cw)
-                A_Nechad = nechad_dict['A'][didx]
-                C_Nechad = nechad_dict['C'][didx]
-
-            ## resampled to band
-            if nechad_parameter == 'resampled':
-                par_name = '{}_Nechad{}Ave_{}'.format(nechad_par, cal_year, cw)
-                nechad_dict = ac.parameters.nechad.coef_hyper(nechad_par)
-                ## resample parameters to band
-                cdct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, nechad_dict['C'], rsrd[gem['gatts']['sensor']]['rsr'])
-                adct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, 1/nechad_dict['A'], rsrd[gem['gatts']['sensor']]['rsr'])
-                adct = {k:1/adct[k] for k in adct}
-                A_Nechad = adct[nechad_band]
-                C_Nechad = cdct[nechad_band]
-
-            ## resampled to band by Nechad 2016
-            if nechad_parameter == '2016':
-                par_name = '{}_Nechad2016_{}'.format(nechad_par, cw)
-                par_attributes['algorithm']='2016 calibration'
-                nechad_dict = ac.parameters.nechad.coef_2016()
-                for k in nechad_dict:
-                    if k['sensor'] != gem['gatts']['sensor'].split('_')[-1]: continue
-                    if k['band'] != 'B{}'.format(nechad_band): continue
-                    if k['par'] != nechad_par: continue
-                    A_Nechad = k['A']
-                    C_Nechad = k['C']
-
-            ## if we have A and C we can continue
-            if (A_Nechad is not None) & (C_Nechad is not None):
-                cur_ds = 'rhos_{}'.format(cw)
-                if cur_ds in gem['data']:
-                    cur_data = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                ## compute parameter
-                cur_mask = np.where(cur_data >= (setu['nechad_max_rhow_C_factor'] * C_Nechad))
-                cur_data = (A_Nechad * cur_data) / (1.-(cur_data/C_Nechad))
-                cur_data[cur_mask] = np.nan
-                par_data[par_name] = cur_data
-                par_atts[par_name] = par_attributes
-                par_atts[par_name]['ds_name'] = par_name
-                par_atts[par_name]['A_{}'.format(nechad_par)] = A_Nechad
-                par_atts[par_name]['C_{}'.format(nechad_par)] = C_Nechad
-        ## end nechad turbidity/spm
-        #############################
-
-        #############################
-        ## start Dogliotti 2015 turbidity
-        if 'dogliotti2015' in cur_par:
-            mask = True ## water parameter so apply mask
-
-            par_attributes = {'algorithm':'Dogliotti et al. 2015', 'title':'Dogliotti Turbidity'}
-            par_attributes['reference']='Dogliotti et al. 2015'
-            par_attributes['algorithm']=''
-
-            ## get config
-            par_name = 'TUR_Dogliotti2015'
-            dcfg = 'defaults'
-            dogliotti_par = 'blended'
-            if len(sp) > 2:
-                if sp[2] not in ['red', 'nir']:
-                    dcfg = sp[2]
-                else:
-                    dogliotti_par = sp[2]
-                par_name+='_{}'.format(dogliotti_par)
-            par_attributes['ds_name'] = par_name
-            cfg = ac.parameters.dogliotti.coef(config=dcfg)
-
-            ## identify bands
-            ri, rw = ac.shared.closest_idx(rhos_waves, int(cfg['algo_wave_red']))
-            ni, nw = ac.shared.closest_idx(rhos_waves, int(cfg['algo_wave_nir']))
-            for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
-                if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(rw)): red_band = b
-                if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(nw)): nir_band = b
-
-            ## store settings in atts
-            for k in cfg: par_attributes[k] = cfg[k]
-            par_attributes['wave_red'] = rw
-            par_attributes['wave_nir'] = nw
-
-            ## read red data
-            cur_ds = 'rhos_{}'.format(rw)
-            if cur_ds in gem['data']:
-                red = 1.0 * gem['data'][cur_ds]
-            else:
-                red = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-            tur = (par_attributes['A_T_red'] * red) / (1.-red/par_attributes['C_T_red'])
+                ## find out wavelength for turbidity product
+                if type(nechad_wave) == str:
+                    if nechad_wave.lower() == 'red': nechad_wave=665
+                    elif nechad_wave.lower() == 'nir': nechad_wave=865
+                    elif nechad_wave.lower() == 'green': nechad_wave=560
+                    else:
+                        try: ## if wavelength is specified
+                            nechad_wave = int(nechad_wave)
+                        except:
+                            continue
+
+                ci, cw = ac.shared.closest_idx(rhos_waves, int(nechad_wave))
+                for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
+                    if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(cw)): nechad_band = b
+
+                A_Nechad, C_Nechad = None, None
+                nechad_dict = ac.parameters.dogliotti.coef_hyper()
+
+                ## band center
+                if nechad_parameter == 'center':
+                    par_name = '{}_Dogliotti2022_{}'.format(nechad_par, cw)
+                    didx,algwave = ac.shared.closest_idx(nechad_dict['wave'], cw)
+                    A_Nechad = nechad_dict['A_mean'][didx]
+                    C_Nechad = nechad_dict['C'][didx]
+                elif nechad_parameter == 'resampled':
+                    par_name = '{}_Dogliotti2022_{}'.format(nechad_par, cw)
+                    # resample parameters to band
+                    cdct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, nechad_dict['C'], rsrd[gem['gatts']['sensor']]['rsr'])
+                    adct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, 1/nechad_dict['A_mean'], rsrd[gem['gatts']['sensor']]['rsr'])
+                    adct = {k:1/adct[k] for k in adct}
+                    A_Nechad = adct[nechad_band]
+                    C_Nechad = cdct[nechad_band]
+
+                ## if we have A and C we can continue
+                if (A_Nechad is not None) & (C_Nechad is not None):
+                    cur_ds = 'rhos_{}'.format(cw)
+                    cur_data = l2w_data(cur_ds)
+                    ## compute parameter
+                    cur_mask = np.where(cur_data >= (setu['nechad_max_rhow_C_factor'] * C_Nechad))
+                    cur_data = (A_Nechad * cur_data) / (1.-(cur_data/C_Nechad))
+                    cur_data[cur_mask] = np.nan
+                    par_data[par_name] = cur_data
+                    par_atts[par_name] = par_attributes
+                    par_atts[par_name]['ds_name'] = par_name
+                    par_atts[par_name]['wavelength'] = cw
+                    par_atts[par_name]['A_{}'.format(nechad_par)] = A_Nechad
+                    par_atts[par_name]['C_{}'.format(nechad_par)] = C_Nechad
+            ## end Dogliotti generic turbidity
+            #############################
+
+            #############################
+            ## CHL_OC
+            if 'chl_oc' in cur_par:
+                mask = True ## water parameter so apply mask
+                ## load config
+                chl_oc_wl_diff = 20
+                cfg = ac.parameters.chl_oc.coef()
+                if gem['gatts']['sensor'] not in cfg:
+                    print('{} not configured for {}'.format(cur_par, gem['gatts']['sensor']))
+                    continue
 
-            ## read nir data
-            cur_ds = 'rhos_{}'.format(nw)
-            if cur_ds in gem['data']:
-                nir = 1.0 * gem['data'][cur_ds]
-            else:
-                nir = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-            nir_tur = (par_attributes['A_T_nir'] * nir) / (1.-nir/par_attributes['C_T_nir'])
-
-            if dogliotti_par == 'blended':
-                ## replace most turbid with nir band
-                dsub = np.where(red >= par_attributes['upper_lim'])
-                if len(dsub[0]) > 0: tur[dsub] = nir_tur[dsub]
-                ## blend in between
-                dsub = np.where((red < par_attributes['upper_lim']) & (red >= par_attributes['lower_lim']))
-                if len(dsub[0]) > 0:
-                    w=(red[dsub]  - par_attributes['lower_lim']) / (par_attributes['upper_lim']-par_attributes['lower_lim'])
-                    tur[dsub] = ((1.-w) * tur[dsub]) + (w*nir_tur[dsub])
-                par_data[par_name] = tur
-                par_atts[par_name] = par_attributes
-            elif dogliotti_par == 'red':
-                par_data[par_name] = tur
-                par_atts[par_name] = par_attributes
-            elif dogliotti_par == 'nir':
-                par_data[par_name] = nir_tur
-                par_atts[par_name] = par_attributes
-            red = None
-            nir = None
-        ## end Dogliotti turbidity
-        #############################
-
-        #############################
-        ## Dogliotti generic turbidity
-        if 'dogliotti2022' in cur_par:
-            mask = True ## water parameter so apply mask
-            nechad_par = 'TUR'
-            par_attributes = {'algorithm':'Dogliotti et al. in prep', 'title':'Dogliotti Turbidity'}
-            par_attributes['reference']='Nechad et al. 2009'
-            par_attributes['algorithm']='turbidity recalibration 2022'
-            nechad_parameter = 'center'
-            if not hyper: nechad_parameter = 'resampled'
-
-            ## find out which band to use
-            nechad_band = None
-            nechad_wave = 665
-            sp = cur_par.split('_')
-            if len(sp) > 2: nechad_wave = sp[2]
-            if len(sp) > 3: nechad_wave = sp[3]
-
-            ## find out wavelength for turbidity product
-            if type(nechad_wave) == str:
-                if nechad_wave.lower() == 'red': nechad_wave=665
-                elif nechad_wave.lower() == 'nir': nechad_wave=865
-                elif nechad_wave.lower() == 'green': nechad_wave=560
+                par_attributes = {'algorithm':'Chlorophyll a blue/green ratio', 'dataset':'rhos'}
+                par_attributes['reference']='Franz et al. 2015'
+                par_attributes['algorithm']=''
+
+                if (cur_par == 'chl_oc') | (cur_par == 'chl_oc2'):
+                    par_name = 'chl_oc2'
+                elif (cur_par == 'chl_oc2_BLK'):
+                    par_name = 'chl_oc2_BLK'
+                elif (cur_par == 'chl_oc3'):
+                    par_name = 'chl_oc3'
+                elif (cur_par == 'chl_oc3_BLK'):
+                    par_name = 'chl_oc3_BLK'
+                elif (cur_par == 'chl_oc3_SMAT'):
+                    par_name = 'chl_oc3_SMAT'
+                elif (cur_par == 'chl_oc4'):
+                    par_name = 'chl_oc4'
                 else:
-                    try: ## if wavelength is specified
-                        nechad_wave = int(nechad_wave)
-                    except:
-                        continue
+                    par_name = cur_par
 
-            ci, cw = ac.shared.closest_idx(rhos_waves, int(nechad_wave))
-            for b in rsrd[gem['gatts']['sensor']]['rsr_bands']:
-                if (rsrd[gem['gatts']['sensor']]['wave_name'][b] == str(cw)): nechad_band = b
-
-            A_Nechad, C_Nechad = None, None
-            nechad_dict = ac.parameters.dogliotti.coef_hyper()
-
-            ## band center
-            if nechad_parameter == 'center':
-                par_name = '{}_Dogliotti2022_{}'.format(nechad_par, cw)
-                didx,algwave = ac.shared.closest_idx(nechad_dict['wave'], cw)
-                A_Nechad = nechad_dict['A_mean'][didx]
-                C_Nechad = nechad_dict['C'][didx]
-            elif nechad_parameter == 'resampled':
-                par_name = '{}_Dogliotti2022_{}'.format(nechad_par, cw)
-                # resample parameters to band
-                cdct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, nechad_dict['C'], rsrd[gem['gatts']['sensor']]['rsr'])
-                adct = ac.shared.rsr_convolute_dict(nechad_dict['wave']/1000, 1/nechad_dict['A_mean'], rsrd[gem['gatts']['sensor']]['rsr'])
-                adct = {k:1/adct[k] for k in adct}
-                A_Nechad = adct[nechad_band]
-                C_Nechad = cdct[nechad_band]
-
-            ## if we have A and C we can continue
-            if (A_Nechad is not None) & (C_Nechad is not None):
-                cur_ds = 'rhos_{}'.format(cw)
-                if cur_ds in gem['data']:
-                    cur_data = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                ## compute parameter
-                cur_mask = np.where(cur_data >= (setu['nechad_max_rhow_C_factor'] * C_Nechad))
-                cur_data = (A_Nechad * cur_data) / (1.-(cur_data/C_Nechad))
-                cur_data[cur_mask] = np.nan
-                par_data[par_name] = cur_data
+                if par_name not in cfg[gem['gatts']['sensor']]:
+                    print('{} not configured for {}'.format(par_name, gem['gatts']['sensor']))
+                    continue
+                par_attributes['ds_name']=par_name
+                chl_dct = cfg[gem['gatts']['sensor']][par_name]
+
+                ## get bands
+                blue, green = None, None
+                for w in chl_dct['blue'] + chl_dct['green']:
+                    ci, cw = ac.shared.closest_idx(rhos_waves, int(w))
+                    if np.abs(cw-w) > chl_oc_wl_diff: continue
+                    cur_ds = 'rhos_{}'.format(cw)
+                    cur_data = l2w_data(cur_ds)
+                    if w in chl_dct['blue']:
+                        if blue is None:
+                            par_attributes['blue_wave_sel'] = [cw]
+                            blue = 1.0 * cur_data
+                        else:
+                            par_attributes['blue_wave_sel'] += [cw]
+                            blue = np.nanmax((blue, cur_data), axis=0)
+                    if w in chl_dct['green']:
+                        if green is None:
+                            par_attributes['green_wave_sel'] = [cw]
+                            green = 1.0 * cur_data
+                if (blue is None) | (green is None): continue
+
+                ## compute CHL
+                ratio = np.log10(blue/green)
+                blue, green = None, None
+                par_data[par_name] = chl_dct['chl_coef'][0] + chl_dct['chl_coef'][1] * ratio + \
+                                                         chl_dct['chl_coef'][2] * ratio * ratio + \
+                                                         chl_dct['chl_coef'][3] * ratio * ratio * ratio + \
+                                                         chl_dct['chl_coef'][4] * ratio * ratio * ratio * ratio
+                par_data[par_name] = np.power(10, par_data[par_name])
                 par_atts[par_name] = par_attributes
-                par_atts[par_name]['ds_name'] = par_name
-                par_atts[par_name]['wavelength'] = cw
-                par_atts[par_name]['A_{}'.format(nechad_par)] = A_Nechad
-                par_atts[par_name]['C_{}'.format(nechad_par)] = C_Nechad
-        ## end Dogliotti generic turbidity
-        #############################
-
-        #############################
-        ## CHL_OC
-        if 'chl_oc' in cur_par:
-            mask = True ## water parameter so apply mask
-            ## load config
-            chl_oc_wl_diff = 20
-            cfg = ac.parameters.chl_oc.coef()
-            if gem['gatts']['sensor'] not in cfg:
-                print('{} not configured for {}'.format(cur_par, gem['gatts']['sensor']))
-                continue
+            ## end CHL_OC
+            #############################
 
-            par_attributes = {'algorithm':'Chlorophyll a blue/green ratio', 'dataset':'rhos'}
-            par_attributes['reference']='Franz et al. 2015'
-            par_attributes['algorithm']=''
-
-            if (cur_par == 'chl_oc') | (cur_par == 'chl_oc2'):
-                par_name = 'chl_oc2'
-            elif (cur_par == 'chl_oc2_BLK'):
-                par_name = 'chl_oc2_BLK'
-            elif (cur_par == 'chl_oc3'):
-                par_name = 'chl_oc3'
-            elif (cur_par == 'chl_oc3_BLK'):
-                par_name = 'chl_oc3_BLK'
-            elif (cur_par == 'chl_oc3_SMAT'):
-                par_name = 'chl_oc3_SMAT'
-            elif (cur_par == 'chl_oc4'):
-                par_name = 'chl_oc4'
-            else:
+            #############################
+            ## CHL_RE
+            if (cur_par[0:6] == 'chl_re'):
                 par_name = cur_par
+                mask = True ## apply non water mask
+                if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI', 'EN1_MERIS'] + ac.hyper_sensors:
+                    print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                    continue
 
-            if par_name not in cfg[gem['gatts']['sensor']]:
-                print('{} not configured for {}'.format(par_name, gem['gatts']['sensor']))
-                continue
-            par_attributes['ds_name']=par_name
-            chl_dct = cfg[gem['gatts']['sensor']][par_name]
-
-            ## get bands
-            blue, green = None, None
-            for w in chl_dct['blue'] + chl_dct['green']:
-                ci, cw = ac.shared.closest_idx(rhos_waves, int(w))
-                if np.abs(cw-w) > chl_oc_wl_diff: continue
-                cur_ds = 'rhos_{}'.format(cw)
-                if cur_ds in gem['data']:
-                    cur_data = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                if w in chl_dct['blue']:
-                    if blue is None:
-                        par_attributes['blue_wave_sel'] = [cw]
-                        blue = 1.0 * cur_data
-                    else:
-                        par_attributes['blue_wave_sel'] += [cw]
-                        blue = np.nanmax((blue, cur_data), axis=0)
-                if w in chl_dct['green']:
-                    if green is None:
-                        par_attributes['green_wave_sel'] = [cw]
-                        green = 1.0 * cur_data
-            if (blue is None) | (green is None): continue
-
-            ## compute CHL
-            ratio = np.log10(blue/green)
-            blue, green = None, None
-            par_data[par_name] = chl_dct['chl_coef'][0] + chl_dct['chl_coef'][1] * ratio + \
-                                                     chl_dct['chl_coef'][2] * ratio * ratio + \
-                                                     chl_dct['chl_coef'][3] * ratio * ratio * ratio + \
-                                                     chl_dct['chl_coef'][4] * ratio * ratio * ratio * ratio
-            par_data[par_name] = np.power(10, par_data[par_name])
-            par_atts[par_name] = par_attributes
-        ## end CHL_OC
-        #############################
-
-        #############################
-        ## CHL_RE
-        if (cur_par[0:6] == 'chl_re'):
-            par_name = cur_par
-            mask = True ## apply non water mask
-            if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI', 'EN1_MERIS'] + ac.hyper_sensors:
-                print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                continue
-
-            par_split = par_name.split('_')
-            par_attributes = {'algorithm':'Red-edge chlorophyll', 'dataset':'rhos'}
-            par_attributes['reference']=''
-            par_attributes['algorithm']=''
+                par_split = par_name.split('_')
+                par_attributes = {'algorithm':'Red-edge chlorophyll', 'dataset':'rhos'}
+                par_attributes['reference']=''
+                par_attributes['algorithm']=''
+
+                ## find algorithms
+                if len(par_split) >= 3:
+                    chl_re_algorithm = None
+
+                    ###########
+                    ## GONS
+                    if par_split[2][0:4] == 'gons':
+                        chl_re_algorithm = 'gons'
+                        par_attributes['algorithm']='Gons et al. 3 band'
+                        par_attributes['reference']='Gons et al. 2005'
+                        gons = ac.parameters.chl_re.coef_gons()
+
+                        if par_split[2] == 'gons':
+                            req_waves = [670,705,780]
+                            gons_name = 'chl_re_gons'
+                        elif par_split[2] == 'gons740':
+                            req_waves = [670,705,740]
+                            gons_name = 'chl_re_gons740'
+                        else:
+                            print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                            continue
+                        req_waves = [gons[gons_name][tag] for tag in ['red_band', 'rededge_band', 'nir_band']]
+                    ## end GONS
+                    ###########
+
+                    ###########
+                    ## GONS VARYING BLK
+                    if 'gons_varying' in cur_par:
+                        chl_re_algorithm = 'gons_varying'
+                        par_attributes['algorithm'] = 'adapted Gons et al. 3 band'
+                        par_attributes['reference'] = 'Gons et al. 2005'
+                        gons = ac.parameters.chl_re.coef_gons()
+                        req_waves = [670, 705, 780]
+                        gons_name = 'chl_re_gons'
 
-            ## find algorithms
-            if len(par_split) >= 3:
-                chl_re_algorithm = None
+                        req_waves = [gons[gons_name][tag] for tag in ['red_band', 'rededge_band', 'nir_band']]
+                    ## end GONS VARYING BLK
+                    ###########
+
+
+                    ###########
+                    ## MOSES
+                    if par_split[2][0:6] == 'moses3':
+                        chl_re_algorithm = 'moses'
+                        par_attributes['reference']='Moses et al. 2012'
+                        par_attributes['algorithm']='Moses et al. 3 band'
+                        par_attributes['a']=(232.29,23.173) ## put coefficients in external file
+                        ### get required datasets
+                        if par_split[2] == 'moses3b':
+                            req_waves = [670,705,780]
+                        elif par_split[2] == 'moses3b740':
+                            req_waves = [670,705,740]
+                        else:
+                            print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                            continue
+                    ## end MOSES
+                    ###########
+
+                    ###########
+                    ## MOSES 2B BLK
+                    if par_split[2][0:6] == 'moses2':
+                        chl_re_algorithm = 'moses2bBLK'
+                        par_attributes['reference']='Moses et al. 2009'
+                        par_attributes['algorithm']='Moses et al. 2 band'
+                        par_attributes['a']=(44.24599,-29.95277) ## put coefficients in external file
+                        ### get required datasets
+                        if par_split[2] == 'moses2bBLK':
+                            req_waves = [670,705]
+                        else:
+                            print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                            continue
+
+                    ## end MOSES 2B BLK
+                    ###########
+
+                    ###########
+                    ## MISHRA
+                    if par_split[2][0:6] == 'mishra':
+                        chl_re_algorithm = 'mishra'
+                        par_attributes['reference']='Mishra et al. 2014'
+                        par_attributes['algorithm']='Mishra et al. 2014, NDCI'
+                        par_attributes['a']=(14.039, 86.115, 194.325) ## put coefficients in external file
+                        ### get required datasets
+                        req_waves = [670,705]
+                    ## end MISHRA
+                    ###########
+
+                    ## MISHRA BLK
+                    if par_split[2][0:9] == 'mishraBLK':
+                        chl_re_algorithm = 'mishraBLK'
+                        par_attributes['reference']='Mishra et al. 2014'
+                        par_attributes['algorithm']='Mishra et al. 2014, NDCI, modified for BLK'
+                        par_attributes['a']=(9.90394, 3.63135, 10.70727) ## put coefficients in external file
+                        ### get required datasets
+                        req_waves = [670,705]
+                    ## end MISHRA BLK
+                    ###########
 
-                ###########
-                ## GONS
-                if par_split[2][0:4] == 'gons':
-                    chl_re_algorithm = 'gons'
-                    par_attributes['algorithm']='Gons et al. 3 band'
-                    par_attributes['reference']='Gons et al. 2005'
-                    gons = ac.parameters.chl_re.coef_gons()
+                    ## MISHRA SMAT
+                    if par_split[2][0:9] == 'mishraSMAT':
+                        chl_re_algorithm = 'mishraSMAT'
+                        par_attributes['reference']='Mishra et al. 2014'
+                        par_attributes['algorithm']='Mishra et al. 2014, NDCI, modified for SMAT'
+                        par_attributes['a']=(9.68041, -49.57658, 61.81215) ## put coefficients in external file
 
-                    if par_split[2] == 'gons':
+                        ### get required datasets
+                        req_waves = [670,705]
+                    ## end MISHRA BLK
+                    ###########
+
+                    ###########
+                    ## BRAMICH
+                    if par_split[2][0:7] == 'bramich':
+                        chl_re_algorithm = 'bramich'
+                        par_attributes['reference']='Bramich et al. 2021'
+                        par_attributes['algorithm']='Bramich et al. 2021'
+                        ### get required datasets
                         req_waves = [670,705,780]
-                        gons_name = 'chl_re_gons'
-                    elif par_split[2] == 'gons740':
-                        req_waves = [670,705,740]
-                        gons_name = 'chl_re_gons740'
+                    ## end BRAMICH
+                    ###########
+
+                    ###########
+                    ## read data
+                    if chl_re_algorithm is not None:
+                        required_datasets,req_waves_selected = [],[]
+                        ds_waves = [w for w in rhos_waves]
+                        for i, reqw in enumerate(req_waves):
+                            widx, selwave = ac.shared.closest_idx(ds_waves, reqw)
+                            if abs(float(selwave)-float(reqw)) > 10: continue
+                            selds ='{}_{}'.format(par_attributes['dataset'],selwave)
+                            required_datasets.append(selds)
+                            req_waves_selected.append(selwave)
+                        par_attributes['waves']=req_waves_selected
+                        if len(required_datasets) != len(req_waves):
+                            print('Required datasets not found for {}.'.format(par_name))
+                            continue
+                        ## get data
+                        for di, cur_ds in enumerate(required_datasets):
+                            if di == 0: tmp_data = []
+                            cur_data = l2w_data(cur_ds)
+                            tmp_data.append(cur_data)
                     else:
                         print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
                         continue
-                    req_waves = [gons[gons_name][tag] for tag in ['red_band', 'rededge_band', 'nir_band']]
-                ## end GONS
-                ###########
-
-                ###########
-                ## GONS VARYING BLK
-                if 'gons_varying' in cur_par:
-                    chl_re_algorithm = 'gons_varying'
-                    par_attributes['algorithm'] = 'adapted Gons et al. 3 band'
-                    par_attributes['reference'] = 'Gons et al. 2005'
-                    gons = ac.parameters.chl_re.coef_gons()
-                    req_waves = [670, 705, 780]
-                    gons_name = 'chl_re_gons'
-
-                    req_waves = [gons[gons_name][tag] for tag in ['red_band', 'rededge_band', 'nir_band']]
-                ## end GONS VARYING BLK
-                ###########
-
-
-                ###########
-                ## MOSES
-                if par_split[2][0:6] == 'moses3':
-                    chl_re_algorithm = 'moses'
-                    par_attributes['reference']='Moses et al. 2012'
-                    par_attributes['algorithm']='Moses et al. 3 band'
-                    par_attributes['a']=(232.29,23.173) ## put coefficients in external file
-                    ### get required datasets
-                    if par_split[2] == 'moses3b':
-                        req_waves = [670,705,780]
-                    elif par_split[2] == 'moses3b740':
-                        req_waves = [670,705,740]
+                    ## end read data
+                    ###########
+
+                    ###########
+                    ## compute GONS
+                    if chl_re_algorithm == 'gons':
+                        for k in gons[gons_name]: par_attributes[k] = gons[gons_name][k]
+                        gc = gons[gons_name]['chl_coef']
+                        bb = (gc[0] * tmp_data[2]) / (gc[1] - gc[2] * tmp_data[2])
+                        rm = tmp_data[1]/tmp_data[0]
+                        par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb,gc[5]))
+                        par_data[par_name] /= gons[gons_name]['astar_chl']
+                        if '_nocheck' not in par_name:
+                            par_data[par_name][par_data[par_name]<0]=np.nan
+                            gm = gons[gons_name]['validity']
+                            par_data[par_name][((tmp_data[0] <= gm[0]) | (tmp_data[1]/tmp_data[0] <= gm[1]))]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute GONS
+                    ###########
+
+                    ###########
+                    ## compute GONS VARYING
+                    if chl_re_algorithm == 'gons_varying':
+                        for k in gons[gons_name]: par_attributes[k] = gons[gons_name][k]
+
+                        gc = gons[gons_name]['chl_coef']
+                        bb = (gc[0] * tmp_data[2]) / (gc[1] - gc[2] * tmp_data[2])
+                        rm = tmp_data[1]/tmp_data[0]
+                        par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb,gc[5]))
+                        par_data[par_name] /= 0.05152  # changed for a fit them all astar (0.05152), then recaluclate with varying coefficient)
+
+                        chl_array = par_data[par_name]
+
+                        astarchl_array = []
+                        for chl in chl_array:
+                            astarchl = 1.1188 * chl ** -1  # 1.1188 * x ** -1
+                            astarchl_array.append(astarchl)
+
+                        par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb, gc[5]))
+                        par_data[par_name] /= astarchl_array # with a varying astarchl
+
+
+                        if '_nocheck' not in par_name:
+                            par_data[par_name][par_data[par_name]<0]=np.nan
+                            gm = gons[gons_name]['validity']
+                            par_data[par_name][((tmp_data[0] <= gm[0]) | (tmp_data[1]/tmp_data[0] <= gm[1]))]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute GONS VARYING
+                    ###########
+
+                    ###########
+                    ## compute MOSES
+                    if chl_re_algorithm == 'moses':
+                        par_data[par_name] = par_attributes['a'][0]* \
+                                            ((np.power(tmp_data[0],-1)-np.power(tmp_data[1],-1)) * \
+                                            tmp_data[2]) + par_attributes['a'][1]
+                        par_data[par_name][par_data[par_name]<0]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute MOSES
+                    ###########
+
+                    ###########
+                    ## compute MOSES 2B BLK
+                    if chl_re_algorithm == 'moses2bBLK':
+                        par_data[par_name] = par_attributes['a'][0]* \
+                                            ((np.power(tmp_data[0],-1)) * \
+                                            tmp_data[1]) + par_attributes['a'][1]
+                        par_data[par_name][par_data[par_name]<0]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute MOSES 2B BLK
+                    ###########
+
+                    ###########
+                    ## compute MISHRA
+                    if chl_re_algorithm == 'mishra':
+                        ndci = (tmp_data[1]-tmp_data[0]) / (tmp_data[1]+tmp_data[0])
+                        par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1]*ndci + par_attributes['a'][2]*ndci*ndci
+                        ndci = None
+                        par_data[par_name][par_data[par_name]<0]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute MISHRA
+                    ###########
+
+                    ###########
+                    ## compute MISHRA BLK
+                    if chl_re_algorithm == 'mishraBLK':
+                        ndci = (tmp_data[1]-tmp_data[0]) / (tmp_data[1]+tmp_data[0])
+                        par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1]*ndci + par_attributes['a'][2]*ndci*ndci
+                        ndci = None
+                        par_data[par_name][par_data[par_name]<0]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute MISHRA BLK
+                    ###########
+
+                    ###########
+                    ## compute MISHRA SMAT
+                    if chl_re_algorithm == 'mishraSMAT':
+                        ndci = (tmp_data[1] - tmp_data[0]) / (tmp_data[1] + tmp_data[0])
+                        par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1] * ndci + \
+                                             par_attributes['a'][2] * ndci * ndci
+                        ndci = None
+                        par_data[par_name][par_data[par_name] < 0] = np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute MISHRA BLK
+                    ###########
+
+                    ###########
+                    ## compute BRAMICH
+                    if chl_re_algorithm == 'bramich':
+                        ## same as gons
+                        bb = (1.61 * tmp_data[2]) / (0.082 - 0.6 * tmp_data[2])
+                        rm = tmp_data[1]/tmp_data[0]
+                        par_data[par_name] = ((rm * (0.7 + bb)) - 0.40 - np.power(bb,1.05))
+                        ## from eq 12 in Bramich 2021
+                        #par_data[par_name] = np.power(par_data[par_name]/0.022,1.201)
+                        ## from Bramich via RG
+                        par_data[par_name] = np.power(par_data[par_name],1.1675)/0.0109
+                        par_data[par_name][par_data[par_name]<0]=np.nan
+                        par_atts[par_name] = par_attributes
+                        tmp_data = None
+                    ## end compute BRAMICH
+                    ###########
+            ## end CHL_RE
+            #############################
+
+            #############################
+            ## QAA
+            if (cur_par[0:3] == 'qaa') | (cur_par == 'qaa5') | (cur_par == 'qaa6') | (cur_par == 'qaaw') |\
+               ((cur_par[0:3] == 'qaa') & (('_v5' in cur_par) | ('_v6' in cur_par) | ('_vw' in cur_par))):
+                if qaa_computed: continue
+                print('QAA')
+                mask = True ## water parameter so apply mask
+                sensor = gem['gatts']['sensor']
+                if sensor not in ['L8_OLI', 'L9_OLI', 'S2A_MSI', 'S2B_MSI']:
+                    print('QAA not configured for {}'.format(gem['gatts']['sensor']))
+                    continue
+
+                par_attributes = {'algorithm':'QAA', 'dataset':'rhos'}
+                par_attributes['standard_name']='qaa'
+                par_attributes['long_name']='Quasi Analytical Algorithm outputs'
+                par_attributes['units']='various'
+                par_attributes['reference']='Lee et al. 2002'
+                par_attributes['algorithm']=''
+
+                qaa_coef = ac.parameters.qaa.qaa_coef()
+                qaa_wave = [443, 490, 560, 665]
+                sen_wave = []
+
+                for ki, k in enumerate(qaa_wave):
+                    ci, cw = ac.shared.closest_idx(rhos_waves, k)
+                    cur_ds = 'rhos_{}'.format(cw)
+                    sen_wave.append(cw)
+                    if ki == 0: qaa_in = {}
+                    cur_data = l2w_data(cur_ds)
+                    ## mask data
+                    if (mask) & (setu['l2w_mask_water_parameters']): cur_data[l2w_mask] = np.nan
+                    ## convert to Rrs
+                    qaa_in[k] = cur_data/np.pi
+
+                ## get sun zenith angle
+                if 'sza' in gem['data']:
+                    sza = l2w_data('sza')
+                else:
+                    sza = gem['gatts']['sza']
+
+                ## run qaa
+                ret = ac.parameters.qaa.qaa_compute(qaa_in, qaa_coef = qaa_coef,
+                                            sza=sza, satellite=sensor[0:2])
+                ## list possible output parameters
+                qaa_pars = list(ret.keys())
+                cur_par_out = []
+                ## check which parameters are wanted
+                cur_par_out = []
+                for p in setu['l2w_parameters']:
+                    for qp in qaa_pars:
+                        k = 'qaa_{}'.format(qp)
+                        if k in cur_par_out: continue
+                        if p == 'qaa':
+                            cur_par_out.append(k)
+                        elif p in ['qaa5', 'qaa6', 'qaaw']:
+                            if (('v5_' not in k) & ('v6_' not in k) & ('vw_' not in k)) |\
+                                ('v{}_'.format(p[-1]) in k):
+                                cur_par_out.append(k)
+                        else:
+                            if p == k: cur_par_out.append(k)
+                cur_par_out.sort()
+
+                ## reformat for output
+                for p in cur_par_out:
+                    par_data[p] = ret[p[4:]] * 1.0
+                    ret[p[4:]] = None
+                    par_atts[p] = par_attributes
+                    par_atts[p]['ds_name'] = p
+                ret = None
+                qaa_computed = True
+            ## end QAA
+            #############################
+
+            #############################
+            ## Pitarch 3 band QAA
+            if cur_par[0:5] == 'p3qaa':
+                if p3qaa_computed: continue
+
+                mask = True ## water parameter so apply mask
+                ## load config
+                cfg = ac.parameters.pitarch.p3qaa_coef()
+                if gem['gatts']['sensor'] not in cfg:
+                    print('P3QAA not configured for {}'.format(gem['gatts']['sensor']))
+                    continue
+
+                par_attributes = {'algorithm':'Pitarch and Vanhellemont, submitted'}
+
+                ## read Blue Green Red data, convert to Rrs
+                for k in ['B', 'G', 'R']:
+                    ci, cw = ac.shared.closest_idx(rhos_waves, cfg[gem['gatts']['sensor']]['center_wl'][k])
+                    cur_ds = 'rhos_{}'.format(cw)
+                    cur_data = l2w_data(cur_ds)
+                    if (mask) & (setu['l2w_mask_water_parameters']): cur_data[l2w_mask] = np.nan
+                    if k == 'B':
+                        B = cur_data / np.pi
+                        Bwave = cw
+                    if k == 'G':
+                        G = cur_data / np.pi
+                        Gwave = cw
+                    if k == 'R':
+                        R = cur_data / np.pi
+                        Rwave = cw
+                    cur_data = None
+
+                ## compute 3 band QAA
+                print('Computing Pitarch 3 band QAA')
+                print('R{} G{} B{}'.format(Rwave, Gwave, Bwave))
+                ret = ac.parameters.pitarch.p3qaa_compute(gem['gatts']['sensor'], B, G, R)
+
+                ## list possible output parameters
+                p3_pars = []
+                for k in ret:
+                    if len(ret[k].shape) == 3:
+                        p3_pars += ['p3qaa_{}_{}'.format(k, Bwave), 'p3qaa_{}_{}'.format(k, Gwave), 'p3qaa_{}_{}'.format(k, Rwave)]
                     else:
-                        print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                        continue
-                ## end MOSES
-                ###########
-
-                ###########
-                ## MOSES 2B BLK
-                if par_split[2][0:6] == 'moses2':
-                    chl_re_algorithm = 'moses2bBLK'
-                    par_attributes['reference']='Moses et al. 2009'
-                    par_attributes['algorithm']='Moses et al. 2 band'
-                    par_attributes['a']=(44.24599,-29.95277) ## put coefficients in external file
-                    ### get required datasets
-                    if par_split[2] == 'moses2bBLK':
-                        req_waves = [670,705]
+                        p3_pars += ['p3qaa_{}'.format(k)]
+                ## check which parameters are wanted
+                if 'p3qaa' in setu['l2w_parameters']:
+                    cur_par_out = p3_pars
+                else:
+                    cur_par_out = [k for k in setu['l2w_parameters'] if k in p3_pars]
+                    for k in setu['l2w_parameters']:
+                        if k.lower() == 'p3qaa_a_*':
+                            cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_a_' in k.lower())]
+                        if k.lower() == 'p3qaa_bb_*':
+                            cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_bb_' in k.lower())]
+                        if k.lower() == 'p3qaa_kd_*':
+                            cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_kd_' in k.lower())]
+
+                ## reformat for output
+                for p in cur_par_out:
+                    if p[6:] not in ret: ## this means we have a three band parameter
+                        k = p[6:-4]
+                        w = int(p[-3:])
+                        if w == Bwave: wi = 0
+                        if w == Gwave: wi = 1
+                        if w == Rwave: wi = 2
+                        par_data[p] = ret[k][:,:,wi]
+                        par_atts[p] = {pk: par_attributes[pk] for pk in par_attributes}
+                        par_atts[p]['ds_name'] = p
                     else:
-                        print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                        continue
+                        par_data[p] = ret[p[6:]]
+                        par_atts[p] = {pk: par_attributes[pk] for pk in par_attributes}
+                        par_atts[p]['ds_name'] = p
+                ret = None
+                p3qaa_computed = True
+            ## end Pitarch 3 band QAA
+            #############################
+
+            #############################
+            ## FAI
+            if (cur_par == 'fai') | (cur_par == 'fai_rhot'):
+                par_name = cur_par
+                mask = False ## no water mask
+                par_split = cur_par.split('_')
+                par_attributes = {'algorithm':'Floating Algal Index, Hu et al. 2009', 'dataset':'rhos'}
+                par_attributes['standard_name']='fai'
+                par_attributes['long_name']='Floating Algal Index'
+                par_attributes['units']="1"
+                par_attributes['reference']='Hu et al. 2009'
+                par_attributes['algorithm']=''
+
+                ## select bands
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+                if cur_par=='fai_rhot':
+                    par_attributes['dataset']='rhot'
+                    ds_waves = [w for w in rhot_waves]
+                ## wavelengths and max wavelength difference
+                fai_diff = [10, 30, 80]
+                req_waves = [660,865,1610]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > fai_diff[i]: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+                ## compute fai
+                fai_sc = (float(par_attributes['waves'][1])-float(par_attributes['waves'][0]))/\
+                         (float(par_attributes['waves'][2])-float(par_attributes['waves'][0]))
+                nir_prime = tmp_data[0] + (tmp_data[2]-tmp_data[0]) * fai_sc
+                par_data[par_name] = tmp_data[1] - nir_prime
+                par_atts[par_name] = par_attributes
+                tmp_data = None
+            ## end FAI
+            #############################
 
-                ## end MOSES 2B BLK
-                ###########
-
-                ###########
-                ## MISHRA
-                if par_split[2][0:6] == 'mishra':
-                    chl_re_algorithm = 'mishra'
-                    par_attributes['reference']='Mishra et al. 2014'
-                    par_attributes['algorithm']='Mishra et al. 2014, NDCI'
-                    par_attributes['a']=(14.039, 86.115, 194.325) ## put coefficients in external file
-                    ### get required datasets
-                    req_waves = [670,705]
-                ## end MISHRA
-                ###########
-
-                ## MISHRA BLK
-                if par_split[2][0:9] == 'mishraBLK':
-                    chl_re_algorithm = 'mishraBLK'
-                    par_attributes['reference']='Mishra et al. 2014'
-                    par_attributes['algorithm']='Mishra et al. 2014, NDCI, modified for BLK'
-                    par_attributes['a']=(9.90394, 3.63135, 10.70727) ## put coefficients in external file
-                    ### get required datasets
-                    req_waves = [670,705]
-                ## end MISHRA BLK
-                ###########
-
-                ## MISHRA SMAT
-                if par_split[2][0:9] == 'mishraSMAT':
-                    chl_re_algorithm = 'mishraSMAT'
-                    par_attributes['reference']='Mishra et al. 2014'
-                    par_attributes['algorithm']='Mishra et al. 2014, NDCI, modified for SMAT'
-                    par_attributes['a']=(9.68041, -49.57658, 61.81215) ## put coefficients in external file
-
-                    ### get required datasets
-                    req_waves = [670,705]
-                ## end MISHRA BLK
-                ###########
-
-                ###########
-                ## BRAMICH
-                if par_split[2][0:7] == 'bramich':
-                    chl_re_algorithm = 'bramich'
-                    par_attributes['reference']='Bramich et al. 2021'
-                    par_attributes['algorithm']='Bramich et al. 2021'
-                    ### get required datasets
-                    req_waves = [670,705,780]
-                ## end BRAMICH
-                ###########
-
-                ###########
-                ## read data
-                if chl_re_algorithm is not None:
-                    required_datasets,req_waves_selected = [],[]
-                    ds_waves = [w for w in rhos_waves]
-                    for i, reqw in enumerate(req_waves):
-                        widx, selwave = ac.shared.closest_idx(ds_waves, reqw)
-                        if abs(float(selwave)-float(reqw)) > 10: continue
-                        selds ='{}_{}'.format(par_attributes['dataset'],selwave)
-                        required_datasets.append(selds)
-                        req_waves_selected.append(selwave)
-                    par_attributes['waves']=req_waves_selected
-                    if len(required_datasets) != len(req_waves):
-                        print('Required datasets not found for {}.'.format(par_name))
-                        continue
-                    ## get data
-                    for di, cur_ds in enumerate(required_datasets):
-                        if di == 0: tmp_data = []
-                        if cur_ds in gem['data']:
-                            cur_data  = 1.0 * gem['data'][cur_ds]
-                        else:
-                            cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                        tmp_data.append(cur_data)
+            #############################
+            ## FAIT
+            if (cur_par == 'fait'):
+                par_name = cur_par
+                mask = False ## no water mask
+                par_split = par_name.split('_')
+                par_attributes = {'algorithm':'Floating Algal Index Turbid Waters, Dogliotti et al. 2018', 'dataset':'rhos'}
+                par_attributes['standard_name']='fait'
+                par_attributes['long_name']='Floating Algal Index for Turbid Waters'
+                par_attributes['units']="1"
+                par_attributes['reference']='Dogliotti et al. 2018'
+                par_attributes['algorithm']=''
+
+                ## read config
+                fait_cfg = ac.shared.import_config('{}/Shared/algorithms/Dogliotti/dogliotti_fait.txt'.format(ac.config['data_dir']))
+                fait_fai_threshold = float(fait_cfg['fait_fai_threshold'])
+                fait_red_threshold = float(fait_cfg['fait_red_threshold'])
+                fait_rgb_limit = float(fait_cfg['fait_rgb_limit'])
+                fait_L_limit = float(fait_cfg['fait_L_limit'])
+
+                if gem['gatts']['sensor'] in ['L8_OLI', 'L9_OLI']:
+                    fait_a_threshold = float(fait_cfg['fait_a_threshold_OLI'])
+                elif gem['gatts']['sensor'] in ['S2A_MSI', 'S2B_MSI']:
+                    fait_a_threshold = float(fait_cfg['fait_a_threshold_MSI'])
                 else:
                     print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
                     continue
-                ## end read data
-                ###########
-
-                ###########
-                ## compute GONS
-                if chl_re_algorithm == 'gons':
-                    for k in gons[gons_name]: par_attributes[k] = gons[gons_name][k]
-                    gc = gons[gons_name]['chl_coef']
-                    bb = (gc[0] * tmp_data[2]) / (gc[1] - gc[2] * tmp_data[2])
-                    rm = tmp_data[1]/tmp_data[0]
-                    par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb,gc[5]))
-                    par_data[par_name] /= gons[gons_name]['astar_chl']
-                    if '_nocheck' not in par_name:
-                        par_data[par_name][par_data[par_name]<0]=np.nan
-                        gm = gons[gons_name]['validity']
-                        par_data[par_name][((tmp_data[0] <= gm[0]) | (tmp_data[1]/tmp_data[0] <= gm[1]))]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute GONS
-                ###########
-
-                ###########
-                ## compute GONS VARYING
-                if chl_re_algorithm == 'gons_varying':
-                    for k in gons[gons_name]: par_attributes[k] = gons[gons_name][k]
-
-                    gc = gons[gons_name]['chl_coef']
-                    bb = (gc[0] * tmp_data[2]) / (gc[1] - gc[2] * tmp_data[2])
-                    rm = tmp_data[1]/tmp_data[0]
-                    par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb,gc[5]))
-                    par_data[par_name] /= 0.05152  # changed for a fit them all astar (0.05152), then recaluclate with varying coefficient)
 
-                    chl_array = par_data[par_name]
-
-                    astarchl_array = []
-                    for chl in chl_array:
-                        astarchl = 1.1188 * chl ** -1  # 1.1188 * x ** -1
-                        astarchl_array.append(astarchl)
+                ## add to parameter attributes
+                par_attributes['fai_threshold'] = fait_fai_threshold
+                par_attributes['red_threshold'] = fait_red_threshold
+                par_attributes['rgb_limit'] = fait_rgb_limit
+                par_attributes['L_limit'] = fait_L_limit
+                par_attributes['a_threshold'] = fait_a_threshold
+
+                ## select bands
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+
+                ## wavelengths and max wavelength difference
+                fai_diff = [10, 10, 10, 30, 80]
+                req_waves = [490, 560, 660, 865, 1610]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > fai_diff[i]: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+
+                ## compute fait
+                fai_sc = (float(par_attributes['waves'][3])-float(par_attributes['waves'][2]))/\
+                         (float(par_attributes['waves'][4])-float(par_attributes['waves'][2]))
+                nir_prime = tmp_data[2] + \
+                            (tmp_data[4]-tmp_data[2]) * fai_sc
+                par_data[par_name] = tmp_data[3] - nir_prime
+                par_atts[par_name] = par_attributes
+                nir_prime = None
 
-                    par_data[par_name] = ((rm * (gc[3] + bb)) - gc[4] - np.power(bb, gc[5]))
-                    par_data[par_name] /= astarchl_array # with a varying astarchl
+                ## make lab coordinates
+                for i in range(3):
+                    data = ac.shared.datascl(tmp_data[i], dmin=0, dmax=fait_rgb_limit)
+                    if i == 0:
+                        rgb = data
+                    else:
+                        rgb = np.dstack((rgb,data))
+                    data = None
+                lab = skimage.color.rgb2lab(rgb)
+                rgb = None
+
+                ## check FAI > 0
+                par_data[par_name][par_data[par_name] >= fait_fai_threshold] = 1.0
+                par_data[par_name][par_data[par_name] < fait_fai_threshold] = 0.0
+
+                ## check turbidity based on red threshold
+                par_data[par_name][tmp_data[2] > fait_red_threshold] = 0.0
+
+                ## check L and a
+                par_data[par_name][lab[:,:,0] >= fait_L_limit] = 0.0
+                par_data[par_name][lab[:,:,1] >= fait_a_threshold] = 0.0
+                lab = None
+            ## end FAIT
+            #############################
+
+            #############################
+            ## NDVI
+            if (cur_par == 'ndvi') | (cur_par == 'ndvi_rhot'):
+                par_name = cur_par
+                mask = False ## no water mask
+                par_split = cur_par.split('_')
+                par_attributes = {'algorithm':'NDVI', 'dataset':'rhos'}
+                par_attributes['reference']=''
+                par_attributes['algorithm']=''
+
+                ## select bands
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+                if cur_par=='ndvi_rhot':
+                    par_attributes['dataset']='rhot'
+                    ds_waves = [w for w in rhot_waves]
+
+                ## wavelengths and max wavelength difference
+                ndvi_diff = [40, 65]
+                req_waves = [660,865]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > ndvi_diff[i]: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+
+                ## compute ndvi
+                par_data[par_name] = (tmp_data[1]-tmp_data[0])/\
+                                       (tmp_data[1]+tmp_data[0])
+                par_atts[par_name] = par_attributes
+                tmp_data = None
+            ## end NDVI
 
+            #############################
+            ## NDCI
+            if (cur_par == 'ndci'):
+                par_name = cur_par
+                mask = True ## apply non water mask
+                par_attributes = {'algorithm':'Mishra et al. 2014, NDCI', 'dataset':'rhos'}
+                par_attributes['standard_name']='ndci'
+                par_attributes['long_name']='Normalised Difference Chlorophyll Index'
+                par_attributes['units']="1"
+                par_attributes['reference']='Mishra et al. 2014'
+                par_attributes['algorithm']=''
+
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+
+                ### get required datasets
+                if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI'] + ac.hyper_sensors:
+                    print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                    continue
 
-                    if '_nocheck' not in par_name:
-                        par_data[par_name][par_data[par_name]<0]=np.nan
-                        gm = gons[gons_name]['validity']
-                        par_data[par_name][((tmp_data[0] <= gm[0]) | (tmp_data[1]/tmp_data[0] <= gm[1]))]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute GONS VARYING
-                ###########
-
-                ###########
-                ## compute MOSES
-                if chl_re_algorithm == 'moses':
-                    par_data[par_name] = par_attributes['a'][0]* \
-                                        ((np.power(tmp_data[0],-1)-np.power(tmp_data[1],-1)) * \
-                                        tmp_data[2]) + par_attributes['a'][1]
-                    par_data[par_name][par_data[par_name]<0]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute MOSES
-                ###########
-
-                ###########
-                ## compute MOSES 2B BLK
-                if chl_re_algorithm == 'moses2bBLK':
-                    par_data[par_name] = par_attributes['a'][0]* \
-                                        ((np.power(tmp_data[0],-1)) * \
-                                        tmp_data[1]) + par_attributes['a'][1]
-                    par_data[par_name][par_data[par_name]<0]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute MOSES 2B BLK
-                ###########
-
-                ###########
-                ## compute MISHRA
-                if chl_re_algorithm == 'mishra':
-                    ndci = (tmp_data[1]-tmp_data[0]) / (tmp_data[1]+tmp_data[0])
-                    par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1]*ndci + par_attributes['a'][2]*ndci*ndci
-                    ndci = None
-                    par_data[par_name][par_data[par_name]<0]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute MISHRA
-                ###########
-
-                ###########
-                ## compute MISHRA BLK
-                if chl_re_algorithm == 'mishraBLK':
-                    ndci = (tmp_data[1]-tmp_data[0]) / (tmp_data[1]+tmp_data[0])
-                    par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1]*ndci + par_attributes['a'][2]*ndci*ndci
-                    ndci = None
-                    par_data[par_name][par_data[par_name]<0]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute MISHRA BLK
-                ###########
-
-                ###########
-                ## compute MISHRA SMAT
-                if chl_re_algorithm == 'mishraSMAT':
-                    ndci = (tmp_data[1] - tmp_data[0]) / (tmp_data[1] + tmp_data[0])
-                    par_data[par_name] = par_attributes['a'][0] + par_attributes['a'][1] * ndci + \
-                                         par_attributes['a'][2] * ndci * ndci
-                    ndci = None
-                    par_data[par_name][par_data[par_name] < 0] = np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute MISHRA BLK
-                ###########
-
-                ###########
-                ## compute BRAMICH
-                if chl_re_algorithm == 'bramich':
-                    ## same as gons
-                    bb = (1.61 * tmp_data[2]) / (0.082 - 0.6 * tmp_data[2])
-                    rm = tmp_data[1]/tmp_data[0]
-                    par_data[par_name] = ((rm * (0.7 + bb)) - 0.40 - np.power(bb,1.05))
-                    ## from eq 12 in Bramich 2021
-                    #par_data[par_name] = np.power(par_data[par_name]/0.022,1.201)
-                    ## from Bramich via RG
-                    par_data[par_name] = np.power(par_data[par_name],1.1675)/0.0109
-                    par_data[par_name][par_data[par_name]<0]=np.nan
-                    par_atts[par_name] = par_attributes
-                    tmp_data = None
-                ## end compute BRAMICH
-                ###########
-        ## end CHL_RE
-        #############################
-
-        #############################
-        ## QAA
-        if (cur_par[0:3] == 'qaa') | (cur_par == 'qaa5') | (cur_par == 'qaa6') | (cur_par == 'qaaw') |\
-           ((cur_par[0:3] == 'qaa') & (('_v5' in cur_par) | ('_v6' in cur_par) | ('_vw' in cur_par))):
-            if qaa_computed: continue
-            print('QAA')
-            mask = True ## water parameter so apply mask
-            sensor = gem['gatts']['sensor']
-            if sensor not in ['L8_OLI', 'L9_OLI', 'S2A_MSI', 'S2B_MSI']:
-                print('QAA not configured for {}'.format(gem['gatts']['sensor']))
-                continue
+                req_waves = [670,705]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > 10: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+                ## compute ndci
+                par_data[par_name] = (tmp_data[1]-tmp_data[0])/\
+                                       (tmp_data[1]+tmp_data[0])
+                par_atts[par_name] = par_attributes
+                tmp_data = None
+            ## end NDCI
+            #############################
 
-            par_attributes = {'algorithm':'QAA', 'dataset':'rhos'}
-            par_attributes['standard_name']='qaa'
-            par_attributes['long_name']='Quasi Analytical Algorithm outputs'
-            par_attributes['units']='various'
-            par_attributes['reference']='Lee et al. 2002'
-            par_attributes['algorithm']=''
-
-            qaa_coef = ac.parameters.qaa.qaa_coef()
-            qaa_wave = [443, 490, 560, 665]
-            sen_wave = []
-
-            for ki, k in enumerate(qaa_wave):
-                ci, cw = ac.shared.closest_idx(rhos_waves, k)
-                cur_ds = 'rhos_{}'.format(cw)
-                sen_wave.append(cw)
-                if ki == 0: qaa_in = {}
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                ## mask data
-                if (mask) & (setu['l2w_mask_water_parameters']): cur_data[(l2_flags & flag_value)!=0] = np.nan
-                ## convert to Rrs
-                qaa_in[k] = cur_data/np.pi
-
-            ## get sun zenith angle
-            if 'sza' in gem['data']:
-                sza = gem['data']['sza']
-            else:
-                sza = gem['gatts']['sza']
-
-            ## run qaa
-            ret = ac.parameters.qaa.qaa_compute(qaa_in, qaa_coef = qaa_coef,
-                                        sza=sza, satellite=sensor[0:2])
-            ## list possible output parameters
-            qaa_pars = list(ret.keys())
-            cur_par_out = []
-            ## check which parameters are wanted
-            cur_par_out = []
-            for p in setu['l2w_parameters']:
-                for qp in qaa_pars:
-                    k = 'qaa_{}'.format(qp)
-                    if k in cur_par_out: continue
-                    if p == 'qaa':
-                        cur_par_out.append(k)
-                    elif p in ['qaa5', 'qaa6', 'qaaw']:
-                        if (('v5_' not in k) & ('v6_' not in k) & ('vw_' not in k)) |\
-                            ('v{}_'.format(p[-1]) in k):
-                            cur_par_out.append(k)
-                    else:
-                        if p == k: cur_par_out.append(k)
-            cur_par_out.sort()
-
-            ## reformat for output
-            for p in cur_par_out:
-                par_data[p] = ret[p[4:]] * 1.0
-                ret[p[4:]] = None
-                par_atts[p] = par_attributes
-                par_atts[p]['ds_name'] = p
-            ret = None
-            qaa_computed = True
-        ## end QAA
-        #############################
-
-        #############################
-        ## Pitarch 3 band QAA
-        if cur_par[0:5] == 'p3qaa':
-            if p3qaa_computed: continue
-
-            mask = True ## water parameter so apply mask
-            ## load config
-            cfg = ac.parameters.pitarch.p3qaa_coef()
-            if gem['gatts']['sensor'] not in cfg:
-                print('P3QAA not configured for {}'.format(gem['gatts']['sensor']))
-                continue
+            #############################
+            ## SLH
+            if (cur_par == 'slh'):
+                par_name = cur_par
+                mask = True ## apply non water mask
+                par_attributes = {'algorithm':'Kudela et al. 2015, SLH', 'dataset':'rhos'}
+                par_attributes['standard_name']='slh'
+                par_attributes['long_name']='Scattering Line Height'
+                par_attributes['units']="1"
+                par_attributes['reference']='Kudela et al. 2015'
+                par_attributes['algorithm']=''
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+
+                ### get required datasets
+                if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI'] + ac.hyper_sensors:
+                    print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
+                    continue
 
-            par_attributes = {'algorithm':'Pitarch and Vanhellemont, submitted'}
+                req_waves = [670,705,780]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > 10: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+                slh_waves = [float(ds.split('_')[1]) for ds in required_datasets]
+                ratio = (tmp_data[2]-tmp_data[0]) / \
+                        (slh_waves[2]+slh_waves[0])
+                par_data[par_name] = tmp_data[1] - (tmp_data[0] + (ratio)*(slh_waves[1]+slh_waves[0]))
+                par_atts[par_name] = par_attributes
+                tmp_data = None
+            ## end SLH
+            #############################
 
-            ## read Blue Green Red data, convert to Rrs
-            for k in ['B', 'G', 'R']:
-                ci, cw = ac.shared.closest_idx(rhos_waves, cfg[gem['gatts']['sensor']]['center_wl'][k])
-                cur_ds = 'rhos_{}'.format(cw)
-                if cur_ds in gem['data']:
-                    cur_data = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                if (mask) & (setu['l2w_mask_water_parameters']): cur_data[(l2_flags & flag_value)!=0] = np.nan
-                if k == 'B':
-                    B = cur_data / np.pi
-                    Bwave = cw
-                if k == 'G':
-                    G = cur_data / np.pi
-                    Gwave = cw
-                if k == 'R':
-                    R = cur_data / np.pi
-                    Rwave = cw
-                cur_data = None
-
-            ## compute 3 band QAA
-            print('Computing Pitarch 3 band QAA')
-            print('R{} G{} B{}'.format(Rwave, Gwave, Bwave))
-            ret = ac.parameters.pitarch.p3qaa_compute(gem['gatts']['sensor'], B, G, R)
-
-            ## list possible output parameters
-            p3_pars = []
-            for k in ret:
-                if len(ret[k].shape) == 3:
-                    p3_pars += ['p3qaa_{}_{}'.format(k, Bwave), 'p3qaa_{}_{}'.format(k, Gwave), 'p3qaa_{}_{}'.format(k, Rwave)]
-                else:
-                    p3_pars += ['p3qaa_{}'.format(k)]
-            ## check which parameters are wanted
-            if 'p3qaa' in setu['l2w_parameters']:
-                cur_par_out = p3_pars
-            else:
-                cur_par_out = [k for k in setu['l2w_parameters'] if k in p3_pars]
-                for k in setu['l2w_parameters']:
-                    if k.lower() == 'p3qaa_a_*':
-                        cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_a_' in k.lower())]
-                    if k.lower() == 'p3qaa_bb_*':
-                        cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_bb_' in k.lower())]
-                    if k.lower() == 'p3qaa_kd_*':
-                        cur_par_out += [k for k in p3_pars if (k not in cur_par_out) & ('p3qaa_kd_' in k.lower())]
-
-            ## reformat for output
-            for p in cur_par_out:
-                if p[6:] not in ret: ## this means we have a three band parameter
-                    k = p[6:-4]
-                    w = int(p[-3:])
-                    if w == Bwave: wi = 0
-                    if w == Gwave: wi = 1
-                    if w == Rwave: wi = 2
-                    par_data[p] = ret[k][:,:,wi]
-                    par_atts[p] = {pk: par_attributes[pk] for pk in par_attributes}
-                    par_atts[p]['ds_name'] = p
-                else:
-                    par_data[p] = ret[p[6:]]
-                    par_atts[p] = {pk: par_attributes[pk] for pk in par_attributes}
-                    par_atts[p]['ds_name'] = p
-            ret = None
-            p3qaa_computed = True
-        ## end Pitarch 3 band QAA
-        #############################
-
-        #############################
-        ## FAI
-        if (cur_par == 'fai') | (cur_par == 'fai_rhot'):
-            par_name = cur_par
-            mask = False ## no water mask
-            par_split = cur_par.split('_')
-            par_attributes = {'algorithm':'Floating Algal Index, Hu et al. 2009', 'dataset':'rhos'}
-            par_attributes['standard_name']='fai'
-            par_attributes['long_name']='Floating Algal Index'
-            par_attributes['units']="1"
-            par_attributes['reference']='Hu et al. 2009'
-            par_attributes['algorithm']=''
-
-            ## select bands
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-            if cur_par=='fai_rhot':
-                par_attributes['dataset']='rhot'
-                ds_waves = [w for w in rhot_waves]
-            ## wavelengths and max wavelength difference
-            fai_diff = [10, 30, 80]
-            req_waves = [660,865,1610]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > fai_diff[i]: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-            ## compute fai
-            fai_sc = (float(par_attributes['waves'][1])-float(par_attributes['waves'][0]))/\
-                     (float(par_attributes['waves'][2])-float(par_attributes['waves'][0]))
-            nir_prime = tmp_data[0] + (tmp_data[2]-tmp_data[0]) * fai_sc
-            par_data[par_name] = tmp_data[1] - nir_prime
-            par_atts[par_name] = par_attributes
-            tmp_data = None
-        ## end FAI
-        #############################
-
-        #############################
-        ## FAIT
-        if (cur_par == 'fait'):
-            par_name = cur_par
-            mask = False ## no water mask
-            par_split = par_name.split('_')
-            par_attributes = {'algorithm':'Floating Algal Index Turbid Waters, Dogliotti et al. 2018', 'dataset':'rhos'}
-            par_attributes['standard_name']='fait'
-            par_attributes['long_name']='Floating Algal Index for Turbid Waters'
-            par_attributes['units']="1"
-            par_attributes['reference']='Dogliotti et al. 2018'
-            par_attributes['algorithm']=''
-
-            ## read config
-            fait_cfg = ac.shared.import_config('{}/Shared/algorithms/Dogliotti/dogliotti_fait.txt'.format(ac.config['data_dir']))
-            fait_fai_threshold = float(fait_cfg['fait_fai_threshold'])
-            fait_red_threshold = float(fait_cfg['fait_red_threshold'])
-            fait_rgb_limit = float(fait_cfg['fait_rgb_limit'])
-            fait_L_limit = float(fait_cfg['fait_L_limit'])
-
-            if gem['gatts']['sensor'] in ['L8_OLI', 'L9_OLI']:
-                fait_a_threshold = float(fait_cfg['fait_a_threshold_OLI'])
-            elif gem['gatts']['sensor'] in ['S2A_MSI', 'S2B_MSI']:
-                fait_a_threshold = float(fait_cfg['fait_a_threshold_MSI'])
-            else:
-                print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                continue
+            #############################
+            ## OLH
+            if (cur_par == 'olh'):
+                par_name = cur_par
+                mask = True ## apply non water mask
+
+                par_attributes = {'algorithm':'Castagna et al. 2020'}
+                par_attributes['standard_name']='olh'
+                par_attributes['long_name']='Orange Line Height'
+                par_attributes['units']="1"
+                par_attributes['reference']='Castagna et al. 2020'
+                par_attributes['algorithm']=''
+
+                ### get required datasets
+                if gem['gatts']['sensor'] not in ['L8_OLI', 'L9_OLI', 'EO1_ALI']:
+                    print('Parameter {} not configured for {}.'.format(cur_par,gem['gatts']['sensor']))
+                    continue
 
-            ## add to parameter attributes
-            par_attributes['fai_threshold'] = fait_fai_threshold
-            par_attributes['red_threshold'] = fait_red_threshold
-            par_attributes['rgb_limit'] = fait_rgb_limit
-            par_attributes['L_limit'] = fait_L_limit
-            par_attributes['a_threshold'] = fait_a_threshold
-
-            ## select bands
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-
-            ## wavelengths and max wavelength difference
-            fai_diff = [10, 10, 10, 30, 80]
-            req_waves = [490, 560, 660, 865, 1610]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > fai_diff[i]: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-
-            ## compute fait
-            fai_sc = (float(par_attributes['waves'][3])-float(par_attributes['waves'][2]))/\
-                     (float(par_attributes['waves'][4])-float(par_attributes['waves'][2]))
-            nir_prime = tmp_data[2] + \
-                        (tmp_data[4]-tmp_data[2]) * fai_sc
-            par_data[par_name] = tmp_data[3] - nir_prime
-            par_atts[par_name] = par_attributes
-            nir_prime = None
-
-            ## make lab coordinates
-            for i in range(3):
-                data = ac.shared.datascl(tmp_data[i], dmin=0, dmax=fait_rgb_limit)
-                if i == 0:
-                    rgb = data
-                else:
-                    rgb = np.dstack((rgb,data))
-                data = None
-            lab = skimage.color.rgb2lab(rgb)
-            rgb = None
-
-            ## check FAI > 0
-            par_data[par_name][par_data[par_name] >= fait_fai_threshold] = 1.0
-            par_data[par_name][par_data[par_name] < fait_fai_threshold] = 0.0
-
-            ## check turbidity based on red threshold
-            par_data[par_name][tmp_data[2] > fait_red_threshold] = 0.0
-
-            ## check L and a
-            par_data[par_name][lab[:,:,0] >= fait_L_limit] = 0.0
-            par_data[par_name][lab[:,:,1] >= fait_a_threshold] = 0.0
-            lab = None
-        ## end FAIT
-        #############################
-
-        #############################
-        ## NDVI
-        if (cur_par == 'ndvi') | (cur_par == 'ndvi_rhot'):
-            par_name = cur_par
-            mask = False ## no water mask
-            par_split = cur_par.split('_')
-            par_attributes = {'algorithm':'NDVI', 'dataset':'rhos'}
-            par_attributes['reference']=''
-            par_attributes['algorithm']=''
-
-            ## select bands
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-            if cur_par=='ndvi_rhot':
-                par_attributes['dataset']='rhot'
-                ds_waves = [w for w in rhot_waves]
-
-            ## wavelengths and max wavelength difference
-            ndvi_diff = [40, 65]
-            req_waves = [660,865]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > ndvi_diff[i]: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-
-            ## compute ndvi
-            par_data[par_name] = (tmp_data[1]-tmp_data[0])/\
-                                   (tmp_data[1]+tmp_data[0])
-            par_atts[par_name] = par_attributes
-            tmp_data = None
-        ## end NDVI
-
-        #############################
-        ## NDCI
-        if (cur_par == 'ndci'):
-            par_name = cur_par
-            mask = True ## apply non water mask
-            par_attributes = {'algorithm':'Mishra et al. 2014, NDCI', 'dataset':'rhos'}
-            par_attributes['standard_name']='ndci'
-            par_attributes['long_name']='Normalised Difference Chlorophyll Index'
-            par_attributes['units']="1"
-            par_attributes['reference']='Mishra et al. 2014'
-            par_attributes['algorithm']=''
-
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-
-            ### get required datasets
-            if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI'] + ac.hyper_sensors:
-                print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                continue
+                if gem['gatts']['sensor'] == 'L8_OLI': req_waves = [561,613,655]
+                if gem['gatts']['sensor'] == 'L9_OLI': req_waves = [561,613,654]
+                if gem['gatts']['sensor'] == 'EO1_ALI': req_waves = [561,613,655]
 
-            req_waves = [670,705]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > 10: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-            ## compute ndci
-            par_data[par_name] = (tmp_data[1]-tmp_data[0])/\
-                                   (tmp_data[1]+tmp_data[0])
-            par_atts[par_name] = par_attributes
-            tmp_data = None
-        ## end NDCI
-        #############################
-
-        #############################
-        ## SLH
-        if (cur_par == 'slh'):
-            par_name = cur_par
-            mask = True ## apply non water mask
-            par_attributes = {'algorithm':'Kudela et al. 2015, SLH', 'dataset':'rhos'}
-            par_attributes['standard_name']='slh'
-            par_attributes['long_name']='Scattering Line Height'
-            par_attributes['units']="1"
-            par_attributes['reference']='Kudela et al. 2015'
-            par_attributes['algorithm']=''
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-
-            ### get required datasets
-            if gem['gatts']['sensor'] not in ['S2A_MSI', 'S2B_MSI', 'S3A_OLCI', 'S3B_OLCI'] + ac.hyper_sensors:
-                print('Parameter {} not configured for {}.'.format(par_name,gem['gatts']['sensor']))
-                continue
+                required_datasets = ['rhos_{}'.format(w) for w in req_waves]
 
-            req_waves = [670,705,780]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > 10: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-            slh_waves = [float(ds.split('_')[1]) for ds in required_datasets]
-            ratio = (tmp_data[2]-tmp_data[0]) / \
-                    (slh_waves[2]+slh_waves[0])
-            par_data[par_name] = tmp_data[1] - (tmp_data[0] + (ratio)*(slh_waves[1]+slh_waves[0]))
-            par_atts[par_name] = par_attributes
-            tmp_data = None
-        ## end SLH
-        #############################
-
-        #############################
-        ## OLH
-        if (cur_par == 'olh'):
-            par_name = cur_par
-            mask = True ## apply non water mask
-
-            par_attributes = {'algorithm':'Castagna et al. 2020'}
-            par_attributes['standard_name']='olh'
-            par_attributes['long_name']='Orange Line Height'
-            par_attributes['units']="1"
-            par_attributes['reference']='Castagna et al. 2020'
-            par_attributes['algorithm']=''
-
-            ### get required datasets
-            if gem['gatts']['sensor'] not in ['L8_OLI', 'L9_OLI', 'EO1_ALI']:
-                print('Parameter {} not configured for {}.'.format(cur_par,gem['gatts']['sensor']))
-                continue
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
 
-            if gem['gatts']['sensor'] == 'L8_OLI': req_waves = [561,613,655]
-            if gem['gatts']['sensor'] == 'L9_OLI': req_waves = [561,613,654]
-            if gem['gatts']['sensor'] == 'EO1_ALI': req_waves = [561,613,655]
+                ## compute parameter
+                ow = (float(req_waves[2])-req_waves[1])/(float(req_waves[2])-float(req_waves[0]))
+                par_data[par_name] = tmp_data[0]*ow + tmp_data[2]*(1-ow)
+                par_data[par_name] = tmp_data[1]-par_data[par_name]
+                tmp_data = None
+                par_atts[par_name] = par_attributes
+            ## end OLH
+            #############################
+
+            #############################
+            ## Hue Angle
+            if (cur_par == 'hue_angle'):
+                hue_coeff = ac.parameters.vanderwoerd.coef_hue_angle()
+                if gem['gatts']['sensor'] not in hue_coeff:
+                    print('Parameter {} not configured for {}.'.format(cur_par, gem['gatts']['sensor']))
+                    continue
 
-            required_datasets = ['rhos_{}'.format(w) for w in req_waves]
+                par_name = cur_par
+                mask = True ## apply non water mask
+
+                par_attributes = {'algorithm':'Hue Angle', 'dataset':'rhos'}
+                par_attributes['standard_name']='hue_angle'
+                par_attributes['long_name']='Hue Angle'
+                par_attributes['units']='degrees'
+                par_attributes['reference']='Van der Woerd et al., 2018'
+                par_attributes['algorithm']=''
+
+
+                req_waves = hue_coeff[gem['gatts']['sensor']]['req_waves']
+                hac = hue_coeff[gem['gatts']['sensor']]
+
+                required_datasets,req_waves_selected = [],[]
+                ds_waves = [w for w in rhos_waves]
+                for i, reqw in enumerate(req_waves):
+                    widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
+                    if abs(float(selwave)-float(reqw)) > 10: continue
+                    selds='{}_{}'.format(par_attributes['dataset'],selwave)
+                    required_datasets.append(selds)
+                    req_waves_selected.append(selwave)
+                par_attributes['waves']=req_waves_selected
+                if len(required_datasets) != len(req_waves): continue
+
+                ## get data
+                for di, cur_ds in enumerate(required_datasets):
+                    if di == 0: tmp_data = []
+                    cur_data = l2w_data(cur_ds)
+                    tmp_data.append(cur_data)
+
+                ## compute hue angle
+                yw = 1/3.
+                xw = 1/3.
+                for iw, w in enumerate(req_waves_selected):
+                    idx, w_ = ac.shared.closest_idx(hac['lambda'], req_waves_selected[iw])
+                    if iw == 0:
+                        X = tmp_data[iw] * hac['X'][idx]
+                        Y = tmp_data[iw] * hac['Y'][idx]
+                        Z = tmp_data[iw] * hac['Z'][idx]
+                    else:
+                        X += tmp_data[iw] * hac['X'][idx]
+                        Y += tmp_data[iw] * hac['Y'][idx]
+                        Z += tmp_data[iw] * hac['Z'][idx]
+                    X[np.where(mask)] = np.nan
+                    Y[np.where(mask)] = np.nan
+                    Z[np.where(mask)] = np.nan
+                    den = (X+Y+Z)
+                    x = X/den
+                    y = Y/den
+                    den = None
+
+                    ## calculate alpha
+                    alpha = np.mod(np.arctan2(y-yw, x-xw),2*np.pi)
+                    x,y = None, None
+                    alpha*=(180/np.pi)
+                    hues_100 = alpha/100.
+                    corr = (hac['coef'][0] * np.power(hues_100,5)) + \
+                           (hac['coef'][1] * np.power(hues_100,4)) + \
+                           (hac['coef'][2] * np.power(hues_100,3)) + \
+                           (hac['coef'][3] * np.power(hues_100,2)) + \
+                           (hac['coef'][4] * hues_100) + hac['coef'][5]
+                    hues_100 = None
+                    alpha += corr
+                    corr = None
+                    par_data[par_name] = alpha
+                    par_atts[par_name] = par_attributes
+                    alpha = None
+            ## end Hue Angle
+            #############################
 
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-
-            ## compute parameter
-            ow = (float(req_waves[2])-req_waves[1])/(float(req_waves[2])-float(req_waves[0]))
-            par_data[par_name] = tmp_data[0]*ow + tmp_data[2]*(1-ow)
-            par_data[par_name] = tmp_data[1]-par_data[par_name]
-            tmp_data = None
-            par_atts[par_name] = par_attributes
-        ## end OLH
-        #############################
-
-        #############################
-        ## Hue Angle
-        if (cur_par == 'hue_angle'):
-            hue_coeff = ac.parameters.vanderwoerd.coef_hue_angle()
-            if gem['gatts']['sensor'] not in hue_coeff:
-                print('Parameter {} not configured for {}.'.format(cur_par, gem['gatts']['sensor']))
+            ## continue if parameter not computed
+            if len(par_data) == 0:
+                if (bsub is None) or (bsub[1] == 0): print('Parameter {} not computed'.format(cur_par))
                 continue
 
-            par_name = cur_par
-            mask = True ## apply non water mask
-
-            par_attributes = {'algorithm':'Hue Angle', 'dataset':'rhos'}
-            par_attributes['standard_name']='hue_angle'
-            par_attributes['long_name']='Hue Angle'
-            par_attributes['units']='degrees'
-            par_attributes['reference']='Van der Woerd et al., 2018'
-            par_attributes['algorithm']=''
-
-
-            req_waves = hue_coeff[gem['gatts']['sensor']]['req_waves']
-            hac = hue_coeff[gem['gatts']['sensor']]
-
-            required_datasets,req_waves_selected = [],[]
-            ds_waves = [w for w in rhos_waves]
-            for i, reqw in enumerate(req_waves):
-                widx,selwave = ac.shared.closest_idx(ds_waves, reqw)
-                if abs(float(selwave)-float(reqw)) > 10: continue
-                selds='{}_{}'.format(par_attributes['dataset'],selwave)
-                required_datasets.append(selds)
-                req_waves_selected.append(selwave)
-            par_attributes['waves']=req_waves_selected
-            if len(required_datasets) != len(req_waves): continue
-
-            ## get data
-            for di, cur_ds in enumerate(required_datasets):
-                if di == 0: tmp_data = []
-                if cur_ds in gem['data']:
-                    cur_data  = 1.0 * gem['data'][cur_ds]
-                else:
-                    cur_data  = ac.shared.nc_data(gemf, cur_ds, sub=sub).data
-                tmp_data.append(cur_data)
-
-            ## compute hue angle
-            yw = 1/3.
-            xw = 1/3.
-            for iw, w in enumerate(req_waves_selected):
-                idx, w_ = ac.shared.closest_idx(hac['lambda'], req_waves_selected[iw])
-                if iw == 0:
-                    X = tmp_data[iw] * hac['X'][idx]
-                    Y = tmp_data[iw] * hac['Y'][idx]
-                    Z = tmp_data[iw] * hac['Z'][idx]
+            ## write parameters in par_data
+            for cur_ds in par_data:
+                ## add mask
+                if (mask) & (setu['l2w_mask_water_parameters']): par_data[cur_ds][l2w_mask] = np.nan
+                ## write to NetCDF
+                if verbosity > 1: print('Writing {}'.format(cur_ds))
+                if bsub is None:
+                    gemo.write(cur_ds, par_data[cur_ds], ds_att=par_atts[cur_ds])
                 else:
-                    X += tmp_data[iw] * hac['X'][idx]
-                    Y += tmp_data[iw] * hac['Y'][idx]
-                    Z += tmp_data[iw] * hac['Z'][idx]
-                X[np.where(mask)] = np.nan
-                Y[np.where(mask)] = np.nan
-                Z[np.where(mask)] = np.nan
-                den = (X+Y+Z)
-                x = X/den
-                y = Y/den
-                den = None
-
-                ## calculate alpha
-                alpha = np.mod(np.arctan2(y-yw, x-xw),2*np.pi)
-                x,y = None, None
-                alpha*=(180/np.pi)
-                hues_100 = alpha/100.
-                corr = (hac['coef'][0] * np.power(hues_100,5)) + \
-                       (hac['coef'][1] * np.power(hues_100,4)) + \
-                       (hac['coef'][2] * np.power(hues_100,3)) + \
-                       (hac['coef'][3] * np.power(hues_100,2)) + \
-                       (hac['coef'][4] * hues_100) + hac['coef'][5]
-                hues_100 = None
-                alpha += corr
-                corr = None
-                par_data[par_name] = alpha
-                par_atts[par_name] = par_attributes
-                alpha = None
-        ## end Hue Angle
-        #############################
-
-        ## continue if parameter not computed
-        if len(par_data) == 0:
-            print('Parameter {} not computed'.format(cur_par))
-            continue
-
-        ## write parameters in par_data
-        for cur_ds in par_data:
-            ## add mask
-            if (mask) & (setu['l2w_mask_water_parameters']): par_data[cur_ds][(l2_flags & flag_value)!=0] = np.nan
-            ## write to NetCDF
-            if verbosity > 1: print('Writing {}'.format(cur_ds))
-            ac.output.nc_write(ofile, cur_ds, par_data[cur_ds], dataset_attributes=par_atts[cur_ds],
-                               attributes=gem['gatts'], new=new, nc_projection=nc_projection,
-                               netcdf_compression=setu['netcdf_compression'],
-                               netcdf_compression_level=setu['netcdf_compression_level'],
-                               netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-            ## we can also add parameter to gem
-            if return_gem:
-                gem['data'][cur_ds] = par_data[cur_ds]
-                gem['atts'][cur_ds] = par_atts[cur_ds]
-
-            new = False
-        par_data = None
-        par_atts = None
-    ## end parameter loop
+                    gemo.write(cur_ds, par_data[cur_ds], ds_att=par_atts[cur_ds], offset=[bsub[0], bsub[1]], global_dims=l2_flags.shape)
+                block_datasets.append(cur_ds.lower())
+                ## we can also add parameter to gem
+                if return_gem:
+                    if bsub is None:
+                        gem['data'][cur_ds] = par_data[cur_ds]
+                    else:
+                        if bsub[1] == 0: gem['data'][cur_ds] = np.zeros(l2_flags.shape, dtype=par_data[cur_ds].dtype)+np.nan
+                        gem['data'][cur_ds][bsub[1]:bsub[1]+bsub[3], bsub[0]:bsub[0]+bsub[2]] = par_data[cur_ds]
+                    gem['atts'][cur_ds] = par_atts[cur_ds]
+            par_data = None
+            par_atts = None
+            ac.acolite.profiling.stop('l2w_parameter')
+        ## end parameter loop
+    ## end block loop
+    if (lazy) & (len(setu['l2w_parameters']) > 0): gem['data'].release(l2w_required[setu['l2w_parameters'][-1]])
+
+    ## close input and output files
+    gemo.close()
+    gemi.close()
 
     ## return data or file path
     if return_gem:
@@ -5,6 +5,7 @@
 ## modifications: 2021-03-11 (QV) RGB outputs
 ##                2021-03-15 (QV) large update, including other parameters and mapping with pcolormesh
 ##                2021-04-01 (QV) changed plot_all option
+##                2026-10-18 (AD) list virtual geolocation datasets
 
 def acolite_map(ncf, output = None,
                 settings = None,
@@ -186,7 +187,7 @@ def acolite_map(ncf, output = None,
             plt.close()
 
     ## get info from netcdf file
-    datasets = ac.shared.nc_datasets(ncf)
+    datasets = ac.shared.nc_datasets(ncf, virtual=True)
     datasets_lower = [ds.lower() for ds in datasets]
     gatts = ac.shared.nc_gatts(ncf)
     imratio = None
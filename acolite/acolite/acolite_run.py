@@ -6,6 +6,9 @@
 ##                2021-04-15 (QV) test/parse input files
 ##                2022-03-04 (QV) moved inputfile testing to inputfile_test
 ##                2023-03-29 (AD) modified for CS tiff
+##                2026-10-18 (AD) moved bundle processing to acolite_run_bundle, added workers option for a process pool
+##                2026-10-18 (AD) added run profile with per stage resource use (profile_run and profile_cprofile settings)
+##                2026-10-18 (AD) pass export_geotiff_stack and export_geotiff_threads to nc_to_geotiff
 
 # AD
 def cleaning_4_CS(output_folder, L2W_delete = True):
@@ -38,8 +41,189 @@ def cleaning_4_CS(output_folder, L2W_delete = True):
         except:
             pass
 
-def acolite_run(settings, inputfile=None, output=None):
+## process a single bundle
+## returns the processed dict for this bundle and the l1r settings
+def acolite_run_bundle(bundle, setu, setu_l1r):
+    import os
+    import acolite as ac
+
+    processed = {'input': bundle}
+
+    ## save user settings
+    settings_file = '{}/acolite_run_{}_l1r_settings_user.txt'.format(setu_l1r['output'],setu_l1r['runid'])
+    ac.acolite.settings.write(settings_file, setu_l1r)
+
+    ## run l1 convert
+    ac.acolite.profiling.start('l1r')
+    ret = ac.acolite.acolite_l1r(bundle, setu_l1r)
+    ac.acolite.profiling.stop('l1r')
+    if len(ret) == 0: return(processed, None)
+    l1r_files, l1r_setu = ret
+    processed['l1r'] = l1r_files
+
+    ## save all used settings
+    settings_file = '{}/acolite_run_{}_l1r_settings.txt'.format(l1r_setu['output'],l1r_setu['runid'])
+    ac.acolite.settings.write(settings_file, l1r_setu)
+
+    ## do atmospheric correction
+    l2r_files, l2t_files = [], []
+    l2w_files = []
+    for l1r in l1r_files:
+        gatts = ac.shared.nc_gatts(l1r)
+        if 'acolite_file_type' not in gatts: gatts['acolite_file_type'] = 'L1R'
+        if l1r_setu['l1r_export_geotiff']: ac.output.nc_to_geotiff(l1r, match_file = l1r_setu['export_geotiff_match_file'],
+                                                        cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
+                                                        skip_geo = l1r_setu['export_geotiff_coordinates'] is False,
+                                                        stack = l1r_setu['export_geotiff_stack'], threads = l1r_setu['export_geotiff_threads'])
+        if l1r_setu['l1r_export_geotiff_rgb']: ac.output.nc_to_geotiff_rgb(l1r, settings = l1r_setu)
+
+        ## rhot RGB
+        if l1r_setu['rgb_rhot']:
+            l1r_setu_ = {k: l1r_setu[k] for k in l1r_setu}
+            l1r_setu_['rgb_rhos'] = False
+            ac.acolite.acolite_map(l1r, settings = l1r_setu_, plot_all=False)
+
+        ## do VIS-SWIR atmospheric correction
+        if l1r_setu['atmospheric_correction']:
+            if gatts['acolite_file_type'] == 'L1R':
+                ## run ACOLITE
+                ac.acolite.profiling.start('l2r', file=os.path.basename(l1r))
+                ret = ac.acolite.acolite_l2r(l1r, settings = setu, verbosity = ac.config['verbosity'])
+                ac.acolite.profiling.stop('l2r')
+                if len(ret) != 2: continue
+                l2r, l2r_setu = ret
+            else:
+                l2r = '{}'.format(l1r)
+                l2r_setu = ac.acolite.settings.parse(gatts['sensor'], settings=setu)
+
+            if (l2r_setu['adjacency_correction']):
+                ac.acolite.profiling.start('adjacency', method=l2r_setu['adjacency_method'])
+                ret = None
+                ## acstar3 adjacency correction
+                if (l2r_setu['adjacency_method']=='acstar3'):
+                    ret = ac.adjacency.acstar3.acstar3(l2r, setu = l2r_setu, verbosity = ac.config['verbosity'])
+                ## GLAD
+                if (l2r_setu['adjacency_method']=='glad'):
+                    ret = ac.adjacency.glad.glad_l2r(l2r, verbosity = ac.config['verbosity'])
+                l2r = [] if ret is None else ret
+                ac.acolite.profiling.stop('adjacency')
+
+            ## if we have multiple l2r files
+            if type(l2r) is not list: l2r = [l2r]
+            l2r_files+=l2r
+
+            if l2r_setu['l2r_export_geotiff']:
+                for ncf in l2r:
+                    ac.output.nc_to_geotiff(ncf, match_file = l2r_setu['export_geotiff_match_file'],
+                                            cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
+                                            skip_geo = l2r_setu['export_geotiff_coordinates'] is False,
+                                            stack = l2r_setu['export_geotiff_stack'], threads = l2r_setu['export_geotiff_threads'])
+
+                    if l2r_setu['l2r_export_geotiff_rgb']: ac.output.nc_to_geotiff_rgb(ncf, settings = l2r_setu)
+
+
+            ## make rgb rhos maps
+            if l2r_setu['rgb_rhos']:
+                l2r_setu_ = {k: l1r_setu[k] for k in l2r_setu}
+                l2r_setu_['rgb_rhot'] = False
+                for ncf in l2r:
+                    ac.acolite.acolite_map(ncf, settings = l2r_setu_, plot_all=False)
+
+            ## compute l2w parameters
+            if l2r_setu['l2w_parameters'] is not None:
+                if type(l2r_setu['l2w_parameters']) is not list: l2r_setu['l2w_parameters'] = [l2r_setu['l2w_parameters']]
+                for ncf in l2r:
+                    ac.acolite.profiling.start('l2w', file=os.path.basename(ncf))
+                    ret = ac.acolite.acolite_l2w(ncf, settings=l2r_setu)
+                    ac.acolite.profiling.stop('l2w')
+                    l2w_file_path=ret
+                    if ret is not None:
+                        if l2r_setu['l2w_export_geotiff']: ac.output.nc_to_geotiff(ret, match_file = l2r_setu['export_geotiff_match_file'],
+                                                                        cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
+                                                                        skip_geo = l2r_setu['export_geotiff_coordinates'] is False,
+                                                                        stack = l2r_setu['export_geotiff_stack'], threads = l2r_setu['export_geotiff_threads'])
+                        l2w_files.append(ret)
+
+                        ## make l2w maps
+                        if l2r_setu['map_l2w']:
+                            ac.acolite.acolite_map(ret, settings=l2r_setu)
+
+        ## run TACT thermal atmospheric correction
+        if l1r_setu['tact_run']:
+            ac.acolite.profiling.start('tact')
+            ret = ac.tact.tact_gem(l1r, output = l1r_setu['output'], verbosity=ac.config['verbosity'],
+                                        output_atmosphere = l1r_setu['tact_output_atmosphere'],
+                                        output_intermediate = l1r_setu['tact_output_intermediate'])
+            ac.acolite.profiling.stop('tact')
+            if ret != ():
+                l2t_files.append(ret)
+                if l1r_setu['l2t_export_geotiff']: ac.output.nc_to_geotiff(ret, match_file = l1r_setu['export_geotiff_match_file'],
+                                                                           cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
+                                                                           skip_geo = l1r_setu['export_geotiff_coordinates'] is False,
+                                                                           stack = l1r_setu['export_geotiff_stack'], threads = l1r_setu['export_geotiff_threads'])
+
+                ## make l2t maps
+                if l1r_setu['tact_map']: ac.acolite.acolite_map(ret, settings=l1r_setu)
+
+    if len(l2r_files) > 0: processed['l2r'] = l2r_files
+    if len(l2t_files) > 0: processed['l2t'] = l2t_files
+    if len(l2w_files) > 0: processed['l2w'] = l2w_files
+
+    return(processed, l1r_setu)
+
+## worker log file, LogTee is kept until the worker process exits
+worker_log = None
+## worker profile, written after each bundle
+worker_profile = None
+
+## set up worker process for acolite_run
+def acolite_run_worker_init(log_base, setu):
+    import os, sys, multiprocessing
+    import acolite as ac
+    global worker_log, worker_profile
+
+    if 'verbosity' in setu: ac.config['verbosity'] = int(setu['verbosity'])
+
+    ## stdout redirect inherited from the main process is not process safe
+    if isinstance(sys.stdout, ac.acolite.logging.LogTee): sys.stdout = sys.stdout.stdout
+
+    ## log to a separate file for each worker
+    wi = multiprocessing.current_process()._identity
+    wi = wi[0] if len(wi) > 0 else os.getpid()
+    worker_log = ac.acolite.logging.LogTee('{}_worker_{:02d}_log_file.txt'.format(log_base, wi))
+    print('Run ID - {} - worker {}'.format(setu['runid'], wi))
+
+    ## profile for each worker
+    if ('profile_run' in setu) and (setu['profile_run']):
+        worker_profile = ac.acolite.profiling.profiler('{}_worker_{:02d}_profile'.format(log_base, wi),
+                                                       cprofile=setu['profile_cprofile'] if 'profile_cprofile' in setu else None).start()
+
+## run a single bundle
+## errors are caught and recorded in the processed dict so that other bundles can continue
+def acolite_run_bundle_safe(ni, bundle, setu, setu_l1r):
+    import traceback
+    import acolite as ac
+    ac.acolite.profiling.start('bundle', bundle=ni)
+    try:
+        print('Processing bundle {}: {}'.format(ni, bundle))
+        processed, l1r_setu = acolite_run_bundle(bundle, setu, setu_l1r)
+    except:
+        error = traceback.format_exc()
+        print('Processing bundle {} failed: {}'.format(ni, bundle))
+        print(error)
+        processed, l1r_setu = {'input': bundle, 'error': error.strip().split('\n')[-1]}, None
+    ac.acolite.profiling.stop('bundle')
+    return(processed, l1r_setu)
+
+## run a single bundle in a worker process
+def acolite_run_worker(ni, bundle, setu, setu_l1r):
+    processed, l1r_setu = acolite_run_bundle_safe(ni, bundle, setu, setu_l1r)
+    if worker_profile is not None: worker_profile.write()
+    return(ni, processed, l1r_setu)
+
+def acolite_run(settings, inputfile=None, output=None, workers=None):
     import glob, datetime, os
+    import multiprocessing
     import acolite as ac
 
     print('Running ACOLITE 4 CALLISTO - {}'.format(ac.version))
@@ -65,6 +249,12 @@ def acolite_run(settings, inputfile=None, output=None):
     log = ac.acolite.logging.LogTee(log_file)
     print('Run ID - {}'.format(setu['runid']))
 
+    ## run profile next to the log file
+    profile = None
+    if ('profile_run' in setu) and (setu['profile_run']):
+        profile = ac.acolite.profiling.profiler('{}/acolite_run_{}_profile'.format(setu['output'],setu['runid']),
+                                                cprofile=setu['profile_cprofile'] if 'profile_cprofile' in setu else None).start()
+
     ## earthdata credentials from settings file
     for k in ['EARTHDATA_u', 'EARTHDATA_p']:
         kv = setu[k] if k in setu else ac.config[k]
@@ -74,6 +264,8 @@ def acolite_run(settings, inputfile=None, output=None):
     ## set settings from launch_acolite
     if inputfile is not None: setu['inputfile'] = inputfile
     if output is not None: setu['output'] = output
+    if workers is not None: setu['workers'] = int(workers)
+    workers = 1 if ('workers' not in setu) or (setu['workers'] is None) else setu['workers']
 
     ## check if we have anything to do
     if 'inputfile' not in setu:
@@ -104,117 +296,24 @@ def acolite_run(settings, inputfile=None, output=None):
 
     ## track processed scenes
     processed = {}
-    ## run through bundles to process
-    for ni in range(nruns):
-        ## bundle to process
-        bundle = inputfile_list[ni]
-        processed[ni] = {'input': bundle}
-
-        ## save user settings
-        settings_file = '{}/acolite_run_{}_l1r_settings_user.txt'.format(setu_l1r['output'],setu_l1r['runid'])
-        ac.acolite.settings.write(settings_file, setu_l1r)
-
-        ## run l1 convert
-        ret = ac.acolite.acolite_l1r(bundle, setu_l1r)
-        if len(ret) == 0: continue
-        l1r_files, l1r_setu = ret
-        processed[ni]['l1r'] = l1r_files
-
-        ## save all used settings
-        settings_file = '{}/acolite_run_{}_l1r_settings.txt'.format(l1r_setu['output'],l1r_setu['runid'])
-        ac.acolite.settings.write(settings_file, l1r_setu)
-
-        ## do atmospheric correction
-        l2r_files, l2t_files = [], []
-        l2w_files = []
-        for l1r in l1r_files:
-            gatts = ac.shared.nc_gatts(l1r)
-            if 'acolite_file_type' not in gatts: gatts['acolite_file_type'] = 'L1R'
-            if l1r_setu['l1r_export_geotiff']: ac.output.nc_to_geotiff(l1r, match_file = l1r_setu['export_geotiff_match_file'],
-                                                            cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
-                                                            skip_geo = l1r_setu['export_geotiff_coordinates'] is False)
-            if l1r_setu['l1r_export_geotiff_rgb']: ac.output.nc_to_geotiff_rgb(l1r, settings = l1r_setu)
-
-            ## rhot RGB
-            if l1r_setu['rgb_rhot']:
-                l1r_setu_ = {k: l1r_setu[k] for k in l1r_setu}
-                l1r_setu_['rgb_rhos'] = False
-                ac.acolite.acolite_map(l1r, settings = l1r_setu_, plot_all=False)
-
-            ## do VIS-SWIR atmospheric correction
-            if l1r_setu['atmospheric_correction']:
-                if gatts['acolite_file_type'] == 'L1R':
-                    ## run ACOLITE
-                    ret = ac.acolite.acolite_l2r(l1r, settings = setu, verbosity = ac.config['verbosity'])
-                    if len(ret) != 2: continue
-                    l2r, l2r_setu = ret
-                else:
-                    l2r = '{}'.format(l1r)
-                    l2r_setu = ac.acolite.settings.parse(gatts['sensor'], settings=setu)
-
-                if (l2r_setu['adjacency_correction']):
-                    ret = None
-                    ## acstar3 adjacency correction
-                    if (l2r_setu['adjacency_method']=='acstar3'):
-                        ret = ac.adjacency.acstar3.acstar3(l2r, setu = l2r_setu, verbosity = ac.config['verbosity'])
-                    ## GLAD
-                    if (l2r_setu['adjacency_method']=='glad'):
-                        ret = ac.adjacency.glad.glad_l2r(l2r, verbosity = ac.config['verbosity'])
-                    l2r = [] if ret is None else ret
-
-                ## if we have multiple l2r files
-                if type(l2r) is not list: l2r = [l2r]
-                l2r_files+=l2r
-
-                if l2r_setu['l2r_export_geotiff']:
-                    for ncf in l2r:
-                        ac.output.nc_to_geotiff(ncf, match_file = l2r_setu['export_geotiff_match_file'],
-                                                cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
-                                                skip_geo = l2r_setu['export_geotiff_coordinates'] is False)
-
-                        if l2r_setu['l2r_export_geotiff_rgb']: ac.output.nc_to_geotiff_rgb(ncf, settings = l2r_setu)
-
-
-                ## make rgb rhos maps
-                if l2r_setu['rgb_rhos']:
-                    l2r_setu_ = {k: l1r_setu[k] for k in l2r_setu}
-                    l2r_setu_['rgb_rhot'] = False
-                    for ncf in l2r:
-                        ac.acolite.acolite_map(ncf, settings = l2r_setu_, plot_all=False)
-
-                ## compute l2w parameters
-                if l2r_setu['l2w_parameters'] is not None:
-                    if type(l2r_setu['l2w_parameters']) is not list: l2r_setu['l2w_parameters'] = [l2r_setu['l2w_parameters']]
-                    for ncf in l2r:
-                        ret = ac.acolite.acolite_l2w(ncf, settings=l2r_setu)
-                        l2w_file_path=ret
-                        if ret is not None:
-                            if l2r_setu['l2w_export_geotiff']: ac.output.nc_to_geotiff(ret, match_file = l2r_setu['export_geotiff_match_file'],
-                                                                            cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
-                                                                            skip_geo = l2r_setu['export_geotiff_coordinates'] is False)
-                            l2w_files.append(ret)
-
-                            ## make l2w maps
-                            if l2r_setu['map_l2w']:
-                                ac.acolite.acolite_map(ret, settings=l2r_setu)
-
-            ## run TACT thermal atmospheric correction
-            if l1r_setu['tact_run']:
-                ret = ac.tact.tact_gem(l1r, output = l1r_setu['output'], verbosity=ac.config['verbosity'],
-                                            output_atmosphere = l1r_setu['tact_output_atmosphere'],
-                                            output_intermediate = l1r_setu['tact_output_intermediate'])
-                if ret != ():
-                    l2t_files.append(ret)
-                    if l1r_setu['l2t_export_geotiff']: ac.output.nc_to_geotiff(ret, match_file = l1r_setu['export_geotiff_match_file'],
-                                                                               cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
-                                                                               skip_geo = l1r_setu['export_geotiff_coordinates'] is False)
-
-                    ## make l2t maps
-                    if l1r_setu['tact_map']: ac.acolite.acolite_map(ret, settings=l1r_setu)
-
-        if len(l2r_files) > 0: processed[ni]['l2r'] = l2r_files
-        if len(l2t_files) > 0: processed[ni]['l2t'] = l2t_files
-        if len(l2w_files) > 0: processed[ni]['l2w'] = l2w_files
+    if (workers > 1) & (nruns > 1):
+        ## run bundles in a pool of worker processes
+        workers = min(workers, nruns)
+        print('Processing {} bundles with {} workers'.format(nruns, workers))
+        log_base = '{}/acolite_run_{}'.format(setu['output'],setu['runid'])
+        with multiprocessing.Pool(processes=workers, initializer=acolite_run_worker_init, initargs=(log_base, setu)) as pool:
+            results = pool.starmap(acolite_run_worker, [(ni, inputfile_list[ni], setu, setu_l1r) for ni in range(nruns)], chunksize=1)
+    else:
+        ## run through bundles to process
+        results = []
+        for ni in range(nruns):
+            results.append((ni, *acolite_run_bundle_safe(ni, inputfile_list[ni], setu, setu_l1r)))
+
+    ## track processed scenes and report failed bundles
+    for ni, processed_ni, l1r_setu_ni in results:
+        processed[ni] = processed_ni
+        if l1r_setu_ni is not None: l1r_setu = l1r_setu_ni
+        if 'error' in processed_ni: print('Bundle {} failed: {}'.format(ni, processed_ni['error']))
 
     ## reproject data
     try:
@@ -229,7 +328,9 @@ def acolite_run(settings, inputfile=None, output=None):
                 reprojected = []
                 if otype not in processed[i]: continue
                 for ncf in processed[i][otype]:
+                    ac.acolite.profiling.start('reprojection', file=os.path.basename(ncf))
                     ncfo = ac.output.project_acolite_netcdf(ncf, settings=settings)
+                    ac.acolite.profiling.stop('reprojection')
                     if ncfo == (): continue
                     reprojected.append(ncfo)
 
@@ -256,7 +357,8 @@ def acolite_run(settings, inputfile=None, output=None):
                         if l1r_setu['{}_export_geotiff'.format(otype)]:
                             ac.output.nc_to_geotiff(ncfo, match_file = l1r_setu['export_geotiff_match_file'],
                                                                         cloud_optimized_geotiff = l1r_setu['export_cloud_optimized_geotiff'],
-                                                                        skip_geo = l1r_setu['export_geotiff_coordinates'] is False)
+                                                                        skip_geo = l1r_setu['export_geotiff_coordinates'] is False,
+                                                                        stack = l1r_setu['export_geotiff_stack'], threads = l1r_setu['export_geotiff_threads'])
                     ## output rgb geotiff
                     if '{}_export_geotiff_rgb'.format(otype) in l1r_setu:
                         if l1r_setu['{}_export_geotiff_rgb'.format(otype)]:
@@ -267,17 +369,27 @@ def acolite_run(settings, inputfile=None, output=None):
 
     # AD
     # update files for CS platform
-    for key in [key for key in processed[0].keys() if key in ['l1r', 'l2r', 'l2w']]:
-        file = processed[0][key][0]
-        output_folder = os.path.dirname(file)
-
-    cleaning_4_CS(output_folder, L2W_delete=False)
-    print('\n finished deleting files ') # debug
+    ## use the first bundle with outputs, earlier bundles may have failed
+    output_folder = None
+    for ni in processed:
+        for key in [key for key in processed[ni].keys() if key in ['l1r', 'l2r', 'l2w']]:
+            file = processed[ni][key][0]
+            output_folder = os.path.dirname(file)
+        if output_folder is not None: break
+
+    if output_folder is not None:
+        cleaning_4_CS(output_folder, L2W_delete=False)
+        print('\n finished deleting files ') # debug
     # AD
 
         ## end processing loop
     log.__del__()
 
+    ## write run profile
+    if profile is not None:
+        profile_files = profile.stop()
+        print('Wrote run profile {}'.format(profile_files[0]))
+
     ## remove files
     for ni in processed:
         for level in ['l1r', 'l2r', 'l2t', 'l2w']:
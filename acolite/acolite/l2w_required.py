@@ -0,0 +1,101 @@
+## def l2w_required
+## returns the L2R datasets required to compute the given L2W parameter
+## used to keep datasets in memory only while parameters remaining in the L2W processing need them
+## wildcard and copied datasets (rhot_*, rhos_*, Rrs_*, ...) are read when copied and are not listed
+## written by AD
+## 2026-10-18
+## modifications:
+
+def l2w_required(cur_par, rhos_waves, rhot_waves, sensor):
+    import acolite as ac
+
+    def closest(waves, req_waves, dataset='rhos'):
+        if len(waves) == 0: return([])
+        return(['{}_{}'.format(dataset, ac.shared.closest_idx(waves, int(w))[1]) for w in req_waves])
+
+    def band_wave(sp, default=665):
+        wave = default
+        if len(sp) > 2: wave = sp[2]
+        if len(sp) > 3: wave = sp[3]
+        if type(wave) == str:
+            if wave.lower() == 'red': wave = 665
+            elif wave.lower() == 'nir': wave = 865
+            elif wave.lower() == 'green': wave = 560
+            else:
+                try:
+                    wave = int(wave)
+                except:
+                    return(None)
+        return(wave)
+
+    sp = cur_par.split('_')
+    required = []
+
+    ## turbidity and spm
+    if ('nechad' in cur_par) | ('dogliotti2022' in cur_par):
+        wave = band_wave(sp)
+        if wave is not None: required = closest(rhos_waves, [wave])
+
+    elif 'dogliotti2015' in cur_par:
+        dcfg = 'defaults'
+        if (len(sp) > 2):
+            if sp[2] not in ['red', 'nir']: dcfg = sp[2]
+        cfg = ac.parameters.dogliotti.coef(config=dcfg)
+        required = closest(rhos_waves, [cfg['algo_wave_red'], cfg['algo_wave_nir']])
+
+    ## chlorophyll
+    elif 'chl_oc' in cur_par:
+        cfg = ac.parameters.chl_oc.coef()
+        if sensor in cfg:
+            par_name = 'chl_oc2' if cur_par == 'chl_oc' else cur_par
+            if par_name in cfg[sensor]:
+                required = closest(rhos_waves, cfg[sensor][par_name]['blue'] + cfg[sensor][par_name]['green'])
+
+    elif cur_par[0:6] == 'chl_re':
+        req_waves = [670, 705, 780]
+        if len(sp) >= 3:
+            if sp[2] in ['gons', 'gons740']:
+                gons = ac.parameters.chl_re.coef_gons()
+                gons_name = 'chl_re_{}'.format(sp[2])
+                req_waves = [gons[gons_name][tag] for tag in ['red_band', 'rededge_band', 'nir_band']]
+            elif sp[2] == 'moses3b740': req_waves = [670, 705, 740]
+            elif sp[2][0:6] in ['moses2', 'mishra']: req_waves = [670, 705]
+        required = closest(rhos_waves, req_waves)
+
+    ## inherent optical properties
+    elif cur_par[0:3] == 'qaa':
+        required = closest(rhos_waves, [443, 490, 560, 665]) + ['sza']
+
+    elif cur_par[0:5] == 'p3qaa':
+        cfg = ac.parameters.pitarch.p3qaa_coef()
+        if sensor in cfg:
+            required = closest(rhos_waves, [cfg[sensor]['center_wl'][k] for k in ['B', 'G', 'R']])
+
+    ## indices
+    elif cur_par in ['fai', 'ndvi']:
+        required = closest(rhos_waves, [660, 865, 1610] if cur_par == 'fai' else [660, 865])
+
+    elif cur_par in ['fai_rhot', 'ndvi_rhot']:
+        required = closest(rhot_waves, [660, 865, 1610] if cur_par == 'fai_rhot' else [660, 865], dataset='rhot')
+
+    elif cur_par == 'fait':
+        required = closest(rhos_waves, [490, 560, 660, 865, 1610])
+
+    elif cur_par == 'ndci':
+        required = closest(rhos_waves, [670, 705])
+
+    elif cur_par == 'slh':
+        required = closest(rhos_waves, [670, 705, 780])
+
+    elif cur_par == 'olh':
+        if sensor == 'L9_OLI':
+            required = ['rhos_{}'.format(w) for w in [561, 613, 654]]
+        else:
+            required = ['rhos_{}'.format(w) for w in [561, 613, 655]]
+
+    elif cur_par == 'hue_angle':
+        hue_coeff = ac.parameters.vanderwoerd.coef_hue_angle()
+        if sensor in hue_coeff:
+            required = closest(rhos_waves, hue_coeff[sensor]['req_waves'])
+
+    return(list(dict.fromkeys(required)))
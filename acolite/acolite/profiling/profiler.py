@@ -0,0 +1,165 @@
+## class profiler
+## records wall time, CPU time, peak RSS and bytes read/written for processing stages
+## stages are recorded by the active profiler through ac.acolite.profiling.stage (context manager)
+## or the start and stop functions, and are no-ops when no profiler is active
+## stages can be nested, the stage path is the stage names joined by /
+##
+## cprofile is None, 'all' or a list of stage names that are run under cProfile
+## the statistics of these stages are written to <base>_<stage>_<n>.prof
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+import os, sys, time, json
+
+## active profiler
+active = None
+
+class profiler(object):
+        def __init__(self, base, cprofile=None):
+            self.base = base
+            self.cprofile = cprofile
+            if type(self.cprofile) is str: self.cprofile = [self.cprofile]
+            self.stages = []
+            self.stack = []
+            self.counts = {}
+            self.t0 = time.perf_counter()
+            self.previous = None
+            odir = os.path.dirname(self.base)
+            if (len(odir) > 0) and (not os.path.exists(odir)): os.makedirs(odir)
+
+        ## make this the active profiler
+        def start(self):
+            global active
+            self.previous = active
+            active = self
+            return(self)
+
+        ## stop this profiler and write the profile
+        def stop(self):
+            global active
+            while len(self.stack) > 0: self.stage_stop()
+            if active is self: active = self.previous
+            return(self.write())
+
+        ## current resources used by this process
+        def resources(self):
+            res = {'wall': time.perf_counter(), 'cpu': time.process_time(),
+                   'maxrss': maxrss(), 'rss': rss()}
+            res.update(io())
+            return(res)
+
+        def stage_start(self, name, **info):
+            path = '/'.join([s['name'] for s in self.stack] + [name])
+            cur = {'name': name, 'path': path, 'depth': len(self.stack), 'info': info, 'start': self.resources()}
+
+            ## run stage under cProfile
+            cur['cprofile'] = None
+            if self.cprofile is not None:
+                if ('all' in self.cprofile) or (name in self.cprofile):
+                    ## only one cProfile can be active
+                    if not any([s['cprofile'] is not None for s in self.stack]):
+                        import cProfile
+                        cur['cprofile'] = cProfile.Profile()
+                        cur['cprofile'].enable()
+            self.stack.append(cur)
+
+        def stage_stop(self, name=None):
+            if len(self.stack) == 0: return
+            ## close stages that were not stopped, e.g. after an early return
+            if name is not None:
+                if name not in [s['name'] for s in self.stack]: return
+                while self.stack[-1]['name'] != name: self.stage_stop()
+            cur = self.stack.pop()
+            end = self.resources()
+            start = cur['start']
+
+            rec = {'stage': cur['name'], 'path': cur['path'], 'depth': cur['depth'],
+                   'start': start['wall']-self.t0,
+                   'wall': end['wall']-start['wall'], 'cpu': end['cpu']-start['cpu'],
+                   'rss_start': start['rss'], 'rss_end': end['rss'],
+                   'peak_rss': end['maxrss']}
+            for k, ks in [('peak_rss_increase', 'maxrss'), ('bytes_read', 'bytes_read'), ('bytes_written', 'bytes_written')]:
+                rec[k] = None if (start[ks] is None) or (end[ks] is None) else end[ks]-start[ks]
+            for k in cur['info']: rec[k] = cur['info'][k]
+
+            ## write cProfile statistics
+            if cur['cprofile'] is not None:
+                cur['cprofile'].disable()
+                if cur['name'] not in self.counts: self.counts[cur['name']] = 0
+                self.counts[cur['name']] += 1
+                rec['cprofile'] = '{}_{}_{}.prof'.format(self.base, cur['name'], self.counts[cur['name']])
+                cur['cprofile'].dump_stats(rec['cprofile'])
+            self.stages.append(rec)
+
+        ## write json and csv profile
+        def write(self):
+            keys = []
+            for rec in self.stages:
+                for k in rec:
+                    if k not in keys: keys.append(k)
+
+            ofile = '{}.json'.format(self.base)
+            with open(ofile, 'w') as f:
+                json.dump({'wall': time.perf_counter()-self.t0, 'peak_rss': maxrss(), 'stages': self.stages}, f, indent=1, default=str)
+
+            ofile_csv = '{}.csv'.format(self.base)
+            with open(ofile_csv, 'w') as f:
+                f.write('{}\n'.format(','.join(keys)))
+                for rec in self.stages:
+                    f.write('{}\n'.format(','.join(['' if (k not in rec) or (rec[k] is None) else '{}'.format(rec[k]).replace(',', ';') for k in keys])))
+            return(ofile, ofile_csv)
+
+## peak resident set size of this process in MB
+def maxrss():
+    try:
+        import resource
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        ## bytes on macOS, kB on Linux
+        return(r/1024/1024 if sys.platform == 'darwin' else r/1024)
+    except:
+        return(None)
+
+## current resident set size of this process in MB
+def rss():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return(int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024/1024)
+    except:
+        return(None)
+
+## bytes read and written by this process (Linux only)
+def io():
+    ret = {'bytes_read': None, 'bytes_written': None}
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f.readlines():
+                sp = line.split(':')
+                if sp[0] == 'rchar': ret['bytes_read'] = int(sp[1])
+                if sp[0] == 'wchar': ret['bytes_written'] = int(sp[1])
+    except:
+        pass
+    return(ret)
+
+## record a stage with the active profiler
+class stage(object):
+        def __init__(self, name, **info):
+            self.name = name
+            self.info = info
+        def __enter__(self):
+            start(self.name, **self.info)
+            return(self)
+        def __exit__(self, *args):
+            stop(self.name)
+            return(False)
+
+## start a stage with the active profiler
+def start(name, **info):
+    if active is None: return
+    active.stage_start(name, **info)
+
+## stop a stage with the active profiler
+def stop(name=None):
+    if active is None: return
+    active.stage_stop(name)
@@ -44,11 +44,12 @@ def parse(sensor, settings=None, merge=True):
               'flag_exponent_swir', 'flag_exponent_cirrus','flag_exponent_toa',
               'flag_exponent_negative', 'flag_exponent_outofscene',
               'rgb_red_wl','rgb_green_wl', 'rgb_blue_wl',
-              'geometry_res', 'verbosity', 'map_dpi',
+              'geometry_res', 'verbosity', 'map_dpi', 'workers',
               'dsf_wave_range', 'l2w_mask_negative_wave_range', 'dsf_residual_glint_wave_range',
               'luts_pressures', 'nechad_range', 'dsf_minimum_segment_size',
               'netcdf_compression_level', 'netcdf_compression_least_significant_digit',
-              'output_projection_xrange', 'output_projection_yrange']
+              'output_projection_xrange', 'output_projection_yrange', 'l2r_block_size', 'l2w_block_size',
+              'l1r_read_threads', 'l1r_read_max_bands', 'export_geotiff_threads']
 
     float_list = ['min_tgas_aot', 'min_tgas_rho',
 
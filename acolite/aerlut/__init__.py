@@ -1,5 +1,9 @@
 from .import_lut import *
 from .import_luts import *
+from .lut_cache import *
+from .lutinterp import *
+from .lut_stack import *
 from .reverse_lut import *
+from .reverse_lut_band import *
 from .import_rsky_lut import *
 from .import_rsky_luts import *
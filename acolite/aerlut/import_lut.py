@@ -11,9 +11,11 @@
 ##                  2021-06-08 (QV) added lut par subsetting
 ##                  2021-07-20 (QV) added retrieval of generic LUTs
 ##                  2021-10-22 (QV) compute ttot if not in LUT
+##                  2026-10-18 (AD) convolution of all bands with the sparse rsr_matrix
+##                  2026-10-18 (AD) added rsr keyword to generate sensor LUTs for a given RSR dict
 
 def import_lut(lutid, lutdir, lut_par = ['utott', 'dtott', 'astot', 'ttot', 'romix'],
-               override = False, sensor = None, get_remote = True, 
+               override = False, sensor = None, get_remote = True, rsr = None,
                remote_base = 'https://raw.githubusercontent.com/acolite/acolite_luts/main'):
 
     import os, sys
@@ -115,8 +117,8 @@ def import_lut(lutid, lutdir, lut_par = ['utott', 'dtott', 'astot', 'ttot', 'rom
         if (os.path.isfile(lutnc_s)) & (override): os.remove(lutnc_s)
 
         if (not os.path.isfile(lutnc_s)) | (override):
-            ## try downloading LUT from GitHub
-            if (get_remote):
+            ## try downloading LUT from GitHub, not for LUTs generated from a given rsr
+            if (get_remote) & (rsr is None):
                 slut = '{}_{}'.format(lutid, sensor)
                 remote_lut = '{}/{}/{}/{}.nc'.format(remote_base, '-'.join(lutid.split('-')[0:3]), sensor, slut)
                 try:
@@ -127,17 +129,20 @@ def import_lut(lutid, lutdir, lut_par = ['utott', 'dtott', 'astot', 'ttot', 'rom
             ## otherwise to local resampling
             if (not os.path.isfile(lutnc_s)):
                 print('Resampling LUT {} to sensor {}'.format(lutid, sensor))
-                rsrd = ac.shared.rsr_dict(sensor=sensor)
-                rsr, rsr_bands = rsrd[sensor]['rsr'], rsrd[sensor]['rsr_bands']
+                if rsr is None:
+                    rsrd = ac.shared.rsr_dict(sensor=sensor)
+                    rsr, rsr_bands = rsrd[sensor]['rsr'], rsrd[sensor]['rsr_bands']
+                else:
+                    rsr_bands = list(rsr.keys())
 
                 ## read LUT
                 lut, meta = ac.aerlut.import_lut(lutid,lutdir, lut_par=None) ## add None so all pars are loaded when resampling
                 lut_dims = lut.shape
 
                 ## new ndim convolution
-                lut_sensor = {}
-                for band in rsr_bands:
-                    lut_sensor[band] = ac.shared.rsr_convolute_nd(lut, meta['wave'],rsr[band]['response'], rsr[band]['wave'], axis=1)
+                rsrm = ac.shared.rsr_matrix(meta['wave'], rsr, bands=rsr_bands)
+                lut_bands = ac.shared.rsr_convolute_matrix(lut, rsrm, axis=1)
+                lut_sensor = {band: lut_bands[:, rsrm['index'][band]] for band in rsr_bands}
 
                 ## write nc file
                 try:
@@ -161,8 +166,8 @@ def import_lut(lutid, lutdir, lut_par = ['utott', 'dtott', 'astot', 'ttot', 'rom
                         nc.createDimension('tau', lut_dims[6])
                         ## write LUT
                         for band in lut_sensor.keys():
-                            var = nc.createVariable(band,np.float32,('par','azi','thv','ths','wnd','tau'))
-                            nc.variables[band][:] = lut_sensor[band].astype(np.float32)
+                            var = nc.createVariable('{}'.format(band),np.float32,('par','azi','thv','ths','wnd','tau'))
+                            var[:] = lut_sensor[band].astype(np.float32)
                         nc.close()
                         nc = None
                         arr = None
@@ -185,9 +190,14 @@ def import_lut(lutid, lutdir, lut_par = ['utott', 'dtott', 'astot', 'ttot', 'rom
                     meta[attr]=attdata
                 ## read in LUT
                 lut_sensor = dict()
-                datasets = list(nc.variables.keys())
-                for dataset in datasets:
-                    lut_sensor[dataset] = nc.variables[dataset][:]
+                if rsr is None:
+                    datasets = list(nc.variables.keys())
+                    for dataset in datasets:
+                        lut_sensor[dataset] = nc.variables[dataset][:]
+                else:
+                    ## band names as in the given rsr
+                    for band in rsr:
+                        lut_sensor[band] = nc.variables['{}'.format(band)][:]
                 nc.close()
                 nc = None
             except:
@@ -12,6 +12,9 @@
 ##                     2021-10-24 (QV) added get_remote as keyword
 ##                     2021-11-09 (QV) added reduce dimensions
 ##                     2022-03-03 (QV) increased default reduce dimensions AOT range
+##                     2026-10-18 (AD) added cache option to store and memory-map the merged LUTs
+##                     2026-10-18 (AD) use lutinterp instead of RegularGridInterpolator
+##                     2026-10-18 (AD) added rsr keyword to generate and read sensor LUTs for a given RSR dict
 
 def import_luts(pressures = [500, 750, 1013, 1100],
                 base_luts = ['ACOLITE-LUT-202110-MOD1', 'ACOLITE-LUT-202110-MOD2'],
@@ -19,8 +22,8 @@ def import_luts(pressures = [500, 750, 1013, 1100],
                 lut_par = ['utott', 'dtott', 'astot', 'ttot', 'romix'],
                 reduce_dimensions = False, return_lut_array = False,
                 vza_range = [0, 16],  aot_range = [0, 1.5],
-                get_remote = True, sensor = None, add_rsky = False, add_dutott = True):
-    import scipy.interpolate
+                get_remote = True, sensor = None, add_rsky = False, add_dutott = True,
+                cache = False, rsr = None):
     import numpy as np
     import acolite as ac
 
@@ -38,6 +41,17 @@ def import_luts(pressures = [500, 750, 1013, 1100],
     lut_dict = {}
     ## run through luts
     for lut in base_luts:
+        ## read merged LUT from cache
+        if cache:
+            cache_dir = ac.aerlut.lut_cache_dir(lut, sensor=sensor, pressures=pressures, lut_par=lut_par,
+                                                rsky_lut=rsky_lut, add_rsky=add_rsky, add_dutott=add_dutott,
+                                                reduce_dimensions=reduce_dimensions,
+                                                vza_range=vza_range, aot_range=aot_range)
+            lut_entry = ac.aerlut.lut_cache_read(cache_dir)
+            if lut_entry is not None:
+                lut_dict[lut] = lut_entry
+                continue
+
         ## run through pressures
         for ip, pr in enumerate(pressures):
             lutid = '{}-{}mb'.format(lut, '{}'.format(pr).zfill(4))
@@ -54,12 +68,16 @@ def import_luts(pressures = [500, 750, 1013, 1100],
 
                 ## sensor specific lut
                 #lut_data_dict, lut_meta = ac.aerlut.import_lut_sensor(sensor, None, lutid, override=0, lutdir=lutdir)
-                lut_data_dict, lut_meta = ac.aerlut.import_lut(lutid, lutdir, sensor = sensor, lut_par = lut_par, get_remote = get_remote)
+                lut_data_dict, lut_meta = ac.aerlut.import_lut(lutid, lutdir, sensor = sensor, lut_par = lut_par,
+                                                               get_remote = get_remote, rsr = rsr)
 
                 #bands = list(lut_data_dict.keys())
                 # get bands from rsr_file as different systems may not keep dict keys in the same order
-                rsr_file = ac.config['data_dir']+'/RSR/'+sensor+'.txt'
-                rsr, rsr_bands = ac.shared.rsr_read(file=rsr_file)
+                if rsr is None:
+                    rsr_file = ac.config['data_dir']+'/RSR/'+sensor+'.txt'
+                    rsr_bands = ac.shared.rsr_read(file=rsr_file)[1]
+                else:
+                    rsr_bands = list(rsr.keys())
 
             ## set up lut dimensions
             if ip == 0:
@@ -164,15 +182,6 @@ def import_luts(pressures = [500, 750, 1013, 1100],
                 tmp = lut_dict[lut]['lut'][:,iu,:,:,:,:,:,:]*lut_dict[lut]['lut'][:,id,:,:,:,:,:,:]
                 lut_dict[lut]['lut'] = np.insert(lut_dict[lut]['lut'], (ax), tmp, axis=1)
 
-            ## set up LUT interpolator
-            if add_rsky:
-                lut_dict[lut]['rgi'] = scipy.interpolate.RegularGridInterpolator(lut_dict[lut]['dim'],
-                                                                             lut_dict[lut]['lut'][:,:,:,:,:,:,:,:],
-                                                                             bounds_error=False, fill_value=np.nan)
-            else:
-                lut_dict[lut]['rgi'] = scipy.interpolate.RegularGridInterpolator(lut_dict[lut]['dim'],
-                                                                             lut_dict[lut]['lut'][:,:,:,:,:,:,0,:],
-                                                                             bounds_error=False, fill_value=np.nan)
         else:
             ## make arrays
             for band in rsr_bands:
@@ -180,7 +189,7 @@ def import_luts(pressures = [500, 750, 1013, 1100],
 
             ## add rsky if requested
             if add_rsky:
-                rskyd = ac.aerlut.import_rsky_luts(models=[int(lut[-1])], lutbase=rsky_lut, sensor=sensor, get_remote=get_remote)
+                rskyd = ac.aerlut.import_rsky_luts(models=[int(lut[-1])], lutbase=rsky_lut, sensor=sensor, get_remote=get_remote, rsr=rsr)
                 rlut = rskyd[int(lut[-1])]['lut']
                 rsky_winds  = rskyd[int(lut[-1])]['meta']['wind']
                 rskyd = None
@@ -249,18 +258,38 @@ def import_luts(pressures = [500, 750, 1013, 1100],
                     tmp = lut_dict[lut]['lut'][band][:,iu,:,:,:,:,:]*lut_dict[lut]['lut'][band][:,id,:,:,:,:,:]
                     lut_dict[lut]['lut'][band] = np.insert(lut_dict[lut]['lut'][band], (ax), tmp, axis=1)
 
-            lut_dict[lut]['rgi'] = {}
             lut_dict[lut]['ipd'] = {p:i for i,p in enumerate(lut_dict[lut]['meta']['par'])}
-            for band in rsr_bands:
+
+        ## write merged LUT to cache
+        if cache:
+            if ac.aerlut.lut_cache_write(cache_dir, lut_dict[lut]):
+                lut_entry = ac.aerlut.lut_cache_read(cache_dir)
+                if lut_entry is not None: lut_dict[lut] = lut_entry
+
+    ## set up LUT interpolators
+    for lut in lut_dict:
+        if sensor is None:
+            if add_rsky:
+                lut_dict[lut]['rgi'] = ac.aerlut.lutinterp(lut_dict[lut]['dim'],
+                                                           lut_dict[lut]['lut'][:,:,:,:,:,:,:,:],
+                                                           bounds_error=False, fill_value=np.nan)
+            else:
+                lut_dict[lut]['rgi'] = ac.aerlut.lutinterp(lut_dict[lut]['dim'],
+                                                           lut_dict[lut]['lut'][:,:,:,:,:,:,0,:],
+                                                           bounds_error=False, fill_value=np.nan)
+        else:
+            lut_dict[lut]['rgi'] = {}
+            for band in lut_dict[lut]['lut']:
                 ## set up LUT interpolator per band
                 if add_rsky:
-                    lut_dict[lut]['rgi'][band] = scipy.interpolate.RegularGridInterpolator(lut_dict[lut]['dim'],
-                                                                                       lut_dict[lut]['lut'][band][:,:,:,:,:,:,:],
-                                                                                       bounds_error=False, fill_value=np.nan)
+                    lut_dict[lut]['rgi'][band] = ac.aerlut.lutinterp(lut_dict[lut]['dim'],
+                                                                     lut_dict[lut]['lut'][band][:,:,:,:,:,:,:],
+                                                                     bounds_error=False, fill_value=np.nan)
                 else:
-                    lut_dict[lut]['rgi'][band] = scipy.interpolate.RegularGridInterpolator(lut_dict[lut]['dim'],
-                                                                                       lut_dict[lut]['lut'][band][:,:,:,:,:,0,:],
-                                                                                       bounds_error=False, fill_value=np.nan)
+                    lut_dict[lut]['rgi'][band] = ac.aerlut.lutinterp(lut_dict[lut]['dim'],
+                                                                     lut_dict[lut]['lut'][band][:,:,:,:,:,0,:],
+                                                                     bounds_error=False, fill_value=np.nan)
+
     ## remove LUT array to reduce memory use
     if not return_lut_array:
         for lut in lut_dict:
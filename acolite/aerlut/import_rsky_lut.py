@@ -9,8 +9,10 @@
 ##               2021-03-01 (QV) removed separate luts for wind speed
 ##               2021-05-31 (QV) added remote lut retrieval
 ##               2021-07-20 (QV) added retrieval of generic LUTs
+##               2026-10-18 (AD) convolution of all bands with the sparse rsr_matrix
+##               2026-10-18 (AD) added rsr keyword to generate sensor LUTs for a given RSR dict
 
-def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, override=False,
+def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, override=False, rsr=None,
                     get_remote = True, remote_base = 'https://raw.githubusercontent.com/acolite/acolite_luts/main'):
     import os
     import numpy as np
@@ -73,8 +75,12 @@ def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, overr
 
                 ## get sensor RSR
                 lutdir=ac.config['lut_dir']
-                rsr_file = ac.config['data_dir']+'/RSR/'+sensor+'.txt'
-                rsr, rsr_bands = ac.shared.rsr_read(file=rsr_file)
+                if rsr is None:
+                    rsr_file = ac.config['data_dir']+'/RSR/'+sensor+'.txt'
+                    rsr, rsr_bands = ac.shared.rsr_read(file=rsr_file)
+                else:
+                    rsr_bands = list(rsr.keys())
+                    get_remote = False
 
                 ## make new sensor lutfile
                 if (override) & (os.path.isfile(lutnc_s)): os.remove(lutnc_s)
@@ -94,9 +100,9 @@ def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, overr
                     ## read lut
                     lut, meta, dim, rgi = ac.aerlut.import_rsky_lut(model, lutbase=lutbase)
                     ## resample to bands
-                    lut_sensor = {}
-                    for band in rsr_bands:
-                        lut_sensor[band] = ac.shared.rsr_convolute_nd(lut, meta['wave'],rsr[band]['response'], rsr[band]['wave'], axis=0)
+                    rsrm = ac.shared.rsr_matrix(meta['wave'], rsr, bands=rsr_bands)
+                    lut_bands = ac.shared.rsr_convolute_matrix(lut, rsrm, axis=0)
+                    lut_sensor = {band: lut_bands[rsrm['index'][band]] for band in rsr_bands}
                     #return(lut_sensor, meta, dim)
                     ## save to new file
                     from netCDF4 import Dataset
@@ -114,8 +120,8 @@ def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, overr
                     nc.createDimension('tau', len(dim[5]))
                     ## write LUT
                     for band in rsr_bands:
-                        var = nc.createVariable(band,np.float32,('azi','thv','ths','wind', 'tau'))
-                        nc.variables[band][:] = lut_sensor[band].astype(np.float32)
+                        var = nc.createVariable('{}'.format(band),np.float32,('azi','thv','ths','wind', 'tau'))
+                        var[:] = lut_sensor[band].astype(np.float32)
                     nc.close()
                 ## end resample lut
 
@@ -129,7 +135,7 @@ def import_rsky_lut(model, lutbase='ACOLITE-RSKY-202102-82W', sensor=None, overr
                         meta[attr]=attdata
                     lut_sensor = {}
                     for band in rsr_bands:
-                        lut_sensor[band] = nc.variables[band][:]
+                        lut_sensor[band] = nc.variables['{}'.format(band)][:]
                     nc.close()
                     dim = [meta['azi'], meta['thv'], meta['ths'], meta['wind'], meta['tau']]
                     rgi_sensor = {}
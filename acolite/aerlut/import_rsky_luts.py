@@ -4,9 +4,10 @@
 ##               2021-02-24 (QV) renamed from rsky_read_luts
 ##               2021-03-01 (QV) simplified, added wind in lut
 ##               2021-10-24 (QV) added get_remote as keyword
+##               2026-10-18 (AD) added rsr keyword for sensor LUTs generated for a given RSR dict
 
 def import_rsky_luts(models=[1,2], lutbase='ACOLITE-RSKY-202102-82W', sensor=None,
-                    override=False, get_remote = True):
+                    override=False, get_remote = True, rsr = None):
     import os
     import numpy as np
     import scipy.interpolate
@@ -17,7 +18,7 @@ def import_rsky_luts(models=[1,2], lutbase='ACOLITE-RSKY-202102-82W', sensor=Non
 
     for mod in models:
         lut = None
-        ret = ac.aerlut.import_rsky_lut(mod, lutbase=lutbase, sensor=sensor, get_remote = get_remote)
+        ret = ac.aerlut.import_rsky_lut(mod, lutbase=lutbase, sensor=sensor, get_remote = get_remote, rsr = rsr)
         rskyd[mod] = {'lut':ret[0], 'meta':ret[1], 'dims':ret[2], 'rgi':ret[3]}
 
         if sensor is None: ## generic model
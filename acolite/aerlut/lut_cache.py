@@ -0,0 +1,100 @@
+## def lut_cache
+## reads and writes merged LUTs from/to an on-disk cache of npy files that can be memory-mapped
+## written by AD
+## 2026-10-18
+## modifications:
+
+lut_cache_version = '1'
+
+## find the cache directory for a merged LUT
+## the directory name includes a hash of all settings that affect the merged LUT
+def lut_cache_dir(lut, sensor=None, pressures=None, lut_par=None,
+                  rsky_lut=None, add_rsky=False, add_dutott=True,
+                  reduce_dimensions=False, vza_range=None, aot_range=None):
+    import hashlib, json
+    import acolite as ac
+
+    key = {'version': lut_cache_version, 'lut': lut, 'sensor': sensor,
+           'pressures': [float(p) for p in pressures], 'lut_par': list(lut_par),
+           'rsky_lut': rsky_lut if add_rsky else None, 'add_rsky': add_rsky, 'add_dutott': add_dutott,
+           'reduce_dimensions': reduce_dimensions,
+           'vza_range': [float(v) for v in vza_range] if reduce_dimensions else None,
+           'aot_range': [float(v) for v in aot_range] if reduce_dimensions else None}
+    key_hash = hashlib.md5(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[0:16]
+    return('{}/Cache/{}-{}-{}'.format(ac.config['lut_dir'], lut, 'generic' if sensor is None else sensor, key_hash))
+
+## write merged LUT to cache directory
+## data is written to a temporary directory which is renamed when complete
+## so that parallel runs never read a partially written cache
+def lut_cache_write(cache_dir, lut_entry):
+    import os, json, shutil
+    import numpy as np
+
+    if os.path.exists(cache_dir): return(True)
+    tmp_dir = '{}.tmp{}'.format(cache_dir, os.getpid())
+    try:
+        if os.path.exists(tmp_dir): shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        ## store arrays and their data type to restore metadata exactly
+        def encode(v):
+            if isinstance(v, np.ndarray): return({'array': v.tolist(), 'dtype': v.dtype.str})
+            if isinstance(v, np.generic): return({'scalar': v.item(), 'dtype': v.dtype.str})
+            return(v)
+
+        meta = {'version': lut_cache_version,
+                'meta': {k: encode(lut_entry['meta'][k]) for k in lut_entry['meta']},
+                'dim': [encode(np.asarray(d)) for d in lut_entry['dim']],
+                'ipd': lut_entry['ipd']}
+
+        if type(lut_entry['lut']) is dict:
+            meta['bands'] = list(lut_entry['lut'].keys())
+            for bi, band in enumerate(meta['bands']):
+                np.save('{}/lut_{}.npy'.format(tmp_dir, bi), np.ma.getdata(lut_entry['lut'][band]))
+        else:
+            meta['bands'] = None
+            np.save('{}/lut.npy'.format(tmp_dir), np.ma.getdata(lut_entry['lut']))
+
+        with open('{}/meta.json'.format(tmp_dir), 'w') as f:
+            f.write(json.dumps(meta))
+
+        os.rename(tmp_dir, cache_dir)
+    except BaseException as e:
+        print('Could not write LUT cache {}: {}'.format(cache_dir, e))
+        if os.path.exists(tmp_dir): shutil.rmtree(tmp_dir, ignore_errors=True)
+        return(False)
+    return(True)
+
+## read merged LUT from cache directory
+## LUT arrays are memory-mapped so that parallel runs share the pages in the OS cache
+## returns None if the cache is missing or was written by another version
+def lut_cache_read(cache_dir, mmap_mode='r'):
+    import os, json
+    import numpy as np
+
+    meta_file = '{}/meta.json'.format(cache_dir)
+    if not os.path.exists(meta_file): return(None)
+    try:
+        with open(meta_file, 'r') as f:
+            meta = json.loads(f.read())
+        if meta['version'] != lut_cache_version: return(None)
+
+        def decode(v):
+            if type(v) is dict:
+                if 'array' in v: return(np.asarray(v['array'], dtype=np.dtype(v['dtype'])))
+                if 'scalar' in v: return(np.dtype(v['dtype']).type(v['scalar']))
+            return(v)
+
+        lut_entry = {'meta': {k: decode(meta['meta'][k]) for k in meta['meta']},
+                     'dim': [decode(d) for d in meta['dim']],
+                     'ipd': meta['ipd']}
+
+        if meta['bands'] is None:
+            lut_entry['lut'] = np.load('{}/lut.npy'.format(cache_dir), mmap_mode=mmap_mode)
+        else:
+            lut_entry['lut'] = {band: np.load('{}/lut_{}.npy'.format(cache_dir, bi), mmap_mode=mmap_mode)
+                                for bi, band in enumerate(meta['bands'])}
+    except BaseException as e:
+        print('Could not read LUT cache {}: {}'.format(cache_dir, e))
+        return(None)
+    return(lut_entry)
@@ -0,0 +1,28 @@
+## def lut_stack
+## stacks the sensor LUTs for the given parameters and bands into a single array
+## with the parameter and band as trailing dimensions: (pressure, raa, vza, sza, [wind], aot, par, band)
+## the interpolation weights are then computed once per point for all parameters (and bands)
+##
+## returns a dict with pars, bands, rgi for all bands at once, and rgi_band with an interpolator per band
+## results have shape (..., par, band) for rgi and (..., par) for rgi_band
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def lut_stack(lutd, pars, bands=None):
+    import numpy as np
+    import acolite as ac
+
+    if bands is None: bands = list(lutd['rgi'].keys())
+    pids = [lutd['ipd'][p] for p in pars]
+
+    ## parameter axis moved to the end, with bands stacked after it
+    values = np.stack([np.moveaxis(lutd['rgi'][b].values[:, pids], 1, -1) for b in bands], axis=-1)
+    dim = [d for di, d in enumerate(lutd['rgi'][bands[0]].grid) if di != 1]
+
+    stack = {'pars': list(pars), 'bands': list(bands)}
+    stack['rgi'] = ac.aerlut.lutinterp(dim, values, bounds_error=False, fill_value=np.nan)
+    stack['rgi_band'] = {b: ac.aerlut.lutinterp(dim, np.ascontiguousarray(values[..., bi]), bounds_error=False, fill_value=np.nan)
+                         for bi, b in enumerate(bands)}
+    return(stack)
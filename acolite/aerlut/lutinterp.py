@@ -0,0 +1,153 @@
+## class lutinterp
+## multilinear interpolator for the ACOLITE LUTs, can be used in place of scipy's RegularGridInterpolator
+##
+## axes where all requested coordinates are the same (e.g. pressure, parameter, wind, or geometry in fixed/tiled mode)
+## are reduced first by slicing the LUT, so that only the axes that vary per point are interpolated
+## remaining axes are interpolated by gathering all corners of the grid cell at once in chunks of points
+## values can have trailing dimensions (e.g. stacked bands) which are all evaluated in one call
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+import numpy as np
+
+class lutinterp(object):
+    def __init__(self, points, values, bounds_error=False, fill_value=np.nan, chunk_size=2**22):
+        self.grid = tuple([np.asarray(p, dtype=np.float64) for p in points])
+        self.ndim = len(self.grid)
+        self.values = np.ma.getdata(values)
+        self.bounds_error = bounds_error
+        self.fill_value = fill_value
+        self.chunk_size = chunk_size
+
+        if self.values.ndim < self.ndim:
+            raise ValueError('There are {} point arrays, but values has {} dimensions'.format(self.ndim, self.values.ndim))
+        for i, g in enumerate(self.grid):
+            if g.ndim != 1:
+                raise ValueError('The points in dimension {} must be 1-dimensional'.format(i))
+            if len(g) != self.values.shape[i]:
+                raise ValueError('There are {} points and {} values in dimension {}'.format(len(g), self.values.shape[i], i))
+            if (len(g) > 1) and (not np.all(np.diff(g) > 0)):
+                raise ValueError('The points in dimension {} must be strictly ascending'.format(i))
+
+        ## precompute axis spacing and limits
+        self.spacing = [np.diff(g) if len(g) > 1 else np.ones(1) for g in self.grid]
+        self.limits = [(g[0], g[-1]) for g in self.grid]
+        self.trailing = self.values.shape[self.ndim:]
+
+    ## find lower grid index and normalised distance for coordinates on axis
+    def axis_index(self, axis, x):
+        g = self.grid[axis]
+        if len(g) == 1: return(np.zeros(np.shape(x), dtype=int), np.zeros(np.shape(x)))
+        i = np.searchsorted(g, x) - 1
+        i = np.clip(i, 0, len(g) - 2)
+        t = (x - g[i]) / self.spacing[axis][i]
+        return(i, t)
+
+    ## test whether coordinates are in bounds, also False for NaN
+    def axis_valid(self, axis, x):
+        return((x >= self.limits[axis][0]) & (x <= self.limits[axis][1]))
+
+    def __call__(self, xi):
+        ## coordinates as tuple of broadcastable arrays, or array with last dimension ndim
+        if isinstance(xi, tuple):
+            if len(xi) != self.ndim:
+                raise ValueError('Requested {} coordinates for {} dimensions'.format(len(xi), self.ndim))
+            xi = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) for x in xi])
+        else:
+            xi = np.asarray(xi, dtype=np.float64)
+            if xi.shape[-1] != self.ndim:
+                raise ValueError('Requested {} coordinates for {} dimensions'.format(xi.shape[-1], self.ndim))
+            xi = [xi[..., i] for i in range(self.ndim)]
+        shape = xi[0].shape
+
+        ## find axes with a single coordinate for all points
+        fixed, varying = {}, []
+        for axis, x in enumerate(xi):
+            x0 = x.flat[0] if x.size > 0 else np.nan
+            if (x.size > 0) and (np.isfinite(x0)) and ((x.size == 1) or np.all(x == x0)):
+                fixed[axis] = x0
+            else:
+                varying.append(axis)
+
+        ## check bounds of fixed axes
+        valid_fixed = all([self.axis_valid(axis, fixed[axis]) for axis in fixed])
+        if (self.bounds_error) and (not valid_fixed):
+            raise ValueError('One of the requested xi is out of bounds')
+        if (not valid_fixed) and (self.fill_value is not None):
+            return(np.full(shape + self.trailing, self.fill_value, dtype=np.float64))
+
+        ## reduce LUT by slicing fixed axes
+        sl, lerp = [], []
+        for axis in range(self.ndim):
+            if axis in fixed:
+                i, t = self.axis_index(axis, fixed[axis])
+                i, t = int(i), float(t)
+                if t == 0:
+                    sl.append(i)
+                else:
+                    sl.append(slice(i, i+2))
+                    lerp.append(t)
+            else:
+                sl.append(slice(None))
+        sub = np.asarray(self.values[tuple(sl)], dtype=np.float64)
+
+        ## interpolate fixed axes remaining in the reduced LUT
+        lerp_axes = [axis for axis in fixed if type(sl[axis]) is slice]
+        for li in range(len(lerp_axes)-1, -1, -1):
+            ax = sum([1 for a in range(lerp_axes[li]) if type(sl[a]) is slice])
+            t = lerp[li]
+            sub = (1. - t) * np.take(sub, 0, axis=ax) + t * np.take(sub, 1, axis=ax)
+
+        ## no varying axes
+        if len(varying) == 0:
+            return(np.broadcast_to(sub, shape + self.trailing).copy())
+
+        ## interpolate varying axes per point
+        nv = len(varying)
+        vshape = sub.shape[0:nv]
+        sub = sub.reshape((int(np.prod(vshape)), -1))
+        ntr = sub.shape[1]
+        strides = [int(np.prod(vshape[a+1:])) for a in range(nv)]
+        offsets = np.zeros([2]*nv, dtype=np.int64)
+        for a in range(nv):
+            oshape = [1]*nv
+            oshape[a] = 2
+            offsets = offsets + (np.arange(2) * strides[a] if vshape[a] > 1 else np.zeros(2, dtype=np.int64)).reshape(oshape)
+        offsets = offsets.flatten()
+
+        xv = [xi[axis].ravel() for axis in varying]
+        npoints = xv[0].size
+        result = np.zeros((npoints, ntr), dtype=np.float64)
+
+        step = max(1, int(self.chunk_size / (len(offsets) * ntr)))
+        for p0 in range(0, npoints, step):
+            p1 = min(npoints, p0+step)
+            base = np.zeros(p1-p0, dtype=np.int64)
+            ts = []
+            valid = np.ones(p1-p0, dtype=bool)
+            for a, axis in enumerate(varying):
+                x = xv[a][p0:p1]
+                i, t = self.axis_index(axis, x)
+                base += i * strides[a]
+                ts.append(t)
+                valid &= self.axis_valid(axis, x)
+
+            ## gather all corners, shape (points, 2, ..., 2, trailing)
+            v = sub[base[:, None] + offsets[None, :]]
+            v = v.reshape((p1-p0,) + (2,)*nv + (ntr,))
+
+            ## interpolate from the last to the first axis
+            for a in range(nv-1, -1, -1):
+                t = ts[a].reshape((p1-p0,) + (1,)*a + (1,))
+                v = (1. - t) * v.take(0, axis=1+a) + t * v.take(1, axis=1+a)
+            result[p0:p1] = v
+
+            if not np.all(valid):
+                if self.bounds_error:
+                    raise ValueError('One of the requested xi is out of bounds')
+                if self.fill_value is not None:
+                    result[p0:p1][~valid] = self.fill_value
+
+        return(result.reshape(shape + self.trailing))
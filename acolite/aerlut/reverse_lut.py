@@ -5,22 +5,30 @@
 ## last updates: 2021-05-31 (QV) added remote lut retrieval
 ##               2021-10-24 (QV) added pressures and get_remote as keyword to other functions
 ##               2021-10-25 (QV) test if the wind dimension is != 1 or missing
+##               2026-10-18 (AD) use lutinterp instead of RegularGridInterpolator
+##               2026-10-18 (AD) moved LUT creation to reverse_lut_band, bands are created in multiprocessing
+##               2026-10-18 (AD) added rsr keyword for sensor LUTs generated for a given RSR dict
 
 def reverse_lut(sensor, lutdw=None, par = 'romix',
                        pct = (1,60), nbins = 20, override = False,
                        pressures = [500, 1013, 1100],
                        base_luts = ['ACOLITE-LUT-202110-MOD1', 'ACOLITE-LUT-202110-MOD2'],
                        rsky_lut = 'ACOLITE-RSKY-202102-82W',
-                       get_remote = True, remote_base = 'https://raw.githubusercontent.com/acolite/acolite_luts/main'):
+                       get_remote = True, remote_base = 'https://raw.githubusercontent.com/acolite/acolite_luts/main',
+                       processes = 4, rsr = None):
     import acolite as ac
     import numpy as np
     from netCDF4 import Dataset
-    import scipy.interpolate
     import time, os
+    from functools import partial
+    import multiprocessing
 
-    if lutdw is None:
+    if rsr is not None:
+        bands = list(rsr.keys())
+        get_remote = False
+    elif lutdw is None:
         rsrf = ac.config['data_dir']+'/RSR/{}.txt'.format(sensor)
-        rsr, rsr_bands = ac.shared.rsr_read(rsrf)
+        rsr_bands = ac.shared.rsr_read(rsrf)[1]
         bands = [b for b in rsr_bands]
     else:
         lut = list(lutdw.keys())[0]
@@ -31,7 +39,8 @@ def reverse_lut(sensor, lutdw=None, par = 'romix',
         lutdir = '{}/{}-Reverse/{}'.format(ac.config['lut_dir'], '-'.join(lut.split('-')[0:3]), sensor)
         if not os.path.exists(lutdir): os.makedirs(lutdir)
 
-        rgi = {}
+        ## find LUTs to be created
+        to_create = []
         for b in bands:
             slut = '{}-reverse-{}-{}-{}'.format(lut, sensor, par, b)
             lutnc = '{}/{}.nc'.format(lutdir, slut)
@@ -48,70 +57,35 @@ def reverse_lut(sensor, lutdw=None, par = 'romix',
                         print('Could not download remote lut {} to {}'.format(remote_lut, lutnc))
 
                 ## generate LUT if download did not work
-                if (not os.path.exists(lutnc)):
-                    print('Creating reverse LUTs for {}'.format(sensor))
-                    if lutdw is None:
-                        print('Importing source LUTs')
-                        lutdw = ac.aerlut.import_luts(sensor=sensor, base_luts = base_luts,
-                                                        lut_par = [par], return_lut_array = True,
-                                                        pressures = pressures, get_remote = get_remote,
-                                                        add_rsky = par == 'romix+rsky_t', rsky_lut = rsky_lut)
-                    pid = lutdw[lut]['ipd'][par]
-                    if len(lutdw[lut]['dim']) == 7:
-                        wind_dim = True
-                        pressures, pids, raas, vzas, szas, winds, aots = lutdw[lut]['dim']
-                    else:
-                        pressures, pids, raas, vzas, szas, aots = lutdw[lut]['dim']
-                        wind_dim = False
-                        winds = np.atleast_1d(2)
-
+                if (not os.path.exists(lutnc)): to_create.append(b)
 
-                    print('Starting {}'.format(slut))
-                    t0 = time.time()
-                    tmp = lutdw[lut]['lut'][b][:,pid,:,:,:,:,:].flatten()
-                    tmp = np.log(tmp)
-                    prc = np.nanpercentile(tmp, pct)
-                    h = np.histogram(tmp, bins=nbins, range=prc)
-                    rpath_bins = np.exp(h[1])
+        ## generate LUTs
+        if len(to_create) > 0:
+            print('Creating reverse LUTs for {}'.format(sensor))
+            if lutdw is None:
+                print('Importing source LUTs')
+                lutdw = ac.aerlut.import_luts(sensor=sensor, base_luts = base_luts,
+                                                lut_par = [par], return_lut_array = True,
+                                                pressures = pressures, get_remote = get_remote,
+                                                add_rsky = par == 'romix+rsky_t', rsky_lut = rsky_lut, rsr = rsr)
+            pid = lutdw[lut]['ipd'][par]
+            args = [('{}/{}-reverse-{}-{}-{}.nc'.format(lutdir, lut, sensor, par, b),
+                     '{}-reverse-{}-{}-{}'.format(lut, sensor, par, b),
+                     lut, lutdw[lut]['lut'][b], lutdw[lut]['dim'], pid) for b in to_create]
 
-                    ## set up dimensions for lut
-                    lut_dimensions = ('pressure','raa','vza','sza','wind','rho')
-                    dim = [pressures, raas, vzas, szas, winds, rpath_bins]
-                    dims = [len(d) for d in dim]
-                    luta = np.zeros(dims) + np.nan
-                    ii = 0
-                    ni = np.product(dims[:-1])
-                    for pi, pressure in enumerate(pressures):
-                        for ri, raa in enumerate(raas):
-                            for vi, vza in enumerate(vzas):
-                                for si, sza in enumerate(szas):
-                                    for wi, wind in enumerate(winds):
-                                        if wind_dim:
-                                            ret = lutdw[lut]['rgi'][b]((pressure, pid, raa, vza, sza, wind, aots))
-                                        else:
-                                            ret = lutdw[lut]['rgi'][b]((pressure, pid, raa, vza, sza, aots))
-                                        luta[pi, ri, vi, si, wi, :] = np.interp(rpath_bins, ret, aots)
-                                        ii+=1
-                            print('{} {:.1f}%'.format(b, (ii/ni)*100), end='\r')
-                    print('\nResampling {} took {:.1f}s'.format(slut, time.time()-t0))
+            ## run bands in multiprocessing, not possible from a daemonic process
+            nproc = min(processes, len(to_create)) if processes is not None else 1
+            if multiprocessing.current_process().daemon: nproc = 1
+            if nproc > 1:
+                with multiprocessing.Pool(processes=nproc) as pool:
+                    results = pool.starmap(partial(ac.aerlut.reverse_lut_band, pct=pct, nbins=nbins), args)
+            else:
+                results = [ac.aerlut.reverse_lut_band(*arg, pct=pct, nbins=nbins) for arg in args]
 
-                    ## write this sensor band lut
-                    if os.path.exists(lutnc): os.remove(lutnc)
-                    nc = Dataset(lutnc, 'w')
-                    ## set attributes
-                    setattr(nc, 'base', slut)
-                    setattr(nc, 'aermod', lut[-1])
-                    setattr(nc, 'aots', aots)
-                    setattr(nc, 'lut_dimensions', lut_dimensions)
-                    for di, dn in enumerate(lut_dimensions):
-                        ## set attribute
-                        setattr(nc, dn, dim[di])
-                        ## create dimensions
-                        nc.createDimension(dn, len(dim[di]))
-                    ## write lut
-                    var = nc.createVariable('lut',np.float32,lut_dimensions)
-                    var[:] = luta.astype(np.float32)
-                    nc.close()
+        rgi = {}
+        for b in bands:
+            slut = '{}-reverse-{}-{}-{}'.format(lut, sensor, par, b)
+            lutnc = '{}/{}.nc'.format(lutdir, slut)
 
             ## read LUT and make rgi
             if os.path.exists(lutnc):
@@ -134,11 +108,11 @@ def reverse_lut(sensor, lutdw=None, par = 'romix',
 
                 ## band specific interpolator
                 if len(np.atleast_1d(meta['wind'])) == 1:
-                    rgi[b] = scipy.interpolate.RegularGridInterpolator([meta[k] for k in meta['lut_dimensions'] if k not in ['wind']],
-                                                                     lutb[:,:,:,:,0,:],bounds_error=False, fill_value=None)
+                    rgi[b] = ac.aerlut.lutinterp([meta[k] for k in meta['lut_dimensions'] if k not in ['wind']],
+                                                 lutb[:,:,:,:,0,:],bounds_error=False, fill_value=None)
                 else:
-                    rgi[b] = scipy.interpolate.RegularGridInterpolator([meta[k] for k in meta['lut_dimensions']],
-                                                                     lutb,bounds_error=False, fill_value=None)
+                    rgi[b] = ac.aerlut.lutinterp([meta[k] for k in meta['lut_dimensions']],
+                                                 lutb,bounds_error=False, fill_value=None)
         revl[lut]={'rgi':rgi, 'minaot':minaot, 'maxaot':maxaot,
                    'model':int(lut[-1]), 'meta':meta}
     return(revl)
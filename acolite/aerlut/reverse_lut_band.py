@@ -0,0 +1,97 @@
+## def reverse_lut_band
+## creates the reverse lut rpath -> aot for a single band and writes it to a NetCDF file
+## the forward lut is evaluated in one call over the full grid and inverted along the aot axis
+## written by AD
+## 2026-10-18, split from reverse_lut
+## modifications:
+
+def reverse_lut_band(lutnc, slut, lut, lut_data, lut_dim, pid, pct = (1,60), nbins = 20):
+    import acolite as ac
+    import numpy as np
+    from netCDF4 import Dataset
+    import time, os
+
+    if len(lut_dim) == 7:
+        wind_dim = True
+        pressures, pids, raas, vzas, szas, winds, aots = lut_dim
+    else:
+        pressures, pids, raas, vzas, szas, aots = lut_dim
+        wind_dim = False
+        winds = np.atleast_1d(2)
+
+    print('Starting {}'.format(slut))
+    t0 = time.time()
+    tmp = lut_data[:,pid,:,:,:,:,:].flatten()
+    tmp = np.log(tmp)
+    prc = np.nanpercentile(tmp, pct)
+    h = np.histogram(tmp, bins=nbins, range=prc)
+    rpath_bins = np.exp(h[1])
+
+    ## set up dimensions for lut
+    lut_dimensions = ('pressure','raa','vza','sza','wind','rho')
+    dim = [pressures, raas, vzas, szas, winds, rpath_bins]
+    dims = [len(d) for d in dim]
+
+    ## evaluate forward lut for all grid cells and aots in one call
+    rgi = ac.aerlut.lutinterp(lut_dim, lut_data if wind_dim else lut_data[:,:,:,:,:,0,:], bounds_error=False, fill_value=np.nan)
+    xi = [np.asarray(pressures).reshape(-1,1,1,1,1,1), pid,
+          np.asarray(raas).reshape(1,-1,1,1,1,1),
+          np.asarray(vzas).reshape(1,1,-1,1,1,1),
+          np.asarray(szas).reshape(1,1,1,-1,1,1)]
+    if wind_dim: xi += [np.asarray(winds).reshape(1,1,1,1,-1,1)]
+    xi += [np.asarray(aots).reshape(1,1,1,1,1,-1)]
+    ret = rgi(tuple(xi))
+    if not wind_dim: ret = ret[:,:,:,:,np.newaxis,:]
+    ret = ret.reshape(-1, len(aots))
+
+    ## invert to aot for the rpath bins
+    luta = interp_rows(rpath_bins, ret, np.asarray(aots, dtype=np.float64))
+    luta = luta.reshape(dims)
+    print('Resampling {} took {:.1f}s'.format(slut, time.time()-t0))
+
+    ## write this sensor band lut
+    if os.path.exists(lutnc): os.remove(lutnc)
+    nc = Dataset(lutnc, 'w')
+    ## set attributes
+    setattr(nc, 'base', slut)
+    setattr(nc, 'aermod', lut[-1])
+    setattr(nc, 'aots', aots)
+    setattr(nc, 'lut_dimensions', lut_dimensions)
+    for di, dn in enumerate(lut_dimensions):
+        ## set attribute
+        setattr(nc, dn, dim[di])
+        ## create dimensions
+        nc.createDimension(dn, len(dim[di]))
+    ## write lut
+    var = nc.createVariable('lut',np.float32,lut_dimensions)
+    var[:] = luta.astype(np.float32)
+    nc.close()
+    return(lutnc)
+
+## np.interp(x, xp[i], fp) for each row i of xp
+## uses a vectorised search for rows that are strictly increasing, and np.interp for the others
+def interp_rows(x, xp, fp):
+    import numpy as np
+
+    nrow, n = xp.shape
+    out = np.zeros((nrow, len(x)))
+    mono = np.all(np.diff(xp, axis=1) > 0, axis=1)
+
+    ## index of the last xp <= x
+    xpm = xp[mono]
+    j = np.sum(xpm[:,np.newaxis,:] <= x[np.newaxis,:,np.newaxis], axis=2) - 1
+    jc = np.clip(j, 0, n-2)
+    x0 = np.take_along_axis(xpm, jc, axis=1)
+    x1 = np.take_along_axis(xpm, jc+1, axis=1)
+    slope = (fp[jc+1]-fp[jc])/(x1-x0)
+    res = slope*(x[np.newaxis,:]-x0) + fp[jc]
+    res[x[np.newaxis,:] == x0] = fp[jc][x[np.newaxis,:] == x0]
+    ## clamp outside the range as np.interp
+    res[j < 0] = fp[0]
+    res[j >= n-1] = fp[-1]
+    res[:, np.isnan(x)] = np.nan
+    out[mono] = res
+
+    for i in np.where(~mono)[0]:
+        out[i] = np.interp(x, xp[i], fp)
+    return(out)
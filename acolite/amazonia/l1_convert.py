@@ -6,6 +6,8 @@
 ## written by Quinten Vanhellemont, RBINS
 ## 2022-01-14
 ## modifications: 2022-02-06 (QV) added vza
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) added output_geolocation_virtual and output_geolocation_float32
 
 def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
     import os, zipfile, shutil
@@ -226,6 +228,10 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
         else:
             nc_projection = None
 
+        ## virtual geolocation, lon and lat are computed from the projection when read
+        geolocation_virtual = (output_geolocation) & (setu['output_geolocation_virtual']) & (nc_projection is not None)
+        if geolocation_virtual: gatts['geolocation_virtual'] = 1
+
         ## save projection keys in gatts
         pkeys = ['xrange', 'yrange', 'proj4_string', 'pixel_size', 'zone']
         for k in pkeys:
@@ -256,7 +262,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
 
 
         ## write lat/lon
-        if (output_geolocation):
+        if (output_geolocation) & (not geolocation_virtual):
             if (os.path.exists(ofile) & (not new)):
                 datasets = ac.shared.nc_datasets(ofile)
             else:
@@ -264,13 +270,15 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
             if ('lat' not in datasets) or ('lon' not in datasets):
                 if verbosity > 1: print('Writing geolocation lon/lat')
                 lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
-                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True, nc_projection=nc_projection,
+                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=not setu['output_geolocation_float32'], nc_projection=nc_projection,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 if verbosity > 1: print('Wrote lon')
-                ac.output.nc_write(ofile, 'lat', lat, double=True,
+                ac.output.nc_write(ofile, 'lat', lat, double=not setu['output_geolocation_float32'],
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 if verbosity > 1: print('Wrote lat')
@@ -287,11 +295,13 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 x, y = ac.shared.projection_geo(dct_prj, xy=True, add_half_pixel=True)
                 ac.output.nc_write(ofile, 'x', x, new=new,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 x = None
                 if verbosity > 1: print('Wrote x')
                 ac.output.nc_write(ofile, 'y', y,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 y = None
                 if verbosity > 1: print('Wrote y')
@@ -357,6 +367,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
             ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts,
                                 new=new, dataset_attributes = ds_att, nc_projection=nc_projection,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             new = False
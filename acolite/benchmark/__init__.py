@@ -0,0 +1,4 @@
+from .synthetic_luts import *
+from .synthetic_l1r import *
+from .pipeline import *
+from .components import *
@@ -0,0 +1,47 @@
+## command line entry point for the benchmarks, the benchmark package is not imported with acolite
+## python -m acolite.benchmark pipeline --output dir [--sensors S2A_MSI,L8_OLI --sizes 1000 --baseline file]
+## python -m acolite.benchmark components --output dir [--cases tiles_interp,lut_stack --settings json]
+## written by AD
+## 2026-10-18
+## modifications:
+
+def main():
+    import json
+    import argparse
+    import numpy as np
+    import acolite as ac
+    import acolite.benchmark
+
+    ## ignore numpy errors
+    olderr = np.seterr(all='ignore')
+
+    parser = argparse.ArgumentParser(description='ACOLITE benchmarks')
+    parser.add_argument('benchmark', choices=['pipeline', 'components'], help='benchmark to run')
+    parser.add_argument('--output', help='output directory', required=True)
+    parser.add_argument('--sensors', help='comma separated sensor list (pipeline)', default=None)
+    parser.add_argument('--sizes', help='comma separated scene sizes (pipeline)', default=None)
+    parser.add_argument('--dsf_modes', help='comma separated dsf modes (pipeline)', default=None)
+    parser.add_argument('--baseline', help='baseline results file (pipeline)', default=None)
+    parser.add_argument('--update_baseline', help='write results to baseline (pipeline)', action='store_true')
+    parser.add_argument('--keep_files', help='keep the processed files (pipeline)', action='store_true')
+    parser.add_argument('--cases', help='comma separated cases (components)', default=None)
+    parser.add_argument('--remote', help='use the ACOLITE LUTs instead of the stand-in LUTs (components)', action='store_true')
+    parser.add_argument('--settings', help='JSON settings, processing settings for pipeline, keyword arguments per case for components', default=None)
+    parser.add_argument('--verbosity', help='verbosity', type=int, default=5)
+    args = parser.parse_args()
+
+    settings = {} if args.settings is None else json.loads(args.settings)
+    if args.benchmark == 'pipeline':
+        kwargs = {}
+        if args.sensors is not None: kwargs['sensors'] = args.sensors.split(',')
+        if args.sizes is not None: kwargs['sizes'] = [int(s) for s in args.sizes.split(',')]
+        if args.dsf_modes is not None: kwargs['dsf_modes'] = args.dsf_modes.split(',')
+        ac.benchmark.pipeline(args.output, baseline=args.baseline, update_baseline=args.update_baseline,
+                              settings=settings, keep_files=args.keep_files, verbosity=args.verbosity, **kwargs)
+    else:
+        cases = None if args.cases is None else args.cases.split(',')
+        ac.benchmark.components(args.output, cases=cases, settings=settings, synthetic=not args.remote,
+                                verbosity=args.verbosity)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+## def components
+## benchmarks and regression checks of single processing components, one case per component
+## each case times the current implementation against the previous one (or the options it replaces)
+## and checks the results, timings and checks are collected in benchmark_components.json in output
+##
+## cases:
+##    gem_session: NetCDF reading and writing per dataset versus a gem session with an open handle
+##    lut_interp: scipy's RegularGridInterpolator versus lutinterp for the fixed, tiled and resolved LUT calls
+##    lut_stack: LUT evaluation per band and parameter versus stacked per band and for all bands
+##    reverse_lut: reverse LUT creation with the previous loop over each grid cell versus reverse_lut_band
+##    nc_chunking: reading full bands, blocks of rows and single pixels for NetCDF chunking policies
+##    geolocation: float64, float32 and virtual geolocation datasets
+##    tiles_interp: tiles_interp versus scipy griddata
+##    rsr_convolution: per band interp1d convolution versus rsr_convolute_nd and the sparse rsr_matrix
+##
+## settings is a dict of keyword arguments per case, e.g. {'tiles_interp': {'dims': (1000, 1000)}}
+## with synthetic=True the LUT cases use the stand-in LUTs written to output, so they run offline
+## cases that fail are recorded with their error
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def components(output, cases=None, settings={}, synthetic=True, verbosity=5):
+    import os, json, datetime
+    import acolite as ac
+
+    if not os.path.exists(output): os.makedirs(output)
+    if cases is None: cases = list(component_cases.keys())
+    if synthetic:
+        config = ac.benchmark.pipeline_setup(output)
+        for k in config: ac.config[k] = config[k]
+
+    results = {'date': datetime.datetime.now().isoformat(), 'cases': {}}
+    for case in cases:
+        if case not in component_cases:
+            print('Benchmark case {} not configured'.format(case))
+            continue
+        kwargs = settings[case] if case in settings else {}
+        try:
+            ret = component_cases[case](output, **kwargs)
+        except Exception as e:
+            ret = {'error': '{}: {}'.format(type(e).__name__, e)}
+        ret['settings'] = {k: '{}'.format(kwargs[k]) for k in kwargs}
+        results['cases'][case] = ret
+        if verbosity > 0: component_report(case, ret)
+
+    ofile = '{}/benchmark_components.json'.format(output)
+    with open(ofile, 'w') as f: json.dump(results, f, indent=1, default=str)
+    if verbosity > 0: print('Wrote {}'.format(ofile))
+    return(results)
+
+## run function repeat times and return the last result and the mean time
+def timed(function, *args, repeat=1, **kwargs):
+    import time
+    t0 = time.time()
+    for r in range(repeat): ret = function(*args, **kwargs)
+    return(ret, (time.time()-t0)/repeat)
+
+## maximum absolute difference, inf if the nan positions differ
+def max_abs_diff(a, b):
+    import numpy as np
+    a, b = np.asarray(np.ma.filled(a, np.nan), dtype=np.float64), np.asarray(np.ma.filled(b, np.nan), dtype=np.float64)
+    if not np.array_equal(np.isnan(a), np.isnan(b)): return(np.inf)
+    if np.all(np.isnan(a)): return(0.0)
+    return(float(np.nanmax(np.abs(a-b))))
+
+## print timings, speedups and checks of a case
+def component_report(case, ret):
+    if 'error' in ret:
+        print('{}: failed {}'.format(case, ret['error']))
+        return
+    print('{}: {}'.format(case, ret['description']))
+    for k in ret['timings']:
+        speedup = ''
+        if k in ret['speedup']:
+            speedup = '{:>8.1f}x vs {}'.format(ret['timings'][ret['speedup'][k]]/max(ret['timings'][k], 1e-9), ret['speedup'][k])
+        print('    {:28}{:>9.3f}s{}'.format(k, ret['timings'][k], speedup))
+    for k in ret['checks']:
+        v = ret['checks'][k]
+        print('    {:28}{}'.format(k, '{:>9.2e}'.format(v) if (type(v) is float) & ('diff' in k) else v))
+
+## NetCDF reading and writing per dataset versus a gem session
+def component_gem_session(output, nbands=200, dims=(500, 500)):
+    import os
+    import numpy as np
+    import acolite as ac
+
+    f_reopen = '{}/benchmark_gem_reopen_L1R.nc'.format(output)
+    f_session = '{}/benchmark_gem_session_L1R.nc'.format(output)
+    gatts = {'sensor': 'BENCHMARK', 'isodate': '2026-10-18T10:30:00', 'acolite_file_type': 'L1R'}
+    datasets = ['rhot_{}'.format(w) for w in np.linspace(400, 2500, nbands).astype(int)]
+    data = np.random.default_rng(0).random(dims, dtype=np.float32)
+
+    def write_reopen():
+        for di, ds in enumerate(datasets): ac.output.nc_write(f_reopen, ds, data, attributes=gatts, new=di==0)
+    def write_session():
+        gemo = ac.gem.gem(f_session, new=True, keep_open=True)
+        gemo.gatts = gatts
+        for ds in datasets: gemo.write(ds, data)
+        gemo.close()
+    def read_reopen():
+        gem = ac.gem.gem(f_reopen)
+        return([gem.data(ds) for ds in datasets])
+    def read_session():
+        with ac.gem.gem(f_session) as gem: return([gem.data(ds) for ds in datasets])
+
+    timings = {}
+    for f in [write_reopen, write_session, read_reopen, read_session]:
+        ret, timings[f.__name__] = timed(f)
+        if f is read_reopen: ref = ret
+    checks = {'max_abs_diff': max(max_abs_diff(r, s) for r, s in zip(ref, ret))}
+    for f in [f_reopen, f_session]:
+        if os.path.exists(f): os.remove(f)
+    return({'description': '{} bands of {}x{} pixels'.format(nbands, dims[0], dims[1]), 'timings': timings,
+            'speedup': {'write_session': 'write_reopen', 'read_session': 'read_reopen'}, 'checks': checks})
+
+## scipy's RegularGridInterpolator versus lutinterp for the LUT calls in the DSF
+## fixed: scene average geometry, all aot steps
+## tiled: tile geometry, all aot steps per tile
+## resolved: per pixel geometry at the retrieved aot, as used for the surface reflectance computation
+def component_lut_interp(output, sensor='S2A_MSI', lut=None, par='romix+rsky_t', ntiles=200, dims=(1000, 1000), get_remote=True):
+    import numpy as np
+    import scipy.interpolate
+    import acolite as ac
+
+    lutdw = ac.aerlut.import_luts(sensor=sensor, add_rsky=True, return_lut_array=True, get_remote=get_remote)
+    if lut is None: lut = list(lutdw.keys())[0]
+    bands = list(lutdw[lut]['lut'].keys())
+    dim = lutdw[lut]['dim']
+    pid = lutdw[lut]['ipd'][par]
+    tau = lutdw[lut]['meta']['tau']
+    interpolators = {'rgi': {b: scipy.interpolate.RegularGridInterpolator(dim, lutdw[lut]['lut'][b],
+                                                                          bounds_error=False, fill_value=np.nan) for b in bands},
+                     'lutinterp': {b: ac.aerlut.lutinterp(dim, lutdw[lut]['lut'][b],
+                                                          bounds_error=False, fill_value=np.nan) for b in bands}}
+
+    ## geometry within the LUT range
+    rng = np.random.default_rng(0)
+    def geometry(n):
+        return([rng.uniform(dim[0][0], dim[0][-1], n), rng.uniform(dim[2][0], dim[2][-1], n),
+                rng.uniform(dim[3][0], dim[3][-1], n), rng.uniform(dim[4][0], dim[4][-1], 1) + np.zeros(n),
+                rng.uniform(dim[5][0], dim[5][-1], 1) + np.zeros(n)])
+    pressure, raa, vza, sza, wind = geometry(ntiles)
+    npix = dims[0] * dims[1]
+    pressure_r, raa_r, vza_r, sza_r, wind_r = geometry(npix)
+    pressure_r[:] = pressure[0]
+    aot_r = rng.uniform(tau[0], tau[-1], npix)
+
+    modes = {'fixed': lambda rgi: [rgi[b]((pressure[0], pid, raa[0], vza[0], sza[0], wind[0], tau)) for b in bands],
+             'tiled': lambda rgi: [[rgi[b]((pressure[ti], pid, raa[ti], vza[ti], sza[ti], wind[ti], tau)) for ti in range(ntiles)] for b in bands],
+             'resolved': lambda rgi: [rgi[b]((pressure_r, pid, raa_r, vza_r, sza_r, wind_r, aot_r)) for b in bands]}
+    timings, checks = {}, {}
+    for m in modes:
+        ref, timings['{}_rgi'.format(m)] = timed(modes[m], interpolators['rgi'])
+        res, timings['{}_lutinterp'.format(m)] = timed(modes[m], interpolators['lutinterp'])
+        checks['{}_max_abs_diff'.format(m)] = max_abs_diff(ref, res)
+    return({'description': '{} bands of {} {}, {} tiles, {}x{} pixels for resolved'.format(len(bands), sensor, lut, ntiles, dims[0], dims[1]),
+            'timings': timings, 'speedup': {'{}_lutinterp'.format(m): '{}_rgi'.format(m) for m in modes}, 'checks': checks})
+
+## LUT evaluation per band and parameter versus the band stacked LUT for the surface reflectance step
+def component_lut_stack(output, sensor='S2A_MSI', lut=None, par='romix+rsky_t', pars=['astot', 'dutott', 'ttot'],
+                        npoints=250000, get_remote=True):
+    import numpy as np
+    import acolite as ac
+
+    lutdw = ac.aerlut.import_luts(sensor=sensor, add_rsky=True, get_remote=get_remote)
+    if lut is None: lut = list(lutdw.keys())[0]
+    bands = list(lutdw[lut]['rgi'].keys())
+    dim = lutdw[lut]['dim']
+    pars = [par] + pars
+
+    timings = {}
+    stack, timings['setup'] = timed(ac.aerlut.lut_stack, lutdw[lut], pars)
+
+    ## per pixel geometry and aot within the LUT range
+    rng = np.random.default_rng(0)
+    xi = [rng.uniform(d[0], d[-1], npoints) for di, d in enumerate(dim) if di != 1]
+    xi[0][:] = xi[0][0]
+
+    ref, timings['band_par'] = timed(lambda: {b: {p: lutdw[lut]['rgi'][b]((xi[0], lutdw[lut]['ipd'][p], *xi[1:])) for p in pars} for b in bands})
+    res_band, timings['band'] = timed(lambda: {b: stack['rgi_band'][b](tuple(xi)) for b in bands})
+    res_all, timings['all'] = timed(stack['rgi'], tuple(xi))
+
+    diff = 0
+    for bi, b in enumerate(bands):
+        for pi, p in enumerate(pars):
+            diff = max(diff, max_abs_diff(ref[b][p], res_band[b][:, pi]), max_abs_diff(ref[b][p], res_all[:, pi, bi]))
+    return({'description': '{} bands and {} parameters of {} {} at {} points'.format(len(bands), len(pars), sensor, lut, npoints),
+            'timings': timings, 'speedup': {'band': 'band_par', 'all': 'band_par'}, 'checks': {'max_abs_diff': diff}})
+
+## reverse LUT creation with the previous loop over each grid cell versus reverse_lut_band
+def component_reverse_lut(output, sensor='S2A_MSI', lut='ACOLITE-LUT-202110-MOD1', par='romix',
+                          bands=None, pct=(1,60), nbins=20, get_remote=True):
+    import os
+    import numpy as np
+    import scipy.interpolate
+    from netCDF4 import Dataset
+    import acolite as ac
+
+    lutdw = ac.aerlut.import_luts(sensor=sensor, base_luts=[lut], lut_par=[par], return_lut_array=True,
+                                  pressures=[500, 1013, 1100], get_remote=get_remote,
+                                  add_rsky=par == 'romix+rsky_t')
+    if bands is None: bands = list(lutdw[lut]['lut'].keys())
+    pid = lutdw[lut]['ipd'][par]
+    lut_dim = lutdw[lut]['dim']
+
+    ## previous loop over the grid cells
+    def loop(b):
+        if len(lut_dim) == 7:
+            wind_dim = True
+            pressures, pids, raas, vzas, szas, winds, aots = lut_dim
+        else:
+            pressures, pids, raas, vzas, szas, aots = lut_dim
+            wind_dim = False
+            winds = np.atleast_1d(2)
+        rgi = scipy.interpolate.RegularGridInterpolator(lut_dim, lutdw[lut]['lut'][b] if wind_dim else lutdw[lut]['lut'][b][:,:,:,:,:,0,:],
+                                                        bounds_error=False, fill_value=np.nan)
+        tmp = np.log(lutdw[lut]['lut'][b][:,pid,:,:,:,:,:].flatten())
+        prc = np.nanpercentile(tmp, pct)
+        h = np.histogram(tmp, bins=nbins, range=prc)
+        rpath_bins = np.exp(h[1])
+        luta = np.zeros((len(pressures), len(raas), len(vzas), len(szas), len(winds), len(rpath_bins))) + np.nan
+        for pi, pressure in enumerate(pressures):
+            for ri, raa in enumerate(raas):
+                for vi, vza in enumerate(vzas):
+                    for si, sza in enumerate(szas):
+                        for wi, wind in enumerate(winds):
+                            if wind_dim:
+                                ret = rgi((pressure, pid, raa, vza, sza, wind, aots))
+                            else:
+                                ret = rgi((pressure, pid, raa, vza, sza, aots))
+                            luta[pi, ri, vi, si, wi, :] = np.interp(rpath_bins, ret, aots)
+        return(luta.astype(np.float32))
+
+    ## vectorised
+    def vectorised(b):
+        lutnc = '{}/benchmark-reverse-{}-{}-{}.nc'.format(output, sensor, par, b)
+        ac.aerlut.reverse_lut_band(lutnc, os.path.basename(lutnc)[0:-3], lut, lutdw[lut]['lut'][b], lut_dim, pid, pct=pct, nbins=nbins)
+        with Dataset(lutnc) as nc: lutv = nc.variables['lut'][:]
+        os.remove(lutnc)
+        return(lutv)
+
+    timings = {'loop': 0, 'vectorised': 0}
+    diff = 0
+    for b in bands:
+        ref, t = timed(loop, b)
+        timings['loop'] += t
+        res, t = timed(vectorised, b)
+        timings['vectorised'] += t
+        diff = max(diff, max_abs_diff(ref, res))
+    return({'description': '{} bands of {} {} {}'.format(len(bands), sensor, lut, par),
+            'timings': timings, 'speedup': {'vectorised': 'loop'}, 'checks': {'max_abs_diff': diff}})
+
+## reading NetCDF datasets written with different chunking policies
+## full bands, blocks of rows, and single pixels (as in matchup extraction)
+def component_nc_chunking(output, dims=(4000, 4000), nbands=4, block_size=256, npixels=500,
+                          policies=['default', 'stripe', 'tile', 'contiguous'], netcdf_compression=False):
+    import os
+    import numpy as np
+    from netCDF4 import Dataset
+    import acolite as ac
+
+    gatts = {'sensor': 'BENCHMARK', 'isodate': '2026-10-18T10:30:00'}
+    datasets = ['rhos_{}'.format(w) for w in np.linspace(440, 2200, nbands).astype(int)]
+    data = np.random.default_rng(0).random(dims, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    pixels = list(zip(rng.integers(0, dims[0], npixels), rng.integers(0, dims[1], npixels)))
+
+    timings, checks = {}, {}
+    for policy in policies:
+        ncf = '{}/benchmark_chunking_{}.nc'.format(output, policy)
+        def write():
+            for di, ds in enumerate(datasets):
+                ac.output.nc_write(ncf, ds, data, attributes=gatts, new=di==0, netcdf_chunking=policy,
+                                   netcdf_compression=netcdf_compression)
+        ret, timings['{}_write'.format(policy)] = timed(write)
+        with Dataset(ncf) as nc:
+            ret, timings['{}_full'.format(policy)] = timed(lambda: [nc.variables[ds][:] for ds in datasets])
+            ret, timings['{}_block'.format(policy)] = timed(lambda: [nc.variables[ds][r0:r0+block_size, :] for ds in datasets for r0 in range(0, dims[0], block_size)])
+            ret, timings['{}_pixel'.format(policy)] = timed(lambda: [nc.variables[ds][p[0], p[1]] for ds in datasets for p in pixels])
+            checks['{}_max_abs_diff'.format(policy)] = max_abs_diff(nc.variables[datasets[-1]][:], data)
+        os.remove(ncf)
+    return({'description': '{} bands of {}x{} pixels{}'.format(nbands, dims[0], dims[1], ' with compression' if netcdf_compression else ''),
+            'timings': timings, 'speedup': {}, 'checks': checks})
+
+## geolocation written as float64 and float32 lon/lat datasets, or virtual geolocation computed from the NetCDF projection
+## file size, write time, reading full lon/lat, blocks of rows, and lon/lat for single pixels
+## lon/lat of the full and pixel reads are checked against the lon/lat computed from the projection
+## the default dims and pixel_size are a 10 m Sentinel-2 tile
+def component_geolocation(output, dims=(10980, 10980), pixel_size=10, block_size=1024, npixels=100,
+                          modes=['float64', 'float32', 'virtual'], netcdf_compression=False):
+    import os
+    import numpy as np
+    import pyproj
+    import acolite as ac
+
+    ## UTM grid
+    dct = {'p': pyproj.Proj('+proj=utm +zone=31 +datum=WGS84 +units=m +no_defs'),
+           'xrange': [499980, 499980+dims[1]*pixel_size], 'yrange': [5700000, 5700000-dims[0]*pixel_size],
+           'pixel_size': [pixel_size, -pixel_size], 'xdim': dims[1], 'ydim': dims[0]}
+    nc_projection = ac.shared.projection_netcdf(dct, add_half_pixel=True)
+    rng = np.random.default_rng(0)
+    pixels = list(zip(rng.integers(0, dims[0], npixels), rng.integers(0, dims[1], npixels)))
+
+    ## reference lon/lat computed from the projection
+    lon_ref, lat_ref = ac.shared.projection_geo(dct, add_half_pixel=True)
+    pixels_ref = [(lon_ref[p[0]:p[0]+1, p[1]:p[1]+1], lat_ref[p[0]:p[0]+1, p[1]:p[1]+1]) for p in pixels]
+
+    timings, checks = {}, {}
+    for mode in modes:
+        ncf = '{}/benchmark_geolocation_{}.nc'.format(output, mode)
+        gatts = {'sensor': 'BENCHMARK', 'isodate': '2026-10-18T10:30:00', 'acolite_file_type': 'L1R'}
+        if mode == 'virtual': gatts['geolocation_virtual'] = 1
+
+        ## a small dataset is written for the virtual geolocation to create the file with projection
+        def write():
+            if mode == 'virtual':
+                ac.output.nc_write(ncf, 'l2_flags', np.zeros(dims, dtype=np.int32), attributes=gatts, new=True,
+                                   nc_projection=nc_projection, netcdf_compression=True)
+            else:
+                lon, lat = ac.shared.projection_geo(dct, add_half_pixel=True)
+                ac.output.nc_write(ncf, 'lon', lon, attributes=gatts, new=True, double=mode == 'float64',
+                                   nc_projection=nc_projection, netcdf_compression=netcdf_compression)
+                ac.output.nc_write(ncf, 'lat', lat, double=mode == 'float64', netcdf_compression=netcdf_compression)
+        def read(sub=None):
+            return(ac.shared.nc_data(ncf, 'lon', sub=sub), ac.shared.nc_data(ncf, 'lat', sub=sub))
+
+        ret, timings['{}_write'.format(mode)] = timed(write)
+        checks['{}_size_mb'.format(mode)] = round(os.path.getsize(ncf)/1024/1024, 1)
+        ret, timings['{}_full'.format(mode)] = timed(read)
+        diff = max(max_abs_diff(ret[0], lon_ref), max_abs_diff(ret[1], lat_ref))
+        ret = None
+        ret, timings['{}_block'.format(mode)] = timed(lambda: [read([0, r0, dims[1], min(block_size, dims[0]-r0)]) for r0 in range(0, dims[0], block_size)])
+        ret, timings['{}_pixel'.format(mode)] = timed(lambda: [read([p[1], p[0], 1, 1]) for p in pixels])
+        diff = max(diff, max_abs_diff([r[0] for r in ret], [r[0] for r in pixels_ref]), max_abs_diff([r[1] for r in ret], [r[1] for r in pixels_ref]))
+
+        ## lon/lat of the full and pixel reads compared to the projection
+        checks['{}_max_abs_diff'.format(mode)] = diff
+        os.remove(ncf)
+    return({'description': '{}x{} pixels{}'.format(dims[0], dims[1], ' with compression' if netcdf_compression else ''),
+            'timings': timings, 'speedup': {}, 'checks': checks})
+
+## tiles_interp versus scipy griddata as used previously
+def component_tiles_interp(output, dims=(10980, 10980), tiles=(23, 23), methods=['linear', 'nearest'], smooth=True, kern_size=3,
+                           target_mask_fraction=None, griddata=True):
+    import numpy as np
+    from scipy.interpolate import griddata as scipy_griddata
+    from scipy.ndimage import uniform_filter
+    import acolite as ac
+
+    rng = np.random.default_rng(0)
+    data = rng.random(tiles)
+    data[0,0] = np.nan
+    xnew = np.linspace(0, tiles[1]-1, dims[1], dtype=np.float32)
+    ynew = np.linspace(0, tiles[0]-1, dims[0], dtype=np.float32)
+    target_mask = None
+    if target_mask_fraction is not None: target_mask = rng.random(dims) < target_mask_fraction
+
+    def previous(method):
+        cur_data = ac.shared.fillnan(data)
+        if smooth: cur_data = uniform_filter(cur_data, size=kern_size)
+        xv, yv = np.meshgrid(np.arange(0., tiles[1], 1), np.arange(0., tiles[0], 1), sparse=False)
+        ci = (list(xv.ravel()), list(yv.ravel()))
+        if target_mask is None:
+            zref = scipy_griddata(ci, list(cur_data.ravel()), (xnew[None,:], ynew[:,None]), method=method)
+        else:
+            vd = np.where(target_mask)
+            zref = np.zeros(dims)+np.nan
+            zref[vd] = scipy_griddata(ci, list(cur_data.ravel()), (xnew[vd[1]], ynew[vd[0]]), method=method)
+        return(zref.astype(np.float32))
+
+    timings, checks, speedup = {}, {}, {}
+    for method in methods:
+        znew, timings['{}_tiles_interp'.format(method)] = timed(ac.shared.tiles_interp, data.copy(), xnew, ynew, smooth=smooth, kern_size=kern_size,
+                                                                method=method, target_mask=target_mask, target_mask_full=True)
+        if not griddata: continue
+        zref, timings['{}_griddata'.format(method)] = timed(previous, method)
+        speedup['{}_tiles_interp'.format(method)] = '{}_griddata'.format(method)
+        checks['{}_max_abs_diff'.format(method)] = max_abs_diff(zref, znew)
+        zref, znew = None, None
+    return({'description': '{}x{} tiles to {}x{} pixels'.format(tiles[0], tiles[1], dims[0], dims[1]),
+            'timings': timings, 'speedup': speedup, 'checks': checks})
+
+## RSR convolution of a hyperspectral LUT to the sensor bands
+## the default RSR is a 230 band PRISMA like sensor (gaussian RSR, 402-2463 nm every 9 nm, 12 nm FWHM)
+def component_rsr_convolution(output, dims=(5, 7, 7, 7, 1, 8), wave=None, band_waves=None, band_width=12.,
+                              axis=1, repeat=3):
+    import numpy as np
+    from scipy.interpolate import interp1d
+    import acolite as ac
+
+    if wave is None: wave = np.arange(0.35, 2.6001, 0.01)
+    if band_waves is None: band_waves = np.arange(402., 2470., 9.)
+    rsr = ac.shared.rsr_hyper(band_waves, [band_width]*len(band_waves))
+    bands = list(rsr.keys())
+
+    ## synthetic LUT with the wavelength dimension at axis
+    shape = list(dims)
+    shape.insert(axis, len(wave))
+    lut = np.random.default_rng(0).random(shape)
+
+    ## previous per band interp1d convolution
+    def convolute_interp1d():
+        ret = {}
+        f = interp1d(wave, lut, axis=axis)
+        for b in bands:
+            sub = np.where(rsr[b]['response'] > 0.0025)
+            resp, rw = rsr[b]['response'][sub], rsr[b]['wave'][sub]
+            data_i = np.moveaxis(f(rw), axis, -1)
+            ret[b] = np.nansum(data_i * resp, axis=-1) / np.nansum(resp)
+        return(ret)
+
+    timings = {}
+    ref, timings['interp1d'] = timed(convolute_interp1d, repeat=repeat)
+
+    ## matrix setup, cache is cleared to include the setup time
+    ac.shared.rsr_matrix_cache.clear()
+    rsrm, timings['matrix_setup'] = timed(ac.shared.rsr_matrix, wave, rsr)
+    rsrm, timings['matrix_cached'] = timed(ac.shared.rsr_matrix, wave, rsr)
+    res_nd, timings['convolute_nd'] = timed(lambda: {b: ac.shared.rsr_convolute_nd(lut, wave, rsr[b]['response'], rsr[b]['wave'], axis=axis) for b in bands}, repeat=repeat)
+    res, timings['matrix'] = timed(ac.shared.rsr_convolute_matrix, lut, rsrm, axis=axis, repeat=repeat)
+
+    ## relative differences to the interp1d convolution
+    checks = {'convolute_nd_max_rel_diff': max([float(np.nanmax(np.abs(res_nd[b]-ref[b])/np.abs(ref[b]))) for b in bands]),
+              'matrix_max_rel_diff': max([float(np.nanmax(np.abs(res.take(rsrm['index'][b], axis=axis)-ref[b])/np.abs(ref[b]))) for b in bands])}
+    return({'description': '{} wavelengths to {} bands for LUT shape {}'.format(len(wave), len(bands), shape),
+            'timings': timings, 'speedup': {'convolute_nd': 'interp1d', 'matrix': 'interp1d'}, 'checks': checks})
+
+component_cases = {'gem_session': component_gem_session, 'lut_interp': component_lut_interp,
+                   'lut_stack': component_lut_stack, 'reverse_lut': component_reverse_lut,
+                   'nc_chunking': component_nc_chunking, 'geolocation': component_geolocation,
+                   'tiles_interp': component_tiles_interp, 'rsr_convolution': component_rsr_convolution}
@@ -0,0 +1,148 @@
+## def pipeline
+## benchmark of the L1R -> L2R -> L2W processing on synthetic scenes, runs offline with stand-in LUTs
+## each case (sensor, size, geometry, dsf mode) is run in a new process to record its peak memory
+## cases that fail are recorded with their error
+## results are written to benchmark_pipeline.json in the output directory and compared
+## with the baseline file if given, e.g. the results of a previous run
+##
+## the sensor specific and reverse LUTs are derived from the stand-in LUTs on first use and kept
+## in the output directory, so the first run includes their setup
+##
+## sizes are the number of rows and columns of the square synthetic scenes
+## PRISMA uses a hyperspectral band set with gaussian bands, hyperspectral sensors are run
+## with hyper_dsf_modes as the tiled, segmented and resolved modes are not supported for these unless luts_hyper_sensor is set
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def pipeline(output, sensors=['S2A_MSI', 'L8_OLI', 'PRISMA'], sizes=[1000, 5000, 10000],
+             geometries=['fixed', 'per_pixel'], dsf_modes=['fixed', 'tiled', 'segmented', 'resolved'], hyper_dsf_modes=['fixed'],
+             l2w_parameters=['spm_nechad2016', 't_nechad2016', 'chl_re_mishra', 'ndvi'],
+             baseline=None, update_baseline=False, tolerance=0.2, settings={},
+             keep_files=False, verbosity=5):
+    import os, json, time, shutil, datetime
+    import acolite as ac
+
+    if not os.path.exists(output): os.makedirs(output)
+    config = pipeline_setup(output)
+
+    results = {'date': datetime.datetime.now().isoformat(), 'cases': {}}
+    for sensor in sensors:
+        for size in sizes:
+            for geometry in geometries:
+                ## synthetic scene, reused for all dsf modes
+                l1r = '{}/{}_{}_{}_L1R.nc'.format(output, sensor, size, geometry)
+                t0 = time.time()
+                pipeline_run(pipeline_l1r, (l1r, sensor, size, geometry == 'per_pixel', config))
+                if verbosity > 1: print('Synthetic {} {}x{} L1R with {} geometry took {:.1f}s'.format(sensor, size, size, geometry, time.time()-t0))
+
+                for dsf_mode in (hyper_dsf_modes if sensor in ac.hyper_sensors else dsf_modes):
+                    case = '{}_{}_{}_{}'.format(sensor, size, geometry, dsf_mode)
+                    case_output = '{}/{}'.format(output, case)
+                    setu = {'output': case_output, 'dsf_aot_estimate': dsf_mode,
+                            'resolved_geometry': geometry == 'per_pixel',
+                            'ancillary_data': False, 'dem_pressure': False,
+                            'l2w_parameters': l2w_parameters, 'verbosity': 0}
+                    for k in settings: setu[k] = settings[k]
+
+                    ## failing cases are recorded and the benchmark continues
+                    try:
+                        ret = pipeline_run(pipeline_case, (l1r, setu, config))
+                    except Exception as e:
+                        ret = {'l2r': None, 'l2w': None, 'peak_rss': None, 'error': '{}: {}'.format(type(e).__name__, e)}
+                    results['cases'][case] = ret
+                    if verbosity > 1:
+                        if 'error' in ret:
+                            print('{}: failed {}'.format(case, ret['error']))
+                        else:
+                            print('{}: L2R {:.1f}s, L2W {}, peak memory {:.0f} MB'.format(case, ret['l2r'],
+                                  'n/a' if ret['l2w'] is None else '{:.1f}s'.format(ret['l2w']), ret['peak_rss']))
+                    if not keep_files: shutil.rmtree(case_output, ignore_errors=True)
+                if (not keep_files) & (os.path.exists(l1r)): os.remove(l1r)
+
+    ## compare to baseline
+    if (baseline is not None):
+        if os.path.exists(baseline):
+            with open(baseline, 'r') as f: base = json.load(f)
+            results['baseline'] = baseline
+            results['comparison'] = pipeline_compare(results['cases'], base['cases'], tolerance=tolerance, verbosity=verbosity)
+        elif verbosity > 0:
+            print('Baseline {} not found'.format(baseline))
+
+    ofile = '{}/benchmark_pipeline.json'.format(output)
+    with open(ofile, 'w') as f: json.dump(results, f, indent=1)
+    if verbosity > 0: print('Wrote {}'.format(ofile))
+
+    if (update_baseline) & (baseline is not None):
+        with open(baseline, 'w') as f: json.dump(results, f, indent=1)
+        if verbosity > 0: print('Wrote baseline {}'.format(baseline))
+    return(results)
+
+## stand-in LUTs and data directory with links to the data in the acolite data directory
+## returns the config to be set in the processes running the benchmark
+def pipeline_setup(output):
+    import os, shutil
+    import acolite as ac
+
+    lut_dir = '{}/LUT'.format(output)
+    data_dir = '{}/data'.format(output)
+    if not os.path.exists(data_dir): os.makedirs(data_dir)
+    for d in os.listdir(ac.config['data_dir']):
+        if d == 'LUT': continue
+        if os.path.exists('{}/{}'.format(data_dir, d)): continue
+        try:
+            os.symlink(os.path.abspath('{}/{}'.format(ac.config['data_dir'], d)), '{}/{}'.format(data_dir, d))
+        except:
+            if os.path.isdir('{}/{}'.format(ac.config['data_dir'], d)):
+                shutil.copytree('{}/{}'.format(ac.config['data_dir'], d), '{}/{}'.format(data_dir, d))
+    ac.benchmark.synthetic_luts(lut_dir, data_dir=data_dir)
+    return({'lut_dir': lut_dir, 'data_dir': data_dir})
+
+## run function in a new process and return the result
+def pipeline_run(function, args):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return(executor.submit(function, *args).result())
+
+## write synthetic scene
+def pipeline_l1r(l1r, sensor, size, per_pixel_geometry, config):
+    import acolite as ac
+    for k in config: ac.config[k] = config[k]
+    return(ac.benchmark.synthetic_l1r(l1r, sensor=sensor, dims=(size, size), per_pixel_geometry=per_pixel_geometry))
+
+## run L2R and L2W processing for one case
+def pipeline_case(l1r, setu, config):
+    import time
+    import acolite as ac
+    for k in config: ac.config[k] = config[k]
+
+    ret = {'l2r': None, 'l2w': None}
+    t0 = time.time()
+    l2r = ac.acolite.acolite_l2r(l1r, settings=setu, verbosity=0)
+    ret['l2r'] = time.time()-t0
+    if len(l2r) == 2:
+        t0 = time.time()
+        ac.acolite.acolite_l2w(l2r[0], settings=setu)
+        ret['l2w'] = time.time()-t0
+    ret['peak_rss'] = ac.acolite.profiling.maxrss()
+    return(ret)
+
+## compare results to baseline, cases are flagged when time or memory increase by more than tolerance
+def pipeline_compare(cases, base, tolerance=0.2, verbosity=5):
+    comparison = {}
+    for case in cases:
+        if case not in base: continue
+        comparison[case] = {}
+        for k in ['l2r', 'l2w', 'peak_rss']:
+            if (cases[case][k] is None) or (base[case][k] is None) or (base[case][k] == 0): continue
+            comparison[case][k] = cases[case][k]/base[case][k]
+        comparison[case]['regression'] = any([comparison[case][k] > 1+tolerance for k in comparison[case]])
+
+    if verbosity > 0:
+        print('{:40}{:>10}{:>10}{:>10}'.format('case (ratio to baseline)', 'l2r', 'l2w', 'memory'))
+        for case in comparison:
+            print('{:40}{}{}'.format(case, ''.join(['{:>10.2f}'.format(comparison[case][k]) if k in comparison[case] else '{:>10}'.format('') \
+                                                    for k in ['l2r', 'l2w', 'peak_rss']]), ' regression' if comparison[case]['regression'] else ''))
+    return(comparison)
@@ -0,0 +1,78 @@
+## def synthetic_l1r
+## writes a synthetic ACOLITE L1R NetCDF for benchmarking the processing
+## multispectral sensors use the RSR in data/RSR, the hyperspectral PRISMA-like band set
+## uses gaussian bands at band_waves with band_widths FWHM as the hyperspectral converters
+##
+## the scene has water with a turbid plume, land in the eastern part and nodata stripes
+## splitting the scene in segments, with per_pixel_geometry sza, vza and raa datasets are written
+## bands are generated and written in blocks of block_size rows to limit memory use
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def synthetic_l1r(ofile, sensor='S2A_MSI', dims=(1000, 1000), per_pixel_geometry=False,
+                  band_waves=None, band_widths=None, block_size=1000, seed=0,
+                  netcdf_compression=False):
+    import os
+    import numpy as np
+    import acolite as ac
+
+    odir = os.path.dirname(ofile)
+    if (len(odir) > 0) and (not os.path.exists(odir)): os.makedirs(odir)
+
+    gatts = {'sensor': sensor, 'isodate': '2026-06-18T10:30:00', 'acolite_file_type': 'L1R',
+             'sza': 35., 'vza': 5., 'raa': 80., 'saa': 150., 'vaa': 70., 'lon': 3.1, 'lat': 51.2}
+
+    ## band wavelengths
+    if sensor in ac.hyper_sensors:
+        if band_waves is None: band_waves = np.arange(402, 2498, 9.)
+        if band_widths is None: band_widths = np.zeros(len(band_waves))+12.
+        gatts['band_waves'] = np.asarray(band_waves)
+        gatts['band_widths'] = np.asarray(band_widths)
+        waves = {'{}'.format(bi): w for bi, w in enumerate(band_waves)}
+        wave_names = {b: '{:.0f}'.format(waves[b]) for b in waves}
+    else:
+        rsrd = ac.shared.rsr_dict(sensor)
+        if sensor not in rsrd:
+            print('Could not find RSR for {}'.format(sensor))
+            return()
+        waves = rsrd[sensor]['wave_nm']
+        wave_names = rsrd[sensor]['wave_name']
+
+    ## scene layout, columns of land and rows of nodata splitting the scene into segments
+    land_col = int(dims[1]*0.75)
+    nodata_rows = [int(dims[0]*f) for f in [0.33, 0.66]]
+
+    gemo = ac.gem.gem(ofile, new=True, keep_open=True, netcdf_compression=netcdf_compression)
+    gemo.gatts = gatts
+    blocks = [(r0, min(r0+block_size, dims[0])) for r0 in range(0, dims[0], block_size)]
+
+    ## per pixel geometry
+    if per_pixel_geometry:
+        for ds, v0, v1, ax in [('sza', 33., 37., 0), ('vza', 1., 11., 1), ('raa', 70., 90., 1)]:
+            for r0, r1 in blocks:
+                yy, xx = np.mgrid[r0:r1, 0:dims[1]]
+                data = v0 + (v1-v0)*(yy if ax == 0 else xx)/dims[ax]
+                gemo.write(ds, data.astype(np.float32), offset=[0, r0], global_dims=dims)
+
+    ## top of atmosphere reflectance
+    rng = np.random.default_rng(seed)
+    for b in waves:
+        w = waves[b]
+        ds = 'rhot_{}'.format(wave_names[b])
+        for r0, r1 in blocks:
+            yy, xx = np.mgrid[r0:r1, 0:dims[1]]
+            ## atmospheric path and water reflectance
+            data = 0.08*(w/500.)**-3 + 0.01 + 0.01*rng.random((r1-r0, dims[1]))
+            ## turbid plume in the red and nir
+            plume = np.exp(-(((yy-dims[0]*0.5)/(dims[0]*0.2))**2 + ((xx-dims[1]*0.3)/(dims[1]*0.15))**2))
+            data += plume*0.03*np.exp(-((w-700)/150)**2)
+            ## vegetated land
+            land = xx >= land_col
+            data[land] += 0.02 + 0.25*(w > 700)
+            for r in nodata_rows:
+                if (r >= r0) & (r < r1): data[r-r0, :] = np.nan
+            gemo.write(ds, data.astype(np.float32), ds_att={'wavelength': w}, offset=[0, r0], global_dims=dims)
+    gemo.close()
+    return(ofile)
@@ -0,0 +1,94 @@
+## def synthetic_luts
+## writes small stand-in LUTs for running the processing offline in benchmarks
+## aerosol LUTs (MOD1 and MOD2 at a few pressures) and sky reflectance LUTs are written to lut_dir
+## gas and water vapour transmittance LUTs are written to data_dir/LUT
+## the LUTs follow the format of the ACOLITE LUTs with simple analytical models, and are not physically valid
+##
+## the sensor specific LUTs are computed from these on first use as for the ACOLITE LUTs
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def synthetic_luts(lut_dir, data_dir=None, base_luts=['ACOLITE-LUT-202110-MOD1', 'ACOLITE-LUT-202110-MOD2'],
+                   pressures=[500, 750, 1013, 1100], rsky_lut='ACOLITE-RSKY-202102-82W', override=False):
+    import os
+    import numpy as np
+    from netCDF4 import Dataset
+
+    ## LUT dimensions
+    wave = np.array([0.35, 0.4, 0.44, 0.49, 0.55, 0.6, 0.67, 0.75, 0.86, 1.0, 1.25, 1.6, 2.0, 2.2, 2.6])
+    azi = np.linspace(0, 180, 7)
+    thv = np.array([0, 5, 10, 20, 40, 60.])
+    ths = np.array([0, 10, 20, 30, 40, 50, 60, 70.])
+    tau = np.array([0.001, 0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5.])
+    wind = np.array([0.1, 2, 5, 10, 20.])
+    pars = ['utott', 'dtott', 'astot', 'ttot', 'romix']
+
+    def write_lut(ncf, lut, dims, atts):
+        with Dataset(ncf, 'w') as nc:
+            for k in atts: setattr(nc, k, atts[k])
+            for di, d in enumerate(dims): nc.createDimension(d, lut.shape[di])
+            nc.createVariable('lut', np.float32, dims)[:] = lut.astype(np.float32)
+
+    lutfiles = []
+
+    ## aerosol LUTs with pars (utott, dtott, astot, ttot, romix)
+    W, A, V, S, T = np.meshgrid(wave, azi, thv, ths, tau, indexing='ij')
+    mus, muv = np.cos(np.radians(S)), np.cos(np.radians(V))
+    phase = 1 + 0.3*np.cos(np.radians(A))
+    for lut in base_luts:
+        mod = int(lut[-1])
+        lutdir = '{}/{}'.format(lut_dir, '-'.join(lut.split('-')[0:3]))
+        if not os.path.exists(lutdir): os.makedirs(lutdir)
+        for pressure in pressures:
+            lutnc = '{}/{}-{}mb.nc'.format(lutdir, lut, str(pressure).zfill(4))
+            lutfiles.append(lutnc)
+            if (os.path.exists(lutnc)) & (not override): continue
+            tau_r = 0.0088*W**-4.05*pressure/1013.25
+            tau_a = T*(0.55/W)**(1.4 if mod == 1 else 0.6)
+            ttot = tau_r + tau_a
+            romix = (tau_r*0.75 + tau_a*(0.35 if mod == 1 else 0.25))*phase/(4*mus*muv)**0.5*0.5
+            data = np.stack([np.exp(-ttot/muv*0.5), np.exp(-ttot/mus*0.5), 0.12*ttot/(1+ttot), ttot, romix])
+            write_lut(lutnc, data[:,:,:,:,:,None,:], ('par', 'wave', 'azi', 'thv', 'ths', 'wnd', 'tau'),
+                      {'par': ','.join(pars), 'wave': wave, 'azi': azi, 'thv': thv, 'ths': ths, 'wnd': np.array([2.]), 'tau': tau})
+
+        ## sky reflectance LUT
+        rskydir = '{}/{}'.format(lut_dir, '-'.join(rsky_lut.split('-')[1:3]))
+        if not os.path.exists(rskydir): os.makedirs(rskydir)
+        rskync = '{}/{}-MOD{}.nc'.format(rskydir, rsky_lut, mod)
+        lutfiles.append(rskync)
+        if (not os.path.exists(rskync)) | (override):
+            W_, A_, V_, S_, Wi, T_ = np.meshgrid(wave, azi, thv, ths, wind, tau, indexing='ij')
+            rsky = (0.02 + 0.001*Wi)*(1 + 0.1*T_)*(1 + 0.05*np.cos(np.radians(A_)))
+            write_lut(rskync, rsky, ('wave', 'azi', 'thv', 'ths', 'wind', 'tau'),
+                      {'wave': wave, 'azi': azi, 'thv': thv, 'ths': ths, 'wind': wind, 'tau': tau})
+
+    ## gas and water vapour LUTs
+    if data_dir is not None:
+        gwave = np.linspace(0.3, 2.6, 231)
+        gpressure = np.array([500, 1013, 1100.])
+        gvza = np.array([0, 30, 60.])
+        gsza = np.array([0, 30, 60, 80.])
+        gpars = ['ttdica', 'ttoxyg', 'ttniox', 'ttmeth']
+
+        for d in ['Gas', 'WV']:
+            if not os.path.exists('{}/LUT/{}'.format(data_dir, d)): os.makedirs('{}/LUT/{}'.format(data_dir, d))
+
+        lutnc = '{}/LUT/Gas/Gas_202106F.nc'.format(data_dir)
+        lutfiles.append(lutnc)
+        if (not os.path.exists(lutnc)) | (override):
+            gas = np.ones((len(gpressure), len(gpars), len(gwave), len(gvza), len(gsza)))*0.99
+            gas[:,:,(gwave > 1.35) & (gwave < 1.42)] = 0.3
+            write_lut(lutnc, gas, ('p', 'par', 'wave', 'vza', 'sza'),
+                      {'par': ','.join(gpars), 'pressure': gpressure, 'wave': gwave, 'vza': gvza, 'sza': gsza})
+
+        lutnc = '{}/LUT/WV/WV_201710C.nc'.format(data_dir)
+        lutfiles.append(lutnc)
+        if (not os.path.exists(lutnc)) | (override):
+            wv = np.array([0, 1, 2, 5.])
+            wvt = np.ones((len(gsza), len(gvza), len(wv), len(gpressure), len(gwave)))*0.98
+            wvt[...,(gwave > 1.33) & (gwave < 1.45)] = 0.05
+            write_lut(lutnc, wvt, ('ths', 'thv', 'wv', 'p', 'wave'),
+                      {'ths': gsza, 'thv': gvza, 'wv': wv, 'wave': gwave})
+    return(lutfiles)
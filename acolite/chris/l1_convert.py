@@ -4,6 +4,7 @@
 ## 2021-06-08
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, settings = {}, verbosity = 5, output = None):
     from pyhdf.SD import SD,SDC
@@ -218,6 +219,7 @@ def l1_convert(inputfile, settings = {}, verbosity = 5, output = None):
                                    dataset_attributes=ds_att,
                                    attributes=gatts, new=new,
                                    netcdf_compression=setu['netcdf_compression'],
+                                   netcdf_chunking=setu['netcdf_chunking'],
                                    netcdf_compression_level=setu['netcdf_compression_level'],
                                    netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 new = False
@@ -230,6 +232,7 @@ def l1_convert(inputfile, settings = {}, verbosity = 5, output = None):
                                dataset_attributes=ds_att,
                                attributes=gatts, new=new,
                                netcdf_compression=setu['netcdf_compression'],
+                               netcdf_chunking=setu['netcdf_chunking'],
                                netcdf_compression_level=setu['netcdf_compression_level'],
                                netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             if verbosity > 2: print('Wrote {} to {}'.format(ds, ofile))
@@ -241,6 +244,7 @@ def l1_convert(inputfile, settings = {}, verbosity = 5, output = None):
             print('Applying CHRIS Noise Reduction')
             ofile = ac.chris.noise_reduction(ofile, rename=True,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
 
@@ -2,6 +2,7 @@ from .hgt_find import hgt_find
 from .hgt_geolocation import hgt_geolocation
 from .hgt_lonlat import hgt_lonlat
 from .hgt_read import hgt_read
+from .hgt_mosaic import hgt_mosaic
 from .hgt_download import hgt_download
 
 from .srtm15plus import srtm15plus
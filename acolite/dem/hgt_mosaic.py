@@ -0,0 +1,79 @@
+## def hgt_mosaic
+## makes a mosaic of DEM HGT SRTM tiles covering a given limit [S, W, N, E]
+## only the part of the tiles covering the limit (plus a one pixel border) is copied
+## decoded tiles are cached as npy files in hgt_dir/Cache and memory mapped when reading
+## locations without a tile (e.g. ocean) are set to 0
+##
+## returns a dict with the mosaic data, the latitude of the first row, the longitude of the first column,
+## and the pixel step in degrees
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def hgt_mosaic(limit, hgt_dir=None, cache=True):
+    import os
+    import numpy as np
+    import acolite as ac
+
+    if hgt_dir is None: hgt_dir = ac.config['hgt_dir']
+    hgt_files, hgt_required = ac.dem.hgt_find(limit, required=True, hgt_dir=hgt_dir)
+
+    ## tiles origins from required tile names
+    origins = [hgt_origin(t) for t in hgt_required]
+    lat_top = max([o[0] for o in origins]) + 1
+    lon_left = min([o[1] for o in origins])
+
+    ## tile data
+    tiles = {}
+    for hgt_file in hgt_files:
+        tiles[os.path.basename(hgt_file).split('.')[0]] = hgt_tile(hgt_file, cache=cache)
+    n = 1201 if len(tiles) == 0 else tiles[list(tiles.keys())[0]].shape[0]
+    step = 1./(n-1)
+
+    ## mosaic window covering the limit
+    r0 = max(0, int(np.floor((lat_top - limit[2]) / step)) - 1)
+    r1 = int(np.ceil((lat_top - limit[0]) / step)) + 2
+    c0 = max(0, int(np.floor((limit[1] - lon_left) / step)) - 1)
+    c1 = int(np.ceil((limit[3] - lon_left) / step)) + 2
+    data = np.zeros((r1-r0, c1-c0), dtype=np.int16)
+
+    ## copy overlapping part of each tile
+    for t in tiles:
+        lat0, lon0 = hgt_origin(t)
+        tr = int(round((lat_top - (lat0 + 1)) / step)) - r0
+        tc = int(round((lon0 - lon_left) / step)) - c0
+        sr0, sr1 = max(0, -tr), min(n, data.shape[0] - tr)
+        sc0, sc1 = max(0, -tc), min(n, data.shape[1] - tc)
+        if (sr1 <= sr0) | (sc1 <= sc0): continue
+        data[tr+sr0:tr+sr1, tc+sc0:tc+sc1] = tiles[t][sr0:sr1, sc0:sc1]
+
+    return({'data': data, 'lat': lat_top - r0 * step, 'lon': lon_left + c0 * step, 'step': step})
+
+## lat, lon of the southwest corner of a tile name, e.g. N51E002
+def hgt_origin(tile):
+    lat = float(tile[1:3]) * (1 if tile[0] == 'N' else -1)
+    lon = float(tile[4:7]) * (1 if tile[3] == 'E' else -1)
+    return(lat, lon)
+
+## read a tile, decoded tiles are cached in hgt_dir/Cache and returned memory mapped
+def hgt_tile(file, cache=True):
+    import os
+    import numpy as np
+    import acolite as ac
+
+    if not cache: return(ac.dem.hgt_read(file))
+
+    cache_dir = '{}/Cache'.format(os.path.dirname(file))
+    npy_file = '{}/{}.npy'.format(cache_dir, os.path.basename(file).split('.')[0])
+    if not os.path.exists(npy_file):
+        data = ac.dem.hgt_read(file)
+        try:
+            if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+            tmp_file = '{}.tmp{}.npy'.format(npy_file[0:-4], os.getpid())
+            np.save(tmp_file, data.astype(np.int16))
+            os.replace(tmp_file, npy_file)
+        except BaseException as e:
+            print('Could not write {}: {}'.format(npy_file, e))
+            return(data)
+    return(np.load(npy_file, mmap_mode='r'))
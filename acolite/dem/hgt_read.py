@@ -4,9 +4,9 @@
 ## 2017-07-17
 ##                2019-04-24 (QV) added support for zip files
 ##                2021-04-07 (QV) changed numpy import
+##                2026-10-18 (AD) decode with np.frombuffer as big endian signed shorts, tile size from file size
 
 def hgt_read(file):
-    import struct
     import numpy as np
 
     if '.gz' in file:
@@ -22,11 +22,10 @@ def hgt_read(file):
         with open(file,'rb') as f:
             data_read = f.read()
 
-    dim = (1201,1201)
+    ## 1201x1201 for 3 arcsec tiles, 3601x3601 for 1 arcsec tiles
+    n = int(round((len(data_read)/2)**0.5))
+    dim = (n,n)
 
-    ## big endian, unsigned shorts
-    data = struct.unpack('>{}'.format('H'*dim[0]*dim[1]),data_read)
-    data = np.asarray(data).reshape(dim)
-
-    data[data > 32768] -= 65535
+    ## big endian, signed shorts, read without copying the buffer
+    data = np.frombuffer(data_read, dtype='>i2').reshape(dim)
     return(data)
@@ -6,18 +6,13 @@
 ##
 ## function written by Quinten Vanhellemont, RBINS
 ## 2022-01-09
-## modifications:
+## modifications: 2026-10-18 (AD) bilinear interpolation on the regular SRTM15+ grid with shared grid weights
 
-def srtm15plus_lonlat(lon1, lat1, path=None, sea_level=0):
+def srtm15plus_lonlat(lon1, lat1, path=None, sea_level=0, block_size=1024):
 
     import os
-    from pyproj import Proj
-    import pyproj
-
     import acolite as ac
     import numpy as np
-    from pyresample.bilinear import NumpyBilinearResampler
-    from pyresample import geometry
 
     if path is None:
         file = ac.dem.srtm15plus(path=None \
@@ -39,19 +34,22 @@ def srtm15plus_lonlat(lon1, lat1, path=None, sea_level=0):
 
     sub = [sublon[0][0], sublat[0][0], sublon[0][-1]-sublon[0][0]+1, sublat[0][-1]-sublat[0][0]+1]
 
-    yi = lat[sublat].shape[0]
-    xi = lon[sublon].shape[0]
-
-    lon0 = np.tile(lon[sublon], yi).reshape(yi, xi)
-    lat0 = np.rot90(np.tile(lat[sublat], xi).reshape(xi, yi))
-    lon = None
-    lat = None
-
     ## read z
     zin, zatt = ac.shared.nc_data(file, 'z', attributes=True, sub = sub)
-    zin = np.flipud(zin)
 
-    result = ac.shared.reproject2(zin, lon0, lat0, lon1, lat1, nearest=False, radius_of_influence=5000)
+    zin = np.ma.getdata(zin)
+    lon, lat = np.ma.getdata(lon[sublon]), np.ma.getdata(lat[sublat])
+
+    ## interpolate on the regular grid, in blocks of rows for scene grids
+    if np.ndim(lon1) == 2:
+        result = np.zeros(np.shape(lon1), dtype=np.float32)
+        for r0 in range(0, result.shape[0], block_size):
+            weights = ac.shared.grid_weights(lon, lat, lon1[r0:r0+block_size], lat1[r0:r0+block_size])
+            result[r0:r0+block_size] = ac.shared.grid_interp(zin, weights)
+    else:
+        result = np.asarray(ac.shared.grid_interp(zin, ac.shared.grid_weights(lon, lat, lon1, lat1)))
+    lon = None
+    lat = None
 
     if sea_level is not None:
         result[result<sea_level] = sea_level
@@ -4,6 +4,7 @@
 ## 2021-08-10
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output = None, settings = {}, verbosity = 5):
     import numpy as np
@@ -198,10 +199,12 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity = 5):
             print(lat.shape)
             ac.output.nc_write(ofile, 'lat', lat, new = new, attributes = gatts,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             lat = None
             ac.output.nc_write(ofile, 'lon', lon,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             lon = None
             new = False
@@ -235,6 +238,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity = 5):
                 ac.output.nc_write(ofile, 'Lt_{}'.format(bands[b]['wave_name']), cdata_radiance,
                                             attributes = gatts, dataset_attributes = ds_att, new = new,
                                             netcdf_compression=setu['netcdf_compression'],
+                                            netcdf_chunking=setu['netcdf_chunking'],
                                             netcdf_compression_level=setu['netcdf_compression_level'],
                                             netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 new = False
@@ -246,6 +250,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity = 5):
             ac.output.nc_write(ofile, 'rhot_{}'.format(bands[b]['wave_name']), cdata,\
                                             attributes = gatts, dataset_attributes = ds_att, new = new,
                                             netcdf_compression=setu['netcdf_compression'],
+                                            netcdf_chunking=setu['netcdf_chunking'],
                                             netcdf_compression_level=setu['netcdf_compression_level'],
                                             netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             cdata = None
@@ -4,3 +4,4 @@ from .read import *
 from. scene_download import *
 from. scene_find import *
 from .gem import *
+from .lazy import *
@@ -4,6 +4,10 @@
 ## modifications: 2021-04-01 (QV) added some write support
 ##                2021-12-08 (QV) added nc_projection
 ##                2022-02-15 (QV) added L9/TIRS
+##                2026-10-18 (AD) added session mode keeping the NetCDF handle open, cached dataset attributes
+##                2026-10-18 (AD) added block reading of in memory datasets, block writing and chunksizes
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) added datasets_virtual, lon and lat computed from the projection for virtual geolocation
 
 import acolite as ac
 import os, sys
@@ -14,7 +18,9 @@ class gem(object):
         def __init__(self, file, new=False,
                     netcdf_compression=False,
                     netcdf_compression_level=4,
-                    netcdf_compression_least_significant_digit=None):
+                    netcdf_compression_least_significant_digit=None,
+                    netcdf_chunking='auto',
+                    keep_open=False):
             self.file=file
             self.data_mem = {}
             self.data_att = {}
@@ -22,10 +28,19 @@ class gem(object):
             self.bands = {}
             self.verbosity = 0
             self.nc_projection = None
+            self.chunksizes = None
+            self.datasets_virtual = []
 
             self.netcdf_compression=netcdf_compression
             self.netcdf_compression_level=netcdf_compression_level
             self.netcdf_compression_least_significant_digit=netcdf_compression_least_significant_digit
+            self.netcdf_chunking=netcdf_chunking
+
+            ## session mode keeps one NetCDF handle open until close() is called
+            self.keep_open = keep_open
+            self.nc = None
+            self.nc_mode = None
+            self.ds_atts = {}
 
             if new:
                 self.new = True
@@ -38,6 +53,41 @@ class gem(object):
                 self.datasets_read()
                 self.nc_projection = ac.shared.nc_read_projection(self.file)
 
+        def __enter__(self):
+            self.open()
+            return(self)
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.close()
+
+        def __del__(self):
+            try:
+                self.close()
+            except:
+                pass
+
+        def open(self, mode='r'):
+            ## start session, handle is opened when first needed
+            self.keep_open = True
+            if (not self.new) & (os.path.exists(self.file)): self.handle(mode=mode)
+
+        def close(self):
+            if self.nc is not None:
+                try:
+                    self.nc.close()
+                except:
+                    pass
+            self.nc = None
+            self.nc_mode = None
+
+        def handle(self, mode='r'):
+            ## return open handle, reopen in append mode if we need to write to a read handle
+            if (self.nc is not None) & (self.nc_mode == 'r') & (mode == 'a'): self.close()
+            if self.nc is None:
+                self.nc = Dataset(self.file, mode, format='NETCDF4')
+                self.nc_mode = mode
+            return(self.nc)
+
         def gatts_read(self):
             self.gatts = ac.shared.nc_gatts(self.file)
             ## detect thermal sensor
@@ -55,23 +105,43 @@ class gem(object):
                 self.gatts['thermal_bands'] = ['6_vcid_1', '6_vcid_2']
 
         def datasets_read(self):
-            self.datasets = ac.shared.nc_datasets(self.file)
+            if self.nc is not None:
+                self.datasets = list(self.nc.variables.keys())
+            else:
+                self.datasets = ac.shared.nc_datasets(self.file)
+            ## datasets computed when read
+            self.datasets_virtual = []
+            if 'geolocation_virtual' in getattr(self, 'gatts', {}):
+                self.datasets_virtual = [ds for ds in ['lon', 'lat'] if ds not in self.datasets]
 
-        def data(self, ds, attributes=False, store=False, return_data=True):
+        def data(self, ds, attributes=False, store=False, return_data=True, sub=None):
             if ds in self.data_mem:
                 cdata = self.data_mem[ds]
                 if ds in self.data_att:
                     catt = self.data_att[ds]
                 else:
                     catt = {}
+                ## subset two dimensional datasets
+                if (sub is not None) and (np.ndim(cdata) == 2) and (cdata.shape != (1,1)):
+                    cdata = cdata[sub[1]:sub[1]+sub[3],sub[0]:sub[0]+sub[2]]
             else:
-                if ds in self.datasets:
-                    cdata, catt = ac.shared.nc_data(self.file, ds, attributes=True)
-                    cmask = cdata.mask
-                    cdata = cdata.data
+                if (ds in self.datasets) or (ds in self.datasets_virtual):
+                    if (self.keep_open) & (ds in self.datasets):
+                        nc = self.handle(mode=self.nc_mode if self.nc_mode is not None else 'r')
+                        if ds not in self.ds_atts:
+                            self.ds_atts[ds] = {attr : nc.variables[ds].getncattr(attr) for attr in nc.variables[ds].ncattrs()}
+                        catt = {k: self.ds_atts[ds][k] for k in self.ds_atts[ds]}
+                        if sub is None:
+                            cdata = nc.variables[ds][:]
+                        else:
+                            cdata = nc.variables[ds][sub[1]:sub[1]+sub[3],sub[0]:sub[0]+sub[2]]
+                    else:
+                        cdata, catt = ac.shared.nc_data(self.file, ds, sub=sub, attributes=True)
+                    cmask = np.ma.getmaskarray(cdata)
+                    cdata = np.ma.getdata(cdata)
                     if cdata.dtype in [np.dtype('float32'), np.dtype('float64')]:
                         cdata[cmask] = np.nan
-                    if (self.store) or (store):
+                    if ((self.store) or (store)) & (sub is None):
                         self.data_mem[ds] = cdata
                         self.data_att[ds] = catt
                 else:
@@ -82,24 +152,43 @@ class gem(object):
                 else:
                     return(cdata)
 
-        def write(self, ds, data, ds_att = {}):
+        def write(self, ds, data, ds_att = None, offset = None, global_dims = None):
             if self.new:
                 if os.path.exists(self.file):
                     os.remove(self.file)
+                self.close()
+            nc_handle = None
+            if (self.keep_open) & (not self.new): nc_handle = self.handle(mode='a')
             ac.output.nc_write(self.file, ds, data, attributes=self.gatts,
                                 dataset_attributes=ds_att, new=self.new,
-                                nc_projection=self.nc_projection,
+                                nc_projection=self.nc_projection, offset=offset, global_dims=global_dims,
+                                chunksizes=self.chunksizes,
                                 netcdf_compression=self.netcdf_compression,
                                 netcdf_compression_level=self.netcdf_compression_level,
-                                netcdf_compression_least_significant_digit=self.netcdf_compression_least_significant_digit)
+                                netcdf_compression_least_significant_digit=self.netcdf_compression_least_significant_digit,
+                                netcdf_chunking=self.netcdf_chunking,
+                                nc_handle=nc_handle)
             if self.verbosity > 0: print('Wrote {}'.format(ds))
             self.new = False
+            ## attributes may have been updated
+            if ds in self.ds_atts: del self.ds_atts[ds]
 
         def update_attributes(self):
-            with Dataset(self.file, 'a', format='NETCDF4') as nc:
-                for key in self.gatts.keys():
-                    if self.gatts[key] is not None:
-                        try:
-                            setattr(nc, key, self.gatts[key])
-                        except:
-                            print('Failed to write attribute: {}'.format(key))
+            if self.keep_open:
+                nc = self.handle(mode='a')
+                self.gatts_write(nc)
+            else:
+                with Dataset(self.file, 'a', format='NETCDF4') as nc:
+                    self.gatts_write(nc)
+
+        def gatts_write(self, nc):
+            ## try writing attributes in one call, fall back to single attributes if one fails
+            gatts = {key: self.gatts[key] for key in self.gatts.keys() if self.gatts[key] is not None}
+            try:
+                nc.setncatts(gatts)
+            except:
+                for key in gatts:
+                    try:
+                        nc.setncattr(key, gatts[key])
+                    except:
+                        print('Failed to write attribute: {}'.format(key))
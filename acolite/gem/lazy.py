@@ -0,0 +1,69 @@
+## class lazy
+## dict-like access to the datasets of a gem NetCDF file, datasets are read on first access
+## datasets declared with require are kept in memory until released by all users
+## other datasets are read on each access without being kept in memory
+## written by AD
+## 2026-10-18
+## modifications:
+
+class lazy(object):
+        def __init__(self, ncf, datasets, sub=None, atts=None):
+            self.file = ncf
+            self.datasets = [ds for ds in datasets]
+            self.sub = sub
+            self.atts = {} if atts is None else atts
+            self.data_mem = {}
+            self.required = {}
+
+        def __contains__(self, ds):
+            return((ds in self.data_mem) or (ds in self.datasets))
+
+        def __iter__(self):
+            return(iter(self.keys()))
+
+        def __len__(self):
+            return(len(self.keys()))
+
+        def keys(self):
+            return(self.datasets + [ds for ds in self.data_mem if ds not in self.datasets])
+
+        def __getitem__(self, ds):
+            if ds in self.data_mem: return(self.data_mem[ds])
+            if ds not in self.datasets: raise KeyError(ds)
+            cdata = self.read(ds)
+            if ds in self.required: self.data_mem[ds] = cdata
+            return(cdata)
+
+        def __setitem__(self, ds, data):
+            ## datasets set from outside are kept
+            self.data_mem[ds] = data
+            if ds in self.datasets: self.datasets.remove(ds)
+
+        def __delitem__(self, ds):
+            if ds in self.data_mem: del self.data_mem[ds]
+            if ds in self.datasets: self.datasets.remove(ds)
+
+        def read(self, ds):
+            import numpy as np
+            import acolite as ac
+            d_, a_ = ac.shared.nc_data(self.file, ds, sub=self.sub, attributes=True)
+            cdata = d_.data
+            cdata[d_.mask] = np.nan
+            self.atts[ds] = a_
+            return(cdata)
+
+        def require(self, datasets):
+            ## count users of each dataset
+            for ds in datasets:
+                if ds not in self.datasets: continue
+                if ds not in self.required: self.required[ds] = 0
+                self.required[ds] += 1
+
+        def release(self, datasets):
+            ## evict datasets without remaining users
+            for ds in datasets:
+                if ds not in self.required: continue
+                self.required[ds] -= 1
+                if self.required[ds] > 0: continue
+                del self.required[ds]
+                if ds in self.data_mem: del self.data_mem[ds]
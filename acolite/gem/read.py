@@ -4,8 +4,10 @@
 ## modifications: 2021-03-09 (QV) made reading data optional
 ##                2021-12-08 (QV) added nc_projection
 ##                2022-02-15 (QV) added L9/TIRS
+##                2026-10-18 (AD) added lazy option, datasets are then read on first access
+##                2026-10-18 (AD) added datasets_virtual
 
-def read(ncf, sub = None, skip_datasets = [], load_data=True):
+def read(ncf, sub = None, skip_datasets = [], load_data=True, lazy=False):
     import os
     import numpy as np
     import acolite as ac
@@ -20,6 +22,11 @@ def read(ncf, sub = None, skip_datasets = [], load_data=True):
     gem['gatts'] = ac.shared.nc_gatts(ncf)
     gem['gatts']['gemfile'] = ncf
 
+    ## lon and lat computed from the projection when read with ac.shared.nc_data
+    gem['datasets_virtual'] = []
+    if 'geolocation_virtual' in gem['gatts']:
+        gem['datasets_virtual'] = [ds for ds in ['lon', 'lat'] if ds not in gem['datasets']]
+
     ## detect thermal sensor
     if gem['gatts']['sensor'] == 'L8_OLI':
         gem['gatts']['thermal_sensor'] = 'L8_TIRS'
@@ -37,7 +44,13 @@ def read(ncf, sub = None, skip_datasets = [], load_data=True):
     if 'projection_key' in gem['gatts']:
         gem['nc_projection'] = ac.shared.nc_read_projection(ncf)
 
-    if load_data:
+    if load_data & lazy:
+        ## read datasets when first accessed
+        datasets = [ds for ds in gem['datasets'] if ds not in skip_datasets]
+        if 'projection_key' in gem['gatts']:
+            datasets = [ds for ds in datasets if ds not in ['x', 'y', gem['gatts']['projection_key']]]
+        gem['data'] = ac.gem.lazy(ncf, datasets, sub=sub, atts=gem['atts'])
+    elif load_data:
         ## read all datasets
         for ds in gem['datasets']:
             if ds in skip_datasets: continue
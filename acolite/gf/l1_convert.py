@@ -5,6 +5,7 @@
 ## modifications: 2021-11-20 (QV) reproject file if projection not recognised
 ##                2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
     import numpy as np
@@ -184,11 +185,13 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                     lon, lat = ac.shared.projection_geo(prj, add_half_pixel=True)
                     ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'])
                     lon = None
                     if verbosity > 1: print('Wrote lon')
                     ac.output.nc_write(ofile, 'lat', lat, double=True,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'])
                     lat = None
                     if verbosity > 1: print('Wrote lat')
@@ -216,6 +219,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                     ac.output.nc_write(ofile, 'Lt_{}'.format(bands[b]['wave_name']), cdata_radiance,
                                         attributes = gatts, dataset_attributes = bands[b], new = new,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'],
                                         netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                     new = False
@@ -227,6 +231,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 ac.output.nc_write(ofile, 'rhot_{}'.format(bands[b]['wave_name']), cdata,\
                                         attributes = gatts, dataset_attributes = bands[b], new = new,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'],
                                         netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 cdata = None
@@ -270,6 +275,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 lat = zlat(x, y)
                 ac.output.nc_write(ofile, 'lat', lat, attributes = gatts, new = new,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
 
@@ -277,6 +283,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 lon = zlon(x, y)
                 ac.output.nc_write(ofile, 'lon', lon,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 new = False
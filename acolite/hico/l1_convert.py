@@ -4,6 +4,7 @@
 ## 2021-08-03
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
     import numpy as np
@@ -68,6 +69,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
             ave[ds] = np.nanmean(data)
             ac.output.nc_write(ofile, ds, data, new=new, attributes=gatts,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             new = False
 
@@ -120,12 +122,14 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 ## write toa radiance
                 ac.output.nc_write(ofile, 'Lt_{}'.format(bands[b]['wave_name']), cdata_radiance, dataset_attributes = ds_att,
                             netcdf_compression=setu['netcdf_compression'],
+                            netcdf_chunking=setu['netcdf_chunking'],
                             netcdf_compression_level=setu['netcdf_compression_level'],
                             netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
 
             ## write toa reflectance
             ac.output.nc_write(ofile, 'rhot_{}'.format(bands[b]['wave_name']), cdata, dataset_attributes = ds_att,
                             netcdf_compression=setu['netcdf_compression'],
+                            netcdf_chunking=setu['netcdf_chunking'],
                             netcdf_compression_level=setu['netcdf_compression_level'],
                             netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
 
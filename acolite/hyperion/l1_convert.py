@@ -4,6 +4,7 @@
 ## 2021-08-04
 ## modifications:  2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
     import numpy as np
@@ -144,12 +145,14 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
         lon, lat = ac.shared.projection_geo(dct_prj)
         ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True,
                             netcdf_compression=setu['netcdf_compression'],
+                            netcdf_chunking=setu['netcdf_chunking'],
                             netcdf_compression_level=setu['netcdf_compression_level'])
         if verbosity > 1: print('Wrote lon')
         lon = None
 
         ac.output.nc_write(ofile, 'lat', lat, double=True,
                             netcdf_compression=setu['netcdf_compression'],
+                            netcdf_chunking=setu['netcdf_chunking'],
                             netcdf_compression_level=setu['netcdf_compression_level'])
         if verbosity > 1: print('Wrote lat')
         lat = None
@@ -178,6 +181,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
                 ac.output.nc_write(ofile, 'Lt_{}'.format(ds_att['wave_name']), cdata_radiance,
                                    attributes = gatts, dataset_attributes = ds_att, new=new,
                                    netcdf_compression=setu['netcdf_compression'],
+                                   netcdf_chunking=setu['netcdf_chunking'],
                                    netcdf_compression_level=setu['netcdf_compression_level'],
                                    netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 new = False
@@ -189,6 +193,7 @@ def l1_convert(inputfile, output = None, settings = {}, verbosity=5):
             ac.output.nc_write(ofile, 'rhot_{}'.format(ds_att['wave_name']), cdata,
                                attributes = gatts, dataset_attributes = ds_att, new=new,
                                netcdf_compression=setu['netcdf_compression'],
+                               netcdf_chunking=setu['netcdf_chunking'],
                                netcdf_compression_level=setu['netcdf_compression_level'],
                                netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             new = False
@@ -8,6 +8,9 @@
 ##                2021-02-11 (QV) added checks for merging tiles of the same sensor and close in time
 ##                2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads, thermal band percentiles now computed from the thermal data
+##                2026-10-18 (AD) added output_geolocation_virtual and output_geolocation_float32
 
 def l1_convert(inputfile, output = None, settings = {},
 
@@ -324,6 +327,10 @@ def l1_convert(inputfile, output = None, settings = {},
             nc_projection = None
             nc_projection_pan = None
 
+        ## virtual geolocation, lon and lat are computed from the projection when read
+        geolocation_virtual = (output_geolocation) & (setu['output_geolocation_virtual']) & (nc_projection is not None)
+        if geolocation_virtual: gatts['geolocation_virtual'] = 1
+
         ## save projection keys in gatts
         pkeys = ['xrange', 'yrange', 'proj4_string', 'pixel_size', 'zone']
         for k in pkeys:
@@ -406,15 +413,18 @@ def l1_convert(inputfile, output = None, settings = {},
                 ac.output.nc_write(ofile, 'raa', raa, replace_nan=True,
                                     attributes=gatts, new=new, nc_projection=nc_projection,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote raa')
                 new = False
                 ac.output.nc_write(ofile, 'vza', vza, replace_nan=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote vza')
                 ac.output.nc_write(ofile, 'sza', sza, replace_nan=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote sza')
                 sza = None
@@ -424,7 +434,7 @@ def l1_convert(inputfile, output = None, settings = {},
             #mus.shape+=(1,1)
 
         ## write lat/lon
-        if (output_geolocation):
+        if (output_geolocation) & (not geolocation_virtual):
             if os.path.exists(ofile) & (not new):
                 datasets = ac.shared.nc_datasets(ofile)
             else:
@@ -432,12 +442,14 @@ def l1_convert(inputfile, output = None, settings = {},
             if ('lat' not in datasets) or ('lon' not in datasets):
                 if verbosity > 1: print('Writing geolocation lon/lat')
                 lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=False)
-                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True, nc_projection=nc_projection,
+                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=not setu['output_geolocation_float32'], nc_projection=nc_projection,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote lon')
-                ac.output.nc_write(ofile, 'lat', lat, double=True,
+                ac.output.nc_write(ofile, 'lat', lat, double=not setu['output_geolocation_float32'],
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote lat')
                 new=False
@@ -453,89 +465,108 @@ def l1_convert(inputfile, output = None, settings = {},
                 x, y = ac.shared.projection_geo(dct_prj, xy=True, add_half_pixel=False)
                 ac.output.nc_write(ofile, 'x', x, new=new,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote x')
                 ac.output.nc_write(ofile, 'y', y,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 if verbosity > 1: print('Wrote y')
                 new=False
 
         ## write TOA bands
         if verbosity > 1: print('Converting bands')
-        for b in fmeta:
-            if '.TIF' not in fmeta[b]['FILE']: continue
-            if b in ['PIXEL', 'RADSAT']: continue
-            if os.path.exists(fmeta[b]['FILE']):
-                if b in waves_names:
-                    pan = False
-                    if b in pan_bands: ## pan band
-                        if (not output_pan) & (not output_pan_ms): continue
-                        pan = True
-                        mus_pan = scipy.ndimage.zoom(mus, zoom=pan_scale, order=1) if len(np.atleast_1d(mus))>1 else mus * 1
-                        data = ac.landsat.read_toa(fmeta[b], sub=sub_pan, mus=mus_pan, warp_to=warp_to_pan)
-                        mus_pan = None
-                    else: ## not a pan band
-                        data = ac.landsat.read_toa(fmeta[b], sub=sub, mus=mus, warp_to=warp_to)
-                    ds = 'rhot_{}'.format(waves_names[b])
-                    ds_att = {'wavelength':waves_mu[b]*1000}
-                    for k in fmeta[b]: ds_att[k] = fmeta[b][k]
-                    if percentiles_compute:
-                        ds_att['percentiles'] = percentiles
-                        ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
-
-                    if gains & (gains_dict is not None):
-                        ds_att['toa_gain'] = gains_dict[b]
-                        data *= ds_att['toa_gain']
-                        if verbosity > 1: print('Converting bands: Applied TOA gain {} to {}'.format(ds_att['toa_gain'], ds))
-
-                    if output_pan & pan:
-                        ## write output
-                        ofile_pan = ofile.replace('_L1R.nc', '_L1R_pan.nc')
-                        ac.output.nc_write(ofile_pan, ds, data, attributes=gatts,replace_nan=True,
-                                           new=new_pan, dataset_attributes = ds_att, nc_projection=nc_projection_pan,
-                                           netcdf_compression=setu['netcdf_compression'],
-                                           netcdf_compression_level=setu['netcdf_compression_level'],
-                                           netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                        new_pan = False
-                        if verbosity > 1: print('Converting bands: Wrote {} to separate L1R_pan'.format(ds))
-
-                    ## prepare for low res output
-                    if output_pan_ms & pan: data = scipy.ndimage.zoom(data, zoom=1/pan_scale, order=1)
-
-                    ## clip data
-                    if clip: data[clip_mask] = np.nan
-
-                    ## write to ms file
-                    ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts, new=new,
-                                       dataset_attributes = ds_att, nc_projection=nc_projection,
-                                       netcdf_compression=setu['netcdf_compression'],
-                                       netcdf_compression_level=setu['netcdf_compression_level'],
-                                       netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                    new = False
-                    if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
-                else:
-                    if b in thermal_bands:
-                        if output_thermal:
-                            ds = 'bt{}'.format(b).lower()
-                            ds_att = {'band':b}
-                            for k in fmeta[b]: ds_att[k] = fmeta[b][k]
-                            if percentiles_compute:
-                                ds_att['percentiles'] = percentiles
-                                ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
-                            data = ac.landsat.read_toa(fmeta[b], sub=sub, warp_to=warp_to)
-
-                            ## clip data
-                            if clip: data[clip_mask] = np.nan
-                            ac.output.nc_write(ofile, ds, data, replace_nan=True,
-                                               attributes=gatts, new=new, dataset_attributes=ds_att,
-                                               netcdf_compression=setu['netcdf_compression'],
-                                               netcdf_compression_level=setu['netcdf_compression_level'],
-                                               netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                            new = False
-                            if verbosity > 1: print('Converting bands: Wrote {}'.format(ds))
-                    else:
-                        continue
+        ## read and convert band b, run in the read threads
+        def band_read(b):
+            if '.TIF' not in fmeta[b]['FILE']: return(None)
+            if b in ['PIXEL', 'RADSAT']: return(None)
+            if not os.path.exists(fmeta[b]['FILE']): return(None)
+            if b in waves_names:
+                pan = False
+                if b in pan_bands: ## pan band
+                    if (not output_pan) & (not output_pan_ms): return(None)
+                    pan = True
+                    mus_pan = scipy.ndimage.zoom(mus, zoom=pan_scale, order=1) if len(np.atleast_1d(mus))>1 else mus * 1
+                    data = ac.landsat.read_toa(fmeta[b], sub=sub_pan, mus=mus_pan, warp_to=warp_to_pan)
+                    mus_pan = None
+                else: ## not a pan band
+                    data = ac.landsat.read_toa(fmeta[b], sub=sub, mus=mus, warp_to=warp_to)
+                ds = 'rhot_{}'.format(waves_names[b])
+                ds_att = {'wavelength':waves_mu[b]*1000}
+                for k in fmeta[b]: ds_att[k] = fmeta[b][k]
+                if percentiles_compute:
+                    ds_att['percentiles'] = percentiles
+                    ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
+
+                if gains & (gains_dict is not None):
+                    ds_att['toa_gain'] = gains_dict[b]
+                    data *= ds_att['toa_gain']
+                    if verbosity > 1: print('Converting bands: Applied TOA gain {} to {}'.format(ds_att['toa_gain'], ds))
+
+                ## data for separate pan output
+                data_pan = data if (output_pan & pan) else None
+
+                ## prepare for low res output
+                if output_pan_ms & pan: data = scipy.ndimage.zoom(data, zoom=1/pan_scale, order=1)
+
+                ## clip data
+                if clip:
+                    if data is data_pan: data = data * 1.0
+                    data[clip_mask] = np.nan
+                return(ds, data, ds_att, data_pan)
+            elif (b in thermal_bands) & (output_thermal):
+                ds = 'bt{}'.format(b).lower()
+                ds_att = {'band':b}
+                for k in fmeta[b]: ds_att[k] = fmeta[b][k]
+                data = ac.landsat.read_toa(fmeta[b], sub=sub, warp_to=warp_to)
+                if percentiles_compute:
+                    ds_att['percentiles'] = percentiles
+                    ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
+
+                ## clip data
+                if clip: data[clip_mask] = np.nan
+                return(ds, data, ds_att, None)
+            return(None)
+
+        ## write band b, run in this thread
+        def band_write(b, band):
+            nonlocal new, new_pan
+            ds, data, ds_att, data_pan = band
+            if data_pan is not None:
+                ## write output
+                ofile_pan = ofile.replace('_L1R.nc', '_L1R_pan.nc')
+                ac.output.nc_write(ofile_pan, ds, data_pan, attributes=gatts,replace_nan=True,
+                                   new=new_pan, dataset_attributes = ds_att, nc_projection=nc_projection_pan,
+                                   netcdf_compression=setu['netcdf_compression'],
+                                   netcdf_chunking=setu['netcdf_chunking'],
+                                   netcdf_compression_level=setu['netcdf_compression_level'],
+                                   netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+                new_pan = False
+                if verbosity > 1: print('Converting bands: Wrote {} to separate L1R_pan'.format(ds))
+
+            if b in waves_names:
+                ## write to ms file
+                ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts, new=new,
+                                   dataset_attributes = ds_att, nc_projection=nc_projection,
+                                   netcdf_compression=setu['netcdf_compression'],
+                                   netcdf_chunking=setu['netcdf_chunking'],
+                                   netcdf_compression_level=setu['netcdf_compression_level'],
+                                   netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+                new = False
+                if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
+            else:
+                ac.output.nc_write(ofile, ds, data, replace_nan=True,
+                                   attributes=gatts, new=new, dataset_attributes=ds_att,
+                                   netcdf_compression=setu['netcdf_compression'],
+                                   netcdf_chunking=setu['netcdf_chunking'],
+                                   netcdf_compression_level=setu['netcdf_compression_level'],
+                                   netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+                new = False
+                if verbosity > 1: print('Converting bands: Wrote {}'.format(ds))
+
+        ac.shared.read_bands(list(fmeta.keys()), band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
 
         if verbosity > 1:
             print('Conversion took {:.1f} seconds'.format(time.time()-t0))
@@ -1,5 +1,6 @@
 from .nc_to_geotiff import nc_to_geotiff
 from .nc_to_geotiff_rgb import nc_to_geotiff_rgb
 from .nc_write import nc_write
+from .nc_chunking import nc_chunking
 from .project_acolite_netcdf import project_acolite_netcdf
 from .reproject_acolite_netcdf import reproject_acolite_netcdf
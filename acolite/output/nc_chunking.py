@@ -0,0 +1,43 @@
+## def nc_chunking
+## determines the NetCDF chunking for a two dimensional dataset
+##
+## policies: stripe: row stripes over the full width, for reading full bands or blocks of rows (L1R, L2R)
+##           tile: square tiles, for reading spatial subsets and single pixels (L2W, matchups)
+##           contiguous: no chunking, only possible without compression
+##           default: netCDF4 default chunking
+##           auto: policy is selected from the ACOLITE file type, from the file name or file_type
+##
+## returns policy and chunksizes, chunksizes is None for the contiguous and default policies
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def nc_chunking(global_dims, policy='auto', file=None, file_type=None, itemsize=4,
+                chunk_bytes=2**20, tile_size=256, compression=False):
+    import os
+
+    ## chunking policy per ACOLITE file type
+    policies = {'L1R':'stripe', 'L2R':'stripe', 'L2W':'tile'}
+
+    if policy in [None, 'None']: policy = 'default'
+    if policy == 'auto':
+        if file is not None:
+            ft = os.path.splitext(os.path.basename(file))[0].split('_')[-1]
+            if ft in policies: file_type = ft
+        policy = policies[file_type] if file_type in policies else 'default'
+
+    ## contiguous storage is not possible with compression
+    if (policy == 'contiguous') & (compression): policy = 'default'
+
+    chunksizes = None
+    if policy == 'stripe':
+        rows = max(1, int(chunk_bytes / (global_dims[1] * itemsize)))
+        chunksizes = (min(rows, global_dims[0]), global_dims[1])
+    elif policy == 'tile':
+        chunksizes = (min(tile_size, global_dims[0]), min(tile_size, global_dims[1]))
+    elif policy not in ['contiguous', 'default']:
+        print('NetCDF chunking policy {} not configured, using default chunking'.format(policy))
+        policy = 'default'
+
+    return(policy, chunksizes)
@@ -9,19 +9,27 @@
 ##                2021-02-11 (QV) disabled half pixel offset option, need to check Landsat
 ##                2021-11-20 (QV) added match_file to extract projection from (esp if data is using RPC for geolocation?)
 ##                2021-12-08 (QV) added support for the netcdf projection
+##                2026-10-18 (AD) added profiling stage
+##                2026-10-18 (AD) datasets are read once and written with nodata set at creation, in threads GeoTIFFs
+##                                added stack to write datasets starting with the given prefixes to a multi band GeoTIFF
 
-def nc_to_geotiff(f, skip_geo=True, match_file=None, datasets=None, cloud_optimized_geotiff=False):
+def nc_to_geotiff(f, skip_geo=True, match_file=None, datasets=None, cloud_optimized_geotiff=False,
+                  stack=None, threads=1):
     import acolite as ac
     import numpy as np
     import os
-    from osgeo import osr, gdal
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from netCDF4 import Dataset
+    from osgeo import osr, gdal, gdal_array
 
-    creationOptions = None
+    creationOptions = []
     format = 'GTiff'
     if cloud_optimized_geotiff:
         creationOptions = ['COMPRESS=DEFLATE', 'PREDICTOR=2', 'OVERVIEWS=NONE', 'BLOCKSIZE=1024']
         format = 'COG'
 
+    ac.acolite.profiling.start('geotiff_export', file=os.path.basename(f))
     gatts = ac.shared.nc_gatts(f)
     datasets_file = ac.shared.nc_datasets(f)
     if 'ofile' in gatts:
@@ -29,24 +37,27 @@ def nc_to_geotiff(f, skip_geo=True, match_file=None, datasets=None, cloud_optimi
     else:
         out = f.replace('.nc', '')
 
-    if 'projection_key' in gatts:
-        for ds in datasets_file:
-            if datasets is not None:
-                if ds not in datasets: continue
+    ## datasets to export
+    export = []
+    for ds in datasets_file:
+        if datasets is not None:
+            if ds not in datasets: continue
+        if 'projection_key' in gatts:
             if ds in ['x', 'y', gatts['projection_key']]: continue
             if (skip_geo) & (ds in ['lat', 'lon']): continue
-            outfile = '{}_{}{}'.format(out, ds, '.tif')
-            ## write geotiff
-            dt = gdal.Translate(outfile, 'NETCDF:"{}":{}'.format(f, ds),
-                                format=format, creationOptions=creationOptions)
-            ## set no data value
-            if True:
-                 data = ac.shared.nc_data(f, ds)
-                 dt.GetRasterBand(1).WriteArray(data)
-                 dt.GetRasterBand(1).SetNoDataValue(np.nan)
+        else:
+            if (skip_geo) & (ds in ['lat', 'lon', 'x', 'y']): continue
+        export.append(ds)
 
-            dt = None
-            print('Wrote {}'.format(outfile))
+    ## get projection and geotransform
+    rpcs = None
+    if 'projection_key' in gatts:
+        ## from the NetCDF projection, only metadata is read
+        if len(export) > 0:
+            src_ds = gdal.Open('NETCDF:"{}":{}'.format(f, export[0]))
+            trans = src_ds.GetGeoTransform()
+            wkt = src_ds.GetProjection()
+            src_ds = None
     else:
         tags = ['xrange', 'yrange', 'pixel_size', 'proj4_string']
         if all([t in gatts for t in tags]) or (match_file is not None):
@@ -68,48 +79,89 @@ def nc_to_geotiff(f, skip_geo=True, match_file=None, datasets=None, cloud_optimi
                 if os.path.exists(match_file):
                     ## get projection info from match file
                     src_ds = gdal.Open(match_file)
-                    transform = src_ds.GetGeoTransform()
-                    projection = src_ds.GetProjection()
-                    dimx, dimy = src_ds.RasterXSize, src_ds.RasterYSize
+                    trans = src_ds.GetGeoTransform()
+                    wkt = src_ds.GetProjection()
                     ## get RPC data
                     rpcs = src_ds.GetMetadata('RPC')
                     src_ds = None
                 else:
                     print('File {} not found. Not outputting GeoTIFF files.'.format(match_file))
+                    ac.acolite.profiling.stop('geotiff_export')
                     return
+        else:
+            print('File {} not recognised. Not outputting GeoTIFF files.'.format(f))
+            ac.acolite.profiling.stop('geotiff_export')
+            return
 
-            for ds in datasets_file:
-                if datasets is not None:
-                    if ds not in datasets: continue
-                if (skip_geo) & (ds in ['lat', 'lon', 'x', 'y']): continue
-
-                data = ac.shared.nc_data(f, ds)
-                y,x = data.shape
-                if data.dtype == np.float32:
-                    dt = gdal.GDT_Float32
-                else:
-                    print(data.dtype)
-
-                outfile = '{}_{}{}'.format(out, ds, '.tif')
+    ## group datasets in outputs, datasets starting with a stack prefix are written to one multi band file
+    if stack is not None:
+        if type(stack) is not list: stack = [stack]
+    outputs = []
+    stacked = {}
+    for ds in export:
+        prefix = None
+        if stack is not None:
+            for s in stack:
+                if ds.startswith('{}_'.format(s)):
+                    prefix = s
+                    break
+        if prefix is None:
+            outputs.append(('{}_{}.tif'.format(out, ds), [ds]))
+        else:
+            if prefix not in stacked:
+                stacked[prefix] = []
+                outputs.append(('{}_{}_stack.tif'.format(out, prefix), stacked[prefix]))
+            stacked[prefix].append(ds)
 
-                if match_file is None:
-                    driver = gdal.GetDriverByName('GTiff')
-                    dataset = driver.Create(outfile, x, y, 1, dt)
-                    dataset.SetGeoTransform(trans)
-                    dataset.SetProjection(wkt)
-                else:
-                    driver = gdal.GetDriverByName('GTiff')
-                    dataset = driver.Create(outfile, dimx, dimy, 1, dt)
-                    dataset.SetGeoTransform(transform)
-                    dataset.SetProjection(projection)
-                    #dataset = driver.CreateCopy(outfile, src_ds, 0 )
-                    ## write RPC data
-                    dataset.SetMetadata(rpcs ,'RPC')
-                    src_ds = None
+    ## write output file with nodata set at creation
+    def write(outfile, names, data):
+        dt = gdal_array.NumericTypeCodeToGDALTypeCode(data[0].dtype)
+        if dt is None:
+            print('Data type {} not supported for {}'.format(data[0].dtype, outfile))
+            return
+        y, x = data[0].shape
 
-                dataset.GetRasterBand(1).WriteArray(data)
-                dataset.GetRasterBand(1).SetNoDataValue(np.nan)
-                dataset.FlushCache()
-                print('Wrote {}'.format(outfile))
+        ## COG is written as a copy of an in memory dataset
+        if format == 'COG':
+            dataset = gdal.GetDriverByName('MEM').Create('', x, y, len(data), dt)
         else:
-            print('File {} not recognised. Not outputting GeoTIFF files.'.format(f))
+            dataset = gdal.GetDriverByName(format).Create(outfile, x, y, len(data), dt, options=creationOptions)
+        dataset.SetGeoTransform(trans)
+        dataset.SetProjection(wkt)
+        if rpcs is not None: dataset.SetMetadata(rpcs ,'RPC')
+        for bi, ds in enumerate(names):
+            band = dataset.GetRasterBand(bi+1)
+            if data[bi].dtype.kind == 'f': band.SetNoDataValue(np.nan)
+            if len(names) > 1: band.SetDescription(ds)
+            band.WriteArray(data[bi])
+            band = None
+        if format == 'COG':
+            gdal.GetDriverByName(format).CreateCopy(outfile, dataset, options=creationOptions)
+        else:
+            dataset.FlushCache()
+        dataset = None
+        print('Wrote {}'.format(outfile))
+
+    ## read datasets in this thread and write outputs in a pool of threads
+    if threads is None: threads = 1
+    threads = max(1, int(threads))
+    pending = deque()
+    with Dataset(f) as nc, ThreadPoolExecutor(max_workers=threads) as executor:
+        for outfile, names in outputs:
+            ## limit the number of outputs held in memory
+            while len(pending) >= threads + 1: pending.popleft().result()
+            data = []
+            for ds in names:
+                d = nc.variables[ds][:]
+                if np.ma.isMaskedArray(d):
+                    if d.dtype.kind == 'f':
+                        d = d.filled(np.nan)
+                    else:
+                        d = d.data
+                data.append(d)
+            ## bands in a stack need the same data type
+            if len(data) > 1: data = [d.astype(np.result_type(*data)) for d in data]
+            pending.append(executor.submit(write, outfile, names, data))
+            data = None
+        while len(pending) > 0: pending.popleft().result()
+    ac.acolite.profiling.stop('geotiff_export')
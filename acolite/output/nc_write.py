@@ -21,6 +21,10 @@
 ##                QV 2021-06-04 added dataset attributes defaults
 ##                QV 2021-07-19 change to using setncattr
 ##                QV 2021-12-08 added nc_projection
+##                AD 2026-10-18 added nc_handle keyword to write to an open file, cached dataset attribute lookup
+##                AD 2026-10-18 fixed chunksizes keyword, fill new datasets written with offset in stripes
+##                AD 2026-10-18 added netcdf_chunking keyword to select chunking policy
+##                AD 2026-10-18 release the chunk cache of written datasets in files kept open by the caller
 
 def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
                  new=False, attributes=None, update_attributes=False,
@@ -31,7 +35,9 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
                  format='NETCDF4',
                  netcdf_compression=False,
                  netcdf_compression_level=4,
-                 netcdf_compression_least_significant_digit=None):
+                 netcdf_compression_least_significant_digit=None,
+                 netcdf_chunking='auto',
+                 nc_handle=None):
 
 
     from netCDF4 import Dataset
@@ -39,23 +45,10 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
     from math import ceil
     import numpy as np
 
-    import re
     import acolite as ac
 
     ## import atts for dataset
-    atts = None
-    for p in ac.param['attributes']:
-        if p['parameter'] == dataset: atts = {t:p[t] for t in p}
-    if atts is None:
-        for p in ac.param['attributes']:
-            if re.match(p['parameter'], dataset):
-                atts = {t:p[t] for t in p}
-                if p['parameter'][0:2] != 'bt':
-                    try:
-                        wave = int(dataset.split('_')[-1])
-                        atts['wavelength'] = wave
-                    except:
-                        pass
+    atts = nc_write_attributes(dataset)
 
     ## set attributes from provided/defaults
     if atts is not None:
@@ -67,7 +60,7 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
                     dataset_attributes[t] = atts[t]
         dataset_attributes['parameter'] = dataset
 
-    if os.path.exists(os.path.dirname(ncfile)) is False:
+    if (nc_handle is None) & (os.path.exists(os.path.dirname(ncfile)) is False):
          os.makedirs(os.path.dirname(ncfile))
 
     dims = data.shape
@@ -75,7 +68,9 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
 
     if chunking:
         if chunksizes is not None:
-            chunksizes=(ceil(dim[0]/chunk_tiles[0]), ceil(dim[1]/chunk_tiles[1]))
+            chunksizes=(min(chunksizes[0], global_dims[0]), min(chunksizes[1], global_dims[1]))
+    else:
+        chunksizes = None
 
     if new:
         if os.path.exists(ncfile): os.remove(ncfile)
@@ -127,7 +122,10 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
                     if att in ['_FillValue']: continue
                     var.setncattr(att, nc_projection[v]['attributes'][att])
     else:
-        nc = Dataset(ncfile, 'a', format=format)
+        if nc_handle is not None:
+            nc = nc_handle
+        else:
+            nc = Dataset(ncfile, 'a', format=format)
         if update_attributes:
             if attributes is not None:
                 for key in attributes.keys():
@@ -152,9 +150,7 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
         ## dataset already in NC file
         ## update existing dataset attributes
         if dataset_attributes is not None:
-            for att in dataset_attributes.keys():
-                if att in ['_FillValue']: continue
-                nc.variables[dataset].setncattr(att, dataset_attributes[att])
+            nc.variables[dataset].setncatts({att: dataset_attributes[att] for att in dataset_attributes if att not in ['_FillValue']})
         if offset is None:
             if replace_nan:
                 tmp = nc.variables[dataset][:]
@@ -181,18 +177,24 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
         else:
             netcdf_least_significant_digit = None if netcdf_compression_least_significant_digit is None else 1 * netcdf_compression_least_significant_digit
 
+        ## get chunking from policy
+        contiguous = False
+        if (chunking) & (chunksizes is None):
+            file_type = nc.getncattr('acolite_file_type') if 'acolite_file_type' in nc.ncattrs() else None
+            policy, chunksizes = ac.output.nc_chunking(global_dims, policy=netcdf_chunking, file=ncfile, file_type=file_type,
+                                                       itemsize=data.dtype.itemsize, compression=netcdf_compression)
+            contiguous = policy == 'contiguous'
+
         var = nc.createVariable(dataset,data.dtype,('y','x'),
                                 fill_value=fillvalue,
                                 zlib=netcdf_compression, complevel=netcdf_compression_level,
                                 least_significant_digit=netcdf_least_significant_digit,
-                                chunksizes=chunksizes)
+                                chunksizes=chunksizes, contiguous=contiguous)
 
         if wavelength is not None: var.setncattr('wavelength', float(wavelength))
         ## set attributes
         if dataset_attributes is not None:
-            for att in dataset_attributes.keys():
-                if att in ['_FillValue']: continue
-                var.setncattr(att, dataset_attributes[att])
+            var.setncatts({att: dataset_attributes[att] for att in dataset_attributes if att not in ['_FillValue']})
 
         ## add grid mapping key if there is projection set
         if pkey is not None: var.setncattr('grid_mapping', pkey)
@@ -201,10 +203,44 @@ def nc_write(ncfile, dataset, data, wavelength=None, global_dims=None,
             if data.dtype in (np.float32, np.float64): var[:] = np.nan
             var[:] = data
         else:
-            if data.dtype in (np.float32, np.float64): var[:] = np.nan
+            ## fill in stripes of the data rows to avoid allocating the full dataset
+            if data.dtype in (np.float32, np.float64):
+                for yi in range(0, global_dims[0], dims[0]):
+                    var[yi:yi+dims[0],:] = np.nan
             var[offset[1]:offset[1]+dims[0],offset[0]:offset[0]+dims[1]] = data
     if keep is not True: data = None
 
-    ## close netcdf file
-    nc.close()
+    ## close netcdf file unless it was opened by the caller
+    ## otherwise drop the chunk cache of this dataset, which is kept for every written dataset while the file is open
+    if nc_handle is None:
+        nc.close()
+    else:
+        nc.variables[dataset].set_var_chunk_cache(size=0)
     nc=None
+
+## find default attributes for dataset in the parameter attributes
+## lookup is cached since the attributes list is scanned for every write
+def nc_write_attributes(dataset):
+    atts = _nc_write_attributes(dataset)
+    if atts is None: return(None)
+    return({t:atts[t] for t in atts})
+
+from functools import lru_cache
+@lru_cache(maxsize=None)
+def _nc_write_attributes(dataset):
+    import re
+    import acolite as ac
+    atts = None
+    for p in ac.param['attributes']:
+        if p['parameter'] == dataset: atts = {t:p[t] for t in p}
+    if atts is None:
+        for p in ac.param['attributes']:
+            if re.match(p['parameter'], dataset):
+                atts = {t:p[t] for t in p}
+                if p['parameter'][0:2] != 'bt':
+                    try:
+                        wave = int(dataset.split('_')[-1])
+                        atts['wavelength'] = wave
+                    except:
+                        pass
+    return(atts)
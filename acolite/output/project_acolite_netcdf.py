@@ -4,6 +4,8 @@
 ## 2022-01-04
 ## modifications: 2022-01-05 (QV) acolite function, changed handling provided x and y ranges
 ##                2022-01-10 (QV) renamed from reproject_acolite_netcdf
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) list virtual geolocation datasets
 
 def project_acolite_netcdf(ncf, output = None, settings = {}, target_file=None):
 
@@ -27,7 +29,7 @@ def project_acolite_netcdf(ncf, output = None, settings = {}, target_file=None):
         return()
 
     ## read datasets
-    datasets = ac.shared.nc_datasets(ncf)
+    datasets = ac.shared.nc_datasets(ncf, virtual=True)
     if ('lat' not in datasets) or ('lon' not in datasets):
         print('No lat/lon found in file {}'.format(ncf))
         return()
@@ -183,6 +185,7 @@ def project_acolite_netcdf(ncf, output = None, settings = {}, target_file=None):
 
         ac.output.nc_write(ncfo, ds, data_out, attributes = gatts_out,
                            netcdf_compression=setu['netcdf_compression'],
+                           netcdf_chunking=setu['netcdf_chunking'],
                            netcdf_compression_level=setu['netcdf_compression_level'],
                            netcdf_compression_least_significant_digit=lsd,
                            nc_projection = nc_projection,
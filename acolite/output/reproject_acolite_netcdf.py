@@ -2,7 +2,7 @@
 ## reprojects projected ACOLITE NetCDF data to a defined projection and extent
 ## written by Quinten Vanhellemont, RBINS
 ## 2022-01-10
-## modifications:
+## modifications: 2026-10-18 (AD) added netcdf_chunking
 
 def reproject_acolite_netcdf(ncf, dct, ncfo=None, output=None, settings = {},
                             targetAlignedPixels = False, warp_alg = 'bilinear'):
@@ -114,6 +114,7 @@ def reproject_acolite_netcdf(ncf, dct, ncfo=None, output=None, settings = {},
 
         ac.output.nc_write(ncfo, dsname, data, attributes = gatts,
                            netcdf_compression=setu['netcdf_compression'],
+                           netcdf_chunking=setu['netcdf_chunking'],
                            netcdf_compression_level=setu['netcdf_compression_level'],
                            netcdf_compression_least_significant_digit=lsd,
                            nc_projection = nc_projection,
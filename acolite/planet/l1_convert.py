@@ -6,6 +6,9 @@
 ##                2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
 ##                2022-02-21 (QV) added Skysat
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads
+##                2026-10-18 (AD) added output_geolocation_virtual and output_geolocation_float32
 
 def l1_convert(inputfile, output = None, settings = {},
 
@@ -263,6 +266,10 @@ def l1_convert(inputfile, output = None, settings = {},
         else:
             nc_projection = None
 
+        ## virtual geolocation, lon and lat are computed from the projection when read
+        geolocation_virtual = (output_geolocation) & (setu['output_geolocation_virtual']) & (nc_projection is not None)
+        if geolocation_virtual: gatts['geolocation_virtual'] = 1
+
         ## save projection keys in gatts
         pkeys = ['xrange', 'yrange', 'proj4_string', 'pixel_size', 'zone']
         for k in pkeys:
@@ -294,7 +301,7 @@ def l1_convert(inputfile, output = None, settings = {},
             clip_mask = clip_mask.astype(bool) == False
 
         ## write lat/lon
-        if (output_geolocation):
+        if (output_geolocation) & (not geolocation_virtual):
             if (os.path.exists(ofile) & (not new)):
                 datasets = ac.shared.nc_datasets(ofile)
             else:
@@ -302,13 +309,15 @@ def l1_convert(inputfile, output = None, settings = {},
             if ('lat' not in datasets) or ('lon' not in datasets):
                 if verbosity > 1: print('Writing geolocation lon/lat')
                 lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
-                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True, nc_projection=nc_projection,
+                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=not setu['output_geolocation_float32'], nc_projection=nc_projection,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 if verbosity > 1: print('Wrote lon')
-                ac.output.nc_write(ofile, 'lat', lat, double=True,
+                ac.output.nc_write(ofile, 'lat', lat, double=not setu['output_geolocation_float32'],
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 if verbosity > 1: print('Wrote lat')
@@ -325,19 +334,22 @@ def l1_convert(inputfile, output = None, settings = {},
                 x, y = ac.shared.projection_geo(dct_prj, xy=True, add_half_pixel=True)
                 ac.output.nc_write(ofile, 'x', x, new=new,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 x = None
                 if verbosity > 1: print('Wrote x')
                 ac.output.nc_write(ofile, 'y', y,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 y = None
                 if verbosity > 1: print('Wrote y')
                 new=False
 
         ## convert bands
-        for b in rsr_bands:
-            if b in ['PAN']: continue
+        ## read and convert band b, run in the read threads
+        def band_read(b):
+            if b in ['PAN']: return(None)
             idx = int(meta['{}-band_idx'.format(b)])
 
             ## read data
@@ -390,15 +402,25 @@ def l1_convert(inputfile, output = None, settings = {},
                 ds_att['percentiles'] = percentiles
                 ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
 
+            return(ds, data, ds_att)
+
+        ## write band b, run in this thread
+        def band_write(b, band):
+            nonlocal new
+            ds, data, ds_att = band
             ## write to netcdf file
             ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts,
                                 new=new, dataset_attributes = ds_att, nc_projection=nc_projection,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             new = False
             if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
 
+        ac.shared.read_bands(rsr_bands, band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
+
         if verbosity > 1:
             print('Conversion took {:.1f} seconds'.format(time.time()-t0))
             print('Created {}'.format(ofile))
@@ -4,6 +4,9 @@
 ## 2021-02-24
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads, pan band now scaled with the pan band metadata
+##                2026-10-18 (AD) tiles are read concurrently and written to their window of the full size datasets
 
 def l1_convert(inputfile, output = None, settings = {},
                 limit = None, sub = None,
@@ -174,138 +177,149 @@ def l1_convert(inputfile, output = None, settings = {},
                 lon, lat = ac.pleiades.geo.ll(meta, sub=sub)
                 ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 if verbosity > 1: print('Wrote lon')
                 ac.output.nc_write(ofile, 'lat', lat, double=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 if verbosity > 1: print('Wrote lat')
                 new = False
 
-        ## run through image tiles
-        t = time.process_time()
-        tile_id = 0
-        tile_dims = meta['tiles_nrows'], meta['tiles_ncols']
+        ## pan dimensions
+        if (pmeta is not None) & (not skip_pan):
+            if sub is None:
+                pansub = None
+                pandims = int(pmeta['NROWS']), int(pmeta['NCOLS'])
+            else:
+                pandims = pansub[3], pansub[2]
 
+        ## find image tiles
+        tile_dims = meta['tiles_nrows'], meta['tiles_ncols']
+        tiles = []
         for r_tile in range(meta['ntiles_R']):
             for c_tile in range(meta['ntiles_C']):
-                tile_id+=1
                 tile_name = 'R{}C{}'.format(r_tile+1,c_tile+1)
-                print(tile_id, tile_name)
-
-                ## tile offsets
-                tile_row_off = r_tile * tile_dims[0]
-                tile_col_off = c_tile * tile_dims[1]
-
-                ifile = None
+                ifile, pifile = None, None
                 for it,tfile in enumerate(ifiles):
                     if tile_name not in tfile: continue
                     ifile=ifiles[it]
-                    mfile=mfiles[it]
                     pifile=pifiles[it]
-                    pmfile=pmfiles[it]
-
-                print('Reading: {}'.format(ifile))
-
-                ## read in TOA reflectances
-                for b in rsr_bands:
-                    pan = False
-                    if btags[b] in meta['BAND_INFO']:
-                        bd = {k:meta['BAND_INFO'][btags[b]][k] for k in meta['BAND_INFO'][btags[b]]}
-                        idx = 1+bd['band_index']
-                        ## read data
-                        data = ac.shared.read_band(ifile, idx=idx, sub=sub)
-                    else:
-                        if pmeta is None: continue
-                        if skip_pan: continue
-                        pan = True
-                        if sub is None:
-                            pansub = None
-                            pandims = int(pmeta['NROWS']), int(pmeta['NCOLS'])
-                        else:
-                            pandims = pansub[3], pansub[2]
-                        ## read data
-                        data = ac.shared.read_band(pifile, idx=1, sub=pansub)
-                        print(data.shape)
-                        print(pmeta)
-
-                    nodata = data == np.uint16(meta['NODATA'])
-                    print(idx, b, btags[b])
-                    data = data.astype(np.float32)
-                    if (meta['RADIOMETRIC_PROCESSING'] == 'RADIANCE') | (meta['RADIOMETRIC_PROCESSING'] == 'BASIC'):
-                        #data *= (1./meta['BAND_INFO'][btags[b]]['radiance_gain'])
-                        #data += (meta['BAND_INFO'][btags[b]]['radiance_bias'])
-                        #data *= (np.pi * gatts['se_distance']**2) / (meta['BAND_INFO'][btags[b]]['F0'] * gatts['mus'])
-                        data *= (1./bd['radiance_gain'])
-                        data += (bd['radiance_bias'])
-                        data *= (np.pi * gatts['se_distance']**2) / (bd['F0'] * gatts['mus'])
-                    elif (meta['RADIOMETRIC_PROCESSING'] == 'LINEAR_STRETCH'):
-                        print('Warning linear stretch data')
-                        #data *= (1./meta['BAND_INFO'][btags[b]]['radiance_gain'])
-                        #data += (meta['BAND_INFO'][btags[b]]['radiance_bias'])
-                        #data *= (np.pi * gatts['se_distance']**2) / (meta['BAND_INFO'][btags[b]]['F0'] * gatts['mus'])
-                        data *= (1./bd['radiance_gain'])
-                        data += (bd['radiance_bias'])
-                        data *= (np.pi * gatts['se_distance']**2) / (bd['F0'] * gatts['mus'])
-                    elif (meta['RADIOMETRIC_PROCESSING'] == 'REFLECTANCE'):
-                        #data /= meta['BAND_INFO'][btags[b]]['reflectance_gain']
-                        #data += meta['BAND_INFO'][btags[b]]['reflectance_bias']
-                        data /= bd['reflectance_gain']
-                        data += bd['reflectance_bias']
-                        data /= gatts['mus']
-                    else:
-                        print("{} RADIOMETRIC_PROCESSING not recognised".format(metadata['RADIOMETRIC_PROCESSING']))
-                        continue
-
-                    data[nodata] = np.nan
-
-                    ds = 'rhot_{}'.format(waves_names[b])
-                    ds_att = {'wavelength':waves_mu[b]*1000}
-                    if percentiles_compute:
-                        ds_att['percentiles'] = percentiles
-                        ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
-
-                    if pan:
-                        cur_shape = data.shape
-                        data_full = np.zeros(pandims)+np.nan
-                        data_full[tile_row_off*4:tile_row_off*4+cur_shape[0],
-                                  tile_col_off*4:tile_col_off*4+cur_shape[1]] = data
-                        ## write to netcdf file
-                        ac.output.nc_write(pofile, ds, data_full, replace_nan=True, attributes=gatts,
-                                            new=new_pan, dataset_attributes = ds_att,
-                                            netcdf_compression=setu['netcdf_compression'],
-                                            netcdf_compression_level=setu['netcdf_compression_level'],
-                                            netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                        data_full = None
-                        new_pan = False
-
-                        ## mask data before zooming
-                        dmin = np.nanmin(data)
-                        data[np.isnan(data)] = 0
-                        data = scipy.ndimage.zoom(data, 0.25)
-                        data[data<dmin] = np.nan
-                        data[data==dmin] = np.nan
-
-                    cur_shape = data.shape
-                    data_full = np.zeros(dims)+np.nan
-                    data_full[tile_row_off:tile_row_off+cur_shape[0],
-                              tile_col_off:tile_col_off+cur_shape[1]] = data
-                    data = None
-
-                    ## write to netcdf file
-                    ac.output.nc_write(ofile, ds, data_full, replace_nan=True, attributes=gatts, new=new, dataset_attributes = ds_att,
-                                        netcdf_compression=setu['netcdf_compression'],
-                                        netcdf_compression_level=setu['netcdf_compression_level'],
-                                        netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                    new = False
-                    if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data_full.shape))
-
-            if verbosity > 1:
-                print('Conversion took {:.1f} seconds'.format(time.time()-t0))
-                print('Created {}'.format(ofile))
-
-            if ofile not in ofiles: ofiles.append(ofile)
+                if ifile is None:
+                    print('Tile {} not found'.format(tile_name))
+                    continue
+                ## tile offsets
+                tiles.append({'name': tile_name, 'ifile': ifile, 'pifile': pifile,
+                              'row_off': r_tile * tile_dims[0], 'col_off': c_tile * tile_dims[1]})
+
+        ## read in TOA reflectances
+        ## read and convert band b of tile ti, run in the read threads
+        def band_read(tb):
+            ti, b = tb
+            tile = tiles[ti]
+            pan = False
+            if btags[b] in meta['BAND_INFO']:
+                bd = {k:meta['BAND_INFO'][btags[b]][k] for k in meta['BAND_INFO'][btags[b]]}
+                idx = 1+bd['band_index']
+                ## read data
+                if verbosity > 2: print('Reading {} from {}'.format(b, tile['ifile']))
+                data = ac.shared.read_band(tile['ifile'], idx=idx, sub=sub)
+            else:
+                if pmeta is None: return(None)
+                if skip_pan: return(None)
+                pan = True
+                bd = {k:pmeta['BAND_INFO'][btags[b]][k] for k in pmeta['BAND_INFO'][btags[b]]}
+                idx = 1
+                ## read data
+                if verbosity > 2: print('Reading {} from {}'.format(b, tile['pifile']))
+                data = ac.shared.read_band(tile['pifile'], idx=idx, sub=pansub)
+
+            nodata = data == np.uint16(meta['NODATA'])
+            data = data.astype(np.float32)
+            if (meta['RADIOMETRIC_PROCESSING'] == 'RADIANCE') | (meta['RADIOMETRIC_PROCESSING'] == 'BASIC'):
+                #data *= (1./meta['BAND_INFO'][btags[b]]['radiance_gain'])
+                #data += (meta['BAND_INFO'][btags[b]]['radiance_bias'])
+                #data *= (np.pi * gatts['se_distance']**2) / (meta['BAND_INFO'][btags[b]]['F0'] * gatts['mus'])
+                data *= (1./bd['radiance_gain'])
+                data += (bd['radiance_bias'])
+                data *= (np.pi * gatts['se_distance']**2) / (bd['F0'] * gatts['mus'])
+            elif (meta['RADIOMETRIC_PROCESSING'] == 'LINEAR_STRETCH'):
+                print('Warning linear stretch data')
+                #data *= (1./meta['BAND_INFO'][btags[b]]['radiance_gain'])
+                #data += (meta['BAND_INFO'][btags[b]]['radiance_bias'])
+                #data *= (np.pi * gatts['se_distance']**2) / (meta['BAND_INFO'][btags[b]]['F0'] * gatts['mus'])
+                data *= (1./bd['radiance_gain'])
+                data += (bd['radiance_bias'])
+                data *= (np.pi * gatts['se_distance']**2) / (bd['F0'] * gatts['mus'])
+            elif (meta['RADIOMETRIC_PROCESSING'] == 'REFLECTANCE'):
+                #data /= meta['BAND_INFO'][btags[b]]['reflectance_gain']
+                #data += meta['BAND_INFO'][btags[b]]['reflectance_bias']
+                data /= bd['reflectance_gain']
+                data += bd['reflectance_bias']
+                data /= gatts['mus']
+            else:
+                print("{} RADIOMETRIC_PROCESSING not recognised".format(meta['RADIOMETRIC_PROCESSING']))
+                return(None)
+
+            data[nodata] = np.nan
+
+            ds = 'rhot_{}'.format(waves_names[b])
+            ds_att = {'wavelength':waves_mu[b]*1000}
+            if percentiles_compute:
+                ds_att['percentiles'] = percentiles
+                ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
+
+            data_pan = None
+            if pan:
+                data_pan = data
+                ## mask data before zooming the tile to the multispectral resolution
+                dmin = np.nanmin(data_pan)
+                data = np.where(np.isnan(data_pan), 0, data_pan)
+                data = scipy.ndimage.zoom(data, 0.25)
+                data[data<dmin] = np.nan
+                data[data==dmin] = np.nan
+            return(ds, data, ds_att, data_pan)
+
+        ## write tile window of dataset, the dataset is created at full size on the first write
+        ## returns False if the tile is outside the output dimensions
+        def tile_write(ncfile, ds, data, row_off, col_off, global_dims, new, ds_att):
+            nrows = min(data.shape[0], global_dims[0]-row_off)
+            ncols = min(data.shape[1], global_dims[1]-col_off)
+            if (nrows <= 0) or (ncols <= 0): return(False)
+            ac.output.nc_write(ncfile, ds, data[0:nrows, 0:ncols], offset=[col_off, row_off], global_dims=global_dims,
+                                replace_nan=True, attributes=gatts, new=new, dataset_attributes = ds_att,
+                                netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
+                                netcdf_compression_level=setu['netcdf_compression_level'],
+                                netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+            return(True)
+
+        ## write band b of tile ti, run in this thread
+        def band_write(tb, band):
+            nonlocal new, new_pan
+            ti, b = tb
+            tile = tiles[ti]
+            ds, data, ds_att, data_pan = band
+            if data_pan is not None:
+                if tile_write(pofile, ds, data_pan, tile['row_off']*4, tile['col_off']*4, pandims, new_pan, ds_att):
+                    new_pan = False
+
+            if tile_write(ofile, ds, data, tile['row_off'], tile['col_off'], dims, new, ds_att):
+                new = False
+                if verbosity > 1: print('Converting bands: Wrote {} tile {} ({})'.format(ds, tile['name'], data.shape))
+
+        ## read tiles and bands in the read threads
+        t = time.process_time()
+        ac.shared.read_bands([(ti, b) for ti in range(len(tiles)) for b in rsr_bands], band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
+
+        if verbosity > 1:
+            print('Conversion took {:.1f} seconds'.format(time.time()-t0))
+            print('Created {}'.format(ofile))
+
+        if ofile not in ofiles: ofiles.append(ofile)
 
     return(ofiles, setu)
@@ -5,6 +5,7 @@
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
 ##                2022-02-23 (QV) added option to output L2C reflectances
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
     import numpy as np
@@ -165,16 +166,16 @@ def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
         gatts['band_widths'] = [bands[w]['width'] for w in bands]
 
         ac.output.nc_write(ofile, 'lat', np.flip(np.rot90(lat)), new=True, attributes=gatts,
-                            netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                            netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
         ac.output.nc_write(ofile, 'lon', np.flip(np.rot90(lon)),
-                            netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                            netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
         if os.path.exists(l2file):
             ac.output.nc_write(ofile, 'sza', np.flip(np.rot90(sza)),
-                                netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                                netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
             ac.output.nc_write(ofile, 'vza', np.flip(np.rot90(vza)),
-                                netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                                netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
             ac.output.nc_write(ofile, 'raa', np.flip(np.rot90(raa)),
-                                netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                                netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
 
         ## store l2c data
         store_l2c = setu['prisma_store_l2c']
@@ -184,9 +185,9 @@ def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
                 obase_l2c  = '{}_{}_converted_L2C'.format('PRISMA',  time.strftime('%Y_%m_%d_%H_%M_%S'))
                 ofile_l2c = '{}/{}.nc'.format(odir, obase_l2c)
                 ac.output.nc_write(ofile_l2c, 'lat', np.flip(np.rot90(lat)), new=True, attributes=gatts,
-                                    netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                                    netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
                 ac.output.nc_write(ofile_l2c, 'lon', np.flip(np.rot90(lon)),
-                                    netcdf_compression=setu['netcdf_compression'], netcdf_compression_level=setu['netcdf_compression_level'])
+                                    netcdf_compression=setu['netcdf_compression'], netcdf_chunking=setu['netcdf_chunking'], netcdf_compression_level=setu['netcdf_compression_level'])
             else:
                 ofile_l2c = '{}'.format(ofile)
 
@@ -235,6 +236,7 @@ def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
                 ac.output.nc_write(ofile, 'Lt_{}'.format(bands[b]['wave_name']), np.flip(np.rot90(cdata_radiance)),
                               dataset_attributes = ds_att,
                               netcdf_compression=setu['netcdf_compression'],
+                              netcdf_chunking=setu['netcdf_chunking'],
                               netcdf_compression_level=setu['netcdf_compression_level'],
                               netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 cdata_radiance = None
@@ -243,6 +245,7 @@ def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
             ac.output.nc_write(ofile, 'rhot_{}'.format(bands[b]['wave_name']), np.flip(np.rot90(cdata)),
                               dataset_attributes = ds_att,
                               netcdf_compression=setu['netcdf_compression'],
+                              netcdf_chunking=setu['netcdf_chunking'],
                               netcdf_compression_level=setu['netcdf_compression_level'],
                               netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             cdata = None
@@ -253,6 +256,7 @@ def l1_convert(inputfile, output=None, settings = {}, verbosity=0):
                 ac.output.nc_write(ofile_l2c, 'rhos_l2c_{}'.format(bands[b]['wave_name']), np.flip(np.rot90(cdata_l2c)),
                                   dataset_attributes = ds_att,
                                   netcdf_compression=setu['netcdf_compression'],
+                                  netcdf_chunking=setu['netcdf_chunking'],
                                   netcdf_compression_level=setu['netcdf_compression_level'],
                                   netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 ofile_l2c_new = False
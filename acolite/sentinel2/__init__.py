@@ -1,6 +1,8 @@
 from .grid_geom import *
 from .grid_extend import *
 from .detector_footprint import *
+from .detector_geometry import *
+from .geometry_index import *
 
 from .safe_test import *
 
@@ -0,0 +1,46 @@
+## def detector_geometry
+## interpolates per detector view geometry grids over the detector footprint label image
+## the bounding window of each detector is found in a single pass over the label image
+## and the detector grids are only interpolated over their own window
+##
+## dfoo: detector footprint label image at the geometry resolution
+## grids: dict with for each detector value a dict of extended 5 km grids, e.g. {bv: {'vza': vza, 'vaa': vaa}}
+## xnew, ynew: grid positions of the dfoo columns and rows
+## window: optional (row0, row1, col0, col1) window of dfoo to be computed, default is the full dfoo
+##
+## returns a dict with the datasets in grids at the window size, nan outside of the footprints
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def detector_geometry(dfoo, grids, xnew, ynew, window=None, dtype='float32'):
+    import numpy as np
+    import scipy.ndimage
+    import acolite as ac
+
+    if window is None: window = 0, dfoo.shape[0], 0, dfoo.shape[1]
+    r0, r1, c0, c1 = window
+    labels = dfoo[r0:r1, c0:c1].astype(np.int32)
+
+    datasets = []
+    for bv in grids:
+        for ds in grids[bv]:
+            if ds not in datasets: datasets.append(ds)
+    out = {ds: np.zeros(labels.shape, dtype=dtype)+np.nan for ds in datasets}
+
+    ## bounding slices of each detector in the label image
+    objects = scipy.ndimage.find_objects(labels)
+    for bv in grids:
+        bv = int(bv)
+        if (bv <= 0) or (bv > len(objects)): continue
+        if objects[bv-1] is None: continue
+        sr, sc = objects[bv-1]
+        det_mask = labels[sr, sc] == bv
+        ret = ac.shared.tiles_interp({ds: grids[bv][ds] for ds in grids[bv]},
+                                     xnew[c0+sc.start:c0+sc.stop], ynew[r0+sr.start:r0+sr.stop],
+                                     smooth=False, fill_nan=True, target_mask=det_mask,
+                                     target_mask_full=False, method='linear', dtype=dtype)
+        for ds in ret:
+            out[ds][sr, sc][det_mask] = ret[ds]
+    return(out)
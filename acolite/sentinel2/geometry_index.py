@@ -0,0 +1,61 @@
+## def geometry_index
+## maps the pixels of the target grid onto the geometry grid
+## when the target pixels are aligned with the geometry pixels and the geometry pixel size is a multiple
+## of the target pixel size every target pixel falls in a single geometry pixel, and the average
+## warp of the geometry data to the target grid is a selection of geometry pixels
+##
+## returns None when the grids are not aligned, otherwise a dict with the geometry
+## rows and cols for each target row and column, and the window of the geometry grid
+## covering the target grid as (row0, row1, col0, col1)
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def geometry_index(dct_geom, dct_prj, tolerance=1e-6):
+    import numpy as np
+
+    if dct_geom['proj4_string'] != dct_prj['proj4_string']: return(None)
+
+    idx = {}
+    for ax, rng in [(0, 'xrange'), (1, 'yrange')]:
+        gs, ts = abs(dct_geom['pixel_size'][ax]), abs(dct_prj['pixel_size'][ax])
+        ## geometry pixel size needs to be a multiple of the target pixel size
+        ratio = gs/ts
+        if abs(ratio-round(ratio)) > tolerance: return(None)
+        ratio = int(round(ratio))
+
+        ## target grid needs to start on a target pixel edge of the geometry grid
+        if ax == 0:
+            off = (min(dct_prj[rng])-min(dct_geom[rng]))/ts
+        else:
+            off = (max(dct_geom[rng])-max(dct_prj[rng]))/ts
+        if abs(off-round(off)) > tolerance: return(None)
+        off = int(round(off))
+
+        ## target dimensions as in the warp to the target bounds
+        n = int(round((max(dct_prj[rng])-min(dct_prj[rng]))/ts))
+        idx['cols' if ax == 0 else 'rows'] = (off + np.arange(n))//ratio
+        idx['ncols' if ax == 0 else 'nrows'] = int(round((max(dct_geom[rng])-min(dct_geom[rng]))/gs))
+
+    ## window of the geometry grid covering the target grid
+    rows = idx['rows'][(idx['rows'] >= 0) & (idx['rows'] < idx['nrows'])]
+    cols = idx['cols'][(idx['cols'] >= 0) & (idx['cols'] < idx['ncols'])]
+    if (len(rows) == 0) or (len(cols) == 0): return(None)
+    idx['window'] = int(rows.min()), int(rows.max())+1, int(cols.min()), int(cols.max())+1
+    return(idx)
+
+## select the geometry data for the target grid
+## data is the geometry data over the geometry index window
+## target pixels outside the geometry grid are set to 0 as in the warp
+def geometry_index_apply(data, idx, dtype='float32'):
+    import numpy as np
+
+    r0, r1, c0, c1 = idx['window']
+    rows, cols = idx['rows']-r0, idx['cols']-c0
+    vr = (rows >= 0) & (rows < r1-r0)
+    vc = (cols >= 0) & (cols < c1-c0)
+
+    out = np.zeros((len(rows), len(cols)), dtype=dtype)
+    out[np.ix_(vr, vc)] = data[np.ix_(rows[vr], cols[vc])]
+    return(out)
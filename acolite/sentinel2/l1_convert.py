@@ -6,6 +6,12 @@
 #                 2021-10-14 (QV) fixed band specific footprints for band specific geometry for PB004
 ##                2021-12-08 (QV) added nc_projection
 ##                2021-12-31 (QV) new handling of settings
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads
+##                2026-10-18 (AD) detector footprints rasterised once per granule, detector geometry interpolated per detector window
+##                                geometry selected on the output grid without warping when the grids are aligned
+##                2026-10-18 (AD) added output_geolocation_virtual and output_geolocation_float32
+##                2026-10-18 (AD) auxiliary data interpolated on its regular grid in blocks of rows
 
 def l1_convert(inputfile, output = None, settings = {},
                 percentiles_compute = True,
@@ -282,6 +288,10 @@ def l1_convert(inputfile, output = None, settings = {},
         else:
             nc_projection = None
 
+        ## virtual geolocation, lon and lat are computed from the projection when read
+        geolocation_virtual = (output_geolocation) & (setu['output_geolocation_virtual']) & (nc_projection is not None)
+        if geolocation_virtual: gatts['geolocation_virtual'] = 1
+
         ## save projection keys in gatts
         pkeys = ['xrange', 'yrange', 'proj4_string', 'pixel_size', 'zone']
         for k in pkeys:
@@ -345,44 +355,63 @@ def l1_convert(inputfile, output = None, settings = {},
                 g = None
                 xnew = np.linspace(0, grmeta['VIEW']['Average_View_Zenith'].shape[1]-1, int(xSrc))
                 ynew = np.linspace(0, grmeta['VIEW']['Average_View_Zenith'].shape[0]-1, int(ySrc))
-                sza = ac.shared.tiles_interp(grmeta['SUN']['Zenith'], xnew, ynew, smooth=False, method='linear')
-                saa = ac.shared.tiles_interp(grmeta['SUN']['Azimuth'], xnew, ynew, smooth=False, method='linear')
+
+                ## map the output grid onto the geometry grid
+                ## if aligned only the geometry window covering the output is computed and no warping is needed
+                geom_idx = ac.sentinel2.geometry_index(dct_geom, dct_prj)
+                if geom_idx is None:
+                    geom_win = 0, int(ySrc), 0, int(xSrc)
+                else:
+                    geom_win = geom_idx['window']
+                xwin = xnew[geom_win[2]:geom_win[3]]
+                ywin = ynew[geom_win[0]:geom_win[1]]
+                sza = ac.shared.tiles_interp(grmeta['SUN']['Zenith'], xwin, ywin, smooth=False, method='linear')
+                saa = ac.shared.tiles_interp(grmeta['SUN']['Azimuth'], xwin, ywin, smooth=False, method='linear')
 
                 ## default s2 5x5 km grids
                 if geometry_type == 'grids':
                     #xnew = np.linspace(0, grmeta['VIEW']['Average_View_Zenith'].shape[1]-1, int(global_dims[1]))
                     #ynew = np.linspace(0, grmeta['VIEW']['Average_View_Zenith'].shape[0]-1, int(global_dims[0]))
-                    vza = ac.shared.tiles_interp(grmeta['VIEW']['Average_View_Zenith'], xnew, ynew, smooth=False, method='nearest')
-                    vaa = ac.shared.tiles_interp(grmeta['VIEW']['Average_View_Azimuth'], xnew, ynew, smooth=False, method='nearest')
+                    vza = ac.shared.tiles_interp(grmeta['VIEW']['Average_View_Zenith'], xwin, ywin, smooth=False, method='nearest')
+                    vaa = ac.shared.tiles_interp(grmeta['VIEW']['Average_View_Azimuth'], xwin, ywin, smooth=False, method='nearest')
+
+                ## detector footprints rasterised once at the geometry resolution
+                footprints = {}
+                def footprint(files):
+                    files.sort()
+                    gml = [f for f in files if f.endswith('.gml')]
+                    jp2 = [f for f in files if f.endswith('.jp2')]
+                    if len(gml) > 0:
+                        file = gml[0]
+                    elif len(jp2) > 0:
+                        file = jp2[0]
+                    else:
+                        return(None)
+                    if file not in footprints:
+                        if file.endswith('.gml'):
+                            dval, dfoo = ac.sentinel2.detector_footprint(target_file, file)
+                        else:
+                            dfoo = ac.shared.read_band(file, warp_to=warp_to_geom)
+                            dval = np.unique(dfoo)
+                        footprints[file] = dval, dfoo
+                    return(footprints[file])
 
                 ## use s2 5x5 km grids with detector footprint interpolation
                 if geometry_type == 'grids_footprint':
-                    ## compute vza and saa
-                    gml_files = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.gml'.format(bundle, granule))
-                    gml_files.sort()
-
-                    jp2_files = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.jp2'.format(bundle, granule))
-                    jp2_files.sort()
-
                     ## get detector footprint for 10/20/60 m band
-                    if len(gml_files) > 0:
-                        dval, dfoo = ac.sentinel2.detector_footprint(target_file, gml_files[0])
-                    elif len(jp2_files) > 0:
-                        dfoo = ac.shared.read_band(jp2_files[0], warp_to=warp_to_geom)
-                        dval = np.unique(dfoo)
-                    else:
+                    ret = footprint(glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.gml'.format(bundle, granule)) + \
+                                    glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.jp2'.format(bundle, granule)))
+                    if ret is None:
                         print('No footprint files found')
                         continue
+                    dval, dfoo = ret
 
                     #bands = list(grmeta['VIEW_DET'].keys())
                     #bands.sort()
                     bands = [str(bi) for bi, b in enumerate(rsr_bands)]
 
-                    ## set vza and vaa size to geometry res target size
-                    vza = np.zeros((int(dfoo.shape[0]), int(dfoo.shape[1])))+np.nan
-                    vaa = np.zeros((int(dfoo.shape[0]), int(dfoo.shape[1])))+np.nan
-
                     if verbosity>1:print('Computing band average per detector geometry')
+                    det_grids = {}
                     for nf, bv in enumerate(dval):
                         if bv == 0: continue ## fill value in new format
                         ## compute detector average geometry
@@ -400,21 +429,27 @@ def l1_convert(inputfile, output = None, settings = {},
                                 ave_vaa = np.dstack((ave_vaa, baa))
                         ave_vza = np.nanmean(ave_vza, axis=2)
                         ave_vaa = np.nanmean(ave_vaa, axis=2)
+                        det_grids[bv] = {'vza': ave_vza, 'vaa': ave_vaa}
                         ## end compute detector average geometry
-                        ## interpolate grids to current detector
-                        det_mask = dfoo==bv
-                        ## add +1 to xnew and ynew since we are not cropping the extended grid
-                        vza[det_mask] = ac.shared.tiles_interp(ave_vza, xnew+1, ynew+1, smooth=False, fill_nan=True,
-                                                      target_mask = det_mask, target_mask_full=False, method='linear')
-                        vaa[det_mask] = ac.shared.tiles_interp(ave_vaa, xnew+1, ynew+1, smooth=False, fill_nan=True,
-                                                      target_mask = det_mask, target_mask_full=False, method='linear')
+
+                    ## interpolate grids to each detector over its own window of the footprint
+                    ## add +1 to xnew and ynew since we are not cropping the extended grid
+                    ret = ac.sentinel2.detector_geometry(dfoo, det_grids, xnew+1, ynew+1, window=geom_win)
+                    vza, vaa = ret['vza'], ret['vaa']
+                    ret, det_grids = None, None
 
                 ## use target band so we can just do the 60 metres geometry
                 if os.path.exists(target_file):
-                    sza = ac.shared.warp_from_source(target_file, dct_prj, sza, warp_to=warp_to) # alt (dct, dct_prj, sza)
-                    saa = ac.shared.warp_from_source(target_file, dct_prj, saa, warp_to=warp_to)
-                    vza = ac.shared.warp_from_source(target_file, dct_prj, vza, warp_to=warp_to)
-                    vaa = ac.shared.warp_from_source(target_file, dct_prj, vaa, warp_to=warp_to)
+                    if geom_idx is None:
+                        sza = ac.shared.warp_from_source(target_file, dct_prj, sza, warp_to=warp_to) # alt (dct, dct_prj, sza)
+                        saa = ac.shared.warp_from_source(target_file, dct_prj, saa, warp_to=warp_to)
+                        vza = ac.shared.warp_from_source(target_file, dct_prj, vza, warp_to=warp_to)
+                        vaa = ac.shared.warp_from_source(target_file, dct_prj, vaa, warp_to=warp_to)
+                    else:
+                        sza = ac.sentinel2.geometry_index_apply(sza, geom_idx)
+                        saa = ac.sentinel2.geometry_index_apply(saa, geom_idx)
+                        vza = ac.sentinel2.geometry_index_apply(vza, geom_idx)
+                        vaa = ac.sentinel2.geometry_index_apply(vaa, geom_idx)
                     mask = (vaa == 0) * (vza == 0) * (saa == 0) * (sza == 0)
                 else:
                     print('Could not access {}'.format(target_file))
@@ -424,26 +459,15 @@ def l1_convert(inputfile, output = None, settings = {},
                 ## compute band specific geometry
                 if geometry_per_band:
                     print('Computing band specific per detector geometry')
-                    vza_all = np.zeros((int(dfoo.shape[0]), int(dfoo.shape[1]), len(bands)))+np.nan
-                    vaa_all = np.zeros((int(dfoo.shape[0]), int(dfoo.shape[1]), len(bands)))+np.nan
-
-                    grid_shape = grmeta['VIEW']['0']['Zenith'].shape[0]+2, grmeta['VIEW']['0']['Zenith'].shape[1]+2
-                    vza_grid = np.zeros((grid_shape[0], grid_shape[1], len(bands)))+np.nan
-                    vaa_grid = np.zeros((grid_shape[0], grid_shape[1], len(bands)))+np.nan
+                    vza_all = []
+                    vaa_all = []
 
                     ## use footprint from B1
                     if geometry_fixed_footprint:
-                        gml_files = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.gml'.format(bundle, granule))
-                        gml_files.sort()
-                        jp2_files = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.jp2'.format(bundle, granule))
-                        jp2_files.sort()
-
                         ## get detector footprint for 10/20/60 m band
-                        if len(gml_files) > 0:
-                            dval, dfoo = ac.sentinel2.detector_footprint(target_file, gml_files[0])
-                        elif len(jp2_files) > 0:
-                            dfoo = ac.shared.read_band(jp2_files[0], warp_to=warp_to_geom)
-                            dval = np.unique(dfoo)
+                        ret = footprint(glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.gml'.format(bundle, granule)) + \
+                                        glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO*.jp2'.format(bundle, granule)))
+                        if ret is not None: dval, dfoo = ret
 
                     ## compute band specific view geometry
                     for bi, b in enumerate(bands):
@@ -452,19 +476,18 @@ def l1_convert(inputfile, output = None, settings = {},
 
                         ## band specific footprint
                         if not geometry_fixed_footprint:
-                            gml = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO_B{}.gml'.format(bundle, granule, Bn[1:].zfill(2)))
-                            jp2 = glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO_B{}.jp2'.format(bundle, granule, Bn[1:].zfill(2)))
+                            ret = footprint(glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO_B{}.gml'.format(bundle, granule, Bn[1:].zfill(2))) + \
+                                            glob.glob('{}/GRANULE/{}/QI_DATA/*MSK_DETFOO_B{}.jp2'.format(bundle, granule, Bn[1:].zfill(2))))
+                            if ret is not None: dval, dfoo = ret
 
-                            if len(gml) > 0:
-                                dval, dfoo = ac.sentinel2.detector_footprint(target_file, gml[0])
-                            elif len(jp2) > 0:
-                                dfoo = ac.shared.read_band(jp2[0], warp_to=warp_to_geom)
-                                dval = np.unique(dfoo)
+                        grid_shape = grmeta['VIEW']['0']['Zenith'].shape[0]+2, grmeta['VIEW']['0']['Zenith'].shape[1]+2
+                        vza_grid = np.zeros(grid_shape)+np.nan
+                        vaa_grid = np.zeros(grid_shape)+np.nan
 
+                        det_grids = {}
                         for nf, bv in enumerate(dval):
                             if bv == 0: continue ## fill value in new format
-                            print('Computing band specific geometry - {} Detector {}'.format(Bn, bv))
-                            det_mask = dfoo==bv
+                            if verbosity>2: print('Computing band specific geometry - {} Detector {}'.format(Bn, bv))
 
                             bza = grmeta['VIEW_DET'][b]['{}'.format(bv)]['Zenith']
                             baa = grmeta['VIEW_DET'][b]['{}'.format(bv)]['Azimuth']
@@ -472,27 +495,22 @@ def l1_convert(inputfile, output = None, settings = {},
                             baa = ac.sentinel2.grid_extend(baa, iterations=1, crop=False)
 
                             ## add detector to band VZA grid
-                            vza_tmp =  vza_grid[:,:,bi]
                             ang_sub = np.where(np.isfinite(bza))
-                            vza_tmp[ang_sub] = bza[ang_sub]
-                            vza_grid[:,:,bi] = vza_tmp
+                            vza_grid[ang_sub] = bza[ang_sub]
 
                             ## add detector to band VAA grid
-                            vaa_tmp =  vaa_grid[:,:,bi]
                             ang_sub = np.where(np.isfinite(baa))
-                            vaa_tmp[ang_sub] = baa[ang_sub]
-                            vaa_grid[:,:,bi] = vaa_tmp
+                            vaa_grid[ang_sub] = baa[ang_sub]
 
-                            ## add +1 to xnew and ynew since we are not cropping the extended grid
-                            vza_tmp = vza_all[:,:, bi]
-                            vza_tmp[det_mask] = ac.shared.tiles_interp(vza_grid[:,:,bi], xnew+1, ynew+1, smooth=False, fill_nan=True,
-                                                                          target_mask = det_mask, target_mask_full=False, method='linear')
-                            vza_all[:,:, bi] = vza_tmp
+                            ## each detector is interpolated from the band grid including the previous detectors
+                            det_grids[bv] = {'vza': vza_grid*1.0, 'vaa': vaa_grid*1.0}
 
-                            vaa_tmp = vaa_all[:,:, bi]
-                            vaa_tmp[det_mask] = ac.shared.tiles_interp(vaa_grid[:,:,bi], xnew+1, ynew+1, smooth=False, fill_nan=True,
-                                                                          target_mask = det_mask, target_mask_full=False, method='linear')
-                            vaa_all[:,:, bi] = vaa_tmp
+                        ## add +1 to xnew and ynew since we are not cropping the extended grid
+                        ret = ac.sentinel2.detector_geometry(dfoo, det_grids, xnew+1, ynew+1, window=geom_win)
+                        vza_all.append(ret['vza'])
+                        vaa_all.append(ret['vaa'])
+                        ret, det_grids = None, None
+                footprints = None
 
             elif geometry_type == 'gpt': ## use snap gpt to get nicer angles
                 geometry_parameters = ['view_zenith_mean','view_azimuth_mean','sun_zenith','sun_azimuth']
@@ -531,16 +549,19 @@ def l1_convert(inputfile, output = None, settings = {},
             ac.output.nc_write(ofile, 'raa', raa, replace_nan=True,
                                     attributes=gatts, new=new, nc_projection=nc_projection,
                                                 netcdf_compression=setu['netcdf_compression'],
+                                                netcdf_chunking=setu['netcdf_chunking'],
                                                 netcdf_compression_level=setu['netcdf_compression_level'])
             if verbosity > 1: print('Wrote raa {}'.format(raa.shape))
             raa = None
             new = False
             ac.output.nc_write(ofile, 'vza', vza, replace_nan=True,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             if verbosity > 1: print('Wrote vza {}'.format(vza.shape))
             ac.output.nc_write(ofile, 'sza', sza, replace_nan=True,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             if verbosity > 1: print('Wrote sza {}'.format(sza.shape))
             sza = None
@@ -552,13 +573,20 @@ def l1_convert(inputfile, output = None, settings = {},
                     Bn = 'B{}'.format(b)
                     print('Writing view geometry for {} {} nm'.format(Bn, waves_names[b]))
                     ## band specific view zenith angle
-                    vza = ac.shared.warp_from_source(target_file, dct_prj, vza_all[:,:,bi], warp_to=warp_to)
+                    if geom_idx is None:
+                        vza = ac.shared.warp_from_source(target_file, dct_prj, vza_all[bi], warp_to=warp_to)
+                    else:
+                        vza = ac.sentinel2.geometry_index_apply(vza_all[bi], geom_idx)
                     ac.output.nc_write(ofile, 'vza_{}'.format(waves_names[b]), vza, replace_nan=True,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'])
                     vza = None
                     ## band specific view azimuth angle
-                    vaa = ac.shared.warp_from_source(target_file, dct_prj, vaa_all[:,:,bi], warp_to=warp_to)
+                    if geom_idx is None:
+                        vaa = ac.shared.warp_from_source(target_file, dct_prj, vaa_all[bi], warp_to=warp_to)
+                    else:
+                        vaa = ac.sentinel2.geometry_index_apply(vaa_all[bi], geom_idx)
                     #ac.output.nc_write(ofile, 'vaa_{}'.format(waves_names[b]), vaa, replace_nan=True)
                     ## compute relative azimuth angle
                     raa = np.abs(saa-vaa)
@@ -568,6 +596,7 @@ def l1_convert(inputfile, output = None, settings = {},
                     raa[mask] = np.nan
                     ac.output.nc_write(ofile, 'raa_{}'.format(waves_names[b]), raa, replace_nan=True,
                                        netcdf_compression=setu['netcdf_compression'],
+                                       netcdf_chunking=setu['netcdf_chunking'],
                                        netcdf_compression_level=setu['netcdf_compression_level'])
                     raa = None
             ## delete sun azimuth & mask
@@ -575,7 +604,7 @@ def l1_convert(inputfile, output = None, settings = {},
             mask = None
 
         ## write lat/lon
-        if (output_geolocation):
+        if (output_geolocation) & (not geolocation_virtual):
             if (os.path.exists(ofile) & (not new)):
                 datasets = ac.shared.nc_datasets(ofile)
             else:
@@ -584,15 +613,17 @@ def l1_convert(inputfile, output = None, settings = {},
                 if verbosity > 1: print('Writing geolocation lon/lat')
                 lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
                 print(lon.shape)
-                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True,
+                ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=not setu['output_geolocation_float32'],
                                     nc_projection=nc_projection,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 if verbosity > 1: print('Wrote lon')
                 print(lat.shape)
-                ac.output.nc_write(ofile, 'lat', lat, double=True,
+                ac.output.nc_write(ofile, 'lat', lat, double=not setu['output_geolocation_float32'],
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 if verbosity > 1: print('Wrote lat')
@@ -609,12 +640,14 @@ def l1_convert(inputfile, output = None, settings = {},
                 x, y = ac.shared.projection_geo(dct_prj, xy=True, add_half_pixel=True)
                 ac.output.nc_write(ofile, 'x', x, new=new,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'],
                                     netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 x = None
                 if verbosity > 1: print('Wrote x')
                 ac.output.nc_write(ofile, 'y', y,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'],
                                     netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                 y = None
@@ -640,11 +673,52 @@ def l1_convert(inputfile, output = None, settings = {},
                         aux_file = '{}/GRANULE/{}/AUX_DATA/{}'.format(bundle, granule, source)
                         # gdal warp
                         #adata = ac.shared.read_band(aux_file, sub=None, warp_to=warp_to)
-                        lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
-                        llo = np.vstack((lon.flatten(),lat.flatten())).T
-                        lon = None
-                        lat = None
+
+                        ## put parameters on their regular lon/lat grid
+                        aux_grids = {}
                         for ai, an in enumerate(aux_data):
+                            alon = np.round(np.asarray(aux_data[an]['longitudes'], dtype=np.float64).flatten(), 6)
+                            alat = np.round(np.asarray(aux_data[an]['latitudes'], dtype=np.float64).flatten(), 6)
+                            lons, lats = np.unique(alon), np.unique(alat)
+                            if len(lons) * len(lats) != len(alon): continue
+                            grid = np.zeros((len(lats), len(lons))) + np.nan
+                            grid[np.searchsorted(lats, alat), np.searchsorted(lons, alon)] = np.asarray(aux_data[an]['values']).flatten()
+                            aux_grids[an] = (lons, lats, grid)
+
+                        ## interpolate in blocks of rows, weights are computed once per block for parameters on the same grid
+                        ydim, xdim = int(gatts['global_dims'][0]), int(gatts['global_dims'][1])
+                        block_size = 1024
+                        for r0 in range(0, ydim, block_size):
+                            r1 = min(r0+block_size, ydim)
+                            weights = {}
+                            for an in aux_grids:
+                                lons, lats, grid = aux_grids[an]
+                                key = (len(lons), lons[0], lons[-1], len(lats), lats[0], lats[-1])
+                                if key not in weights:
+                                    weights[key] = ac.shared.grid_weights_projection(lons, lats, dct_prj, r0=r0, r1=r1, add_half_pixel=True)
+                                ret = ac.shared.grid_interp(grid, weights[key])
+                                ## write
+                                ac.output.nc_write(ofile_aux, '{}_{}'.format(source, an), ret, replace_nan=True,
+                                                    offset=[0, r0], global_dims=(ydim, xdim),
+                                                    attributes=gatts, new = ofile_aux_new, nc_projection=nc_projection,
+                                                    netcdf_compression=setu['netcdf_compression'],
+                                                    netcdf_chunking=setu['netcdf_chunking'],
+                                                    netcdf_compression_level=setu['netcdf_compression_level'],
+                                                    netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+                                ret = None
+                                ofile_aux_new = False
+                            weights = None
+                        if verbosity > 1:
+                            for an in aux_grids: print('Wrote {}'.format('{}_{}'.format(source, an)))
+
+                        ## parameters not on a regular grid
+                        aux_irregular = [an for an in aux_data if an not in aux_grids]
+                        if len(aux_irregular) > 0:
+                            lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
+                            llo = np.vstack((lon.flatten(),lat.flatten())).T
+                            lon = None
+                            lat = None
+                        for ai, an in enumerate(aux_irregular):
                             lli = np.stack((aux_data[an]['longitudes'].flatten(),
                                             aux_data[an]['latitudes'].flatten())).T
                             v = aux_data[an]['values'].flatten()
@@ -655,6 +729,7 @@ def l1_convert(inputfile, output = None, settings = {},
                             ac.output.nc_write(ofile_aux, '{}_{}'.format(source, an), ret, replace_nan=True,
                                                 attributes=gatts, new = ofile_aux_new, nc_projection=nc_projection,
                                                 netcdf_compression=setu['netcdf_compression'],
+                                                netcdf_chunking=setu['netcdf_chunking'],
                                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                             if verbosity > 1: print('Wrote {}'.format('{}_{}'.format(source, an)))
@@ -669,41 +744,49 @@ def l1_convert(inputfile, output = None, settings = {},
             for Bn in band_data['RADIO_ADD_OFFSET']:
                 band_data['RADIO_ADD_OFFSET'][Bn] = float(band_data['RADIO_ADD_OFFSET'][Bn])
         if verbosity > 1: print('Converting bands')
-        for bi, b in enumerate(rsr_bands):
+        ## read and convert band b, run in the read threads
+        def band_read(b):
             Bn = 'B{}'.format(b)
-            if Bn not in safe_files[granule]: continue
-            if os.path.exists(safe_files[granule][Bn]['path']):
-                if b in waves_names:
-                    data = ac.shared.read_band(safe_files[granule][Bn]['path'], sub=sub, warp_to=warp_to)
-                    data_mask = data == nodata
-                    data = data.astype(np.float32)
-                    if 'RADIO_ADD_OFFSET' in band_data: data += band_data['RADIO_ADD_OFFSET'][Bn]
-                    data /= quant
-                    data[data_mask] = np.nan
-                    if clip: data[clip_mask] = np.nan
-                    ds = 'rhot_{}'.format(waves_names[b])
-                    ds_att = {'wavelength':waves_mu[b]*1000}
-
-                    if gains & (gains_dict is not None):
-                        ds_att['toa_gain'] = gains_dict[b]
-                        data *= ds_att['toa_gain']
-                        if verbosity > 1: print('Converting bands: Applied TOA gain {} to {}'.format(ds_att['toa_gain'], ds))
-
-                    #for k in band_data: ds_att[k] = band_data[k][b]
-                    if percentiles_compute:
-                        ds_att['percentiles'] = percentiles
-                        ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
-
-                    ## write to ms file
-                    ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts, new=new,
-                                        dataset_attributes = ds_att, nc_projection=nc_projection,
-                                        netcdf_compression=setu['netcdf_compression'],
-                                        netcdf_compression_level=setu['netcdf_compression_level'],
-                                        netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
-                    new = False
-                    if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
-            else:
-                continue
+            if Bn not in safe_files[granule]: return(None)
+            if not os.path.exists(safe_files[granule][Bn]['path']): return(None)
+            if b not in waves_names: return(None)
+            data = ac.shared.read_band(safe_files[granule][Bn]['path'], sub=sub, warp_to=warp_to)
+            data_mask = data == nodata
+            data = data.astype(np.float32)
+            if 'RADIO_ADD_OFFSET' in band_data: data += band_data['RADIO_ADD_OFFSET'][Bn]
+            data /= quant
+            data[data_mask] = np.nan
+            if clip: data[clip_mask] = np.nan
+            ds = 'rhot_{}'.format(waves_names[b])
+            ds_att = {'wavelength':waves_mu[b]*1000}
+
+            if gains & (gains_dict is not None):
+                ds_att['toa_gain'] = gains_dict[b]
+                data *= ds_att['toa_gain']
+                if verbosity > 1: print('Converting bands: Applied TOA gain {} to {}'.format(ds_att['toa_gain'], ds))
+
+            #for k in band_data: ds_att[k] = band_data[k][b]
+            if percentiles_compute:
+                ds_att['percentiles'] = percentiles
+                ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
+            return(ds, data, ds_att)
+
+        ## write band b, run in this thread
+        def band_write(b, band):
+            nonlocal new
+            ds, data, ds_att = band
+            ## write to ms file
+            ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts, new=new,
+                                dataset_attributes = ds_att, nc_projection=nc_projection,
+                                netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
+                                netcdf_compression_level=setu['netcdf_compression_level'],
+                                netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
+            new = False
+            if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
+
+        ac.shared.read_bands(rsr_bands, band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
 
         if verbosity > 1:
             print('Conversion took {:.1f} seconds'.format(time.time()-t0))
@@ -5,6 +5,7 @@
 ## modifications: 2021-12-22 (QV) added MERIS processing
 ##                2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
 
 def l1_convert(inputfile, output = None, settings = {},
                 percentiles_compute = True,
@@ -306,6 +307,7 @@ def l1_convert(inputfile, output = None, settings = {},
             for ds in ['lon', 'lat']:
                 ac.output.nc_write(ofile, ds, data[ds], new=new, attributes=gatts,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 new = False
 
@@ -322,11 +324,13 @@ def l1_convert(inputfile, output = None, settings = {},
                         ko = k.lower()
                     ac.output.nc_write(ofile, ko, tpg[k], new=new, attributes=gatts,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                     new = False
                 elif k in ['sea_level_pressure']:
                     ac.output.nc_write(ofile, 'pressure', tpg[k], new=new, attributes=gatts,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'],
                                     netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
                     new = False
@@ -365,6 +369,7 @@ def l1_convert(inputfile, output = None, settings = {},
 
             ac.output.nc_write(ofile, ds, d, dataset_attributes=ds_att, new=new, attributes=gatts,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             if verbosity > 2: print('Converting bands: Wrote {} ({})'.format(ds, d.shape))
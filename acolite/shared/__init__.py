@@ -5,6 +5,8 @@ from .rsr_write import *
 from .rsr_dict import *
 from .rsr_convolute_dict import *
 from .rsr_convolute_nd import *
+from .rsr_matrix import *
+from .rsr_hash import *
 
 from .projection_sub import *
 from .projection_geo import *
@@ -19,9 +21,13 @@ from .geolocation_sub import *
 from .nc_read import *
 from .nc_write import *
 from .nc_read_projection import *
+from .nc_geolocation import *
+from .grid_interp import *
 from .nc_extract_point import *
+from .nc_extract_points import *
 
 from .read_band import *
+from .read_bands import *
 from .lutnc_import import *
 from .datascl import *
 from .closest_idx import *
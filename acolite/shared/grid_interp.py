@@ -0,0 +1,95 @@
+## def grid_interp
+## bilinear interpolation of datasets on a regular lon/lat grid to given lon, lat positions
+## the indices and weights are computed once with grid_weights and reused for all datasets on the same grid
+##
+## lons and lats are the regular grid axes, lats can be ascending or descending,
+## lons can cross the antimeridian (e.g. 179.75, 180, -179.75) and are taken modulo 360
+## grids covering all longitudes wrap around the antimeridian, other points outside of the grid
+## and points beyond the last latitudes (poles) get the values at the grid edge
+## lon, lat can be scalars or arrays of any shape, NaN positions return NaN
+##
+## grid_weights_projection computes weights for rows r0:r1 of a projected scene grid,
+## to evaluate the datasets in blocks of rows
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def grid_interp(data, weights):
+    import numpy as np
+    d = np.asarray(data)
+    i0, i1, j0, j1 = weights['i0'], weights['i1'], weights['j0'], weights['j1']
+    wi, wj = weights['wi'], weights['wj']
+    ret = (1-wi) * ((1-wj) * d[i0, j0] + wj * d[i0, j1]) + \
+              wi * ((1-wj) * d[i1, j0] + wj * d[i1, j1])
+    if weights['invalid'] is not None: ret[weights['invalid']] = np.nan
+    ret = ret.reshape(weights['shape'])
+    if ret.ndim == 0: ret = ret.item()
+    return(ret)
+
+## compute grid indices and weights for lon, lat
+def grid_weights(lons, lats, lon, lat):
+    import numpy as np
+
+    lons = np.asarray(lons, dtype=np.float64).ravel()
+    lats = np.asarray(lats, dtype=np.float64).ravel()
+    lon, lat = np.broadcast_arrays(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    shape = lon.shape
+    lon, lat = lon.ravel(), lat.ravel()
+
+    ## NaN positions
+    invalid = np.isnan(lon) | np.isnan(lat)
+    if not invalid.any():
+        invalid = None
+    else:
+        lon = np.where(invalid, lons[0], lon)
+        lat = np.where(invalid, lats[0], lat)
+
+    ## grid steps, longitudes modulo 360
+    nlon, nlat = len(lons), len(lats)
+    lon_step = np.mod(lons[1]-lons[0], 360.) if nlon > 1 else 1.
+    lat_step = lats[1]-lats[0] if nlat > 1 else 1.
+    if nlon > 2:
+        if not np.allclose(np.mod(np.diff(lons), 360.), lon_step): print('Warning: longitude grid is not regular')
+    if nlat > 2:
+        if not np.allclose(np.diff(lats), lat_step): print('Warning: latitude grid is not regular')
+    wrap = np.abs(nlon * lon_step - 360.) < lon_step * 1e-3
+
+    ## fractional longitude index
+    fj = np.mod(lon - lons[0], 360.) / lon_step
+    if wrap:
+        fj = np.mod(fj, nlon)
+    else:
+        ## points west of the grid have wrapped to the east
+        fj[fj > (nlon-1) + (360./lon_step-(nlon-1))/2] -= 360./lon_step
+        fj = np.clip(fj, 0, nlon-1)
+    j0 = np.floor(fj).astype(np.int32)
+    wj = fj - j0
+    if wrap:
+        j0 = np.mod(j0, nlon)
+        j1 = np.mod(j0+1, nlon)
+    else:
+        j0 = np.minimum(j0, nlon-1)
+        j1 = np.minimum(j0+1, nlon-1)
+
+    ## fractional latitude index
+    fi = np.clip((lat - lats[0]) / lat_step, 0, nlat-1)
+    i0 = np.minimum(np.floor(fi).astype(np.int32), nlat-1)
+    wi = fi - i0
+    i1 = np.minimum(i0+1, nlat-1)
+
+    return({'shape': shape, 'i0': i0, 'i1': i1, 'j0': j0, 'j1': j1,
+            'wi': wi, 'wj': wj, 'invalid': invalid})
+
+## compute grid weights for rows r0:r1 of a projected scene grid
+def grid_weights_projection(lons, lats, dct, r0=0, r1=None, add_half_pixel=False):
+    import numpy as np
+    if r1 is None: r1 = dct['ydim']
+    x = np.linspace(dct['xrange'][0], dct['xrange'][1]-dct['pixel_size'][0], dct['xdim'])
+    y = np.linspace(dct['yrange'][0], dct['yrange'][1]-dct['pixel_size'][1], dct['ydim'])[r0:r1]
+    if add_half_pixel:
+        x += dct['pixel_size'][0]/2
+        y += dct['pixel_size'][1]/2
+    xx, yy = np.meshgrid(x, y)
+    lon, lat = dct['p'](xx, yy, inverse=True)
+    return(grid_weights(lons, lats, lon, lat))
@@ -0,0 +1,245 @@
+## def nc_extract_points
+## extracts data from many ACOLITE NetCDF files for many lon, lat positions
+## pixel positions are found from the projection x/y if present, or with a KD-tree on lon/lat
+## the pixel index is built once per file grid, and only the boxes around the points are read
+## files are processed in multiprocessing, results are returned as a list of rows (one per file, point and dataset)
+## and can be written to a single CSV or Parquet table
+## written by AD
+## 2026-10-18
+## modifications: 2026-10-18 (AD) support for virtual geolocation
+
+def nc_extract_points(files, st_lon, st_lat, st_name = None, extract_datasets = None,
+                      box_size = 1, shift_edge = False, output_file = None,
+                      processes = 4, verbosity = 0):
+    import os
+    from functools import partial
+    import multiprocessing
+    import acolite as ac
+
+    if (box_size & 1) == 0:
+        print('Box size has to be odd.')
+        return()
+
+    if type(files) is not list: files = [files]
+    if type(st_lon) is not list: st_lon = [st_lon]
+    if type(st_lat) is not list: st_lat = [st_lat]
+    if len(st_lon) != len(st_lat):
+        print('Provide the same number of longitudes and latitudes.')
+        return()
+    if st_name is None: st_name = ['{}'.format(si) for si in range(len(st_lon))]
+    if type(st_name) is not list: st_name = [st_name]
+
+    ## run files in multiprocessing, not possible from a daemonic process
+    nproc = min(processes, len(files)) if processes is not None else 1
+    if multiprocessing.current_process().daemon: nproc = 1
+    extract = partial(nc_extract_points_file, st_lon=st_lon, st_lat=st_lat, st_name=st_name,
+                      extract_datasets=extract_datasets, box_size=box_size, shift_edge=shift_edge,
+                      verbosity=verbosity)
+    if nproc > 1:
+        with multiprocessing.Pool(processes=nproc) as pool:
+            results = pool.map(extract, files, chunksize=1)
+    else:
+        results = [extract(ncf) for ncf in files]
+    rows = [row for res in results for row in res]
+
+    ## write output table
+    if output_file is not None:
+        if os.path.dirname(output_file) != '':
+            if not os.path.exists(os.path.dirname(output_file)): os.makedirs(os.path.dirname(output_file))
+        nc_extract_points_write(output_file, rows)
+        if verbosity > 0: print('Wrote {} rows to {}'.format(len(rows), output_file))
+    return(rows)
+
+## columns of the output table
+nc_extract_points_columns = ['file', 'sensor', 'isodate', 'station', 'st_lon', 'st_lat',
+                             'i', 'j', 'pixel_lon', 'pixel_lat', 'box_size',
+                             'dataset', 'wavelength', 'value', 'mean', 'std', 'median', 'n']
+
+## write rows to csv, or to parquet if the output file has a .parquet extension
+def nc_extract_points_write(output_file, rows):
+    import csv
+
+    if output_file.endswith('.parquet'):
+        try:
+            import pandas as pd
+            pd.DataFrame(rows, columns=nc_extract_points_columns).to_parquet(output_file, index=False)
+            return(output_file)
+        except BaseException as e:
+            print('Could not write {}: {}'.format(output_file, e))
+            output_file = output_file.replace('.parquet', '.csv')
+            print('Writing {}'.format(output_file))
+
+    with open(output_file, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=nc_extract_points_columns)
+        w.writeheader()
+        for row in rows: w.writerow(row)
+    return(output_file)
+
+## pixel index per file grid, kept for the files processed in this process
+nc_extract_points_grids = {}
+
+## find pixel indices for the points in an open NetCDF file
+## returns arrays of i, j, with -1 for points outside of the scene
+def nc_extract_points_index(nc, st_lon, st_lat):
+    import numpy as np
+    import scipy.spatial
+
+    st_lon = np.asarray(st_lon, dtype=np.float64)
+    st_lat = np.asarray(st_lat, dtype=np.float64)
+    shape = nc_extract_points_shape(nc)
+    gatts = nc.ncattrs()
+
+    ## projected grid
+    pkey = nc.getncattr('projection_key') if 'projection_key' in gatts else None
+    if (pkey is not None) and (all([k in nc.variables for k in [pkey, 'x', 'y']])):
+        try:
+            import pyproj
+            crs = pyproj.CRS.from_cf({att: nc.variables[pkey].getncattr(att) for att in nc.variables[pkey].ncattrs()})
+            x = np.asarray(nc.variables['x'][:], dtype=np.float64)
+            y = np.asarray(nc.variables['y'][:], dtype=np.float64)
+            key = ('projection', crs.to_wkt(), shape, x[0], x[-1], y[0], y[-1])
+            if key not in nc_extract_points_grids:
+                nc_extract_points_grids[key] = pyproj.Transformer.from_crs('EPSG:4326', crs, always_xy=True)
+            xp, yp = nc_extract_points_grids[key].transform(st_lon, st_lat)
+            j = np.round((np.asarray(xp) - x[0]) / (x[1] - x[0])).astype(int)
+            i = np.round((np.asarray(yp) - y[0]) / (y[1] - y[0])).astype(int)
+
+            ## refine to the closest pixel centre in lon/lat in a 3x3 window, as nc_extract_point
+            ## points more than one pixel outside of the grid are not in the scene
+            for si in range(len(st_lon)):
+                i0, i1 = max(0, i[si]-1), min(shape[0], i[si]+2)
+                j0, j1 = max(0, j[si]-1), min(shape[1], j[si]+2)
+                if (i1 <= i0) | (j1 <= j0):
+                    i[si], j[si] = -1, -1
+                    continue
+                wlon, wlat = nc_extract_points_lonlat(nc, i0, i1, j0, j1)
+                dist = ((wlon - st_lon[si])**2 + (wlat - st_lat[si])**2)**0.5
+                if np.all(np.isnan(dist)):
+                    i[si], j[si] = -1, -1
+                    continue
+                wi, wj = np.unravel_index(np.nanargmin(dist), dist.shape)
+                i[si], j[si] = i0 + wi, j0 + wj
+            return(i, j)
+        except BaseException as e:
+            print('Could not use projection to find pixels: {}'.format(e))
+
+    ## KD-tree on lon/lat for unprojected grids
+    corners = [(0, 0), (0, shape[1]-1), (shape[0]-1, 0), (shape[0]-1, shape[1]-1)]
+    key = ('kdtree', shape) + tuple([float(v[0,0]) for c in corners for v in nc_extract_points_lonlat(nc, c[0], c[0]+1, c[1], c[1]+1)])
+    if key not in nc_extract_points_grids:
+        lon, lat = nc_extract_points_lonlat(nc, 0, shape[0], 0, shape[1])
+        lon, lat = lon.astype(np.float64), lat.astype(np.float64)
+        valid = np.where(np.isfinite(lon.ravel()) & np.isfinite(lat.ravel()))[0]
+        tree = scipy.spatial.cKDTree(np.vstack((lon.ravel()[valid], lat.ravel()[valid])).T)
+        ranges = (np.nanmin(lon), np.nanmax(lon), np.nanmin(lat), np.nanmax(lat))
+        ## keep only a few grids in memory
+        for k in [k for k in nc_extract_points_grids if k[0] == 'kdtree'][0:-3]: del nc_extract_points_grids[k]
+        nc_extract_points_grids[key] = (tree, valid, ranges)
+    tree, valid, ranges = nc_extract_points_grids[key]
+    d, idx = tree.query(np.vstack((st_lon, st_lat)).T)
+    i, j = np.unravel_index(valid[idx], shape)
+    i, j = np.asarray(i), np.asarray(j)
+
+    ## is requested point in this scene?
+    out = (st_lon < ranges[0]) | (st_lon > ranges[1]) | (st_lat < ranges[2]) | (st_lat > ranges[3])
+    i[out], j[out] = -1, -1
+    return(i, j)
+
+## shape of the lon/lat grid in an open NetCDF file
+def nc_extract_points_shape(nc):
+    if ('lat' not in nc.variables) & ('geolocation_virtual' in nc.ncattrs()):
+        return((len(nc.variables['y']), len(nc.variables['x'])))
+    return(nc.variables['lat'].shape)
+
+## lon and lat for rows i0:i1 and columns j0:j1 in an open NetCDF file
+## computed from the projection for virtual geolocation
+def nc_extract_points_lonlat(nc, i0, i1, j0, j1):
+    import numpy as np
+    import acolite as ac
+    if ('lon' not in nc.variables) & ('geolocation_virtual' in nc.ncattrs()):
+        return(ac.shared.nc_geolocation(nc, sub=[j0, i0, j1-j0, i1-i0]))
+    wlon = np.ma.filled(nc.variables['lon'][i0:i1, j0:j1], np.nan)
+    wlat = np.ma.filled(nc.variables['lat'][i0:i1, j0:j1], np.nan)
+    return(wlon, wlat)
+
+## extract points from a single file
+def nc_extract_points_file(ncf, st_lon, st_lat, st_name = None, extract_datasets = None,
+                           box_size = 1, shift_edge = False, verbosity = 0):
+    import numpy as np
+    from netCDF4 import Dataset
+
+    rows = []
+    try:
+        with Dataset(ncf) as nc:
+            gatts = {att: nc.getncattr(att) for att in nc.ncattrs()}
+            if (('lon' not in nc.variables) or ('lat' not in nc.variables)) & ('geolocation_virtual' not in gatts):
+                print('No lon and lat datasets in {}'.format(ncf))
+                return(rows)
+            shape = nc_extract_points_shape(nc)
+
+            ## find datasets to extract
+            skip = ['x', 'y', 'transverse_mercator']
+            if 'projection_key' in gatts: skip.append(gatts['projection_key'])
+            datasets = [ds for ds in nc.variables if (ds not in skip) and (nc.variables[ds].shape == shape)]
+            dataset_list = nc_extract_points_datasets(datasets, extract_datasets)
+            if len(dataset_list) == 0: return(rows)
+
+            ## find pixels
+            pi, pj = nc_extract_points_index(nc, st_lon, st_lat)
+
+            hbox = int(box_size/2)
+            for si in range(len(st_lon)):
+                if pi[si] < 0:
+                    if verbosity > 1: print('Point {}N {}E not in scene {}'.format(st_lat[si], st_lon[si], ncf))
+                    continue
+                i, j = int(pi[si]), int(pj[si])
+
+                ## find box
+                i0, j0 = i - hbox, j - hbox
+                edge = (i0 < 0) | (j0 < 0) | (i0 + box_size > shape[0]) | (j0 + box_size > shape[1])
+                if edge:
+                    if not shift_edge:
+                        if verbosity > 1: print('Point at the edge of scene, cannot extract {}x{} box'.format(box_size, box_size))
+                        continue
+                    i0 = min(max(0, i0), shape[0] - box_size)
+                    j0 = min(max(0, j0), shape[1] - box_size)
+
+                plon, plat = nc_extract_points_lonlat(nc, i, i+1, j, j+1)
+                pixel_lon, pixel_lat = float(plon[0,0]), float(plat[0,0])
+
+                ## read box for each dataset
+                for ds in dataset_list:
+                    data = np.ma.filled(nc.variables[ds][i0:i0+box_size, j0:j0+box_size].astype(np.float64), np.nan)
+                    wave = None
+                    if ('_' in ds) and (ds.split('_')[0] in ['rhot', 'rhos', 'rhow', 'Rrs', 'rhorc', 'Lt']):
+                        try:
+                            wave = int(ds.split('_')[-1])
+                        except:
+                            pass
+                    rows.append({'file': ncf, 'sensor': gatts['sensor'] if 'sensor' in gatts else None,
+                                 'isodate': gatts['isodate'] if 'isodate' in gatts else None,
+                                 'station': st_name[si] if st_name is not None else si,
+                                 'st_lon': st_lon[si], 'st_lat': st_lat[si], 'i': i, 'j': j,
+                                 'pixel_lon': pixel_lon, 'pixel_lat': pixel_lat,
+                                 'box_size': box_size, 'dataset': ds, 'wavelength': wave,
+                                 'value': data[i-i0, j-j0], 'mean': np.nanmean(data) if np.any(np.isfinite(data)) else np.nan,
+                                 'std': np.nanstd(data) if np.any(np.isfinite(data)) else np.nan,
+                                 'median': np.nanmedian(data) if np.any(np.isfinite(data)) else np.nan,
+                                 'n': int(np.count_nonzero(~np.isnan(data)))})
+    except BaseException as e:
+        print('Could not extract points from {}: {}'.format(ncf, e))
+    return(rows)
+
+## select datasets to extract, as nc_extract_point
+def nc_extract_points_datasets(datasets, extract_datasets = None):
+    if extract_datasets is None: return([ds for ds in datasets if ds not in ['lon', 'lat']])
+    if type(extract_datasets) is not list: extract_datasets = [extract_datasets]
+    dataset_list = []
+    for par in ['rhot', 'rhos', 'rhow', 'Rrs']:
+        if (par in extract_datasets) or ('{}_*'.format(par) in extract_datasets):
+            dataset_list += [ds for ds in datasets if '{}_'.format(par) in ds]
+    for ds in extract_datasets:
+        if ds in dataset_list: continue
+        if ds not in datasets: continue
+        dataset_list.append(ds)
+    return(dataset_list)
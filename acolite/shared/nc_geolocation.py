@@ -0,0 +1,50 @@
+## def nc_geolocation
+## computes lon and lat from the projection stored in an ACOLITE NetCDF
+## used for files with virtual geolocation (geolocation_virtual attribute), where lon and lat are not written
+## the x and y vectors are the pixel coordinates used for lon and lat by the converters
+##
+## ncf is a file name or an open NetCDF Dataset
+## sub is (xoff, yoff, xcount, ycount) as in nc_data, stride subsamples the grid
+## lon and lat are computed in blocks of block_size rows to limit the memory used by the transform
+## returns None if the file has no projection
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+def nc_geolocation(ncf, sub=None, stride=1, dtype='float64', block_size=1024):
+    import numpy as np
+    import pyproj
+    from netCDF4 import Dataset
+
+    ## read projection and x/y vectors
+    def read(nc):
+        if 'projection_key' not in nc.ncattrs(): return(None)
+        pkey = nc.getncattr('projection_key')
+        if not all([k in nc.variables for k in [pkey, 'x', 'y']]): return(None)
+        patt = {att: nc.variables[pkey].getncattr(att) for att in nc.variables[pkey].ncattrs()}
+        x = np.asarray(np.ma.getdata(nc.variables['x'][:]), dtype=np.float64)
+        y = np.asarray(np.ma.getdata(nc.variables['y'][:]), dtype=np.float64)
+        return(patt, x, y)
+
+    if type(ncf) is str:
+        with Dataset(ncf) as nc: ret = read(nc)
+    else:
+        ret = read(ncf)
+    if ret is None: return(None)
+    patt, x, y = ret
+
+    if sub is not None:
+        x = x[sub[0]:sub[0]+sub[2]]
+        y = y[sub[1]:sub[1]+sub[3]]
+    x = x[::stride]
+    y = y[::stride]
+
+    p = pyproj.Proj(pyproj.CRS.from_cf(patt))
+    lon = np.zeros((len(y), len(x)), dtype=dtype)
+    lat = np.zeros((len(y), len(x)), dtype=dtype)
+    for r0 in range(0, len(y), block_size):
+        r1 = min(r0+block_size, len(y))
+        xx, yy = np.meshgrid(x, y[r0:r1])
+        lon[r0:r1], lat[r0:r1] = p(xx, yy, inverse=True)
+    return(lon, lat)
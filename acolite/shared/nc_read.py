@@ -1,4 +1,5 @@
 ## QV 2021-11-17 updated file handling
+## AD 2026-10-18 lon and lat are computed from the projection for files with virtual geolocation
 
 # read dataset and global attributes from netcdf
 def nc_read(file, dataset):
@@ -14,6 +15,9 @@ def nc_read(file, dataset):
 def nc_data(file, dataset, crop=False, sub=None, attributes=False):
     from netCDF4 import Dataset
     with Dataset(file) as nc:
+        ## virtual geolocation
+        if (dataset in ['lon', 'lat']) & (dataset not in nc.variables) & ('geolocation_virtual' in nc.ncattrs()):
+            return(nc_data_geolocation(nc, dataset, crop=crop, sub=sub, attributes=attributes))
         if sub is None:
             if crop is False:
                 data = nc.variables[dataset][:]
@@ -30,6 +34,25 @@ def nc_data(file, dataset, crop=False, sub=None, attributes=False):
     else:
         return(data)
 
+## compute lon or lat from the projection in an open NetCDF
+def nc_data_geolocation(nc, dataset, crop=False, sub=None, attributes=False):
+    import numpy as np
+    import acolite as ac
+    if (sub is None) & (crop is not False):
+        if len(crop) == 4: sub = [crop[0], crop[2], crop[1]-crop[0], crop[3]-crop[2]]
+    if sub is not None:
+        if len(sub) != 4: sub = None
+    lon, lat = ac.shared.nc_geolocation(nc, sub=sub)
+    data = np.ma.masked_array(lon if dataset == 'lon' else lat)
+    if attributes:
+        if dataset == 'lon':
+            atts = {'standard_name': 'longitude', 'long_name': 'longitude', 'units': 'degree_east'}
+        else:
+            atts = {'standard_name': 'latitude', 'long_name': 'latitude', 'units': 'degree_north'}
+        return(data, atts)
+    else:
+        return(data)
+
 ## get attributes for given dataset
 def nc_atts(file, dataset):
     from netCDF4 import Dataset
@@ -45,8 +68,11 @@ def nc_gatts(file):
     return gatts
 
 # read datasets in netcdf
-def nc_datasets(file):
+## virtual adds lon and lat for files with virtual geolocation
+def nc_datasets(file, virtual=False):
     from netCDF4 import Dataset
     with Dataset(file) as nc:
         ds = list(nc.variables.keys())
+        if (virtual) & ('geolocation_virtual' in nc.ncattrs()):
+            ds += [v for v in ['lon', 'lat'] if v not in ds]
     return ds
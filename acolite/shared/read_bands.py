@@ -0,0 +1,63 @@
+## def read_bands
+## reads bands in a pool of threads and writes them from the calling thread in the order given
+## GDAL releases the GIL while decoding and warping, so bands can be decoded concurrently
+## while the NetCDF writes stay serialised
+##
+## read(b) returns the data for band b, or None to skip the band
+## write(b, data) writes the data for band b
+## at most max_bands bands are being read or waiting to be written at any time (default threads + 1)
+##
+## each band is recorded as an l1r_band profiling stage, covering its read (or the wait for the threaded read) and write
+##
+## written by AD
+## 2026-10-18
+## modifications: 2026-10-18 (AD) added profiling stages
+
+def read_bands(bands, read, write, threads=1, max_bands=None):
+    from collections import deque
+    import acolite as ac
+
+    if threads is None: threads = 1
+    threads = max(1, int(threads))
+
+    ## serial reading
+    if threads == 1:
+        for b in bands:
+            ac.acolite.profiling.start('l1r_band', band=b)
+            data = read(b)
+            if data is not None: write(b, data)
+            data = None
+            ac.acolite.profiling.stop('l1r_band')
+        return
+
+    ## threaded reading
+    from concurrent.futures import ThreadPoolExecutor
+    if max_bands is None: max_bands = threads + 1
+    max_bands = max(1, int(max_bands))
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            for b in bands:
+                ## write oldest band when the maximum number of bands is in flight
+                if len(pending) >= max_bands:
+                    b0, future = pending.popleft()
+                    ac.acolite.profiling.start('l1r_band', band=b0)
+                    data = future.result()
+                    if data is not None: write(b0, data)
+                    data, future = None, None
+                    ac.acolite.profiling.stop('l1r_band')
+                pending.append((b, executor.submit(read, b)))
+
+            ## write remaining bands
+            while len(pending) > 0:
+                b0, future = pending.popleft()
+                ac.acolite.profiling.start('l1r_band', band=b0)
+                data = future.result()
+                if data is not None: write(b0, data)
+                data, future = None, None
+                ac.acolite.profiling.stop('l1r_band')
+        except:
+            ## do not start reading the remaining bands
+            for b0, future in pending: future.cancel()
+            raise
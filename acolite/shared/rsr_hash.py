@@ -0,0 +1,19 @@
+## def rsr_hash
+## returns a hash (hex string) of the band names, wavelengths and responses in an RSR dict
+## used to name sensor LUTs generated for an arbitrary band set, e.g. hyperspectral sensors
+## length gives the number of hex characters returned
+## written by AD
+## 2026-10-18
+## modifications:
+
+def rsr_hash(rsr, bands=None, length=16):
+    import hashlib
+    import numpy as np
+
+    if bands is None: bands = list(rsr.keys())
+    h = hashlib.sha1()
+    for b in bands:
+        h.update('{}'.format(b).encode())
+        h.update(np.asarray(rsr[b]['wave'], dtype=np.float64).tobytes())
+        h.update(np.asarray(rsr[b]['response'], dtype=np.float64).tobytes())
+    return(h.hexdigest()[0:length])
@@ -0,0 +1,105 @@
+## def rsr_matrix
+## sparse matrix (bands x wave) to convolute data on the wave grid to the bands in rsr
+## each band row holds the linear interpolation weights of the wave grid at the RSR wavelengths
+## multiplied by the response and divided by the response sum, as in rsr_convolute_nd
+## RSR edges with less than min_sensitivity response are removed
+## bands outside of the wave range raise a ValueError, or are left out of the matrix with bounds_error=False
+##
+## matrices are kept in an in memory LRU cache (rsr_matrix_cache_size entries), keyed by a hash
+## of the wave grid and the RSR
+##
+## returns a dict with bands, index (band to row), matrix (scipy.sparse csr),
+## and the edge trimmed response and response_wave per band
+##
+## rsr_convolute_matrix convolutes an n-dimensional array with the wavelength dimension at axis
+## in one sparse matrix product, the band dimension is put at axis
+## data with NaN values is convoluted per band as in rsr_convolute_nd
+##
+## written by AD
+## 2026-10-18
+## modifications:
+
+from collections import OrderedDict
+
+## in memory cache of matrices
+rsr_matrix_cache = OrderedDict()
+rsr_matrix_cache_size = 32
+
+def rsr_matrix(wave, rsr, bands=None, min_sensitivity=0.0025, bounds_error=True):
+    import hashlib
+    import numpy as np
+    import scipy.sparse
+
+    wave = np.asarray(wave, dtype=np.float64)
+    if bands is None: bands = list(rsr.keys())
+
+    ## trim RSR edges
+    response, response_wave = {}, {}
+    for b in bands:
+        r = np.asarray(rsr[b]['response'], dtype=np.float64)
+        rw = np.asarray(rsr[b]['wave'], dtype=np.float64)
+        sub = np.where(r > min_sensitivity)
+        response[b], response_wave[b] = r[sub], rw[sub]
+
+    ## cache key
+    h = hashlib.sha1(wave.tobytes())
+    h.update('{}'.format(bounds_error).encode())
+    for b in bands:
+        h.update('{}'.format(b).encode())
+        h.update(response[b].tobytes())
+        h.update(response_wave[b].tobytes())
+    key = h.hexdigest()
+    if key in rsr_matrix_cache:
+        rsr_matrix_cache.move_to_end(key)
+        return(rsr_matrix_cache[key])
+
+    ## interpolation weights on the sorted wave grid
+    order = np.argsort(wave)
+    ws = wave[order]
+    rows, cols, vals = [], [], []
+    bands_in = []
+    for b in bands:
+        rw = response_wave[b]
+        if len(rw) > 0:
+            if (rw.min() < ws[0]) or (rw.max() > ws[-1]):
+                if bounds_error: raise ValueError('RSR of band {} ({}-{}) outside of the wave range ({}-{})'.format(b, rw.min(), rw.max(), ws[0], ws[-1]))
+                continue
+        bi = len(bands_in)
+        bands_in.append(b)
+        if len(rw) == 0: continue
+        k = np.clip(np.searchsorted(ws, rw) - 1, 0, len(ws)-2)
+        t = (rw - ws[k]) / (ws[k+1] - ws[k])
+        w = response[b] / np.nansum(response[b])
+        rows += [bi] * (2 * len(rw))
+        cols += list(order[k]) + list(order[k+1])
+        vals += list(w * (1-t)) + list(w * t)
+
+    ## duplicates are summed
+    matrix = scipy.sparse.csr_matrix((vals, (rows, cols)), shape=(len(bands_in), len(wave)))
+    ret = {'bands': bands_in, 'index': {b: bi for bi, b in enumerate(bands_in)}, 'matrix': matrix,
+           'wave': wave, 'response': response, 'response_wave': response_wave}
+
+    rsr_matrix_cache[key] = ret
+    while len(rsr_matrix_cache) > rsr_matrix_cache_size: rsr_matrix_cache.popitem(last=False)
+    return(ret)
+
+## convolute data with rsr matrix
+def rsr_convolute_matrix(data, rsrm, axis=0):
+    import numpy as np
+
+    data = np.asarray(data)
+    if np.isnan(data).any():
+        from scipy.interpolate import interp1d
+        ## data with NaN values, per band interpolation and sum of finite values
+        f = interp1d(rsrm['wave'], data, axis=axis)
+        ret = []
+        for b in rsrm['bands']:
+            data_i = np.moveaxis(f(rsrm['response_wave'][b]), axis, -1)
+            ret.append(np.nansum(data_i * rsrm['response'][b], axis=-1) / np.nansum(rsrm['response'][b]))
+        return(np.stack(ret, axis=axis))
+
+    ## wavelength dimension in front, other dimensions flattened
+    d = np.moveaxis(data, axis, 0)
+    shape = d.shape
+    ret = rsrm['matrix'] @ d.reshape(shape[0], -1)
+    return(np.moveaxis(np.asarray(ret).reshape((rsrm['matrix'].shape[0],) + shape[1:]), 0, axis))
@@ -6,60 +6,139 @@
 ##                2020-11-18 (QV) added dtype to convert from griddata float64, by default float32
 ##                                this improves peak memory use when several datasets are kept in memory
 ##                2021-02-11 (QV) added smooth keyword,  default to nearest
+##                2026-10-18 (AD) replaced griddata by a dedicated regular grid interpolator, evaluated in blocks of block_size rows
+##                                linear interpolation uses the same triangles as the griddata Delaunay triangulation
+##                                data can be a dict of datasets on the same grid, a dict is then returned
 
 def tiles_interp(data, xnew, ynew, smooth = False, kern_size=2, method='nearest', mask=None,
-                 target_mask=None, target_mask_full=False, fill_nan = True, dtype='float32'):
+                 target_mask=None, target_mask_full=False, fill_nan = True, dtype='float32', block_size=512):
 
     import numpy as np
-    from scipy.interpolate import griddata
     from scipy.ndimage import uniform_filter,percentile_filter, distance_transform_edt
     import acolite as ac
-    
-    if mask is not None: data[mask] = np.nan
 
-    ## fill nans with closest value
-    if fill_nan:
-        #ind = distance_transform_edt(np.isnan(data), return_distances=False, return_indices=True)
-        #cur_data = data[tuple(ind)]
-        cur_data = ac.shared.fillnan(data)
+    if type(data) is dict:
+        keys = list(data.keys())
     else:
-        cur_data = data*1.0
+        keys = [None]
+        data = {None: data}
 
-    ## smooth dataset
-    if smooth:
-        z = uniform_filter(cur_data, size=kern_size)
-        zv=list(z.ravel())
-    else:
-        zv=list(cur_data.ravel())
-    dim = data.shape
+    zv = []
+    for k in keys:
+        if mask is not None: data[k][mask] = np.nan
 
-    ### tile centers
-    #x = arange(0.5, dim[1], 1)
-    #y = arange(0.5, dim[0], 1)
+        ## fill nans with closest value
+        if fill_nan:
+            #ind = distance_transform_edt(np.isnan(data), return_distances=False, return_indices=True)
+            #cur_data = data[tuple(ind)]
+            cur_data = ac.shared.fillnan(data[k])
+        else:
+            cur_data = data[k]*1.0
 
-    ## tile edges
-    x = np.arange(0., dim[1], 1)
-    y = np.arange(0., dim[0], 1)
+        ## smooth dataset
+        if smooth:
+            zv.append(uniform_filter(cur_data, size=kern_size))
+        else:
+            zv.append(cur_data)
+    zv = np.stack(zv, axis=-1).astype(np.float64)
 
-    xv, yv = np.meshgrid(x, y, sparse=False)
-    ci = (list(xv.ravel()), list(yv.ravel()))
+    ## tile edges are at integer positions x = 0 .. dim[1]-1, y = 0 .. dim[0]-1
+    xnew = np.asarray(xnew, dtype=np.float64)
+    ynew = np.asarray(ynew, dtype=np.float64)
+    coef = tiles_interp_coef(zv) if method == 'linear' else None
+    odtype = np.float64 if dtype is None else np.dtype(dtype)
 
     ## interpolate
     if target_mask is None:
-        ## full dataset
-        znew = griddata(ci, zv, (xnew[None,:], ynew[:,None]), method=method)
+        ## full dataset, in blocks of rows
+        znew = np.zeros((len(keys), len(ynew), len(xnew)), dtype=odtype)
+        for r0 in range(0, len(ynew), block_size):
+            znew[:, r0:r0+block_size] = np.moveaxis(tiles_interp_eval(zv, coef, xnew, ynew[r0:r0+block_size], method), -1, 0)
     else:
-        ## limit to target mask
+        ## limit to target mask, evaluated on its bounding box in blocks of rows
         vd = np.where(target_mask)
+        zsub = np.zeros((len(keys), len(vd[0])), dtype=odtype)
+        if len(vd[0]) > 0:
+            c0, c1 = vd[1].min(), vd[1].max()+1
+            p0 = 0
+            for r0 in range(vd[0][0], vd[0][-1]+1, block_size):
+                r1 = min(r0+block_size, vd[0][-1]+1)
+                sub = target_mask[r0:r1, c0:c1].astype(bool)
+                zcur = tiles_interp_eval(zv, coef, xnew[c0:c1], ynew[r0:r1], method)[sub]
+                zsub[:, p0:p0+zcur.shape[0]] = zcur.T
+                p0 += zcur.shape[0]
         if target_mask_full:
             ## return a dataset with the proper dimensions
-            znew = np.zeros((len(ynew), len(xnew)))+np.nan
-            znew[vd] = griddata(ci, zv, (xnew[vd[1]], ynew[vd[0]]), method=method)
+            znew = np.zeros((len(keys), len(ynew), len(xnew)), dtype=odtype)+np.nan
+            znew[:, vd[0], vd[1]] = zsub
         else:
             ## return only target_mask data
-            znew = griddata(ci, zv, (xnew[vd[1]], ynew[vd[0]]), method=method)
+            znew = zsub
+
+    if keys == [None]: return(znew[0])
+    return({k: znew[ki] for ki, k in enumerate(keys)})
+
+## triangle coefficients for linear interpolation in each grid cell
+## each cell is split in two triangles along the diagonal used in the Delaunay triangulation
+## of the grid, so results are the same as with griddata
+## returns coef (ny-1, nx-1, 2, 3, npar) with value = c0 + c1 * fx + c2 * fy for each triangle,
+## and diag (ny-1, nx-1), True if the cell is split along the (0,0)-(1,1) diagonal
+def tiles_interp_coef(zv):
+    import numpy as np
+    from scipy.spatial import Delaunay
+
+    ny, nx = zv.shape[0:2]
+    xv, yv = np.meshgrid(np.arange(0., nx, 1), np.arange(0., ny, 1), sparse=False)
+    tri = Delaunay(np.vstack((xv.ravel(), yv.ravel())).T)
+    sx = xv.ravel()[tri.simplices]
+    sy = yv.ravel()[tri.simplices]
+    cx, cy = sx.min(axis=1).astype(int), sy.min(axis=1).astype(int)
+    main = np.any((sx == cx[:,None]) & (sy == cy[:,None]), axis=1) & \
+           np.any((sx == cx[:,None]+1) & (sy == cy[:,None]+1), axis=1)
+    diag = np.zeros((ny-1, nx-1), dtype=bool)
+    diag[cy, cx] = main
+
+    v00, v01 = zv[:-1,:-1], zv[:-1,1:]
+    v10, v11 = zv[1:,:-1], zv[1:,1:]
+    d = diag[:,:,None]
+    coef = np.zeros((ny-1, nx-1, 2, 3, zv.shape[2]))
+    ## triangle 0: fx >= fy along the (0,0)-(1,1) diagonal, fx + fy <= 1 along the (0,1)-(1,0) diagonal
+    coef[:,:,0,0] = v00
+    coef[:,:,0,1] = v01-v00
+    coef[:,:,0,2] = np.where(d, v11-v01, v10-v00)
+    ## triangle 1
+    coef[:,:,1,0] = np.where(d, v00, v10+v01-v11)
+    coef[:,:,1,1] = v11-v10
+    coef[:,:,1,2] = np.where(d, v10-v00, v11-v01)
+    return(coef, diag)
+
+## evaluate grid zv (ny, nx, npar) on the target grid with column positions x and row positions y
+def tiles_interp_eval(zv, coef, x, y, method):
+    import numpy as np
 
-    if dtype is None:
+    ny, nx = zv.shape[0:2]
+    if method == 'nearest':
+        iy = np.clip(np.round(y), 0, ny-1).astype(int)
+        ix = np.clip(np.round(x), 0, nx-1).astype(int)
+        return(zv[iy][:,ix])
+    elif method == 'linear':
+        coef, diag = coef
+        iy = np.clip(np.floor(y), 0, ny-2).astype(int)
+        ix = np.clip(np.floor(x), 0, nx-2).astype(int)
+        fy, fx = (y - iy)[:,None], (x - ix)[None,:]
+        ## rows in the same grid cell row share the cell coefficients
+        znew = np.zeros((len(y), len(x), zv.shape[2]))
+        for cy in np.unique(iy):
+            rows = np.where(iy == cy)[0]
+            c = coef[cy][ix]
+            sel = np.where(diag[cy][ix][None,:], fx < fy[rows], fx + fy[rows] > 1)
+            z0 = c[:,0,0] + fx[0,:,None] * c[:,0,1] + fy[rows,:,None] * c[:,0,2]
+            z1 = c[:,1,0] + fx[0,:,None] * c[:,1,1] + fy[rows,:,None] * c[:,1,2]
+            znew[rows] = np.where(sel[:,:,None], z1, z0)
+        ## outside of the grid
+        znew[(y < 0) | (y > ny-1)] = np.nan
+        znew[:, (x < 0) | (x > nx-1)] = np.nan
         return(znew)
     else:
-        return(znew.astype(np.dtype(dtype)))
+        print('Method {} not configured for tiles_interp'.format(method))
+        return(np.zeros((len(y), len(x), zv.shape[2]))+np.nan)
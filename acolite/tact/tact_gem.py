@@ -3,6 +3,7 @@
 ## written by Quinten Vanhellemont, RBINS
 ## 2021-02-28
 ## modifications: 2021-02-28 (QV) allow gem to be a dict
+##                2026-10-18 (AD) read virtual geolocation
 
 def tact_gem(gem, output_file = True,
              return_data = False,
@@ -31,6 +32,11 @@ def tact_gem(gem, output_file = True,
         gem = ac.gem.read(gem, sub=sub)
     gemf = gem['gatts']['gemfile']
 
+    ## compute virtual geolocation, it is not written to the output
+    datasets_virtual = gem['datasets_virtual'] if 'datasets_virtual' in gem else []
+    for ds in datasets_virtual:
+        if ds not in gem['data']: gem['data'][ds] = ac.shared.nc_data(gemf, ds, sub=sub).data
+
     max_date = (datetime.datetime.now() - datetime.timedelta(days=90)).isoformat()
     if gem['gatts']['isodate'] > max_date:
         print('File too recent for TACT: after {}'.format(max_date))
@@ -65,7 +71,9 @@ def tact_gem(gem, output_file = True,
 
     ## datasets to write
     output_datasets = []
-    for ds in copy_datasets: output_datasets.append(ds)
+    for ds in copy_datasets:
+        if ds in datasets_virtual: continue
+        output_datasets.append(ds)
 
     ## radiative transfer
     thd, simst, lonc, latc = ac.tact.tact_limit(gem['gatts']['isodate'],
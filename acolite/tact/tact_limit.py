@@ -5,6 +5,7 @@
 ## modifications: 2019-12-17 renamed, added tact config, and removed dependencies
 ##                2021-02-27 (QV) integrated in acolite, added interpolation for target lat lon
 ##                2022-02-15 (QV) added L9/TIRS
+##                2026-10-18 (AD) interpolate to given lat lon with shared grid weights
 
 def tact_limit(isotime, limit=None,
                   lat = None, lon = None,
@@ -15,7 +16,6 @@ def tact_limit(isotime, limit=None,
 
     import netCDF4
     import numpy as np
-    import scipy.interpolate
     import os, json, glob
     from functools import partial
     import multiprocessing
@@ -229,12 +229,9 @@ def tact_limit(isotime, limit=None,
 
     ## interpolate to given lat lon
     if (lat is not None) & (lon is not None):
-        ## interpolate simulation data
-        x,y = np.meshgrid(lon_cells,lat_cells)
-        xr = list(x.ravel())
-        yr = list(y.ravel())
-        thd = {k: scipy.interpolate.griddata((xr,yr), list(simst[k].ravel()),
-                                             (lon, lat), method='linear') for k in simst.keys()}
+        ## interpolate simulation data on the regular grid, the weights are computed once for all parameters
+        weights = ac.shared.grid_weights(lon_cells, lat_cells, lon, lat)
+        thd = {k: ac.shared.grid_interp(simst[k], weights) for k in simst.keys()}
         return(thd, simst, lon_cells, lat_cells)
     else:
         return(simst, lon_cells, lat_cells)
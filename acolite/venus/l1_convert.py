@@ -4,6 +4,8 @@
 ## 2021-04-08
 ## modifications:  2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads
 
 def l1_convert(inputfile, output = None, settings = {},
                 percentiles_compute = True,
@@ -188,11 +190,13 @@ def l1_convert(inputfile, output = None, settings = {},
                 lon, lat = ac.shared.projection_geo(dct_prj, add_half_pixel=True)
                 ac.output.nc_write(ofile, 'lon', lon, attributes=gatts, new=new, double=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
                 if verbosity > 1: print('Wrote lon')
                 ac.output.nc_write(ofile, 'lat', lat, double=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 if verbosity > 1: print('Wrote lat')
@@ -208,12 +212,14 @@ def l1_convert(inputfile, output = None, settings = {},
                 if verbosity > 1: print('Writing geolocation x/y')
                 x, y = ac.shared.projection_geo(dct_prj, xy=True, add_half_pixel=True,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 ac.output.nc_write(ofile, 'x', x, new=new)
                 x = None
                 if verbosity > 1: print('Wrote x')
                 ac.output.nc_write(ofile, 'y', y,
                                     netcdf_compression=setu['netcdf_compression'],
+                                    netcdf_chunking=setu['netcdf_chunking'],
                                     netcdf_compression_level=setu['netcdf_compression_level'])
                 y = None
                 if verbosity > 1: print('Wrote y')
@@ -229,6 +235,7 @@ def l1_convert(inputfile, output = None, settings = {},
             cla = ac.shared.read_band(im, idx=1, warp_to=warp_to)
             ac.output.nc_write(ofile, 'cla', cla, new=new,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'])
             cla = None
             if verbosity > 1: print('Wrote cla')
@@ -268,7 +275,8 @@ def l1_convert(inputfile, output = None, settings = {},
                 vaa *= 180/np.pi
 
         ## convert bands
-        for ib, b in enumerate(rsr_bands):
+        ## read and convert band b, run in the read threads
+        def band_read(b):
             btag = 'B{}'.format(b)
             image_file = meta['bands'][btag]['path']
 
@@ -288,15 +296,24 @@ def l1_convert(inputfile, output = None, settings = {},
             if percentiles_compute:
                 ds_att['percentiles'] = percentiles
                 ds_att['percentiles_data'] = np.nanpercentile(data, percentiles)
+            return(ds, data, ds_att)
 
+        ## write band b, run in this thread
+        def band_write(b, band):
+            nonlocal new
+            ds, data, ds_att = band
             ## write to netcdf file
             ac.output.nc_write(ofile, ds, data, replace_nan=True, attributes=gatts, new=new, dataset_attributes = ds_att,
                             netcdf_compression=setu['netcdf_compression'],
+                            netcdf_chunking=setu['netcdf_chunking'],
                             netcdf_compression_level=setu['netcdf_compression_level'],
                             netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             new = False
             if verbosity > 1: print('Converting bands: Wrote {} ({})'.format(ds, data.shape))
 
+        ac.shared.read_bands(rsr_bands, band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
+
         if verbosity > 1:
             print('Conversion took {:.1f} seconds'.format(time.time()-t0))
             print('Created {}'.format(ofile))
@@ -4,6 +4,8 @@
 ## 2021-02-25
 ## modifications: 2021-12-31 (QV) new handling of settings
 ##                2022-01-04 (QV) added netcdf compression
+##                2026-10-18 (AD) added netcdf_chunking
+##                2026-10-18 (AD) read bands in l1r_read_threads threads
 
 def l1_convert(inputfile, output = None,
                inputfile_swir = None,
@@ -250,11 +252,13 @@ def l1_convert(inputfile, output = None,
                 ac.output.nc_write(ofile, 'lat', lat, global_dims=global_dims, new=new, attributes=gatts,
                                                 nc_projection = nc_projection,
                                                 netcdf_compression=setu['netcdf_compression'],
+                                                netcdf_chunking=setu['netcdf_chunking'],
                                                 netcdf_compression_level=setu['netcdf_compression_level'])
                 lat = None
                 ac.output.nc_write(ofile, 'lon', lon,
                                                 nc_projection = nc_projection,
                                                 netcdf_compression=setu['netcdf_compression'],
+                                                netcdf_chunking=setu['netcdf_chunking'],
                                                 netcdf_compression_level=setu['netcdf_compression_level'])
                 lon = None
             else: ## compute from corners given in metadata
@@ -277,10 +281,12 @@ def l1_convert(inputfile, output = None,
                 ac.output.nc_write(ofile, 'lat', zlat(x, y), global_dims=global_dims, new=new, attributes=gatts,
                                         nc_projection = nc_projection,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'])
                 ac.output.nc_write(ofile, 'lon', zlon(x, y),
                                         nc_projection = nc_projection,
                                         netcdf_compression=setu['netcdf_compression'],
+                                        netcdf_chunking=setu['netcdf_chunking'],
                                         netcdf_compression_level=setu['netcdf_compression_level'])
                 x = None
                 y = None
@@ -290,9 +296,11 @@ def l1_convert(inputfile, output = None,
         ## end write lat/lon
 
         ## run through bands
-        for b,band in enumerate(band_names):
+        ## read and convert band, run in the read threads
+        def band_read(band):
             ## run through tiles in this bundle
             ntiles = len(meta['TILE_INFO'])
+            data_full = None
             for ti, tile_mdata in enumerate(meta['TILE_INFO']):
                 try:
                     tile = tile_mdata['FILENAME'].split('_')[1].split('-')[0]
@@ -325,10 +333,12 @@ def l1_convert(inputfile, output = None,
                 else:
                     if swir_file is None:
                         swir_file='{}'.format(file)
-                        swir_meta = meta.copy()
-                    bt = [bt for bt in swir_meta['BAND_INFO'] if swir_meta['BAND_INFO'][bt]['name'] == band][0]
-                    d = ac.shared.read_band(swir_file, idx=swir_meta['BAND_INFO'][bt]['index'], sub=sub, warp_to=warp_to)
-                    cf = float(swir_meta['BAND_INFO'][bt]['ABSCALFACTOR'])/float(swir_meta['BAND_INFO'][bt]['EFFECTIVEBANDWIDTH'])
+                        band_meta = meta.copy()
+                    else:
+                        band_meta = swir_meta
+                    bt = [bt for bt in band_meta['BAND_INFO'] if band_meta['BAND_INFO'][bt]['name'] == band][0]
+                    d = ac.shared.read_band(swir_file, idx=band_meta['BAND_INFO'][bt]['index'], sub=sub, warp_to=warp_to)
+                    cf = float(band_meta['BAND_INFO'][bt]['ABSCALFACTOR'])/float(band_meta['BAND_INFO'][bt]['EFFECTIVEBANDWIDTH'])
 
                 ## track mask
                 nodata = d == np.uint16(0)
@@ -346,12 +356,14 @@ def l1_convert(inputfile, output = None,
                 d[nodata] = np.nan
 
                 ## make new data full array
-                if ti == 0: data_full = np.zeros(global_dims) + np.nan
+                if data_full is None: data_full = np.zeros(global_dims) + np.nan
 
                 ## add in data
                 data_full[offset[1]:offset[1]+d.shape[0], offset[0]:offset[0]+d.shape[1]] = d
                 d = None
 
+            if data_full is None: return(None)
+
             ## set up dataset attributes
             ds = 'rhot_{}'.format(waves_names[band])
             if atmospherically_corrected: ds = ds.replace('rhot_', 'rhos_acomp_')
@@ -364,18 +376,27 @@ def l1_convert(inputfile, output = None,
             if percentiles_compute:
                 ds_att['percentiles'] = percentiles
                 ds_att['percentiles_data'] = np.nanpercentile(data_full, percentiles)
+            return(ds, data_full, ds_att)
 
+        ## write band, run in this thread
+        def band_write(band, band_data):
+            nonlocal new
+            ds, data_full, ds_att = band_data
             ## write to netcdf file
             if verbosity > 1: print('{} - Converting bands: Writing {} ({})'.format(datetime.datetime.now().isoformat()[0:19], ds, data_full.shape))
             ac.output.nc_write(ofile, ds, data_full, attributes = gatts, new = new, dataset_attributes = ds_att,
                                 nc_projection = nc_projection,
                                 netcdf_compression=setu['netcdf_compression'],
+                                netcdf_chunking=setu['netcdf_chunking'],
                                 netcdf_compression_level=setu['netcdf_compression_level'],
                                 netcdf_compression_least_significant_digit=setu['netcdf_compression_least_significant_digit'])
             if verbosity > 1: print('{} - Converting bands: Wrote {} ({})'.format(datetime.datetime.now().isoformat()[0:19], ds, data_full.shape))
             new = False
             data_full = None
 
+        ac.shared.read_bands(band_names, band_read, band_write,
+                             threads=setu['l1r_read_threads'], max_bands=setu['l1r_read_max_bands'])
+
         if verbosity > 1:
             print('Conversion took {:.1f} seconds'.format(time.time()-t0))
             print('Created {}'.format(ofile))
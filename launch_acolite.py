@@ -5,6 +5,7 @@
 ##                    QV 2021-01-05 added freeze_support call for binary GUI
 ##                    QV 2021-04-01 updated for generic ACOLITE
 ##                    QV 2021-05-19 added print of import errors
+##                    AD 2026-10-18 added workers option
 
 def launch_acolite():
     ## need to run freeze_support for PyInstaller binary generation
@@ -42,6 +43,7 @@ def launch_acolite():
     parser.add_argument('--inputfile', help='list of images', default=None)
     parser.add_argument('--output', help='output directory', default=None)
     parser.add_argument('--sensor', help='comma separated sensor list for LUT retrieval', default=None)
+    parser.add_argument('--workers', help='number of processes for running multiple scenes', default=None)
     args, unknown = parser.parse_known_args()
 
     if '--retrieve_luts' in sys.argv:
@@ -62,7 +64,7 @@ def launch_acolite():
             print('No settings file given')
             return()
 
-        ac.acolite.acolite_run(args.settings, inputfile=inputfile, output=output)
+        ac.acolite.acolite_run(args.settings, inputfile=inputfile, output=output, workers=args.workers)
     else:
         ret = ac.acolite.acolite_gui(sys.argv, version=ac.version)
         return()